@@ -0,0 +1,112 @@
+"""
+Benchmark for a chain of transformations (offset, mirror, rotate, skew, scale) of a Gerber object.
+
+A synthetic board is parsed as Gerber (the same board as in benchmark_gerber_union.py) and the same chain of
+transformations is done with:
+    - per element: shapely.affinity for each geometry element, one transformation at a time (as it was done before)
+    - vectorized: Gerber.apply_affine() for each transformation, one shapely.transform() call each
+    - deferred: the matrices are composed, as the app objects do in FlatCAMObj.transform(), and the geometry is
+      transformed once, when it is used
+It reports the time of the chain and the time until the geometry is ready. The transformed geometry is checked
+against the first method.
+
+Usage (from the FlatCAM folder):
+    python Utils/benchmark_affine_transforms.py [nr_pads] [chain_length]
+"""
+
+import os
+import sys
+import time
+from copy import deepcopy
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np                                                              # noqa: E402
+import shapely                                                                  # noqa: E402
+from shapely import affinity                                                    # noqa: E402
+
+from camlib import flatten_shapely_geometry, translation_matrix, scale_matrix, rotation_matrix, \
+    skew_matrix                                                                 # noqa: E402
+from appParsers.ParseGerber import Gerber                                       # noqa: E402
+from benchmark_gerber_union import _App, make_gerber                            # noqa: E402
+
+# each transformation as (shapely.affinity function, its arguments, the matrix)
+TRANSFORMS = [
+    (affinity.translate, {'xoff': 3.0, 'yoff': -2.0}, translation_matrix(3.0, -2.0)),
+    (affinity.scale, {'xfact': 1.0, 'yfact': -1.0, 'origin': (5.0, 5.0)}, scale_matrix(1.0, -1.0, (5.0, 5.0))),
+    (affinity.rotate, {'angle': 15.0, 'origin': (1.0, 2.0)}, rotation_matrix(15.0, (1.0, 2.0))),
+    (affinity.skew, {'xs': 2.0, 'ys': 1.0, 'origin': (0.0, 0.0)}, skew_matrix(2.0, 1.0, (0.0, 0.0))),
+    (affinity.scale, {'xfact': 1.01, 'yfact': 0.99, 'origin': (0.0, 0.0)}, scale_matrix(1.01, 0.99, (0.0, 0.0))),
+]
+
+
+def per_element(gerber, chain_length):
+    def transform_geom(obj, fcn, kwargs):
+        if isinstance(obj, list):
+            return [transform_geom(g, fcn, kwargs) for g in obj]
+        try:
+            return fcn(obj, **kwargs)
+        except AttributeError:
+            return obj
+
+    for idx in range(chain_length):
+        fcn, kwargs, __ = TRANSFORMS[idx % len(TRANSFORMS)]
+        gerber.solid_geometry = transform_geom(gerber.solid_geometry, fcn, kwargs)
+        gerber.follow_geometry = transform_geom(gerber.follow_geometry, fcn, kwargs)
+        for apid in gerber.tools:
+            for geo_el in gerber.tools[apid].get('geometry', []):
+                for key in ('solid', 'follow', 'clear'):
+                    if key in geo_el:
+                        geo_el[key] = transform_geom(geo_el[key], fcn, kwargs)
+
+
+def vectorized(gerber, chain_length):
+    for idx in range(chain_length):
+        gerber.apply_affine(TRANSFORMS[idx % len(TRANSFORMS)][2])
+
+
+def deferred(gerber, chain_length):
+    pending = np.identity(3)
+    for idx in range(chain_length):
+        pending = np.dot(TRANSFORMS[idx % len(TRANSFORMS)][2], pending)
+    return pending
+
+
+def run(nr_pads, chain_length):
+    Gerber.app = _App()
+    source = Gerber()
+    source.parse_lines(make_gerber(nr_pads))
+
+    print("%d pads, %d transformations" % (nr_pads, chain_length))
+    print("%14s %12s %14s" % ("method", "chain [s]", "geometry [s]"))
+    reference = None
+    for name in ('per element', 'vectorized', 'deferred'):
+        gerber = deepcopy(source)
+
+        start = time.perf_counter()
+        if name == 'per element':
+            per_element(gerber, chain_length)
+            chain_time = time.perf_counter() - start
+        elif name == 'vectorized':
+            vectorized(gerber, chain_length)
+            chain_time = time.perf_counter() - start
+        else:
+            pending = deferred(gerber, chain_length)
+            chain_time = time.perf_counter() - start
+            gerber.apply_affine(pending)
+        geometry_time = time.perf_counter() - start
+
+        print("%14s %12.4f %14.3f" % (name, chain_time, geometry_time))
+        result = flatten_shapely_geometry(gerber.solid_geometry) + flatten_shapely_geometry(gerber.follow_geometry)
+        if reference is None:
+            reference = result
+        else:
+            assert len(result) == len(reference) and \
+                all(shapely.equals_exact(a, b, 1e-6) for a, b in zip(reference, result)), \
+                "The %s geometry is different" % name
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2500,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 20)
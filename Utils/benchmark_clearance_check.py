@@ -0,0 +1,112 @@
+"""
+Benchmark for the clearance checks of the Rules Check plugin (Gerber to Gerber and Hole to Hole clearance).
+
+A synthetic dense board is made: rows of SMD pads (rectangles) on a pitch a bit larger than the pad, with a few
+pads that are placed too close, and the same number of drill holes on a grid. For an increasing number of features it
+reports the time needed by:
+    - all pairs: the distance and the nearest points are computed for each two features (the previous method)
+    - STRtree: only the candidate pairs found with the STRtree are measured, in the current process
+    - STRtree + pool: the candidate pairs are measured in chunks sent to a multiprocessing Pool
+and checks that the violations found are the same.
+
+Usage (from the FlatCAM folder):
+    python Utils/benchmark_clearance_check.py [max_features] [processes]
+"""
+
+import os
+import sys
+import time
+import random
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shapely import box, Point                      # noqa: E402
+from shapely.ops import nearest_points              # noqa: E402
+
+from appCommon.Clearance import candidate_pairs, pair_clearances, clearance_chunks, clearance_process  # noqa: E402
+
+CLEARANCE = 0.2
+
+
+def make_pads(nr_features):
+    random.seed(nr_features)
+    pads = []
+    cols = int(nr_features ** 0.5) + 1
+    for i in range(nr_features):
+        x, y = (i % cols) * 1.27, (i // cols) * 1.27
+        # one pad in 50 is moved too close to its neighbour
+        if random.random() < 0.02:
+            x += random.uniform(0.1, 0.2)
+        pads.append(box(x, y, x + 1.0, y + 1.0))
+    return pads
+
+
+def make_holes(nr_features):
+    random.seed(nr_features + 1)
+    cols = int(nr_features ** 0.5) + 1
+    return [Point((i % cols) * 2.54 + random.uniform(0, 0.4), (i // cols) * 2.54).buffer(1.0)
+            for i in range(nr_features)]
+
+
+def all_pairs(geoms_1, geoms_2, size, pool):
+    # the previous method
+    points_list = set()
+    same = geoms_2 is None
+    for idx, geo in enumerate(geoms_1):
+        for s_geo in (geoms_1[idx + 1:] if same else geoms_2):
+            dist = geo.distance(s_geo)
+            if float(dist) < float(size):
+                loc_1, loc_2 = nearest_points(geo, s_geo)
+
+                dx = loc_1.x - loc_2.x
+                dy = loc_1.y - loc_2.y
+                loc = min(loc_1.x, loc_2.x) + (abs(dx) / 2), min(loc_1.y, loc_2.y) + (abs(dy) / 2)
+                points_list.add(loc)
+    return points_list
+
+
+def strtree(geoms_1, geoms_2, size, pool):
+    idx_1, idx_2 = candidate_pairs(geoms_1, geoms_2, distance=size)
+    return {loc for __, loc in pair_clearances(geoms_1, geoms_1 if geoms_2 is None else geoms_2, idx_1, idx_2,
+                                                distance=size)}
+
+
+def strtree_pool(geoms_1, geoms_2, size, pool):
+    idx_1, idx_2 = candidate_pairs(geoms_1, geoms_2, distance=size)
+    chunks = [pool.apply_async(clearance_process, args=chunk + (size, ))
+              for chunk in clearance_chunks(geoms_1, geoms_1 if geoms_2 is None else geoms_2, idx_1, idx_2,
+                                            chunk_size=5000)]
+    return {loc for chunk in chunks for __, loc in chunk.get()}
+
+
+def run(max_features, processes):
+    pool = Pool(processes=processes)
+    print("%10s %12s %16s %12s %12s" % ("features", "rule", "method", "time [s]", "violations"))
+    nr_features = 500
+    while nr_features <= max_features:
+        pads = make_pads(nr_features)
+        rules = (
+            ('gerber', pads[::2], pads[1::2]),
+            ('holes', make_holes(nr_features), None),
+        )
+        for rule, geoms_1, geoms_2 in rules:
+            results = []
+            for name, method in (('all pairs', all_pairs), ('STRtree', strtree), ('STRtree + pool', strtree_pool)):
+                # the quadratic method is not waited for on the big jobs
+                if method is all_pairs and nr_features > 2000:
+                    continue
+                start = time.perf_counter()
+                points = method(geoms_1, geoms_2, CLEARANCE, pool)
+                duration = time.perf_counter() - start
+                results.append(points)
+                print("%10d %12s %16s %12.3f %12d" % (nr_features, rule, name, duration, len(points)))
+            assert all(r == results[0] for r in results), "The %s violations are different" % rule
+        nr_features *= 4
+    pool.close()
+    pool.join()
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 128000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else max(os.cpu_count() // 4, 1))
@@ -0,0 +1,179 @@
+"""
+Benchmark for the flattening of the curves of the imported files (appParsers/ParseCurves.py).
+
+For each kind of curve it reports the time, the number of vertices and the largest distance to the curve of:
+    - per point: the curves evaluated one point at a time, as it was done before
+        - SVG paths (Arc, CubicBezier, QuadraticBezier): steps from component.length(), component.point() in a loop
+        - PDF Bezier curves: a fixed number of points per curve, in a Python loop
+        - DXF splines: spline2Polyline() with 20 segments for each control point
+    - vectorized: the curves evaluated at once, the segments chosen from the turning of the curve and the tolerance
+The distance to the curve (Hausdorff distance, the largest of all the curves) is measured against a dense sampling
+of each curve.
+
+Usage (from the FlatCAM folder):
+    python Utils/benchmark_curve_flattening.py [nr_curves] [steps_per_circle] [tolerance]
+"""
+
+import os
+import sys
+import time
+import random
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np                                                              # noqa: E402
+import shapely                                                                  # noqa: E402
+from shapely import LineString                                                  # noqa: E402
+from svg.path import parse_path, Arc, CubicBezier, QuadraticBezier              # noqa: E402
+
+from appParsers.ParseSVG import flatten_path_curves                            # noqa: E402
+from appParsers.ParsePDF import PdfParser                                       # noqa: E402
+from appParsers.ParseDXF_Spline import spline2Polyline                          # noqa: E402
+from appParsers.ParseCurves import flatten_beziers, flatten_bspline             # noqa: E402
+
+
+def make_svg_path(nr_curves):
+    random.seed(0)
+    commands = ['M 0 0']
+    for idx in range(nr_curves):
+        kind = idx % 3
+        x, y = random.uniform(1, 20), random.uniform(-10, 10)
+        if kind == 0:
+            commands.append('c %f %f %f %f %f %f' % (x / 3, 10, 2 * x / 3, -10, x, y))
+        elif kind == 1:
+            commands.append('q %f %f %f %f' % (x / 2, 8, x, y))
+        else:
+            commands.append('a %f %f 0 0 1 %f %f' % (x, x / 2, x, y))
+    return ' '.join(commands)
+
+
+def svg_per_point(path, units='MM'):
+    # the flattening of the curves in path2shapely(), before the vectorized one; one polyline for each curve
+    curves = []
+    for component in path:
+        if isinstance(component, (Arc, CubicBezier, QuadraticBezier)):
+            steps = int(component.length(0.1)) * 2
+            if units == 'IN':
+                steps *= 25
+            steps = max(steps, 10)
+            points = []
+            for i in range(steps):
+                point = component.point(i / steps)
+                points.append((point.real, point.imag))
+            end = component.point(1.0)
+            points.append((end.real, end.imag))
+            curves.append(LineString(points))
+    return curves
+
+
+def svg_reference(path):
+    return [LineString([(p.real, p.imag) for p in (component.point(t) for t in np.linspace(0, 1, 101))])
+            for component in path if isinstance(component, (Arc, CubicBezier, QuadraticBezier))]
+
+
+def make_beziers(nr_curves):
+    random.seed(1)
+    beziers = []
+    start = (0.0, 0.0)
+    for __ in range(nr_curves):
+        stop = (start[0] + random.uniform(1, 20), start[1] + random.uniform(-10, 10))
+        c1 = (start[0] + random.uniform(0, 10), start[1] + random.uniform(-10, 10))
+        c2 = (stop[0] - random.uniform(0, 10), stop[1] + random.uniform(-10, 10))
+        beziers.append([start, c1, c2, stop])
+        start = stop
+    return beziers
+
+
+def pdf_per_point(beziers, steps):
+    # bezier_to_points() before the vectorized one; one polyline for each curve
+    curves = []
+    for start, c1, c2, stop in beziers:
+        points = []
+        for t in np.arange(0.0, 1.0, 1 / steps):
+            term_p0 = (1 - t) ** 3
+            term_p1 = 3 * t * (1 - t) ** 2
+            term_p2 = 3 * (1 - t) * t ** 2
+            term_p3 = t ** 3
+            x = start[0] * term_p0 + c1[0] * term_p1 + c2[0] * term_p2 + stop[0] * term_p3
+            y = start[1] * term_p0 + c1[1] * term_p1 + c2[1] * term_p2 + stop[1] * term_p3
+            points.append([x, y])
+        points.append(list(stop))
+        curves.append(LineString(points))
+    return curves
+
+
+def make_splines(nr_splines, nr_ctrl=12):
+    random.seed(2)
+    return [[(i * 5.0, random.uniform(-10, 10), 0.0) for i in range(nr_ctrl)] for __ in range(nr_splines)]
+
+
+def curve_lines(points, offsets):
+    return [LineString(points[offsets[i]:offsets[i + 1]]) for i in range(len(offsets) - 1)]
+
+
+def distance(lines, references):
+    return float(shapely.hausdorff_distance(lines, references).max())
+
+
+def vertices(lines):
+    return int(shapely.get_num_coordinates(lines).sum())
+
+
+def report(name, per_point, vectorized):
+    (old_time, old, old_ref), (new_time, new, new_ref) = per_point, vectorized
+    print("%8s %12.4f %12.4f %9.1fx %10d %10d %12.5f %12.5f" % (
+        name, old_time, new_time, old_time / max(new_time, 1e-9), vertices(old), vertices(new),
+        distance(old, old_ref), distance(new, new_ref)))
+
+
+def run(nr_curves, steps_per_circle, tolerance):
+    print("%d curves, %d steps per circle, tolerance %g" % (nr_curves, steps_per_circle, tolerance))
+    print("%8s %12s %12s %10s %10s %10s %12s %12s" % (
+        "curves", "old [s]", "new [s]", "speedup", "old vert.", "new vert.", "old dist.", "new dist."))
+
+    # SVG
+    path = parse_path(make_svg_path(nr_curves))
+    reference = svg_reference(path)
+    start = time.perf_counter()
+    old = svg_per_point(path)
+    old_time = time.perf_counter() - start
+    start = time.perf_counter()
+    curves = flatten_path_curves(path, steps_per_circle, tolerance)
+    new_time = time.perf_counter() - start
+    new = [LineString(curves[idx]) for idx in sorted(curves)]
+    report('SVG', (old_time, old, reference), (new_time, new, reference))
+
+    # PDF
+    beziers = make_beziers(nr_curves)
+    controls = np.array(beziers)
+    reference = curve_lines(*flatten_beziers(controls, steps_per_circle=1000))
+    start = time.perf_counter()
+    old = pdf_per_point(beziers, steps_per_circle)
+    old_time = time.perf_counter() - start
+    parser = PdfParser(units='MM', resolution=steps_per_circle, abort=None, tolerance=tolerance)
+    start = time.perf_counter()
+    parser.beziers_to_points(beziers)
+    new_time = time.perf_counter() - start
+    new = curve_lines(*flatten_beziers(controls, steps_per_circle, tolerance))
+    report('PDF', (old_time, old, reference), (new_time, new, reference))
+
+    # DXF
+    splines = make_splines(max(nr_curves // 10, 1))
+    start = time.perf_counter()
+    old = []
+    for s in splines:
+        x_list, y_list, __ = spline2Polyline(list(s), degree=3, closed=False, segments=20, knots=None)
+        old.append(LineString(zip(x_list, y_list)))
+    old_time = time.perf_counter() - start
+    start = time.perf_counter()
+    new = [LineString(flatten_bspline(s, 3, steps_per_circle=steps_per_circle, tolerance=tolerance)) for s in splines]
+    new_time = time.perf_counter() - start
+    reference = [LineString(flatten_bspline(s, 3, steps_per_circle=2000)) for s in splines]
+    report('DXF', (old_time, old, reference), (new_time, new, reference))
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 3000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 64,
+        float(sys.argv[3]) if len(sys.argv) > 3 else 0.005)
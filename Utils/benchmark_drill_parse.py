@@ -0,0 +1,113 @@
+"""
+Benchmark for the parsing of the G-Code generated from Excellon objects.
+
+Reports, for an increasing number of holes, the time spent by CNCjob.gcode_parse() when the drill holes are found
+with the drill index versus the time spent by a linear search in the Excellon tools (the previous method).
+
+Usage (from the FlatCAM folder):
+    python Utils/benchmark_drill_parse.py [max_holes]
+"""
+
+import os
+import sys
+import time
+import random
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shapely import Point   # noqa: E402
+from camlib import CNCjob   # noqa: E402
+
+
+class _Signal:
+    def emit(self, *args):
+        pass
+
+
+class _Log:
+    def debug(self, *args):
+        pass
+
+    info = warning = error = debug
+
+
+class _App:
+    inform = _Signal()
+    log = _Log()
+    options = {
+        "tools_mill_toolchangexy": "0.0, 0.0",
+        "tools_drill_toolchangexy": "0.0, 0.0",
+    }
+
+
+def make_job(nr_holes, nr_tools=8):
+    random.seed(nr_holes)
+
+    tools = {}
+    for tool in range(1, nr_tools + 1):
+        tools[tool] = {'tooldia': 0.2 * tool, 'drills': []}
+
+    lines = ["G21", "G90", "G00 Z2.0000"]
+    for hole in range(nr_holes):
+        tool = (hole % nr_tools) + 1
+        pt = Point(round(random.uniform(0, 300), 4), round(random.uniform(0, 300), 4))
+        tools[tool]['drills'].append(pt)
+        lines += [
+            "G00 X%.4f Y%.4f" % (pt.x, pt.y),
+            "G01 Z-1.7000",
+            "G01 Z0",
+            "G00 Z2.0000"
+        ]
+
+    job = CNCjob.__new__(CNCjob)
+    job.app = _App()
+    job.decimals = 4
+    job.steps_per_circle = 16
+    job.units = 'MM'
+    job.obj_options = {'type': 'Excellon'}
+    job.pp_excellon_name = 'default'
+    job.pp_geometry_name = 'default'
+    job.pp_solderpaste_name = None
+    job.exc_tools = tools
+    job.gcode = "\n".join(lines)
+    return job
+
+
+def linear_search(job):
+    def find_drill_dia(x, y):
+        coords = (float('%.*f' % (job.decimals, x)), float('%.*f' % (job.decimals, y)))
+        for tool_dict in job.exc_tools.values():
+            for drill_pt in tool_dict['drills']:
+                if (float('%.*f' % (job.decimals, drill_pt.x)), float('%.*f' % (job.decimals, drill_pt.y))) == coords:
+                    return tool_dict['tooldia']
+        return None
+    return find_drill_dia
+
+
+def run(max_holes):
+    print("%10s %14s %14s %10s" % ("holes", "index [s]", "linear [s]", "speedup"))
+    nr_holes = 1000
+    while nr_holes <= max_holes:
+        job = make_job(nr_holes)
+
+        start = time.perf_counter()
+        parsed = job.gcode_parse()
+        t_index = time.perf_counter() - start
+
+        # the linear search is quadratic; do not wait for it on the big jobs
+        if nr_holes <= 20000:
+            job.find_drill_dia = linear_search(job)
+            start = time.perf_counter()
+            job.gcode_parse()
+            t_linear = time.perf_counter() - start
+            print("%10d %14.3f %14.3f %9.1fx" % (nr_holes, t_index, t_linear, t_linear / t_index))
+        else:
+            print("%10d %14.3f %14s %10s" % (nr_holes, t_index, "-", "-"))
+
+        assert len(parsed) >= nr_holes
+        nr_holes *= 2
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 64000)
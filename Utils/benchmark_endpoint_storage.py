@@ -0,0 +1,138 @@
+"""
+Benchmark for the storage used when the paths are chained (nearest endpoint, then remove, in a loop).
+
+For an increasing number of paths it reports the time spent by AppRTreeStorage (libspatialindex, the points
+inserted and deleted one by one) and by AppKDTreeStorage (NumPy arrays and a KD-tree built in bulk) in:
+    - chain: the nearest-remove loop of CNCjob.geo_optimized_rtree()
+    - path_connect: Geometry.path_connect() on the segments of a grid of polylines (all of them touch)
+and checks that both storages give the same result (the same vertices, for path_connect). AppKDTreeStorage is also
+checked against a brute force search of the nearest point, with points removed and inserted between the searches.
+
+Usage (from the FlatCAM folder):
+    python Utils/benchmark_endpoint_storage.py [max_paths]
+"""
+
+import os
+import sys
+import time
+import math
+import random
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shapely import LineString                                      # noqa: E402
+from camlib import Geometry, AppRTreeStorage, AppKDTreeStorage     # noqa: E402
+
+
+def get_pts(o):
+    return [o.coords[0], o.coords[-1]]
+
+
+def make_segments(nr_paths):
+    random.seed(nr_paths)
+    paths = []
+    for i in range(nr_paths):
+        x, y = random.uniform(0, 300), random.uniform(0, 300)
+        paths.append(LineString([(x, y), (x + random.uniform(-2, 2), y + random.uniform(-2, 2))]))
+    return paths
+
+
+def make_polylines(nr_paths):
+    # horizontal polylines broken in segments of 10 vertices; the segments of a polyline touch on their ends
+    paths = []
+    row = 0
+    while len(paths) < nr_paths:
+        for col in range(0, 1000, 9):
+            paths.append(LineString([(col + i, row) for i in range(10)]))
+        row += 1
+    return paths[:nr_paths]
+
+
+def fill(storage_class, paths):
+    storage = storage_class()
+    storage.get_points = get_pts
+    for path in paths:
+        storage.insert(path)
+    return storage
+
+
+def chain(storage_class, paths):
+    storage = fill(storage_class, paths)
+    locations = []
+    current_pt = (0, 0)
+    try:
+        while True:
+            pt, geo = storage.nearest(current_pt)
+            storage.remove(geo)
+            locations.append(pt)
+            current_pt = geo.coords[-1]
+    except StopIteration:
+        pass
+    return locations
+
+
+def path_connect(storage_class, paths):
+    storage = fill(storage_class, paths)
+    # the paths made depend on which of the equally near endpoints is found first, so only the vertices are compared
+    return sorted(pt for geo in Geometry.path_connect(storage).get_objects() for pt in geo.coords)
+
+
+def check_nearest(nr_paths):
+    random.seed(nr_paths)
+    storage = AppKDTreeStorage()
+    storage.get_points = get_pts
+    alive = []
+
+    def insert(x, y):
+        path = LineString([(x, y), (x + 0.01, y)])
+        storage.insert(path)
+        alive.append(path)
+
+    for __ in range(nr_paths):
+        insert(random.uniform(-10, 10), random.uniform(-10, 10))
+
+    for step in range(200):
+        query = (random.uniform(-10, 10), random.uniform(-10, 10))
+        # remove the points around the query (the tree skips them, then it is rebuilt) and insert a closer one
+        alive.sort(key=lambda geo: math.dist(geo.coords[0], query))
+        nr_removed = min(random.randint(0, 60), len(alive) - 1)
+        for path in alive[:nr_removed]:
+            storage.remove(path)
+        del alive[:nr_removed]
+        if step % 2:
+            insert(*query)
+
+        pt, __ = storage.nearest(query)
+        best = min(math.dist(pt_, query) for geo in alive for pt_ in get_pts(geo))
+        assert math.isclose(math.dist(pt, query), best, abs_tol=1e-12), \
+            "The nearest point of %s is not found: %s at %f instead of %f" % (query, pt, math.dist(pt, query), best)
+
+
+def run(max_paths):
+    check_nearest(4000)
+    print("nearest point after removals and inserts: OK")
+
+    print("%10s %14s %14s %14s %10s" % ("paths", "method", "RTree [s]", "KD-tree [s]", "speedup"))
+    nr_paths = 1000
+    while nr_paths <= max_paths:
+        for name, method, paths in (('chain', chain, make_segments(nr_paths)),
+                                    ('path_connect', path_connect, make_polylines(nr_paths))):
+            start = time.perf_counter()
+            kd_result = method(AppKDTreeStorage, paths)
+            t_kd = time.perf_counter() - start
+
+            # the RTree storage is quadratic on removal; do not wait for it on the big jobs
+            if nr_paths <= 32000:
+                start = time.perf_counter()
+                rtree_result = method(AppRTreeStorage, paths)
+                t_rtree = time.perf_counter() - start
+                assert kd_result == rtree_result, "The %s result is different" % name
+                print("%10d %14s %14.3f %14.3f %9.1fx" % (nr_paths, name, t_rtree, t_kd, t_rtree / t_kd))
+            else:
+                print("%10d %14s %14s %14.3f %10s" % (nr_paths, name, "-", t_kd, "-"))
+        nr_paths *= 4
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 256000)
@@ -0,0 +1,144 @@
+"""
+Benchmark for the geometry of the Excellon holes (Excellon.create_geometry()).
+
+For an increasing number of holes (drills and slots in 8 tools), it reports the time of:
+    - geometry: Excellon.create_geometry() as it was done before (a buffer() and a deepcopy() of the tool data for
+      each hole) and with the per tool arrays (Excellon.tool_arrays()), one circle per tool diameter placed at all
+      the drills and one buffer() of all the slots of the tool
+    - slot drills: the slots converted to drills by ToolDrilling, one slot after the other
+      (ToolDrilling.process_slot_as_drills()) and for all the slots of a tool (get_slot_drills())
+The geometry and the drills are checked against the previous method.
+
+Usage (from the FlatCAM folder):
+    python Utils/benchmark_excellon_geometry.py [max_holes]
+"""
+
+import os
+import sys
+import time
+import random
+from copy import deepcopy
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import shapely                                                                  # noqa: E402
+from shapely import Point, LineString                                           # noqa: E402
+
+from appCommon.GeometryArray import GeometryArray                               # noqa: E402
+from appParsers.ParseExcellon import Excellon, get_slot_drills                  # noqa: E402
+from benchmark_gerber_union import _App                                         # noqa: E402
+
+
+class _PerHoleExcellon(Excellon):
+    # the geometry made for each hole, as it was done before the tool arrays
+
+    def create_geometry(self):
+        self.solid_geometry = []
+        for tool in self.tools:
+            self.tools[tool]['solid_geometry'] = GeometryArray()
+            self.tools[tool]['data'] = {}
+
+        for tool in self.tools:
+            tooldia = self.tools[tool]['tooldia']
+            for drill in self.tools[tool].get('drills', []):
+                poly = drill.buffer(tooldia / 2.0, int(self.excellon_circle_steps))
+                self.tools[tool]['solid_geometry'].append(poly)
+                self.tools[tool]['data'] = deepcopy(self.default_data)
+                self.solid_geometry.append(poly)
+            for slot in self.tools[tool].get('slots', []):
+                poly = LineString([slot[0], slot[1]]).buffer(tooldia / 2.0, int(self.excellon_circle_steps))
+                self.tools[tool]['solid_geometry'].append(poly)
+                self.tools[tool]['data'] = deepcopy(self.default_data)
+                self.solid_geometry.append(poly)
+
+
+def process_slot_as_drills(slot, overlap, add_last_pt=False):
+    # ToolDrilling.process_slot_as_drills()
+    drills_list = []
+    start_pt = slot[0]
+    stop_pt = slot[1]
+    slot_line = LineString([start_pt, stop_pt])
+    drills_list.append(start_pt)
+
+    ii = 0
+    while True:
+        ii += 1
+        new_pt = slot_line.interpolate(overlap * ii)
+        if new_pt.within(slot_line) is False:
+            break
+        drills_list.append(new_pt)
+
+    if add_last_pt and stop_pt.distance(drills_list[-1]) >= overlap / 10:
+        drills_list.append(stop_pt)
+    return drills_list
+
+
+def make_tools(nr_holes, nr_tools=8):
+    random.seed(nr_holes)
+    tools = {}
+    for tool in range(1, nr_tools + 1):
+        tools[tool] = {'tooldia': 0.2 * tool, 'drills': [], 'slots': [], 'solid_geometry': []}
+
+    for hole in range(nr_holes):
+        tool = tools[(hole % nr_tools) + 1]
+        x, y = round(random.uniform(0, 300), 4), round(random.uniform(0, 300), 4)
+        if hole % 10:
+            tool['drills'].append(Point(x, y))
+        else:
+            tool['slots'].append((Point(x, y), Point(x + round(random.uniform(0, 5), 4), y)))
+    return tools
+
+
+def make_excellon(cls, tools):
+    excellon = cls(excellon_circle_steps=64)
+    # the options of an Excellon object
+    excellon.default_data = {'option_%d' % idx: [idx, 'value', {'key': idx}] for idx in range(150)}
+    excellon.tools = deepcopy(tools)
+    return excellon
+
+
+def timed(fcn, *args):
+    start = time.perf_counter()
+    result = fcn(*args)
+    return result, time.perf_counter() - start
+
+
+def slot_drills_per_slot(tools, overlap):
+    return [[process_slot_as_drills(slot, overlap, True) for slot in tool['slots']] for tool in tools.values()]
+
+
+def slot_drills_per_tool(excellon, overlap):
+    return [get_slot_drills(excellon.tool_arrays(tool)[1], overlap, True) for tool in excellon.tools]
+
+
+def run(max_holes):
+    Excellon.app = _App()
+    print("%10s %14s %14s %10s %16s %16s %10s" % (
+        "holes", "geometry, old", "geometry, new", "speedup", "slot drills, old", "slot drills, new", "speedup"))
+    nr_holes = 2500
+    while nr_holes <= max_holes:
+        tools = make_tools(nr_holes)
+        old, new = make_excellon(_PerHoleExcellon, tools), make_excellon(Excellon, tools)
+
+        __, old_time = timed(old.create_geometry)
+        __, new_time = timed(new.create_geometry)
+        assert len(old.solid_geometry) == len(new.solid_geometry) == nr_holes, "The holes are missing"
+        assert max(shapely.hausdorff_distance(old.solid_geometry, new.solid_geometry)) < 1e-9, \
+            "The holes are different"
+        assert all(old.tools[tool]['data'] == new.tools[tool]['data'] for tool in tools), "The tool data is different"
+
+        old_drills, old_slots = timed(slot_drills_per_slot, tools, 0.3)
+        new_drills, new_slots = timed(slot_drills_per_tool, new, 0.3)
+        for old_tool, new_tool in zip(old_drills, new_drills):
+            old_tool = shapely.get_coordinates([pt for drills in old_tool for pt in drills])
+            assert old_tool.shape == new_tool.shape and abs(old_tool - new_tool).max(initial=0) < 1e-9, \
+                "The slot drills are different"
+
+        print("%10d %14.3f %14.3f %9.1fx %16.3f %16.3f %9.1fx" % (
+            nr_holes, old_time, new_time, old_time / new_time, old_slots, new_slots, old_slots / new_slots))
+        nr_holes *= 4
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 40000)
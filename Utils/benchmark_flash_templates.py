@@ -0,0 +1,120 @@
+"""
+Benchmark for the geometry of the Gerber flashes (the aperture templates of Gerber.create_flash_geometry()).
+
+For a grid of flashes of circular, rectangular and obround apertures, with an increasing number of flashes, it
+reports the time of:
+    - flashes: Gerber.create_flash_geometry() for each flash, with the flash geometry made for each flash (as it was
+      done before) and with the aperture template moved to each flash
+    - punching: holes in all the flashes of a parsed board (benchmark_gerber_union.py), a buffer() of each pad
+      center (as ToolPunchGerber did it) and the holes placed at the flash locations of the apertures
+      (Gerber.flash_locations() and place_flashes())
+The geometry of the results is checked against the previous method.
+
+Usage (from the FlatCAM folder):
+    python Utils/benchmark_flash_templates.py [max_flashes] [steps_per_circle]
+"""
+
+import os
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import shapely                                                                  # noqa: E402
+from shapely import Point                                                       # noqa: E402
+from shapely.ops import unary_union                                             # noqa: E402
+
+from appParsers.ParseGerber import Gerber, place_flashes                        # noqa: E402
+from benchmark_gerber_union import _App, make_gerber                            # noqa: E402
+
+
+class _PerFlashGerber(Gerber):
+    # the flash geometry made for each flash, as it was done before the templates
+
+    def create_flash_geometry(self, location, aperture, steps_per_circle=None):
+        loc = location
+        if aperture['type'] == 'C':
+            return Point(loc).buffer(aperture['size'] / 2, int(steps_per_circle))
+
+        width = aperture['width']
+        height = aperture['height']
+        if aperture['type'] == 'R':
+            return shapely.box(loc[0] - width / 2, loc[1] - height / 2, loc[0] + width / 2, loc[1] + height / 2).buffer(
+                0.0000001)
+
+        if width > height:
+            c1 = Point(loc[0] + 0.5 * (width - height), loc[1]).buffer(height * 0.5, int(steps_per_circle))
+            c2 = Point(loc[0] - 0.5 * (width - height), loc[1]).buffer(height * 0.5, int(steps_per_circle))
+        else:
+            c1 = Point(loc[0], loc[1] + 0.5 * (height - width)).buffer(width * 0.5, int(steps_per_circle))
+            c2 = Point(loc[0], loc[1] - 0.5 * (height - width)).buffer(width * 0.5, int(steps_per_circle))
+        return unary_union([c1, c2]).convex_hull
+
+
+APERTURES = {
+    'C': {'type': 'C', 'size': 1.6},
+    'R': {'type': 'R', 'width': 1.0, 'height': 0.5, 'size': 1.0},
+    'O': {'type': 'O', 'width': 1.0, 'height': 2.0, 'size': 1.0},
+}
+
+
+def timed(fcn, *args):
+    start = time.perf_counter()
+    result = fcn(*args)
+    return result, time.perf_counter() - start
+
+
+def punch_per_pad(gerber, dia):
+    holes = []
+    for apid in gerber.tools:
+        for elem in gerber.tools[apid].get('geometry', []):
+            if 'follow' in elem and isinstance(elem['follow'], Point):
+                holes.append(elem['follow'].buffer(dia / 2))
+    return holes
+
+
+def punch_flashes(gerber, dia):
+    holes = []
+    for apid in gerber.tools:
+        locations, __ = gerber.flash_locations(apid)
+        holes += list(place_flashes(Point(0, 0).buffer(dia / 2), locations))
+    return holes
+
+
+def make_flashes(gerber, locations, aperture, steps_per_circle):
+    return [gerber.create_flash_geometry(loc, aperture, steps_per_circle) for loc in locations]
+
+
+def run(max_flashes, steps_per_circle):
+    app = _App()
+    app.options = dict(_App.options)
+    app.options['gerber_circle_steps'] = steps_per_circle
+    Gerber.app = app
+    old, new = _PerFlashGerber(), Gerber()
+
+    print("%d steps per circle" % steps_per_circle)
+    print("%10s %10s %14s %14s %9s" % ("flashes", "aperture", "old [s]", "new [s]", "speedup"))
+    nr_flashes = 2500
+    while nr_flashes <= max_flashes:
+        side = int(nr_flashes ** 0.5)
+        locations = [(col * 2.54, row * 2.54) for row in range(side) for col in range(side)]
+        for name, aperture in APERTURES.items():
+            old_geo, old_time = timed(make_flashes, old, locations, aperture, steps_per_circle)
+            new_geo, new_time = timed(make_flashes, new, locations, aperture, steps_per_circle)
+            assert max(shapely.hausdorff_distance(old_geo, new_geo)) < 1e-9, "The flashes are different"
+            print("%10d %10s %14.4f %14.4f %8.1fx" % (len(locations), name, old_time, new_time, old_time / new_time))
+        nr_flashes *= 4
+
+    print("%10s %10s %14s %14s %9s" % ("pads", "", "punch, old [s]", "punch, new [s]", "speedup"))
+    new = Gerber()
+    new.parse_lines(make_gerber(max_flashes))
+    old_holes, old_punch = timed(punch_per_pad, new, 0.5)
+    new_holes, new_punch = timed(punch_flashes, new, 0.5)
+    assert max(shapely.hausdorff_distance(old_holes, new_holes)) < 1e-9, "The holes are different"
+    print("%10d %10s %14.4f %14.4f %8.1fx" % (len(new_holes), "", old_punch, new_punch, old_punch / new_punch))
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 64)
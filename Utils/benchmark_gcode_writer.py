@@ -0,0 +1,92 @@
+"""
+Benchmark for the memory used while generating G-Code.
+
+Emits the cutting moves of a big multi-tool geometry (path by path, as CNCjob.geometry_tool_gcode_gen() does) and
+reports the peak of the memory allocated by Python (tracemalloc) and the time for:
+    - concatenation: the G-Code of each path is added to one string (the previous method)
+    - writer: the G-Code of each path goes into a GCodeWriter which keeps it in memory (what the generation of the
+      G-Code uses, in the GUI and in the Tcl commands: the CNCJob object keeps the G-Code of each tool)
+    - stream: the G-Code of each path goes into a GCodeWriter which streams it into a file (only the export of a
+      CNCJob object streams, CNCJobObject.export_gcode())
+and checks that the resulting G-Code is identical.
+
+Usage (from the FlatCAM folder):
+    python Utils/benchmark_gcode_writer.py [nr_vertices_per_tool]
+"""
+
+import os
+import sys
+import time
+import glob
+import tempfile
+import tracemalloc
+from importlib.machinery import SourceFileLoader
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_preprocessor_emit import make_job, make_geometry     # noqa: E402
+from camlib import GCodeWriter     # noqa: E402
+
+
+def concatenation(job, geometry, out_file):
+    gcode = ''
+    for dia, paths in geometry.items():
+        job.tooldia = dia
+        old_point = (0, 0)
+        for path in paths:
+            gcode += job.linear2gcode(path, dia, old_point=old_point)
+            old_point = path.coords[-1]
+    return gcode
+
+
+def writer(job, geometry, out_file, sink=None):
+    t_gcode = GCodeWriter(sink)
+    for dia, paths in geometry.items():
+        job.tooldia = dia
+        old_point = (0, 0)
+        for path in paths:
+            t_gcode.write(job.linear2gcode(path, dia, old_point=old_point))
+            old_point = path.coords[-1]
+    t_gcode.close()
+    return t_gcode.getvalue()
+
+
+def stream(job, geometry, out_file):
+    with open(out_file, 'w') as f:
+        writer(job, geometry, out_file, sink=f)
+    return None
+
+
+def run(nr_vertices):
+    for file in glob.glob(os.path.join('preprocessors', '*.py')):
+        SourceFileLoader('FlatCAMPostProcessor', file).load_module()
+
+    geometry = make_geometry(nr_vertices)
+    out_file = os.path.join(tempfile.gettempdir(), 'benchmark_gcode_writer.nc')
+    print("%d vertices per tool" % nr_vertices)
+    print("%14s %12s %16s" % ("method", "time [s]", "peak memory [MB]"))
+
+    results = []
+    for method in (concatenation, writer, stream):
+        job = make_job('GRBL_11')
+        tracemalloc.start()
+        start = time.perf_counter()
+        method(job, geometry, out_file)
+        duration = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print("%14s %12.3f %16.1f" % (method.__name__, duration, peak / 1e6))
+
+        # check the result outside the measurements
+        gcode = method(make_job('GRBL_11'), geometry, out_file)
+        if gcode is None:
+            with open(out_file, 'r') as f:
+                gcode = f.read()
+        results.append(gcode)
+
+    assert results[0] == results[1] == results[2], "The G-Code is different"
+    os.remove(out_file)
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 250000)
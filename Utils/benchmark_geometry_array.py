@@ -0,0 +1,109 @@
+"""
+Benchmark for the GeometryArray container of the solid_geometry.
+
+The geometry is a nested list of pads (buffered points) and traces, as the geometry objects hold it. For a plain
+list and for a GeometryArray it reports the time of:
+    - bounds: the bounds of the geometry, asked again after one element was appended (as the fit view does it)
+    - flatten: flatten_shapely_geometry() of the geometry
+    - find: find_polygon() for a number of clicked points (as the Paint and Isolation tools do it)
+    - collection bounds: the bounds of all the objects in the collection (ObjectCollection.get_bounds())
+The results are checked against the plain list.
+
+Usage (from the FlatCAM folder):
+    python Utils/benchmark_geometry_array.py [nr_pads] [nr_objects] [nr_clicks]
+"""
+
+import os
+import sys
+import time
+import random
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np                                                              # noqa: E402
+from shapely import Point, LineString                                           # noqa: E402
+
+from camlib import Geometry, flatten_shapely_geometry                           # noqa: E402
+from benchmark_gerber_union import _App                                         # noqa: E402
+
+# bounds_rec() in Geometry.bounds() uses np.Inf, removed in NumPy 2
+if not hasattr(np, 'Inf'):
+    np.Inf = np.inf
+
+
+class _Geometry(Geometry):
+    multigeo = False
+
+    def __init__(self, geometry):
+        self.solid_geometry = geometry
+
+
+class _PlainGeometry(_Geometry):
+    # the geometry is kept as a plain list
+    solid_geometry = None
+
+    def __init__(self, geometry):
+        self.__dict__['solid_geometry'] = geometry
+
+
+def make_geometry(nr_pads):
+    side = int(nr_pads ** 0.5) + 1
+    rows = []
+    for row in range(side):
+        pads = [Point(col * 2.54, row * 2.54).buffer(0.8, 16) for col in range(side)]
+        traces = [LineString([(0, row * 2.54), (side * 2.54, row * 2.54)]).buffer(0.2, 4)]
+        rows.append(pads + [traces])
+    return rows
+
+
+def timed(fcn, repeat=1):
+    start = time.perf_counter()
+    for __ in range(repeat):
+        result = fcn()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def run(nr_pads, nr_objects, nr_clicks):
+    Geometry.app = _App()
+    geometry = make_geometry(nr_pads)
+    side = len(geometry)
+    random.seed(0)
+    clicks = [(random.uniform(0, side * 2.54), random.uniform(0, side * 2.54)) for __ in range(nr_clicks)]
+    extra = Point(-10, -10).buffer(1.0)
+
+    print("%d pads, %d objects, %d clicks" % (nr_pads, nr_objects, nr_clicks))
+    print("%14s %12s %12s %12s %20s" % ("container", "bounds [s]", "flatten [s]", "find [s]", "collection bounds [s]"))
+    reference = None
+    for name, cls in (('list', _PlainGeometry), ('GeometryArray', _Geometry)):
+        obj = cls([list(row) for row in geometry])
+
+        def bounds_after_append():
+            obj.solid_geometry.append(extra)
+            bounds = obj.bounds()
+            obj.solid_geometry.pop()
+            return bounds
+        obj.bounds()
+        bounds, bounds_time = timed(bounds_after_append, 5)
+        flat, flatten_time = timed(lambda: flatten_shapely_geometry(obj.solid_geometry))
+        found, find_time = timed(lambda: [obj.find_polygon(pt) for pt in clicks])
+
+        objects = [cls([list(row) for row in geometry]) for __ in range(nr_objects)]
+        for o in objects:
+            o.bounds()
+        __, collection_time = timed(lambda: [o.bounds() for o in objects], 5)
+
+        print("%14s %12.5f %12.4f %12.4f %20.5f" % (name, bounds_time, flatten_time, find_time, collection_time))
+        result = (bounds, [g.wkb for g in flat], [g.wkb if g is not None else None for g in found])
+        if reference is None:
+            reference = result
+        else:
+            assert np.allclose(result[0], reference[0]), "The bounds are different"
+            assert result[1] == reference[1], "The flattened geometry is different"
+            assert result[2] == reference[2], "The found polygons are different"
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 20,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 200)
@@ -0,0 +1,103 @@
+"""
+Benchmark for the front end of the Gerber parser (appParsers/ParseGerber_Tokenizer.py).
+
+A synthetic board (see benchmark_gerber_union.py), with KiCAD object attributes (%TO.) before each pad, is written
+to a file. For an increasing size of the board it reports the time spent to read the file and classify its
+commands by:
+    - regex chain: as it was done before; the attribute lines are removed by concatenating the other lines, the lines
+      are split in commands, each command is appended to the source with += and the patterns are tried one after the
+      other until one matches
+    - tokenizer: GerberTokenizer.tokenize(); the patterns are selected from the leading letters of the command
+and the time of Gerber.parse_file() for the whole parsing. The kinds found by the two front ends are checked to
+be the same.
+
+Usage (from the FlatCAM folder):
+    python Utils/benchmark_gerber_tokenizer.py [max_pads]
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from appParsers.ParseGerber import Gerber                                       # noqa: E402
+from appParsers.ParseGerber_Tokenizer import GerberTokenizer, PATTERNS, split_commands, X2_ATTRIBUTES, \
+    UNKNOWN, AM                                                                 # noqa: E402
+from benchmark_gerber_union import _App, make_gerber                            # noqa: E402
+
+
+def add_attributes(glines):
+    lines = []
+    for line in glines:
+        if line.endswith('D03*'):
+            lines.append('%TO.C,R1*%')
+        lines.append(line)
+    return lines
+
+
+def regex_chain(gerber, filename):
+    # the front end before the tokenizer (no aperture macros in the file)
+    with open(filename, 'r') as gfile:
+        read_gfile = gfile.read()
+
+    new_gfile = ""
+    for line in read_gfile.splitlines():
+        if any(attr in line for attr in X2_ATTRIBUTES):
+            continue
+        new_gfile += '%s\n' % line
+
+    patterns = [(kind, getattr(gerber, name)) for kind, name in PATTERNS if kind != AM]
+    source_file = ''
+    kinds = []
+    for line in new_gfile.splitlines():
+        for gline in split_commands(line):
+            source_file += gline + '\n'
+            for kind, pattern in patterns:
+                if pattern.search(gline):
+                    break
+            else:
+                kind = UNKNOWN
+            kinds.append(kind)
+    return kinds
+
+
+def tokenizer(gerber, filename):
+    with open(filename, 'r') as gfile:
+        source = gfile.read()
+    return [kind for kind, __, __, __ in GerberTokenizer(gerber).tokenize(source.splitlines())]
+
+
+def timed(fcn, *args):
+    start = time.perf_counter()
+    result = fcn(*args)
+    return result, time.perf_counter() - start
+
+
+def run(max_pads):
+    Gerber.app = _App()
+    print("%10s %10s %16s %16s %10s %18s" % (
+        "pads", "size [MB]", "regex chain [s]", "tokenizer [s]", "speedup", "parse_file() [s]"))
+    nr_pads = 2500
+    while nr_pads <= max_pads:
+        fd, filename = tempfile.mkstemp(suffix='.gbr')
+        with os.fdopen(fd, 'w') as gfile:
+            gfile.write('\n'.join(add_attributes(make_gerber(nr_pads))) + '\n')
+
+        gerber = Gerber()
+        old_kinds, old_time = timed(regex_chain, gerber, filename)
+        new_kinds, new_time = timed(tokenizer, gerber, filename)
+        assert old_kinds == new_kinds, "The commands are classified differently"
+        ret_val, parse_time = timed(gerber.parse_file, filename)
+        assert ret_val is None, "The parsing failed"
+
+        print("%10d %10.1f %16.3f %16.3f %9.1fx %18.3f" % (
+            nr_pads, os.path.getsize(filename) / 1e6, old_time, new_time, old_time / new_time, parse_time))
+        os.remove(filename)
+        nr_pads *= 4
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
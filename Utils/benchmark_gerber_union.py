@@ -0,0 +1,161 @@
+"""
+Benchmark for the union of the polygons done when a Gerber file is parsed.
+
+A synthetic board is written in Gerber: a copper pour filled with overlapping strokes, clearances cut in it (LPC),
+then on a dark layer (LPD) a grid of pads (flashes) joined by traces. For an increasing size of the board it reports the time spent
+by Gerber.parse_lines() and the peak memory (RSS) of the process when the polygons are joined with:
+    - buffer: a MultiPolygon made of all the polygons is buffered (the default method)
+    - union: unary_union() of all the polygons
+    - tiled: TiledUnion, the polygons are joined per tile while the file is parsed
+    - tiled + pool: the same, with the batches joined in a multiprocessing Pool
+Each method runs in its own process, so the peak memory of one does not hide the others. The area of the
+result is checked against the first method.
+
+Usage (from the FlatCAM folder):
+    python Utils/benchmark_gerber_union.py [max_pads] [processes]
+"""
+
+import os
+import sys
+import time
+import resource
+import multiprocessing
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from camlib import flatten_shapely_geometry     # noqa: E402
+from appParsers.ParseGerber import Gerber        # noqa: E402
+
+
+class _Signal:
+    def emit(self, *args):
+        pass
+
+
+class _Log:
+    def debug(self, *args):
+        pass
+
+    info = warning = error = debug
+
+
+class _PlotCanvas:
+    def new_shape_collection(self, **kwargs):
+        return None
+
+
+class _App:
+    inform = _Signal()
+    log = _Log()
+    decimals = 4
+    app_units = 'MM'
+    use_3d_engine = True
+    abort_flag = False
+    plotcanvas = _PlotCanvas()
+    pool = None
+    options = {
+        "gerber_circle_steps": 16,
+        "gerber_def_units": 'MM',
+        "gerber_def_zeros": 'L',
+        "gerber_use_buffer_for_union": True,
+        "gerber_buffering": 'full',
+        "gerber_simplification": False,
+        "gerber_simp_tolerance": 0.0005,
+        "gerber_clean_apertures": True,
+        "gerber_extra_buffering": False,
+        "gerber_tiled_union": False,
+        "global_process_number": 1,
+    }
+
+
+def coord(value):
+    # format 4.6, leading zeros omitted
+    return '%d' % round(value * 1e6)
+
+
+def make_gerber(nr_pads):
+    cols = int(nr_pads ** 0.5)
+    rows = nr_pads // cols
+    pitch = 2.54
+    width, height = cols * pitch + pitch, rows * pitch + pitch
+
+    lines = ['%FSLAX46Y46*%', '%MOMM*%', '%ADD10C,1.600000*%', '%ADD11C,0.300000*%', '%ADD12R,1.000000X1.000000*%',
+             '%LPD*%', 'G01*', 'D11*']
+    # the copper pour, next to the grid of pads, filled with overlapping strokes (as some CAD programs do it)
+    y = 0.0
+    while y <= height:
+        for col in range(cols):
+            lines.append('X%sY%sD02*' % (coord(width + 1 + col * pitch), coord(y)))
+            lines.append('X%sY%sD01*' % (coord(width + 1 + (col + 1) * pitch), coord(y)))
+        y += 0.25
+
+    # the clearances in the copper pour
+    lines += ['%LPC*%', 'D12*']
+    for row in range(rows):
+        for col in range(cols):
+            lines.append('X%sY%sD03*' % (coord(width + 1 + (col + 0.5) * pitch), coord((row + 0.5) * pitch)))
+
+    # the pads and the traces that join the pads of a row
+    lines += ['%LPD*%', 'D10*']
+    for row in range(rows):
+        for col in range(cols):
+            lines.append('X%sY%sD03*' % (coord((col + 0.5) * pitch), coord((row + 0.5) * pitch)))
+    lines.append('D11*')
+    for row in range(rows):
+        lines.append('X%sY%sD02*' % (coord(0.5 * pitch), coord((row + 0.5) * pitch)))
+        for col in range(1, cols):
+            lines.append('X%sY%sD01*' % (coord((col + 0.5) * pitch), coord((row + 0.5) * pitch)))
+    lines.append('M02*')
+    return lines
+
+
+def parse(method, processes, glines, queue):
+    app = _App()
+    app.options = dict(_App.options)
+    if method == 'union':
+        app.options['gerber_use_buffer_for_union'] = False
+    elif method.startswith('tiled'):
+        app.options['gerber_tiled_union'] = True
+        if method == 'tiled + pool':
+            app.pool = multiprocessing.Pool(processes=processes)
+            app.options['global_process_number'] = 2
+    Gerber.app = app
+
+    gerber = Gerber()
+    start = time.perf_counter()
+    gerber.parse_lines(glines)
+    duration = time.perf_counter() - start
+
+    # ru_maxrss is in kB on Linux
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    area = sum(geo.area for geo in flatten_shapely_geometry(gerber.solid_geometry))
+    if app.pool is not None:
+        app.pool.close()
+    queue.put((duration, rss, area))
+
+
+def run(max_pads, processes):
+    ctx = multiprocessing.get_context('fork')
+    print("%10s %14s %12s %16s %14s" % ("pads", "method", "time [s]", "peak RSS [MB]", "area"))
+    nr_pads = 2500
+    while nr_pads <= max_pads:
+        glines = make_gerber(nr_pads)
+        ref_area = None
+        for method in ('buffer', 'union', 'tiled', 'tiled + pool'):
+            queue = ctx.Queue()
+            proc = ctx.Process(target=parse, args=(method, processes, glines, queue))
+            proc.start()
+            duration, rss, area = queue.get()
+            proc.join()
+
+            print("%10d %14s %12.3f %16.1f %14.3f" % (nr_pads, method, duration, rss, area))
+            if ref_area is None:
+                ref_area = area
+            assert abs(area - ref_area) < ref_area * 1e-6, "The %s area is different" % method
+        nr_pads *= 4
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else max(os.cpu_count() // 4, 1))
@@ -0,0 +1,181 @@
+"""
+Benchmark for the GRBL sender (appCommon/GrblSender.py), against the fake GRBL controller of fake_grbl.py.
+
+For an increasing number of G-code lines it reports the time to send them:
+    - line by line: as the Levelling plugin did it before (ToolLevelling.send_grbl_command()), a line is written and
+      the answer is read with readlines(), which returns only after the timeout of the serial port
+    - streaming: GrblSender.stream(), the lines are sent as long as they fit in the receive buffer of the controller
+The lines received by the controller are checked to be the same and in the same order, and its receive buffer to
+never overflow. The sender is also checked with: a probing cycle (the '[PRB:...]' messages kept with their lines),
+a failed probing (the job stopped by the alarm, the alarm and the feedback messages emitted), pause and resume (no
+line is run while paused), an abort (no line is sent after it and a job added right after it is sent once the
+controller is reset) and the status reports.
+
+Usage (from the FlatCAM folder, Linux or macOS):
+    python Utils/benchmark_grbl_sender.py [max_lines] [seconds_per_line]
+"""
+
+import os
+import sys
+import time
+import random
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serial                                                                   # noqa: E402
+from PyQt6.QtCore import Qt                                                     # noqa: E402
+
+from appCommon.GrblSender import GrblSender, clean_line                         # noqa: E402
+from fake_grbl import FakeGrbl                                                  # noqa: E402
+
+
+def make_gcode(nr_lines):
+    random.seed(nr_lines)
+    lines = ['(a job of %d lines)' % nr_lines, 'G21', 'G90']
+    while len(lines) < nr_lines:
+        lines.append('G1 X%.4f Y%.4f F%d ; cut' % (random.uniform(0, 300), random.uniform(0, 300),
+                                                   random.choice((100, 300, 1200))))
+    return lines
+
+
+def open_port(grbl):
+    return serial.serial_for_url(grbl.port_name, 115200, timeout=0.1)
+
+
+def line_by_line(port, lines):
+    # ToolLevelling.send_grbl_command() for each line, before the sender
+    for line in lines:
+        port.write((line.strip() + '\n').encode('utf-8'))
+        port.readlines()
+
+
+def streaming(sender, lines):
+    job = sender.stream(lines)
+    job.wait()
+    return job
+
+
+def timed(fcn, *args):
+    start = time.perf_counter()
+    result = fcn(*args)
+    return result, time.perf_counter() - start
+
+
+def check_sent(grbl, lines, clean=True):
+    sent = [line for line in map(clean_line, lines) if line] if clean else [line.strip() for line in lines]
+    assert grbl.received == sent, "The controller did not get the lines in order"
+    assert grbl.overflows == 0 and grbl.max_rx <= grbl.rx_buffer_size, "The receive buffer overflowed"
+
+
+def check_probing(sender, grbl):
+    grbl.received.clear()
+    job = sender.stream(['G21', 'G90', 'G0 Z2', 'G0 X10 Y20', 'G38.2 Z-1.5 F60', 'G0 Z2', 'G0 X30 Y5',
+                         'G38.2 Z-1.25 F60'])
+    assert job.wait(10) and not job.aborted and not job.errors, "The probing failed"
+    probes = [job.responses.get(idx) for idx, line in enumerate(job.lines) if line.startswith('G38.2')]
+    assert probes == [['[PRB:10.000,20.000,-1.500:1]'], ['[PRB:30.000,5.000,-1.250:1]']], \
+        "The probe results are not kept with their lines"
+    assert sender.send('$$').text(0).splitlines()[-1] == 'ok', "No answer to $$"
+    assert sender.send('1 bad').errors == [(0, 'error:1')], "The error is not kept with its line"
+
+
+def check_alarm(sender, grbl, messages):
+    grbl.received.clear()
+    messages.clear()
+    grbl.probe_fails = True
+    lines = ['G21', 'G90', 'G0 Z2', 'G0 X10 Y20', 'G38.2 Z-1.5 F60'] + ['G0 X%d Y5' % x for x in range(200)]
+    job = sender.stream(lines)
+    assert job.wait(10) and job.aborted, "The job was not stopped by the alarm"
+    assert len(grbl.received) < len(lines), "Lines were sent after the alarm"
+    assert not any(response for response in job.responses.values()), "The alarm is kept with a line"
+    grbl.probe_fails = False
+    unlock = sender.send('$X', 5)
+    assert unlock.text(0) == 'ok' and not unlock.aborted, "The unlock was not answered"
+    assert 'ALARM:5' in messages and '[MSG:Caution: Unlocked]' in messages, "The messages were not emitted"
+    assert not sender.send('G0 X0 Y0', 5).errors, "The sender does not work after the alarm"
+
+
+def check_pause_resume(sender, grbl, lines):
+    grbl.received.clear()
+    job = sender.stream(lines)
+    while job.acked < len(lines) // 4:
+        time.sleep(0.001)
+    sender.pause()
+    time.sleep(0.1)
+    paused_at = len(grbl.received)
+    time.sleep(0.3)
+    assert len(grbl.received) == paused_at and not job.done, "Lines were run while paused"
+    sender.resume()
+    assert job.wait(60) and not job.aborted, "The job did not end after resume"
+    check_sent(grbl, lines)
+
+
+def check_abort(sender, grbl, lines):
+    grbl.received.clear()
+    job = sender.stream(lines)
+    while job.acked < len(lines) // 2:
+        time.sleep(0.001)
+    sender.abort()
+    after = sender.stream(['G0 X1 Y1', 'G0 X2 Y2'])
+    assert job.wait(5) and job.aborted, "The job was not aborted"
+    assert after.wait(5) and not after.aborted and not after.errors, "The job added after the abort was aborted"
+    time.sleep(0.3)
+    nr_received = len(grbl.received)
+    time.sleep(0.3)
+    assert grbl.received[-2:] == after.lines, "The job added after the abort was not sent after the reset"
+    assert nr_received < len(lines) and len(grbl.received) == nr_received, "Lines were sent after the abort"
+    assert grbl.resets == 1, "The controller was not reset"
+    assert not sender.send('G0 X0 Y0').errors, "The sender does not work after the abort"
+
+
+def run(max_lines, line_time):
+    grbl = FakeGrbl(line_time=line_time).start()
+    port = open_port(grbl)
+    statuses = []
+    messages = []
+    sender = GrblSender(port, status_interval=0.05)
+    sender.status_report.connect(statuses.append, Qt.ConnectionType.DirectConnection)
+    sender.message.connect(messages.append, Qt.ConnectionType.DirectConnection)
+    sender.start()
+
+    print("%.4f seconds per line on the controller" % line_time)
+    print("%10s %18s %14s %14s %10s" % ("lines", "line by line [s]", "streaming [s]", "lines/s", "speedup"))
+    nr_lines = 250
+    while nr_lines <= max_lines:
+        lines = make_gcode(nr_lines)
+
+        # line by line waits for the timeout of the port (0.1 s) on every line; it is measured on a few lines
+        nr_old = min(nr_lines, 250)
+        grbl.received.clear()
+        sender.stop()
+        __, old_time = timed(line_by_line, port, lines[:nr_old])
+        check_sent(grbl, lines[:nr_old], clean=False)
+        old_time *= nr_lines / nr_old
+        sender.start()
+
+        grbl.received.clear()
+        job, new_time = timed(streaming, sender, lines)
+        assert not job.aborted and not job.errors, "The job failed"
+        check_sent(grbl, lines)
+
+        print("%10d %18.2f %14.3f %14.0f %9.1fx" % (nr_lines, old_time, new_time, len(job.lines) / new_time,
+                                                    old_time / new_time))
+        nr_lines *= 4
+
+    check_probing(sender, grbl)
+    check_alarm(sender, grbl, messages)
+    check_pause_resume(sender, grbl, make_gcode(2000))
+    check_abort(sender, grbl, make_gcode(2000))
+    assert statuses and all('state' in status and len(status.get('MPos', ())) == 3 for status in statuses), \
+        "No status reports"
+    print("probing, alarm, pause/resume, abort and %d status reports: OK" % len(statuses))
+
+    sender.stop()
+    port.close()
+    grbl.stop()
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 16000,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 0.0005)
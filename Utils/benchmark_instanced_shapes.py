@@ -0,0 +1,141 @@
+"""
+Benchmark for the plot of the drills and pads as copies of one shape (ShapeCollection.add_many_instanced()).
+
+A grid of holes and pads (circles of 2 diameters and rectangles) is added to a ShapeCollection and drawn offscreen
+with OpenGL (EGL, no window and no GPU needed: Mesa llvmpipe works). For an increasing number of shapes it reports,
+for each way of adding the shapes:
+    - old: ShapeCollection.add_many(), each shape translated to triangles and lines and packed in the layer buffers
+    - tiled: add_many_instanced(), each distinct shape translated once and its copies expanded on the CPU (as it is
+      done on an OpenGL older than 3.3)
+    - instanced: add_many_instanced(), each distinct shape uploaded once and drawn with instancing, one offset and
+      one color for each copy
+the time to add the shapes (with the redraw of the collection), the time of the first and of a next frame and the
+number of vertices sent to OpenGL. The frames are checked against those of the old method, also after some shapes
+are hidden and some are recolored; a few pixels on the edges of the shapes may differ, the copies are moved in
+float32 from the template instead of being translated from their own coordinates.
+
+Usage (from the FlatCAM folder):
+    python Utils/benchmark_instanced_shapes.py [max_shapes]
+"""
+
+import os
+import sys
+import time
+
+os.environ.setdefault('EGL_PLATFORM', 'surfaceless')
+os.environ.setdefault('PYOPENGL_PLATFORM', 'egl')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np                                                              # noqa: E402
+import shapely                                                                  # noqa: E402
+from shapely import Point                                                       # noqa: E402
+import vispy                                                                    # noqa: E402
+
+vispy.use(app='egl')
+
+from vispy import scene                                                         # noqa: E402
+
+from appGUI.VisPyVisuals import ShapeCollection, find_copies, set_instancing    # noqa: E402
+
+MODES = ('old', 'tiled', 'instanced')
+
+
+def make_shapes(nr_shapes):
+    side = int(nr_shapes ** 0.5)
+    shapes = []
+    for row in range(side):
+        for col in range(side):
+            x, y = col * 2.54, row * 2.54
+            kind = (row + col) % 3
+            if kind == 0:
+                shapes.append(Point(x, y).buffer(0.4, 16))
+            elif kind == 1:
+                shapes.append(Point(x, y).buffer(0.7, 16))
+            else:
+                shapes.append(shapely.box(x - 0.6, y - 0.3, x + 0.6, y + 0.3))
+    return shapes
+
+
+def nr_vertices(collection, mode):
+    if mode == 'old':
+        total = 0
+        for arena in collection._levels[0]:
+            # the vertices of the faces and of the lines, as many as the arena holds
+            total += arena.vertices.top + arena.lines.top
+        return total
+
+    total = 0
+    for instances in collection._instances:
+        for buffers in instances._drawn:
+            nr_copies = len(buffers.offsets)
+            for vertices, indices in ((buffers.mesh_vertices, buffers.mesh_tris), (buffers.line_pts, None)):
+                if len(vertices) == 0 or (indices is not None and len(indices) == 0):
+                    continue
+                if mode == 'instanced':
+                    # the shape once, an offset and a color for each copy
+                    total += len(vertices) + 2 * nr_copies
+                else:
+                    total += len(vertices) * nr_copies
+    return total
+
+
+def plot(shapes, mode):
+    set_instancing(mode != 'tiled')
+
+    canvas = scene.SceneCanvas(size=(800, 800), show=False, bgcolor='white')
+    view = canvas.central_widget.add_view()
+    bounds = shapely.total_bounds(shapes)
+    view.camera = scene.PanZoomCamera(rect=(bounds[0] - 1, bounds[1] - 1, bounds[2] - bounds[0] + 2,
+                                            bounds[3] - bounds[1] + 2), aspect=1)
+    collection = ShapeCollection(parent=view.scene, fcoptions={'global_graphic_engine_3d_no_mp': True})
+
+    start = time.perf_counter()
+    kwargs = {'shapes': shapes, 'color': '#000000FF', 'face_color': '#BBF268BF', 'layer': 2}
+    keys = collection.add_many(**kwargs) if mode == 'old' else collection.add_many_instanced(**kwargs)
+    collection.redraw()
+    add_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    frames = [canvas.render()]
+    first_time = time.perf_counter() - start
+    start = time.perf_counter()
+    canvas.render()
+    next_time = time.perf_counter() - start
+
+    collection.update_visibility(False, keys[::7])
+    collection.redraw()
+    collection.update_color(new_mesh_color='#FF000080', new_line_color='#0000FFFF', indexes=keys[1::5])
+    frames.append(canvas.render())
+
+    vertices = nr_vertices(collection, mode)
+    canvas.close()
+    return frames, (add_time, first_time, next_time, vertices)
+
+
+def run(max_shapes):
+    # as the App does, the OpenGL backend is chosen once, before the first canvas
+    set_instancing(True)
+    print("%10s %10s %10s %14s %14s %14s %12s %12s" % (
+        "shapes", "groups", "mode", "add [s]", "1st frame [s]", "frame [s]", "vertices", "pixels diff"))
+    nr_shapes = 2500
+    while nr_shapes <= max_shapes:
+        shapes = make_shapes(nr_shapes)
+        copies, others = find_copies(shapes)
+        assert sum(len(indexes) for __, __, indexes in copies) == len(shapes) and not others, \
+            "The copies are not found"
+
+        old_frames = None
+        for mode in MODES:
+            frames, times = plot(shapes, mode)
+            if old_frames is None:
+                old_frames = frames
+            diff = max(np.count_nonzero((old_frame != frame).any(axis=-1))
+                       for old_frame, frame in zip(old_frames, frames))
+            assert diff < frames[0].shape[0] * frames[0].shape[1] / 100, "The %s frames are different" % mode
+            print("%10d %10d %10s %14.3f %14.3f %14.4f %12d %12d" % ((len(shapes), len(copies), mode) + times +
+                                                                      (diff, )))
+        nr_shapes *= 4
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 40000)
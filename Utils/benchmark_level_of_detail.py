@@ -0,0 +1,68 @@
+"""
+Benchmark for the levels of detail of the shapes plotted with the VisPy engine (3D mode).
+
+A panel of boards is made of round pads and traces with arcs (the buffers of Shapely have many segments on the
+arcs) and it is added to a ShapeCollectionVisual that keeps two more levels of detail, simplified in the process pool.
+For each level it reports the time needed to switch the drawing to it (the buffers of the level are queued for the
+upload; the upload itself is done at the next draw) and the number of faces and line vertices that are drawn.
+
+Usage (from the FlatCAM folder):
+    python Utils/benchmark_level_of_detail.py [nr_pads] [processes]
+"""
+
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shapely import Point, LineString                   # noqa: E402
+from vispy.gloo.context import FakeCanvas               # noqa: E402
+from appGUI.VisPyVisuals import ShapeCollectionVisual   # noqa: E402
+
+LOD_TOLERANCES = (0.02, 0.1)
+
+
+def make_panel(nr_pads):
+    cols = int(nr_pads ** 0.5) + 1
+    shapes = [Point((i % cols) * 2.54, (i // cols) * 2.54).buffer(0.8) for i in range(nr_pads)]
+    for i in range(0, nr_pads, 2):
+        x, y = (i % cols) * 2.54, (i // cols) * 2.54
+        shapes.append(LineString([(x + 0.8, y), (x + 1.74, y + 1.27)]).buffer(0.15))
+    return shapes
+
+
+def run(nr_pads, processes):
+    # the visuals need a current canvas to set the GL state
+    FakeCanvas()
+    pool = Pool(processes=processes)
+
+    shapes = make_panel(nr_pads)
+    collection = ShapeCollectionVisual(pool=pool, layers=3, lod_tolerances=LOD_TOLERANCES)
+    start = time.perf_counter()
+    collection.add_many(shapes, color='#006E20BF', face_color='#BBF268BF')
+    collection.redraw()
+    print("%d shapes added in %.3f s" % (len(shapes), time.perf_counter() - start))
+
+    # wait for the levels of detail made in the pool
+    for __, __, chunk_result in collection._lod_jobs:
+        chunk_result.wait()
+    collection.redraw([])
+
+    print("%12s %12s %12s %12s %14s" % ("pixel size", "level", "switch [s]", "faces", "line vertices"))
+    for pixel_size in (0.001, 0.05, 0.5, 0.001):
+        start = time.perf_counter()
+        collection.set_pixel_size(pixel_size)
+        duration = time.perf_counter() - start
+        arena = collection._levels[collection.lod][1]
+        print("%12.3f %12d %12.3f %12d %14d" % (
+            pixel_size, collection.lod, duration, len(arena.mesh_buffers()[1]), len(arena.line_buffers()[0])))
+    pool.close()
+    pool.join()
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else max(os.cpu_count() // 4, 1))
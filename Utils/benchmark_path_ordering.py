@@ -0,0 +1,117 @@
+"""
+Benchmark for the ordering of the drill holes (the travel between the locations).
+
+For an increasing number of random locations it reports the travel distance and the time needed by:
+    - TSA: CNCjob.optimized_travelling_salesman()
+    - Rtree: the nearest neighbour path made with the RTree index (as CNCjob.exc_optimized_rtree() does)
+    - 2-Opt: CNCjob.optimized_local_search() (a KD-tree nearest neighbour path improved with 2-Opt and Or-Opt moves)
+    - MetaHeuristic and Basic: the OR-Tools solvers, only if the package is installed and only for the small jobs
+All the paths start in the origin.
+
+Usage (from the FlatCAM folder):
+    python Utils/benchmark_path_ordering.py [max_locations] [search_time]
+"""
+
+import os
+import sys
+import time
+import random
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shapely import Point                           # noqa: E402
+from camlib import CNCjob, HAS_ORTOOLS              # noqa: E402
+from appCommon.PathOrdering import travel_distance  # noqa: E402
+
+
+class _Signal:
+    def emit(self, *args):
+        pass
+
+
+class _Log:
+    def debug(self, *args):
+        pass
+
+    info = warning = error = debug
+
+
+class _App:
+    inform = _Signal()
+    log = _Log()
+    abort_flag = False
+
+
+def make_job():
+    job = CNCjob.__new__(CNCjob)
+    job.app = _App()
+    job.decimals = 4
+    return job
+
+
+def make_locations(nr_locations):
+    random.seed(nr_locations)
+    # the drills of a PCB are clustered (IC pads, connectors) so half of them are placed in rows
+    locations = []
+    while len(locations) < nr_locations // 2:
+        x, y = random.uniform(0, 300), random.uniform(0, 300)
+        for i in range(random.randint(4, 40)):
+            locations.append((round(x + i * 2.54, 4), round(y, 4)))
+    while len(locations) < nr_locations:
+        locations.append((round(random.uniform(0, 300), 4), round(random.uniform(0, 300), 4)))
+    return locations[:nr_locations]
+
+
+def tsa(job, locations, search_time):
+    # the list of points is consumed and the returned path starts with the start point
+    path = job.optimized_travelling_salesman(list(locations), start=(0, 0))[1:]
+    index = {pt: idx for idx, pt in enumerate(locations)}
+    return [index[pt] for pt in path]
+
+
+def rtree(job, locations, search_time):
+    points = [Point(pt) for pt in locations]
+    path = job.exc_optimized_rtree(points)
+    index = {pt: idx for idx, pt in enumerate(locations)}
+    return [index[pt[0]] for pt in path]
+
+
+def local_search(job, locations, search_time):
+    return job.optimized_local_search(locations, start_pt=(0, 0), opt_time=search_time)
+
+
+def ortools_meta(job, locations, search_time):
+    return job.optimized_ortools_meta(locations, start=None, opt_time=search_time)
+
+
+def ortools_basic(job, locations, search_time):
+    return job.optimized_ortools_basic(locations, start=None)
+
+
+def run(max_locations, search_time):
+    methods = [('TSA', tsa, 5000), ('Rtree', rtree, None), ('2-Opt', local_search, None)]
+    if HAS_ORTOOLS:
+        methods += [('MetaHeuristic', ortools_meta, 2000), ('Basic', ortools_basic, 2000)]
+
+    print("%10s %14s %14s %10s" % ("locations", "method", "distance", "time [s]"))
+    nr_locations = 1000
+    while nr_locations <= max_locations:
+        locations = make_locations(nr_locations)
+        for name, method, limit in methods:
+            # the quadratic methods are not waited for on the big jobs
+            if limit is not None and nr_locations > limit:
+                continue
+
+            start = time.perf_counter()
+            order = method(make_job(), locations, search_time)
+            duration = time.perf_counter() - start
+
+            assert sorted(order) == list(range(nr_locations)), "%s did not visit all the locations" % name
+            distance = travel_distance(locations, order, start=(0, 0))
+            print("%10d %14s %14.1f %10.3f" % (nr_locations, name, distance, duration))
+        nr_locations *= 4
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 64000, float(sys.argv[2]) if len(sys.argv) > 2 else 3)
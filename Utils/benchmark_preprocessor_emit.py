@@ -0,0 +1,176 @@
+"""
+Benchmark for the G-Code emission from Geometry (CNCjob.linear2gcode()) and of the drilling of the holes.
+
+For some preprocessors it compares the time needed to emit the cutting moves of a big multi-tool geometry:
+    - per point: one doformat(p.linear_code, ...) call for each vertex (a full parameters copy for each vertex)
+    - bulk: one doformat_linear(p.linear_code_bulk, ...) call for each path
+and the time needed to emit the drilling of many holes, in 2 passes (a rapid move, then a plunge, a move up to the
+top of the material and a lift for each pass):
+    - per point: one doformat() call for each line, as the Excellon generators did it
+    - bulk: one doformat_points() call for all the holes
+and checks that the resulting G-Code is identical.
+
+Usage (from the FlatCAM folder):
+    python Utils/benchmark_preprocessor_emit.py [nr_vertices_per_tool] [nr_holes]
+"""
+
+import os
+import sys
+import time
+import random
+import glob
+from importlib.machinery import SourceFileLoader
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shapely import LineString     # noqa: E402
+from camlib import CNCjob           # noqa: E402
+from appPreProcessor import preprocessors   # noqa: E402
+
+PREPROCESSORS = ['GRBL_11', 'default', 'Marlin']
+TOOLS = [0.1, 0.4, 0.8, 1.5]
+
+
+class _Signal:
+    def emit(self, *args):
+        pass
+
+
+class _Log:
+    def debug(self, *args):
+        pass
+
+    info = warning = error = debug
+
+
+class _ExclusionAreas:
+    @staticmethod
+    def travel_coordinates(start_point, end_point, tooldia):
+        return [(None, end_point)]
+
+
+class _App:
+    inform = _Signal()
+    log = _Log()
+    abort_flag = False
+    exc_areas = _ExclusionAreas()
+    options = {"cncjob_coords_type": "G90"}
+
+
+def make_job(pp_name):
+    job = CNCjob.__new__(CNCjob)
+    job.app = _App()
+    job.__dict__.update({
+        'units': 'MM', 'kind': 'generic', 'tooldia': 0.1, 'z_cut': -0.1, 'z_move': 2.0, 'z_feedrate': 60.0,
+        'feedrate': 120.0, 'feedrate_rapid': 1500.0, 'coords_decimals': 4, 'fr_decimals': 2, 'decimals': 4,
+        'seg_x': 0.0, 'seg_y': 0.0, 'coordinates_type': 'G90', 'spindlespeed': None, 'dwell': False,
+        '_bed_limit_x': 300.0, '_bed_limit_y': 300.0, '_bed_offset_x': 1.0, '_bed_offset_y': 0.0,
+        '_bed_skew_x': 0.5, '_bed_skew_y': 0.0, 'x': 0.0, 'y': 0.0, 'oldx': None, 'oldy': None,
+        'z_depthpercut': 0.1, 'multidepth': False, 'f_plunge': False, 'f_retract': False,
+        'pp_geometry_name': pp_name, 'pp_geometry': preprocessors[pp_name],
+    })
+    return job
+
+
+def make_geometry(nr_vertices):
+    random.seed(nr_vertices)
+    geometry = {}
+    for dia in TOOLS:
+        paths = []
+        left = nr_vertices
+        while left > 0:
+            nr_pts = min(left, random.randint(50, 500))
+            left -= nr_pts
+            paths.append(LineString([(random.uniform(0, 300), random.uniform(0, 300)) for _ in range(nr_pts)]))
+        geometry[dia] = paths
+    return geometry
+
+
+def per_point(job):
+    # the emission of the cutting moves as it was done before the bulk emitters
+    def doformat_linear(fun_bulk, points, **kwargs):
+        fun = getattr(job.pp_geometry, fun_bulk.__name__.replace('_bulk', ''))
+        return ''.join(job.doformat(fun, x=pt[0], y=pt[1], **kwargs) for pt in points)
+    return doformat_linear
+
+
+def emit(job, geometry):
+    gcode = []
+    for dia, paths in geometry.items():
+        job.tooldia = dia
+        old_point = (0, 0)
+        for path in paths:
+            gcode.append(job.linear2gcode(path, dia, old_point=old_point))
+            old_point = path.coords[-1]
+    return ''.join(gcode)
+
+
+def make_holes(nr_holes):
+    random.seed(nr_holes)
+    return [(random.uniform(0, 300), random.uniform(0, 300)) for _ in range(nr_holes)]
+
+
+def drill_per_point(job, holes, depths):
+    p = job.pp_geometry
+    gcode = []
+    for locx, locy in holes:
+        gcode.append(job.doformat(p.rapid_code, x=locx, y=locy))
+        for depth in depths:
+            job.z_cut = depth
+            gcode.append(job.doformat(p.down_code, x=locx, y=locy))
+            gcode.append(job.doformat(p.up_to_zero_code, x=locx, y=locy))
+            gcode.append(job.doformat(p.lift_code, x=locx, y=locy))
+    return ''.join(gcode)
+
+
+def drill_bulk(job, holes, depths):
+    p = job.pp_geometry
+    return job.doformat_points([(p.rapid_code, {})] + job.drill_codes(p, depths, True), holes)
+
+
+def run(nr_vertices, nr_holes):
+    for file in glob.glob(os.path.join('preprocessors', '*.py')):
+        SourceFileLoader('FlatCAMPostProcessor', file).load_module()
+
+    geometry = make_geometry(nr_vertices)
+    print("%d tools, %d vertices per tool" % (len(TOOLS), nr_vertices))
+    print("%12s %14s %14s %10s" % ("preprocessor", "per point [s]", "bulk [s]", "speedup"))
+    for pp_name in PREPROCESSORS:
+        job = make_job(pp_name)
+        start = time.perf_counter()
+        new_gcode = emit(job, geometry)
+        t_bulk = time.perf_counter() - start
+
+        job = make_job(pp_name)
+        job.doformat_linear = per_point(job)
+        start = time.perf_counter()
+        old_gcode = emit(job, geometry)
+        t_point = time.perf_counter() - start
+
+        assert old_gcode == new_gcode, "The G-Code made by %s is different" % pp_name
+        print("%12s %14.3f %14.3f %9.1fx" % (pp_name, t_point, t_bulk, t_point / t_bulk))
+
+    holes = make_holes(nr_holes)
+    depths = [-0.9, -1.7]
+    print("%d holes, %d passes" % (nr_holes, len(depths)))
+    print("%12s %14s %14s %10s" % ("preprocessor", "per point [s]", "bulk [s]", "speedup"))
+    for pp_name in PREPROCESSORS:
+        job = make_job(pp_name)
+        start = time.perf_counter()
+        new_gcode = drill_bulk(job, holes, depths)
+        t_bulk = time.perf_counter() - start
+
+        job = make_job(pp_name)
+        start = time.perf_counter()
+        old_gcode = drill_per_point(job, holes, depths)
+        t_point = time.perf_counter() - start
+
+        assert old_gcode == new_gcode, "The drilling G-Code made by %s is different" % pp_name
+        print("%12s %14.3f %14.3f %9.1fx" % (pp_name, t_point, t_bulk, t_point / t_bulk))
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 20000)
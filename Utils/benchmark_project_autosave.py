@@ -0,0 +1,99 @@
+"""
+Benchmark for the autosave of a project where one object changed.
+
+The project (copies of the synthetic board from benchmark_gerber_union.py) is saved as a project archive. Then, at
+each autosave interval, one object changes and the project is saved with:
+    - full: the whole project archive is written again (and verified), as the autosave did it before
+    - journal: only the changed object is appended to the journal of the archive
+It reports the time of one autosave, the size of the journal after all the intervals and the time to open the
+project with the journal replayed. The opened project is checked against the changed project, and a journal left
+by another save of the archive is checked to be ignored.
+
+Usage (from the FlatCAM folder):
+    python Utils/benchmark_project_autosave.py [nr_objects] [nr_pads] [intervals]
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shapely import affinity                                                    # noqa: E402
+
+from camlib import to_dict, dict2obj                                            # noqa: E402
+from appCommon.ProjectArchive import write_project, verify_project, read_project, read_save_id, \
+    ProjectJournal                                                              # noqa: E402
+from benchmark_project_save import make_project, area                          # noqa: E402
+
+
+def change_object(project, interval):
+    # move the geometry of one object, as an editor would do it
+    obj = project['objs'][interval % len(project['objs'])]
+    obj['solid_geometry'] = [affinity.translate(geo, xoff=1.0) for geo in obj['solid_geometry']]
+    obj['obj_options'] = dict(obj['obj_options'], xoff=interval)
+    return interval % len(project['objs'])
+
+
+def run(nr_objects, nr_pads, intervals):
+    project = make_project(nr_objects, nr_pads)
+    ids = ['obj_%d' % idx for idx in range(nr_objects)]
+
+    print("%d objects, %d pads each, %d autosaves" % (nr_objects, nr_pads, intervals))
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, 'project.FlatPrj')
+        write_project(filename, iter(project['objs']), project['options'], project['version'], default=to_dict,
+                      ids=ids)
+
+        full_times = []
+        journal_times = []
+        journal = ProjectJournal(filename)
+        journal.start(read_save_id(filename))
+        for interval in range(intervals):
+            changed = change_object(project, interval)
+
+            # the full save goes to another file so the journal stays valid for its archive
+            full_filename = os.path.join(folder, 'full.FlatPrj')
+            start = time.perf_counter()
+            write_project(full_filename, iter(project['objs']), project['options'], project['version'],
+                          default=to_dict, ids=ids)
+            assert not verify_project(full_filename)
+            full_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            journal.append([(ids[changed], project['objs'][changed])], None, ids, project['version'],
+                           default=to_dict)
+            journal_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        opened = read_project(filename, object_hook=dict2obj)
+        open_time = time.perf_counter() - start
+
+        print("%24s %12.3f" % ("full save [s]", sum(full_times) / intervals))
+        print("%24s %12.3f" % ("journal append [s]", sum(journal_times) / intervals))
+        print("%24s %12.2f" % ("project size [MB]", os.path.getsize(filename) / (1024 * 1024)))
+        print("%24s %12.2f" % ("journal size [MB]", journal.size() / (1024 * 1024)))
+        print("%24s %12.3f" % ("open + replay [s]", open_time))
+
+        ref_area = area(project)
+        assert abs(area(opened) - ref_area) < ref_area * 1e-9, "The replayed area is different"
+        assert [o['obj_options'] for o in opened['objs']] == [o['obj_options'] for o in project['objs']]
+
+        # the archive saved again: the journal of the previous save is stale
+        assert journal.base_save_id() == read_save_id(filename)
+        stale = journal.filename + '.stale'
+        os.replace(journal.filename, stale)
+        write_project(filename, iter(project['objs']), project['options'], project['version'], default=to_dict,
+                      ids=ids)
+        os.replace(stale, journal.filename)
+        assert journal.base_save_id() != read_save_id(filename), "The stale journal is not detected"
+        assert journal.replay(read_save_id(filename)) is None, "The stale journal is replayed"
+        print("%24s %12s" % ("stale journal", "OK"))
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 8,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 625,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 5)
@@ -0,0 +1,104 @@
+"""
+Benchmark for restoring the objects of an opened project.
+
+The project (copies of the synthetic board from benchmark_gerber_union.py) is saved as JSON and as a project
+archive. For each file it reports:
+    - eager: the time to parse the whole project, geometry included, in the app (as it was done before)
+    - index: the time until the objects can be created, without their geometry (the geometry is deferred)
+    - geometry: the time until the geometry of all the objects is ready, prepared in a process pool, one object
+      per task, and made into Shapely geometry in the app
+The area of the restored geometry is checked against the saved geometry.
+
+Usage (from the FlatCAM folder):
+    python Utils/benchmark_project_restore.py [nr_objects] [nr_pads] [processes]
+"""
+
+import os
+import sys
+import time
+import tempfile
+import multiprocessing
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import simplejson as json                                                       # noqa: E402
+
+from camlib import to_dict, dict2obj                                            # noqa: E402
+from appCommon.ProjectArchive import write_project, read_project, has_geometry, apply_object_hook, \
+    load_geometry, resolve_geometry                                             # noqa: E402
+from benchmark_project_save import make_project, area                          # noqa: E402
+
+
+def open_eager(filename, archive):
+    if archive:
+        return read_project(filename, object_hook=dict2obj)
+    with open(filename, 'r') as f:
+        return json.load(f, object_hook=dict2obj)
+
+
+def open_index(filename, archive):
+    if archive:
+        return read_project(filename, object_hook=dict2obj, lazy=True)
+    with open(filename, 'r') as f:
+        return json.load(f)
+
+
+def restore(project, pool):
+    objs = project['objs']
+    chunks = project.get('geometry_chunks') or [None] * len(objs)
+
+    jobs = []
+    for obj, chunk in zip(objs, chunks):
+        deferred = {k: v for k, v in obj.items() if has_geometry(v)}
+        jobs.append((deferred, pool.apply_async(load_geometry, (deferred if chunk is None else None, chunk))))
+
+    restored = []
+    for obj, (deferred, job) in zip(objs, jobs):
+        attrs = {k: apply_object_hook(v, dict2obj) for k, v in obj.items() if k not in deferred}
+        refs, geo_chunk = job.get()
+        attrs.update(resolve_geometry(deferred if refs is None else refs, geo_chunk, dict2obj))
+        restored.append(attrs)
+    return {"objs": restored}
+
+
+def run(nr_objects, nr_pads, processes):
+    project = make_project(nr_objects, nr_pads)
+    ref_area = area(project)
+    pool = multiprocessing.Pool(processes=processes)
+
+    print("%d objects, %d pads each, %d processes" % (nr_objects, nr_pads, processes))
+    print("%10s %12s %12s %14s" % ("file", "eager [s]", "index [s]", "geometry [s]"))
+    with tempfile.TemporaryDirectory() as folder:
+        for name, archive in (('json', False), ('archive', True)):
+            filename = os.path.join(folder, 'project.FlatPrj')
+            if archive:
+                write_project(filename, iter(project['objs']), project['options'], project['version'],
+                              default=to_dict, compresslevel=3)
+            else:
+                with open(filename, 'w') as f:
+                    json.dump(project, f, default=to_dict)
+
+            start = time.perf_counter()
+            eager = open_eager(filename, archive)
+            eager_time = time.perf_counter() - start
+            assert abs(area(eager) - ref_area) < ref_area * 1e-9, "The eager %s area is different" % name
+            del eager
+
+            start = time.perf_counter()
+            index = open_index(filename, archive)
+            index_time = time.perf_counter() - start
+            restored = restore(index, pool)
+            geometry_time = time.perf_counter() - start
+
+            print("%10s %12.3f %12.3f %14.3f" % (name, eager_time, index_time, geometry_time))
+            assert abs(area(restored) - ref_area) < ref_area * 1e-9, "The restored %s area is different" % name
+            os.remove(filename)
+
+    pool.close()
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 8,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 2500,
+        int(sys.argv[3]) if len(sys.argv) > 3 else max(os.cpu_count() // 4, 1))
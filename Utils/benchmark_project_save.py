@@ -0,0 +1,114 @@
+"""
+Benchmark for saving and opening a project.
+
+A synthetic board is parsed as Gerber (the same board as in benchmark_gerber_union.py) and the project is made of
+copies of it. The project is saved and opened again with:
+    - json: the JSON document with WKT geometry, verified by parsing it again (uncompressed projects)
+    - json + lzma: the same JSON document, LZMA compressed
+    - archive: the project archive with one chunk per object and WKB geometry, verified with the chunk checksums
+    - archive + deflate: the same archive, with the chunks compressed
+It reports the time to save (including the verification), the time to open and the file size. The area of the
+opened geometry is checked against the saved geometry.
+
+Usage (from the FlatCAM folder):
+    python Utils/benchmark_project_save.py [nr_objects] [nr_pads]
+"""
+
+import os
+import sys
+import lzma
+import time
+import tempfile
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import simplejson as json                                                       # noqa: E402
+
+from camlib import to_dict, dict2obj, flatten_shapely_geometry                  # noqa: E402
+from appParsers.ParseGerber import Gerber                                       # noqa: E402
+from appCommon.ProjectArchive import write_project, verify_project, read_project  # noqa: E402
+from benchmark_gerber_union import _App, make_gerber                            # noqa: E402
+
+
+def make_project(nr_objects, nr_pads):
+    Gerber.app = _App()
+    gerber = Gerber()
+    gerber.parse_lines(make_gerber(nr_pads))
+
+    objs = []
+    for idx in range(nr_objects):
+        d = gerber.to_dict()
+        d['kind'] = 'gerber'
+        d['obj_options'] = {'name': 'board_%d.gbr' % idx, 'plot': True, 'solid': True, 'multicolored': False}
+        objs.append(d)
+    return {"objs": objs, "options": dict(_App.options), "version": 8.995}
+
+
+def area(project):
+    return sum(geo.area for obj in project['objs'] for geo in flatten_shapely_geometry(obj['solid_geometry']))
+
+
+def save_json(project, filename, compressed):
+    if compressed:
+        data = json.dumps(project, default=to_dict, indent=2, sort_keys=True).encode('utf-8')
+        with open(filename, 'wb') as f:
+            f.write(lzma.compress(data, preset=3))
+    else:
+        with open(filename, 'w') as f:
+            json.dump(project, f, default=to_dict, indent=2, sort_keys=True)
+        # the uncompressed project is verified by parsing it again
+        with open(filename, 'r') as f:
+            assert 'version' in json.load(f, object_hook=dict2obj)
+
+
+def open_json(filename, compressed):
+    if compressed:
+        with lzma.open(filename) as f:
+            return json.loads(f.read().decode('utf-8'), object_hook=dict2obj)
+    with open(filename, 'r') as f:
+        return json.load(f, object_hook=dict2obj)
+
+
+def save_archive(project, filename, compresslevel):
+    write_project(filename, iter(project['objs']), project['options'], project['version'], default=to_dict,
+                  compresslevel=compresslevel)
+    assert not verify_project(filename)
+
+
+def open_archive(filename):
+    return read_project(filename, object_hook=dict2obj)
+
+
+def run(nr_objects, nr_pads):
+    project = make_project(nr_objects, nr_pads)
+    ref_area = area(project)
+    methods = [
+        ('json', lambda fn: save_json(project, fn, False), lambda fn: open_json(fn, False)),
+        ('json + lzma', lambda fn: save_json(project, fn, True), lambda fn: open_json(fn, True)),
+        ('archive', lambda fn: save_archive(project, fn, None), open_archive),
+        ('archive + deflate', lambda fn: save_archive(project, fn, 3), open_archive),
+    ]
+
+    print("%d objects, %d pads each" % (nr_objects, nr_pads))
+    print("%18s %12s %12s %12s" % ("method", "save [s]", "open [s]", "size [MB]"))
+    with tempfile.TemporaryDirectory() as folder:
+        for name, save, load in methods:
+            filename = os.path.join(folder, 'project.FlatPrj')
+            start = time.perf_counter()
+            save(filename)
+            save_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            opened = load(filename)
+            open_time = time.perf_counter() - start
+
+            size = os.path.getsize(filename) / (1024 * 1024)
+            print("%18s %12.3f %12.3f %12.2f" % (name, save_time, open_time, size))
+            assert abs(area(opened) - ref_area) < ref_area * 1e-9, "The %s area is different" % name
+            os.remove(filename)
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 8,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 2500)
@@ -0,0 +1,93 @@
+"""
+Benchmark for the translation of the shapes plotted with the VisPy engine (Shapely geometry to vertex buffers).
+
+For an increasing number of Gerber like flashes (plus a few traces) it reports the time needed to add the shapes to a
+ShapeCollectionVisual and redraw it, and the number of process pool tasks, with:
+    - add: one pool task for each shape (the previous method)
+    - add_many: the shapes are sent to the pool in chunks of WKB and come back as NumPy arrays
+and checks that the buffers of the drawn faces and lines are identical.
+
+Then, with all the shapes on the canvas, it reports the time needed to hide and show again a small group of shapes
+(an object), to recolor it and to remove it, that is the time of one redraw of the collection.
+
+Usage (from the FlatCAM folder):
+    python Utils/benchmark_shape_collection.py [max_shapes] [processes]
+"""
+
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np                                      # noqa: E402
+from shapely import Point, LineString                   # noqa: E402
+from vispy.gloo.context import FakeCanvas               # noqa: E402
+from appGUI.VisPyVisuals import ShapeCollectionVisual, ShapeGroup   # noqa: E402
+
+
+def make_shapes(nr_shapes):
+    cols = int(nr_shapes ** 0.5) + 1
+    shapes = [Point((i % cols) * 1.27, (i // cols) * 1.27).buffer(0.4, 4) for i in range(nr_shapes)]
+    shapes += [LineString([(0, row * 1.27), (cols * 1.27, row * 1.27)]) for row in range(nr_shapes // cols)]
+    return shapes
+
+
+def add(collection, shapes):
+    for shape in shapes:
+        collection.add(shape=shape, color='#006E20BF', face_color='#BBF268BF')
+    return len(shapes)
+
+
+def add_many(collection, shapes):
+    collection.add_many(shapes, color='#006E20BF', face_color='#BBF268BF')
+    return -(-len(shapes) // collection.chunk_size)
+
+
+def buffers(collection):
+    arena = collection._levels[0][1]
+    return arena.mesh_buffers() + arena.line_buffers()[:1]
+
+
+def run(max_shapes, processes):
+    # the visuals need a current canvas to set the GL state
+    FakeCanvas()
+    pool = Pool(processes=processes)
+    print("%10s %12s %12s %10s" % ("shapes", "method", "pool tasks", "time [s]"))
+    nr_shapes = 1000
+    while nr_shapes <= max_shapes:
+        shapes = make_shapes(nr_shapes)
+        results = []
+        for method in (add, add_many):
+            collection = ShapeCollectionVisual(pool=pool, layers=3)
+            start = time.perf_counter()
+            nr_tasks = method(collection, shapes)
+            collection.redraw()
+            duration = time.perf_counter() - start
+            results.append(buffers(collection))
+            print("%10d %12s %12d %10.3f" % (len(shapes), method.__name__, nr_tasks, duration))
+
+        assert all(np.array_equal(a, b) for a, b in zip(*results)), "The buffers are different"
+
+        group = ShapeGroup(collection)
+        group.add_many(shapes=make_shapes(100), color='#006E20BF', face_color='#BBF268BF')
+        group.redraw()
+        for name, change in (
+                ('hide', lambda: setattr(group, 'visible', False)),
+                ('show', lambda: setattr(group, 'visible', True)),
+                ('recolor', lambda: group.redraw(update_colors=('#FF0000BF', '#000000BF'))),
+                ('remove', lambda: group.clear(update=True))):
+            start = time.perf_counter()
+            change()
+            duration = time.perf_counter() - start
+            print("%10d %12s %12s %10.3f" % (len(shapes), name, '', duration))
+        nr_shapes *= 4
+    pool.close()
+    pool.join()
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 64000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else max(os.cpu_count() // 4, 1))
@@ -0,0 +1,76 @@
+"""
+Benchmark for the triangulation of the filled polygons plotted with the VisPy engine (3D mode).
+
+A synthetic copper pour Gerber (see benchmark_gerber_union.py) is parsed and its polygons are added to a
+ShapeCollectionVisual, for an increasing size of the board, with the triangulation engines:
+    - glu: the OpenGL GLU tessellator, one polygon at a time, with a Python callback for each vertex
+    - geos: the GEOS constrained Delaunay triangulation, the polygons of a chunk are triangulated in one call
+It reports the time needed to add the polygons and redraw the collection, in the current process and in a process
+pool, and checks that the area of the triangles is the area of the polygons.
+
+Usage (from the FlatCAM folder):
+    python Utils/benchmark_triangulation.py [max_pads] [processes]
+"""
+
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np                                      # noqa: E402
+from vispy.gloo.context import FakeCanvas               # noqa: E402
+from camlib import flatten_shapely_geometry             # noqa: E402
+from appParsers.ParseGerber import Gerber               # noqa: E402
+from appGUI.VisPyVisuals import ShapeCollectionVisual   # noqa: E402
+from benchmark_gerber_union import _App, make_gerber    # noqa: E402
+
+
+def mesh_area(collection):
+    vertices, faces, __ = collection._levels[0][1].mesh_buffers()
+    tris = vertices[faces].astype(np.float64)
+    a, b, c = tris[:, 0], tris[:, 1], tris[:, 2]
+    cross = (b - a)[:, 0] * (c - a)[:, 1] - (b - a)[:, 1] * (c - a)[:, 0]
+    return np.abs(cross).sum() / 2, len(tris)
+
+
+def run(max_pads, processes):
+    # the visuals need a current canvas to set the GL state
+    FakeCanvas()
+    pool = Pool(processes=processes)
+    Gerber.app = _App()
+
+    print("%10s %10s %10s %8s %12s %10s %12s" % ("pads", "polygons", "vertices", "engine", "pool", "time [s]", "faces"))
+    nr_pads = 625
+    while nr_pads <= max_pads:
+        gerber = Gerber()
+        gerber.parse_lines(make_gerber(nr_pads))
+        polygons = [geo for geo in flatten_shapely_geometry(gerber.solid_geometry) if geo.geom_type == 'Polygon']
+        nr_vertices = sum(len(geo.exterior.coords) + sum(len(i.coords) for i in geo.interiors) for geo in polygons)
+        area = sum(geo.area for geo in polygons)
+
+        for triangulation in ('glu', 'geos'):
+            for shapes_pool in (None, pool):
+                collection = ShapeCollectionVisual(pool=shapes_pool, layers=3, triangulation=triangulation)
+                start = time.perf_counter()
+                collection.add_many(polygons, color='#006E20BF', face_color='#BBF268BF', tolerance=None)
+                collection.redraw()
+                duration = time.perf_counter() - start
+
+                triangles_area, nr_faces = mesh_area(collection)
+                print("%10d %10d %10d %8s %12s %10.3f %12d" % (
+                    nr_pads, len(polygons), nr_vertices, triangulation,
+                    'yes' if shapes_pool else 'no', duration, nr_faces))
+                assert abs(triangles_area - area) < area * 1e-4, \
+                    "The %s triangles area is different: %f != %f" % (triangulation, triangles_area, area)
+        nr_pads *= 4
+    pool.close()
+    pool.join()
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else max(os.cpu_count() // 4, 1))
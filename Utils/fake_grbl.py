@@ -0,0 +1,164 @@
+"""
+A fake GRBL controller on a pseudo terminal (Linux, macOS), to try the GRBL sender (appCommon/GrblSender.py) and the
+GRBL tab of the Levelling plugin without a machine.
+
+It behaves like GRBL 1.1 on the serial line:
+    - the lines go into a receive buffer of 128 bytes; a line is taken out of it, and answered with 'ok', after the
+      time it takes to run it; the bytes received when the buffer is full are lost (and counted as overflows)
+    - '?' gives a status report, '!' holds the motion (no line is taken out of the buffer), '~' resumes it and
+      Ctrl-X (soft reset) empties the buffer and answers with the welcome message
+    - G38.2 (probing) answers with '[PRB:x,y,z:1]' before the 'ok', '$$' with the settings and a line that does not
+      start with a letter or '$' with 'error:1'
+    - when the probe is set to fail (probe_fails) G38.2 raises 'ALARM:5': the next lines are answered with 'error:9'
+      until '$X' (unlock, answered with '[MSG:Caution: Unlocked]') or a soft reset
+
+Usage (from the FlatCAM folder):
+    python Utils/fake_grbl.py [seconds_per_line]
+It prints the name of the serial port to connect to.
+"""
+
+import os
+import re
+import sys
+import time
+import tty
+import select
+import threading
+
+WELCOME = "Grbl 1.1h ['$' for help]"
+SETTINGS = ('$0=10', '$1=25', '$10=1', '$13=0', '$20=0', '$21=0', '$22=0', '$100=250.000', '$101=250.000',
+            '$102=250.000', '$110=500.000', '$111=500.000', '$112=500.000')
+AXIS_RE = re.compile(r'([XYZ])([+-]?\d*\.?\d+)')
+
+
+class FakeGrbl:
+    def __init__(self, rx_buffer_size=128, line_time=0.0005):
+        """
+        :param rx_buffer_size:  the size of the receive buffer
+        :param line_time:       seconds to run a line
+        """
+        self.rx_buffer_size = rx_buffer_size
+        self.line_time = line_time
+
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        self.port_name = os.ttyname(self.slave)
+
+        # the lines that were run, in order
+        self.received = []
+        # the bytes lost because the receive buffer was full
+        self.overflows = 0
+        # the most bytes held in the receive buffer
+        self.max_rx = 0
+        self.state = 'Idle'
+        self.position = [0.0, 0.0, 0.0]
+        self.resets = 0
+        # if G38.2 does not touch the workpiece
+        self.probe_fails = False
+
+        self._rx = bytearray()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, name='FakeGrbl', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+        os.close(self.master)
+        os.close(self.slave)
+
+    def _reply(self, text):
+        os.write(self.master, (text + '\r\n').encode('utf-8'))
+
+    def _status(self):
+        self._reply('<%s|MPos:%.3f,%.3f,%.3f|FS:0,0>' % ((self.state, ) + tuple(self.position)))
+
+    def _receive(self, data):
+        for byte in data:
+            char = chr(byte)
+            if char == '?':
+                self._status()
+            elif char == '!':
+                if self.state == 'Run' or self.state == 'Idle':
+                    self.state = 'Hold'
+            elif char == '~':
+                if self.state == 'Hold':
+                    self.state = 'Run' if self._rx.count(b'\n') else 'Idle'
+            elif char == '\x18':
+                self._rx.clear()
+                self.state = 'Idle'
+                self.resets += 1
+                self._reply('')
+                self._reply(WELCOME)
+            elif len(self._rx) < self.rx_buffer_size:
+                self._rx.append(byte)
+                self.max_rx = max(self.max_rx, len(self._rx))
+            else:
+                self.overflows += 1
+
+    def _run(self, line):
+        self.received.append(line)
+        if not line or not (line[0].isalpha() or line[0] == '$'):
+            return 'error:1'
+
+        if self.state == 'Alarm':
+            if line != '$X':
+                return 'error:9'
+            self.state = 'Idle'
+            self._reply('[MSG:Caution: Unlocked]')
+            return 'ok'
+
+        if line == '$$':
+            for setting in SETTINGS:
+                self._reply(setting)
+        for axis, value in AXIS_RE.findall(line):
+            self.position['XYZ'.index(axis)] = float(value)
+        if line.startswith('G38.2') and self.probe_fails:
+            self.state = 'Alarm'
+            self._reply('ALARM:5')
+        elif line.startswith('G38.2'):
+            self._reply('[PRB:%.3f,%.3f,%.3f:1]' % tuple(self.position))
+        return 'ok'
+
+    def _loop(self):
+        next_run = time.monotonic()
+        while self._running:
+            timeout = max(0.0, next_run - time.monotonic()) if self._rx.count(b'\n') and self.state != 'Hold' \
+                else 0.05
+            readable, __, __ = select.select([self.master], [], [], timeout)
+            if readable:
+                try:
+                    self._receive(os.read(self.master, 1024))
+                except OSError:
+                    break
+
+            if self.state == 'Hold' or time.monotonic() < next_run:
+                continue
+            end = self._rx.find(b'\n')
+            if end < 0:
+                if self.state == 'Run':
+                    self.state = 'Idle'
+                continue
+
+            line = self._rx[:end].decode('utf-8').strip()
+            del self._rx[:end + 1]
+            if self.state != 'Alarm':
+                self.state = 'Run'
+            next_run = time.monotonic() + self.line_time
+            self._reply(self._run(line))
+
+
+if __name__ == '__main__':
+    grbl = FakeGrbl(line_time=float(sys.argv[1]) if len(sys.argv) > 1 else 0.0005).start()
+    print("Fake GRBL controller on: %s (Ctrl-C to stop)" % grbl.port_name)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        grbl.stop()
@@ -0,0 +1,160 @@
+"""
+Distances between the features of one or two sets of geometry (clearance rules, minimum distance between features).
+
+Instead of measuring the distance between every two features, the envelope of each feature, grown by the searched
+distance, is used to query an STRtree made with the other features. Only the pairs found this way (the candidates)
+can be closer than the searched distance, and only for them the exact distance and the nearest points are computed,
+in NumPy arrays. The candidates can be split in chunks that are sent, as WKB, to the processes of the App.pool.
+"""
+
+import numpy as np
+import shapely
+from shapely import STRtree
+
+
+def candidate_pairs(geoms_1, geoms_2=None, distance=0.0):
+    """
+    The pairs of features for which the envelopes are closer than the distance.
+
+    :param geoms_1:     the first set of features
+    :type geoms_1:      list | np.ndarray
+    :param geoms_2:     the second set of features; None to search the pairs inside the first set
+    :type geoms_2:      list | np.ndarray | None
+    :param distance:    the searched distance
+    :type distance:     float
+    :return:            two arrays with the indexes of the features in the pairs (in geoms_1 and in geoms_2). When
+                        the pairs are searched inside one set, each pair is found once, with the first index smaller.
+    :rtype:             tuple
+    """
+    geoms_1 = np.asarray(geoms_1, dtype=object)
+    same = geoms_2 is None
+    geoms_2 = geoms_1 if same else np.asarray(geoms_2, dtype=object)
+
+    if len(geoms_1) == 0 or len(geoms_2) == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+
+    # the STRtree query checks only the envelopes, so the envelopes grown by the distance are queried
+    bounds = shapely.bounds(geoms_1) + np.array([-distance, -distance, distance, distance])
+    idx_1, idx_2 = STRtree(geoms_2).query(shapely.box(*bounds.T))
+
+    if same:
+        keep = idx_1 < idx_2
+        idx_1, idx_2 = idx_1[keep], idx_2[keep]
+    return idx_1, idx_2
+
+
+def nearest_pairs(geoms, tolerance=0.0):
+    """
+    The pairs made by each feature with its nearest neighbour(s), plus all the pairs that are closer than the minimum
+    distance plus the tolerance (so the features that are, within the tolerance, at the minimum distance are all found).
+
+    :param geoms:       the features
+    :type geoms:        list | np.ndarray
+    :param tolerance:   added to the minimum distance when the pairs at the minimum distance are searched
+    :type tolerance:    float
+    :return:            two arrays with the indexes of the features in the pairs; the first index is the smallest
+    :rtype:             tuple
+    """
+    geoms = np.asarray(geoms, dtype=object)
+    if len(geoms) < 2:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+
+    tree = STRtree(geoms)
+    (idx_1, idx_2), dist = tree.query_nearest(geoms, exclusive=True, all_matches=True, return_distance=True)
+
+    near_1, near_2 = tree.query(geoms, predicate='dwithin', distance=float(dist.min()) + tolerance)
+    idx_1 = np.concatenate([idx_1, near_1])
+    idx_2 = np.concatenate([idx_2, near_2])
+
+    pairs = np.unique(np.stack([np.minimum(idx_1, idx_2), np.maximum(idx_1, idx_2)], axis=1), axis=0)
+    pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+    return pairs[:, 0], pairs[:, 1]
+
+
+def pair_clearances(geoms_1, geoms_2, idx_1, idx_2, distance=None, midpoint=True):
+    """
+    The exact distance and the nearest points for each pair of features.
+
+    :param geoms_1:     the first set of features
+    :type geoms_1:      np.ndarray
+    :param geoms_2:     the second set of features
+    :type geoms_2:      np.ndarray
+    :param idx_1:       the indexes of the pairs in the first set
+    :type idx_1:        np.ndarray
+    :param idx_2:       the indexes of the pairs in the second set
+    :type idx_2:        np.ndarray
+    :param distance:    only the pairs closer than this distance are returned; None to return all the pairs (except
+                        those with empty features)
+    :type distance:     float | None
+    :param midpoint:    if True the location of a pair is the point in the middle of the nearest points, else it is
+                        the tuple of the nearest points
+    :type midpoint:     bool
+    :return:            list of (distance, location) tuples
+    :rtype:             list
+    """
+    if len(idx_1) == 0:
+        return []
+
+    a = np.asarray(geoms_1, dtype=object)[idx_1]
+    b = np.asarray(geoms_2, dtype=object)[idx_2]
+    dist = shapely.distance(a, b)
+    # the distance to an empty geometry is NaN
+    keep = ~np.isnan(dist) if distance is None else dist < float(distance)
+    a, b, dist = a[keep], b[keep], dist[keep]
+    if len(dist) == 0:
+        return []
+
+    # the shortest line goes from the nearest point of the first feature to the nearest point of the second
+    coords = shapely.get_coordinates(shapely.shortest_line(a, b)).reshape(-1, 2, 2)
+    x_1, y_1 = coords[:, 0, 0], coords[:, 0, 1]
+    x_2, y_2 = coords[:, 1, 0], coords[:, 1, 1]
+
+    if midpoint:
+        loc_x = np.minimum(x_1, x_2) + np.abs(x_1 - x_2) / 2
+        loc_y = np.minimum(y_1, y_2) + np.abs(y_1 - y_2) / 2
+        locations = zip(loc_x.tolist(), loc_y.tolist())
+    else:
+        locations = zip(zip(x_1.tolist(), y_1.tolist()), zip(x_2.tolist(), y_2.tolist()))
+    return list(zip(dist.tolist(), locations))
+
+
+def clearance_chunks(geoms_1, geoms_2, idx_1, idx_2, chunk_size=20000):
+    """
+    Splits the candidate pairs in chunks that can be sent to other processes. Each chunk holds, as WKB, only the
+    features used by its pairs.
+
+    :param geoms_1:     the first set of features
+    :type geoms_1:      list | np.ndarray
+    :param geoms_2:     the second set of features
+    :type geoms_2:      list | np.ndarray
+    :param idx_1:       the indexes of the pairs in the first set
+    :type idx_1:        np.ndarray
+    :param idx_2:       the indexes of the pairs in the second set
+    :type idx_2:        np.ndarray
+    :param chunk_size:  the maximum number of pairs in a chunk
+    :type chunk_size:   int
+    :return:            yields (wkb_1, wkb_2, chunk_idx_1, chunk_idx_2) tuples, the indexes being in the WKB lists
+    :rtype:             collections.abc.Iterator
+    """
+    geoms_1 = np.asarray(geoms_1, dtype=object)
+    geoms_2 = np.asarray(geoms_2, dtype=object)
+    for start in range(0, len(idx_1), chunk_size):
+        used_1, local_1 = np.unique(idx_1[start:start + chunk_size], return_inverse=True)
+        used_2, local_2 = np.unique(idx_2[start:start + chunk_size], return_inverse=True)
+        yield (
+            shapely.to_wkb(geoms_1[used_1]).tolist(),
+            shapely.to_wkb(geoms_2[used_2]).tolist(),
+            local_1.reshape(-1),
+            local_2.reshape(-1)
+        )
+
+
+def clearance_process(wkb_1, wkb_2, idx_1, idx_2, distance=None, midpoint=True):
+    """
+    Runs pair_clearances() on a chunk made by clearance_chunks(). Made to be used in the App.pool.
+
+    :return:    list of (distance, location) tuples
+    :rtype:     list
+    """
+    return pair_clearances(shapely.from_wkb(wkb_1), shapely.from_wkb(wkb_2), idx_1, idx_2,
+                           distance=distance, midpoint=midpoint)
@@ -12,14 +12,15 @@
 # ##########################################################
 from PyQt6 import QtCore
 
-from shapely import Polygon, Point, LineString
+import shapely
+from shapely import Polygon, LineString, STRtree
 from shapely.ops import unary_union
 
 from appGUI.VisPyVisuals import ShapeCollection
 from appTool import AppTool
 
-from copy import deepcopy
 import collections
+import heapq
 from datetime import datetime
 
 import numpy as np
@@ -52,11 +53,13 @@ class GracefulException(Exception):
 class LoudDict(dict):
     """
     A Dictionary with a callback for item changes.
+    The 'modified' flag is set on any item change, whatever the callback is; the owner resets it.
     """
 
     def __init__(self, *args, **kwargs):
         dict.__init__(self, *args, **kwargs)
         self.callback = lambda x: None
+        self.modified = False
 
     def __setitem__(self, key, value):
         """
@@ -66,6 +69,7 @@ class LoudDict(dict):
             return
 
         dict.__setitem__(self, key, value)
+        self.modified = True
         self.callback(key)
 
     def update(self, *args, **kwargs):
@@ -275,6 +279,10 @@ class ExclusionAreas(QtCore.QObject):
         '''
         self.exclusion_areas_storage = []
 
+        # TravelPlanner objects for each buffered distance (tool diameter) made from the current Exclusion areas
+        self._travel_planners = {}
+        self._travel_planners_key = None
+
         self.mouse_is_dragging = False
 
         self.solid_geometry = []
@@ -704,6 +712,34 @@ class ExclusionAreas(QtCore.QObject):
             # there are no more exclusion areas in the storage, all have been selected and deleted
             self.app.inform.emit('%s' % _("All exclusion zones deleted."))
 
+    def travel_planner(self, tooldia):
+        """
+        The travel planner for a tool diameter. The planners are made only once for each tool diameter and they are
+        discarded when the Exclusion areas change.
+
+        :param tooldia:         The tool diameter used and which generates the travel lines
+        :type tooldia           float
+        :return:                The travel planner for the tool diameter
+        :rtype:                 TravelPlanner
+        """
+        areas_key = tuple(
+            (id(area['shape']), area['shape'].bounds, area['strategy'], area['overz'])
+            for area in self.exclusion_areas_storage
+        )
+        if areas_key != self._travel_planners_key:
+            self._travel_planners = {}
+            self._travel_planners_key = areas_key
+
+        # add a little something to the half diameter, to make sure that we really don't enter the exclusion zones
+        buffered_distance = (tooldia / 2.0) + (0.1 if self.app.app_units == 'MM' else 0.00393701)
+
+        try:
+            planner = self._travel_planners[buffered_distance]
+        except KeyError:
+            planner = TravelPlanner(self.exclusion_areas_storage, buffered_distance)
+            self._travel_planners[buffered_distance] = planner
+        return planner
+
     def travel_coordinates(self, start_point, end_point, tooldia):
         """
         WIll create a path the go around the exclusion areas on the shortest path when travelling (at a Z above the
@@ -719,176 +755,246 @@ class ExclusionAreas(QtCore.QObject):
         :rtype:                 list
         """
 
-        ret_list = []
+        if not self.exclusion_areas_storage:
+            return [[None, end_point]]
 
-        # Travel lines: rapids. Should not pass through Exclusion areas
-        travel_line = LineString([start_point, end_point])
-        origin_point = Point(start_point)
+        return self.travel_planner(tooldia).travel_coordinates(start_point, end_point)
 
-        buffered_storage = []
-        # add a little something to the half diameter, to make sure that we really don't enter the exclusion zones
-        buffered_distance = (tooldia / 2.0) + (0.1 if self.app.app_units == 'MM' else 0.00393701)
 
-        for area in self.exclusion_areas_storage:
-            new_area = deepcopy(area)
-            new_area['shape'] = area['shape'].buffer(buffered_distance, join_style=2)
-            buffered_storage.append(new_area)
+class TravelPlanner:
+    """
+    Plans the travel moves (rapids) of one tool so that they avoid the Exclusion areas.
+
+    The Exclusion areas are buffered with the tool radius only once, when the planner is made. An STRtree of the
+    buffered areas rejects quickly the travel lines that do not touch any of them. For the areas with the 'around'
+    strategy a visibility graph of their vertices is made, and the detours are the shortest paths in this graph.
+    The travel lines that cross areas with the 'over' strategy are raised to the area Over Z while above the area.
+    """
 
-        # sort the Exclusion areas from the closest to the start_point to the farthest
-        tmp = []
-        for area in buffered_storage:
-            dist = Point(start_point).distance(area['shape'])
-            tmp.append((dist, area))
-        tmp.sort(key=lambda k: k[0])
+    def __init__(self, areas, buffered_distance):
+        """
+
+        :param areas:               Exclusion areas; dicts with the format of ExclusionAreas.exclusion_areas_storage
+        :type areas:                list
+        :param buffered_distance:   The distance with which the areas are buffered (the tool radius plus a margin)
+        :type buffered_distance:    float
+        """
+        shapes = np.array([area['shape'] for area in areas], dtype=object)
+        self.shapes = shapely.buffer(shapes, buffered_distance, join_style='mitre')
+        self.tree = STRtree(self.shapes)
+        self.bounds = shapely.total_bounds(self.shapes)
+
+        self.over_areas = [
+            (idx, float(area['overz'])) for idx, area in enumerate(areas) if area['strategy'] != 'around'
+        ]
+        self.over_idx = set(idx for idx, __ in self.over_areas)
+
+        # the 'around' areas that overlap are merged so that no vertex of the visibility graph is inside an obstacle
+        around_shapes = [self.shapes[idx] for idx, area in enumerate(areas) if area['strategy'] == 'around']
+        self.obstacles = np.array(flatten_polygons(unary_union(around_shapes)) if around_shapes else [], dtype=object)
+        self.obstacles_tree = STRtree(self.obstacles)
+
+        vertices = []
+        for poly in self.obstacles:
+            for ring in [poly.exterior] + list(poly.interiors):
+                # the last coordinate in a LinearRing is the closing one, a duplicate of the first one
+                vertices.append(shapely.get_coordinates(ring)[:-1])
+        self.vertices = np.concatenate(vertices) if vertices else np.empty((0, 2))
+
+        # the visibility graph of the obstacles vertices as adjacency lists of (vertex index, distance)
+        self.graph = [[] for __ in range(len(self.vertices))]
+        if len(self.vertices) > 1:
+            first, second = np.triu_indices(len(self.vertices), k=1)
+            visible = self.visible(self.vertices[first], self.vertices[second])
+            first, second = first[visible], second[visible]
+            lengths = np.hypot(*(self.vertices[first] - self.vertices[second]).T)
+            for a, b, length in zip(first.tolist(), second.tolist(), lengths.tolist()):
+                self.graph[a].append((b, length))
+                self.graph[b].append((a, length))
+
+    def visible(self, starts, ends):
+        """
+        Check if the segments from starts to ends do not enter the obstacles (the merged 'around' areas). Segments
+        that only touch the obstacles, e.g. going along an obstacle edge, are visible.
+
+        :param starts:  Nx2 array with the start points of the segments
+        :type starts:   np.ndarray
+        :param ends:    Nx2 array with the end points of the segments
+        :type ends:     np.ndarray
+        :return:        N booleans, True for each segment that does not enter an obstacle
+        :rtype:         np.ndarray
+        """
+        starts = np.asarray(starts, dtype=float).reshape(-1, 2)
+        ends = np.broadcast_to(np.asarray(ends, dtype=float).reshape(-1, 2), starts.shape)
+        visible = np.ones(len(starts), dtype=bool)
+        if len(starts) == 0 or len(self.obstacles) == 0:
+            return visible
+
+        segments = shapely.linestrings(np.stack([starts, ends], axis=1))
+        seg_idx, obs_idx = self.obstacles_tree.query(segments, predicate='intersects')
+        if len(seg_idx):
+            enters = ~shapely.touches(segments[seg_idx], self.obstacles[obs_idx])
+            visible[seg_idx[enters]] = False
+        return visible
+
+    def shortest_path(self, start_point, end_point):
+        """
+        Shortest path from start_point to end_point that goes around the obstacles (the merged 'around' areas).
 
-        sorted_area_storage = [k[1] for k in tmp]
+        :param start_point:     X,Y coordinates for the start point
+        :type start_point:      tuple
+        :param end_point:       X,Y coordinates for the end point
+        :type end_point:        tuple
+        :return:                The list of the path points, without the start_point and the end_point.
+                                None if there is no path, e.g. when one of the points is inside an obstacle.
+        :rtype:                 list
+        """
+        nr_vertices = len(self.vertices)
+        start_node = nr_vertices
+        end_node = nr_vertices + 1
+
+        start_visible = np.flatnonzero(self.visible(np.tile(start_point, (nr_vertices, 1)), self.vertices))
+        end_visible = np.flatnonzero(self.visible(np.tile(end_point, (nr_vertices, 1)), self.vertices))
+        to_start = np.hypot(*(self.vertices[start_visible] - start_point).T)
+        to_end = dict(zip(end_visible.tolist(), np.hypot(*(self.vertices[end_visible] - end_point).T).tolist()))
+
+        # Dijkstra
+        dist = {start_node: 0.0}
+        previous = {}
+        heap = [(0.0, start_node)]
+        while heap:
+            d, node = heapq.heappop(heap)
+            if node == end_node:
+                break
+            if d > dist.get(node, np.inf):
+                continue
+
+            if node == start_node:
+                neighbours = zip(start_visible.tolist(), to_start.tolist())
+            else:
+                neighbours = self.graph[node]
+                if node in to_end:
+                    neighbours = neighbours + [(end_node, to_end[node])]
+
+            for nbr, length in neighbours:
+                new_d = d + length
+                if new_d < dist.get(nbr, np.inf):
+                    dist[nbr] = new_d
+                    previous[nbr] = node
+                    heapq.heappush(heap, (new_d, nbr))
+
+        if end_node not in previous:
+            return None
+
+        path = []
+        node = previous[end_node]
+        while node != start_node:
+            path.append(tuple(self.vertices[node].tolist()))
+            node = previous[node]
+        path.reverse()
+        return path
+
+    def over_moves(self, start_point, end_point):
+        """
+        The moves needed to travel over the 'over' areas crossed by the travel line from start_point to end_point.
 
-        # process the ordered exclusion areas list
-        for area in sorted_area_storage:
-            outline = area['shape'].exterior
-            if travel_line.intersects(outline):
-                intersection_pts = travel_line.intersection(outline)
+        :param start_point:     X,Y coordinates for the start point of the travel line
+        :type start_point:      tuple
+        :param end_point:       X,Y coordinates for the destination point of the travel line
+        :type end_point:        tuple
+        :return:                A list of [Z, (x, y)] moves; Z is None for the moves at the usual travel Z
+        :rtype:                 list
+        """
+        candidates = [
+            (idx, overz) for idx, overz in self.over_areas
+            if self.shapes[idx].intersects(LineString([start_point, end_point]))
+        ]
 
-                if isinstance(intersection_pts, Point):
-                    # it's just a touch, continue
+        ret_list = []
+        current_pt = start_point
+        while candidates:
+            origin = np.asarray(current_pt, dtype=float)
+            travel_line = LineString([current_pt, end_point])
+
+            # the first crossed area along the travel line, its entry and its exit points
+            first = None
+            for cand_idx, (idx, overz) in enumerate(candidates):
+                intersection_pts = shapely.get_coordinates(travel_line.intersection(self.shapes[idx].exterior))
+                if len(intersection_pts) < 2:
+                    # it's just a touch
                     continue
+                distances = np.hypot(*(intersection_pts - origin).T)
+                if first is None or distances.min() < first[0]:
+                    first = (
+                        distances.min(), cand_idx, overz,
+                        tuple(intersection_pts[distances.argmin()].tolist()),
+                        tuple(intersection_pts[distances.argmax()].tolist())
+                    )
+
+            if first is None:
+                break
+
+            __, cand_idx, overz, entry_pt, exit_pt = first
+            ret_list += [[overz, entry_pt], [None, exit_pt]]
+            current_pt = exit_pt
+            del candidates[cand_idx]
 
-                entry_pt = nearest_point(origin_point, intersection_pts)
-                exit_pt = farthest_point(origin_point, intersection_pts)
-
-                if area['strategy'] == 'around':
-                    full_vertex_points = [Point(x) for x in list(outline.coords)]
-
-                    # the last coordinate in outline, a LinearRing, is the closing one
-                    # therefore a duplicate of the first one; discard it
-                    vertex_points = full_vertex_points[:-1]
-
-                    # dist_from_entry = [(entry_pt.distance(vt), vertex_points.index(vt)) for vt in vertex_points]
-                    # closest_point_entry = nsmallest(1, dist_from_entry, key=lambda x: x[0])
-                    # start_idx = closest_point_entry[0][1]
-                    #
-                    # dist_from_exit = [(exit_pt.distance(vt), vertex_points.index(vt)) for vt in vertex_points]
-                    # closest_point_exit = nsmallest(1, dist_from_exit, key=lambda x: x[0])
-                    # end_idx = closest_point_exit[0][1]
-
-                    # pts_line_entry = None
-                    # pts_line_exit = None
-                    # for i in range(len(full_vertex_points)):
-                    #     try:
-                    #         line = LineString(
-                    #             [
-                    #                 (full_vertex_points[i].x, full_vertex_points[i].y),
-                    #                 (full_vertex_points[i + 1].x, full_vertex_points[i + 1].y)
-                    #             ]
-                    #         )
-                    #     except IndexError:
-                    #         continue
-                    #
-                    #     if entry_pt.within(line) or entry_pt.equals(Point(line.coords[0])) or \
-                    #             entry_pt.equals(Point(line.coords[1])):
-                    #         pts_line_entry = [Point(x) for x in line.coords]
-                    #
-                    #     if exit_pt.within(line) or exit_pt.equals(Point(line.coords[0])) or \
-                    #             exit_pt.equals(Point(line.coords[1])):
-                    #         pts_line_exit = [Point(x) for x in line.coords]
-                    #
-                    # closest_point_entry = nearest_point(entry_pt, pts_line_entry)
-                    # start_idx = vertex_points.index(closest_point_entry)
-                    #
-                    # closest_point_exit = nearest_point(exit_pt, pts_line_exit)
-                    # end_idx = vertex_points.index(closest_point_exit)
-
-                    # find all vertexes for which a line from start_point does not cross the Exclusion area polygon
-                    # the same for end_point
-                    # we don't need closest points for which the path leads to crosses of the Exclusion area
-
-                    close_start_points = []
-                    close_end_points = []
-                    for i in range(len(vertex_points)):
-                        try:
-                            start_line = LineString(
-                                [
-                                    start_point,
-                                    (vertex_points[i].x, vertex_points[i].y)
-                                ]
-                            )
-                            end_line = LineString(
-                                [
-                                    end_point,
-                                    (vertex_points[i].x, vertex_points[i].y)
-                                ]
-                            )
-                        except IndexError:
-                            continue
-
-                        if not start_line.crosses(area['shape']):
-                            close_start_points.append(vertex_points[i])
-                        if not end_line.crosses(area['shape']):
-                            close_end_points.append(vertex_points[i])
-
-                    closest_point_entry = nearest_point(entry_pt, close_start_points)
-                    closest_point_exit = nearest_point(exit_pt, close_end_points)
-
-                    start_idx = vertex_points.index(closest_point_entry)
-                    end_idx = vertex_points.index(closest_point_exit)
-
-                    # calculate possible paths: one clockwise the other counterclockwise on the exterior of the
-                    # exclusion area outline (Polygon.exterior)
-                    vp_len = len(vertex_points)
-                    if end_idx > start_idx:
-                        path_1 = vertex_points[start_idx:(end_idx + 1)]
-                        path_2 = [vertex_points[start_idx]]
-                        idx = start_idx
-                        for __ in range(vp_len):
-                            idx = idx - 1 if idx > 0 else (vp_len - 1)
-                            path_2.append(vertex_points[idx])
-                            if idx == end_idx:
-                                break
-                    else:
-                        path_1 = vertex_points[end_idx:(start_idx + 1)]
-                        path_2 = [vertex_points[end_idx]]
-                        idx = end_idx
-                        for __ in range(vp_len):
-                            idx = idx - 1 if idx > 0 else (vp_len - 1)
-                            path_2.append(vertex_points[idx])
-                            if idx == start_idx:
-                                break
-                        path_1.reverse()
-                        path_2.reverse()
-
-                    # choose the one with the lesser length
-                    length_path_1 = 0
-                    for i in range(len(path_1)):
-                        try:
-                            length_path_1 += path_1[i].distance(path_1[i + 1])
-                        except IndexError:
-                            pass
-
-                    length_path_2 = 0
-                    for i in range(len(path_2)):
-                        try:
-                            length_path_2 += path_2[i].distance(path_2[i + 1])
-                        except IndexError:
-                            pass
-
-                    path = path_1 if length_path_1 < length_path_2 else path_2
-
-                    # transform the list of Points into a list of Points coordinates
-                    path_coords = [[None, (p.x, p.y)] for p in path]
-                    ret_list += path_coords
+        return ret_list
 
-                else:
-                    path_coords = [[float(area['overz']), (entry_pt.x, entry_pt.y)], [None, (exit_pt.x, exit_pt.y)]]
-                    ret_list += path_coords
+    def travel_coordinates(self, start_point, end_point):
+        """
+        WIll create a path the go around the exclusion areas on the shortest path when travelling (at a Z above the
+        material).
 
-                # create a new LineString to test again for possible other Exclusion zones
-                last_pt_in_path = path_coords[-1][1]
-                travel_line = LineString([last_pt_in_path, end_point])
+        :param start_point:     X,Y coordinates for the start point of the travel line
+        :type start_point:      tuple
+        :param end_point:       X,Y coordinates for the destination point of the travel line
+        :type end_point:        tuple
+        :return:                A list of [Z, (x, y)] moves; Z is None for the moves at the usual travel Z
+        :rtype:                 list
+        """
+        # quick reject: the travel line is outside the bounding box of all the areas
+        min_x, min_y, max_x, max_y = self.bounds
+        if max(start_point[0], end_point[0]) < min_x or min(start_point[0], end_point[0]) > max_x or \
+                max(start_point[1], end_point[1]) < min_y or min(start_point[1], end_point[1]) > max_y:
+            return [[None, end_point]]
+
+        travel_line = LineString([start_point, end_point])
+        hits = self.tree.query(travel_line, predicate='intersects')
+        if len(hits) == 0:
+            return [[None, end_point]]
 
-        ret_list.append([None, end_point])
+        path = [start_point, end_point]
+        if not self.over_idx.issuperset(hits.tolist()) and not self.visible(start_point, end_point)[0]:
+            detour = self.shortest_path(start_point, end_point)
+            if detour is not None:
+                path = [start_point] + detour + [end_point]
+
+        ret_list = []
+        for leg_start, leg_end in zip(path[:-1], path[1:]):
+            if self.over_areas:
+                ret_list += self.over_moves(leg_start, leg_end)
+            ret_list.append([None, leg_end])
         return ret_list
 
 
+def flatten_polygons(geometry):
+    """
+    The Polygons found in a geometry.
+
+    :param geometry:    a Shapely geometry (Polygon, MultiPolygon or a collection)
+    :type geometry:     BaseGeometry
+    :return:            a list of Polygons
+    :rtype:             list
+    """
+    if isinstance(geometry, Polygon):
+        return [] if geometry.is_empty else [geometry]
+    try:
+        return [poly for geo in geometry.geoms for poly in flatten_polygons(geo)]
+    except AttributeError:
+        return []
+
+
 class AppLogging:
     def __init__(self, app, log_level):
         self.app = app
@@ -0,0 +1,309 @@
+"""
+Columnar container for the geometry of the objects.
+
+``GeometryArray`` is a list of Shapely geometry (the ``solid_geometry`` of the objects) that keeps next to it what
+the vectorized Shapely 2 functions need:
+
+    array       the geometry as a NumPy array (the nested lists, tuples and dicts are flattened); made when first used
+    bounds      the aggregate bounds (xmin, ymin, xmax, ymax), updated by append() without a new pass
+    tree        a STRtree of the array, for the spatial queries; made when first used
+
+They are kept until the list changes. The nested lists are stored as GeometryArray too, so a change of a nested list
+also drops the cached data of the lists that hold it. Since it is a list, the code that iterates, indexes or appends
+to the geometry keeps working.
+"""
+
+import weakref
+
+import numpy as np
+import shapely
+from shapely import STRtree
+from shapely.geometry.base import BaseGeometry
+
+EMPTY_BOUNDS = (np.inf, np.inf, -np.inf, -np.inf)
+
+
+def _collect(geometry, out):
+    if isinstance(geometry, BaseGeometry):
+        out.append(geometry)
+    elif isinstance(geometry, (list, tuple)):
+        for geo in geometry:
+            _collect(geo, out)
+    elif isinstance(geometry, dict):
+        for geo in geometry.values():
+            _collect(geo, out)
+
+
+def _rebuild(structure, geometry):
+    # the same structure as the one given to _collect(), with the next geometry of the iterator in place of each
+    # geometry; the dicts are copied, anything else is kept as it is
+    if isinstance(structure, BaseGeometry):
+        return next(geometry)
+    if isinstance(structure, list):
+        return GeometryArray([_rebuild(el, geometry) for el in structure])
+    if isinstance(structure, tuple):
+        return tuple(_rebuild(el, geometry) for el in structure)
+    if isinstance(structure, dict):
+        return {key: _rebuild(val, geometry) for key, val in structure.items()}
+    return structure
+
+
+class GeometryArray(list):
+    """
+    List of Shapely geometry with a cached NumPy array, aggregate bounds and STRtree.
+    """
+
+    def __init__(self, geometry=None):
+        """
+        :param geometry:    Shapely geometry, a list (possibly nested) of Shapely geometry or None
+        """
+        if geometry is None:
+            geometry = ()
+        elif isinstance(geometry, BaseGeometry):
+            geometry = (geometry, )
+        # weak references to the GeometryArray that hold this one
+        self._parents = []
+        super().__init__(self._adopt(geo) for geo in geometry)
+        self._reset()
+
+    def _adopt(self, geometry):
+        # a nested list is stored as a GeometryArray that drops the cached data of this one when it changes
+        if isinstance(geometry, list):
+            if not isinstance(geometry, GeometryArray):
+                geometry = GeometryArray(geometry)
+            geometry._parents.append(weakref.ref(self))
+        return geometry
+
+    def _reset(self):
+        self._array = None
+        self._bounds = None
+        self._tree = None
+        self._parts = {}
+        for parent_ref in self._parents:
+            parent = parent_ref()
+            if parent is not None:
+                parent._reset()
+
+    def __reduce__(self):
+        # the caches are not sent to the processes or saved
+        return self.__class__, (list(self), )
+
+    # ## Changes of the list
+    def append(self, geometry):
+        super().append(self._adopt(geometry))
+        bounds = self._bounds
+        self._reset()
+        # the aggregate bounds are updated, not made again
+        if bounds is not None and isinstance(geometry, BaseGeometry):
+            if geometry.is_empty:
+                self._bounds = bounds
+            else:
+                xmin, ymin, xmax, ymax = geometry.bounds
+                self._bounds = (min(bounds[0], xmin), min(bounds[1], ymin),
+                                max(bounds[2], xmax), max(bounds[3], ymax))
+
+    def extend(self, geometry):
+        super().extend(self._adopt(geo) for geo in geometry)
+        self._reset()
+
+    def __iadd__(self, geometry):
+        self.extend(geometry)
+        return self
+
+    def insert(self, index, geometry):
+        super().insert(index, self._adopt(geometry))
+        self._reset()
+
+    def __setitem__(self, index, geometry):
+        if isinstance(index, slice):
+            geometry = [self._adopt(geo) for geo in geometry]
+        else:
+            geometry = self._adopt(geometry)
+        super().__setitem__(index, geometry)
+        self._reset()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._reset()
+
+    def pop(self, index=-1):
+        geometry = super().pop(index)
+        self._reset()
+        return geometry
+
+    def remove(self, geometry):
+        super().remove(geometry)
+        self._reset()
+
+    def clear(self):
+        super().clear()
+        self._reset()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._reset()
+
+    def reverse(self):
+        super().reverse()
+        self._reset()
+
+    # ## Cached data
+    @property
+    def array(self):
+        """
+        :return:    all the Shapely geometry in the list, the nested lists flattened, in order
+        :rtype:     np.ndarray
+        """
+        if self._array is None:
+            geoms = []
+            _collect(self, geoms)
+            geo_arr = np.empty(len(geoms), dtype=object)
+            geo_arr[:] = geoms
+            self._array = geo_arr
+        return self._array
+
+    @property
+    def bounds(self):
+        """
+        Same as the bounds of a Shapely geometry so the code that asks an element for its bounds gets the bounds of
+        all the geometry.
+
+        :return:    (xmin, ymin, xmax, ymax); (inf, inf, -inf, -inf) if there is no geometry
+        :rtype:     tuple
+        """
+        if self._bounds is None:
+            geo_arr = self.array
+            bounds = shapely.total_bounds(geo_arr) if len(geo_arr) else None
+            if bounds is None or np.isnan(bounds).any():
+                self._bounds = EMPTY_BOUNDS
+            else:
+                self._bounds = tuple(float(b) for b in bounds)
+        return self._bounds
+
+    @property
+    def tree(self):
+        """
+        :return:    STRtree of ``array``; the indexes returned by its queries are indexes in ``array``
+        :rtype:     STRtree
+        """
+        if self._tree is None:
+            self._tree = STRtree(self.array)
+        return self._tree
+
+    def parts(self, multi_types=None):
+        """
+        The non-empty single geometries: the multi-part geometries are exploded. The order is kept.
+
+        :param multi_types: names of the geometry types that are exploded (e.g. ['MultiPolygon']); all the
+                            multi-part types if None
+        :type multi_types:  list | None
+        :return:            array of Shapely geometry
+        :rtype:             np.ndarray
+        """
+        key = tuple(multi_types) if multi_types is not None else None
+        if key not in self._parts:
+            geo_arr = self.array
+            geo_arr = geo_arr[~shapely.is_empty(geo_arr)]
+            type_ids = shapely.get_type_id(geo_arr)
+            if multi_types is None:
+                explode = type_ids >= 4
+            else:
+                explode = np.isin(type_ids, [shapely.GeometryType[t.upper()].value for t in multi_types])
+
+            if explode.any():
+                parts, part_index = shapely.get_parts(geo_arr[explode], return_index=True)
+                parts_not_empty = ~shapely.is_empty(parts)
+                index = np.concatenate((np.flatnonzero(~explode),
+                                        np.flatnonzero(explode)[part_index[parts_not_empty]]))
+                merged = np.concatenate((geo_arr[~explode], parts[parts_not_empty]))
+                geo_arr = merged[np.argsort(index, kind='stable')]
+            self._parts[key] = geo_arr
+        return self._parts[key]
+
+    def query(self, geometry, predicate=None):
+        """
+        The geometry whose bounding box intersects the bounding box of the given geometry or, with a predicate,
+        the geometry for which predicate(geometry, tested) is True. O(log n) once the tree is made.
+
+        :param geometry:    the Shapely geometry to test
+        :param predicate:   a Shapely binary predicate name: 'intersects', 'contains', 'within' etc. (see STRtree)
+        :return:            array of Shapely geometry, in the order of the list
+        :rtype:             np.ndarray
+        """
+        if not len(self.array):
+            return self.array
+        return self.array[np.sort(self.tree.query(geometry, predicate=predicate))]
+
+    # ## Vectorized operations
+    def _map(self, fcn):
+        """
+        Runs a vectorized Shapely function once on all the geometry and puts each result in the place of its
+        geometry: the nested lists, tuples and dicts and the elements that are not geometry are kept.
+
+        :param fcn:     function of an array of Shapely geometry that returns an array of the same length
+        :return:        the new geometry, with the structure of this one
+        :rtype:         GeometryArray
+        """
+        geo_arr = self.array
+        results = iter(fcn(geo_arr).tolist() if len(geo_arr) else ())
+        return GeometryArray([_rebuild(el, results) for el in self])
+
+    def buffer(self, distance, **kwargs):
+        """
+        :param distance:    buffer distance
+        :param kwargs:      the parameters of shapely.buffer()
+        :return:            the buffered geometry
+        :rtype:             GeometryArray
+        """
+        return self._map(lambda geo_arr: shapely.buffer(geo_arr, distance, **kwargs))
+
+    def simplify(self, tolerance, preserve_topology=True):
+        """
+        :param tolerance:           simplification tolerance
+        :param preserve_topology:   see shapely.simplify()
+        :return:                    the simplified geometry
+        :rtype:                     GeometryArray
+        """
+        return self._map(lambda geo_arr: shapely.simplify(geo_arr, tolerance, preserve_topology=preserve_topology))
+
+    def transform(self, matrix):
+        """
+        :param matrix:  3x3 affine matrix
+        :return:        the transformed geometry
+        :rtype:         GeometryArray
+        """
+        matrix = np.asarray(matrix, dtype=float)
+        return self._map(lambda geo_arr: shapely.transform(
+            geo_arr, lambda coords: np.dot(coords, matrix[:2, :2].T) + matrix[:2, 2]))
+
+
+class GeometryAttribute:
+    """
+    Descriptor for the attributes that hold geometry: the lists set to it are stored as GeometryArray. Any other
+    value (a Shapely geometry, None) is stored as it is.
+
+    The value is kept in the instance __dict__; when it is missing an AttributeError is raised, so the classes that
+    defer their attributes (__getattr__()) keep working.
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        try:
+            return instance.__dict__[self.name]
+        except KeyError:
+            raise AttributeError("'%s' object has no attribute '%s'" % (type(instance).__name__, self.name))
+
+    def __set__(self, instance, value):
+        if isinstance(value, list) and not isinstance(value, GeometryArray):
+            value = GeometryArray(value)
+        instance.__dict__[self.name] = value
+
+    def __delete__(self, instance):
+        try:
+            del instance.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(self.name)
@@ -0,0 +1,460 @@
+"""
+Streaming G-code sender for the GRBL controllers.
+
+GRBL has a serial receive buffer of 128 bytes and it answers each line with ``ok`` or ``error:N`` when the line is
+taken out of that buffer. The sender uses the character-counting protocol of GRBL: it keeps the sizes of the lines
+that were sent and not answered yet and it sends the next line as soon as it fits in the free part of the buffer,
+so the buffer of the controller never runs empty and it never overflows. Each answer frees the size of the oldest
+line.
+
+Two threads do the work:
+
+    writer      sends the lines of the jobs, waiting only for room in the receive buffer of the controller
+    reader      reads the answers; ``ok``/``error`` complete the oldest line, the status reports (``<...>``) are
+                parsed, the alarms and the feedback messages (``ALARM:N``, ``[MSG:...]``) are emitted and the other
+                messages (``[PRB:...]``, ``$N=...``) are kept with the line they answer
+
+The real-time commands (``?``, ``!``, ``~``, soft reset) are single bytes that GRBL handles as soon as they are
+received; they are not counted in the receive buffer and they are sent at once.
+"""
+
+import re
+import time
+import threading
+import logging
+from collections import deque
+
+from PyQt6 import QtCore
+
+log = logging.getLogger('base')
+
+# the size of the serial receive buffer of GRBL
+RX_BUFFER_SIZE = 128
+# seconds to wait for the welcome message after a soft reset before the next lines are sent
+RESET_TIMEOUT = 2.0
+
+# real-time commands
+STATUS_REPORT = '?'
+FEED_HOLD = '!'
+CYCLE_START = '~'
+SOFT_RESET = '\x18'
+REALTIME_COMMANDS = (STATUS_REPORT, FEED_HOLD, CYCLE_START, SOFT_RESET)
+
+# comments: (...) and from ';' to the end of the line
+COMMENT_RE = re.compile(r'\([^)]*\)|;.*$')
+
+
+def clean_line(line):
+    """
+    The G-code line as it is sent to GRBL: without comments and without the spaces at its ends.
+
+    :param line:    a G-code line
+    :type line:     str
+    :return:        the line to send; empty if there is nothing to send
+    :rtype:         str
+    """
+    return COMMENT_RE.sub('', line).strip()
+
+
+def parse_status_report(report):
+    """
+    Parses a GRBL 1.1 status report: ``<Idle|MPos:0.000,0.000,0.000|FS:0,0>``.
+
+    :param report:  the status report, with or without the angle brackets
+    :type report:   str
+    :return:        {'state': 'Idle', 'MPos': [0.0, 0.0, 0.0], 'FS': [0.0, 0.0], ...}; the fields that are not
+                    numbers are kept as text
+    :rtype:         dict
+    """
+    fields = report.strip().strip('<>').split('|')
+    status = {'state': fields[0]}
+    for field in fields[1:]:
+        name, __, value = field.partition(':')
+        try:
+            status[name] = [float(val) for val in value.split(',')]
+        except ValueError:
+            status[name] = value
+    return status
+
+
+class GrblJob:
+    """
+    Lines streamed to the controller, with their answers.
+    """
+
+    def __init__(self, lines, stop_on_error=False):
+        """
+        :param lines:           the lines to send, without comments (see clean_line())
+        :type lines:            list
+        :param stop_on_error:   if no more lines are sent after a line answered with an error
+        :type stop_on_error:    bool
+        """
+        self.lines = lines
+        self.stop_on_error = stop_on_error
+
+        # the number of lines sent and the number of lines answered
+        self.sent = 0
+        self.acked = 0
+        # line index -> the messages received before the answer of the line ('[PRB:...]', '$N=...')
+        self.responses = {}
+        # (line index, 'error:N') for each line that was not accepted
+        self.errors = []
+        # the job was stopped before all its lines were answered
+        self.aborted = False
+
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """
+        Waits until all the lines are answered or the job is aborted.
+
+        :param timeout: seconds; None to wait until the end of the job
+        :type timeout:  float | None
+        :return:        if the job ended
+        :rtype:         bool
+        """
+        return self._done.wait(timeout)
+
+    def text(self, index):
+        """
+        :param index:   the index of a line
+        :type index:    int
+        :return:        the text of the controller for the line: its messages and its answer
+        :rtype:         str
+        """
+        answer = [err for idx, err in self.errors if idx == index] or (['ok'] if index < self.acked else [])
+        return '\n'.join(self.responses.get(index, []) + answer)
+
+    def _finish(self, aborted=False):
+        self.aborted = self.aborted or aborted
+        self._done.set()
+
+
+class GrblSender(QtCore.QObject):
+    """
+    Streams G-code to a GRBL controller connected to a serial port, with the character counting flow control.
+    """
+
+    # (lines answered, lines of the job); emitted when the answered percentage changes
+    progress = QtCore.pyqtSignal(int, int)
+    # the parsed status report, see parse_status_report()
+    status_report = QtCore.pyqtSignal(dict)
+    # a message of the controller that is not the answer to a line (alarms, feedback messages, the welcome message)
+    message = QtCore.pyqtSignal(str)
+    # the job (GrblJob) ended
+    finished = QtCore.pyqtSignal(object)
+
+    def __init__(self, port, rx_buffer_size=RX_BUFFER_SIZE, status_interval=0.25):
+        """
+        :param port:            an open serial port (pyserial) with a read timeout (e.g. 0.1 seconds)
+        :type port:             serial.Serial
+        :param rx_buffer_size:  the size of the receive buffer of the controller
+        :type rx_buffer_size:   int
+        :param status_interval: seconds between the status reports requested while a job runs; None for no reports
+        :type status_interval:  float | None
+        """
+        super().__init__()
+
+        self.port = port
+        self.rx_buffer_size = rx_buffer_size
+        self.status_interval = status_interval
+
+        # guards the jobs, the lines in the receive buffer of the controller and the pause
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        # the jobs waiting to be sent; the first one is being sent
+        self._jobs = deque()
+        # (job, line index, size) of the lines sent and not answered yet, the oldest first
+        self._window = deque()
+        self._window_bytes = 0
+        self._paused = False
+        self._running = False
+        # after abort(): no line is sent until the controller answers the soft reset with its welcome message, or
+        # until this time (time.monotonic()) passes
+        self._reset_until = 0.0
+
+        self._reader = None
+        self._writer = None
+
+    @property
+    def paused(self):
+        return self._paused
+
+    @property
+    def busy(self):
+        """
+        :return:    if there are lines to send or lines that are not answered yet
+        :rtype:     bool
+        """
+        with self._cond:
+            return bool(self._jobs or self._window)
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._reader = threading.Thread(target=self._read_loop, name='GrblSender reader', daemon=True)
+        self._writer = threading.Thread(target=self._write_loop, name='GrblSender writer', daemon=True)
+        self._reader.start()
+        self._writer.start()
+
+    def stop(self):
+        """
+        Stops the threads; the jobs that did not end are aborted. The serial port is not closed.
+        """
+        with self._cond:
+            self._running = False
+            self._abort_jobs()
+            self._cond.notify_all()
+        for thread in (self._reader, self._writer):
+            if thread is not None and thread is not threading.current_thread():
+                thread.join()
+        self._reader = self._writer = None
+
+    def stream(self, lines, stop_on_error=False):
+        """
+        Adds lines to be sent after the lines already queued. It does not wait for the lines to be sent.
+
+        :param lines:           G-code lines (or a G-code text); the comments and the empty lines are not sent
+        :type lines:            list | str
+        :param stop_on_error:   if no more lines of the job are sent after a line answered with an error
+        :type stop_on_error:    bool
+        :return:                the job; GrblJob.wait() waits for its end
+        :rtype:                 GrblJob
+        """
+        if isinstance(lines, str):
+            lines = lines.splitlines()
+        job = GrblJob([line for line in map(clean_line, lines) if line], stop_on_error=stop_on_error)
+        if not job.lines:
+            job._finish()
+            return job
+
+        with self._cond:
+            if not self._running:
+                job._finish(aborted=True)
+                return job
+            self._jobs.append(job)
+            self._cond.notify_all()
+        return job
+
+    def send(self, command, timeout=None):
+        """
+        Sends one command and waits for its answer.
+
+        :param command: a G-code line or a GRBL command ('$$', '$H' etc.)
+        :type command:  str
+        :param timeout: seconds; None to wait for the answer
+        :type timeout:  float | None
+        :return:        the job of the command; GrblJob.text(0) is the text of the controller
+        :rtype:         GrblJob
+        """
+        job = self.stream([command])
+        job.wait(timeout)
+        return job
+
+    def realtime(self, command):
+        """
+        Sends a real-time command now, before the queued lines.
+
+        :param command: one of REALTIME_COMMANDS
+        :type command:  str
+        """
+        self._write(command.encode('utf-8'))
+
+    def request_status(self):
+        self.realtime(STATUS_REPORT)
+
+    def pause(self):
+        """
+        Feed hold: the controller stops the motion and no more lines are sent until resume().
+        """
+        with self._cond:
+            self._paused = True
+        self.realtime(FEED_HOLD)
+
+    def resume(self):
+        """
+        Cycle start: the motion continues and the lines are sent again.
+        """
+        self.realtime(CYCLE_START)
+        with self._cond:
+            self._paused = False
+            self._cond.notify_all()
+
+    def abort(self):
+        """
+        Stops the jobs: no more lines are sent and the controller is reset, so the lines in its buffers are dropped.
+        The jobs added after it are sent once the controller is back from the reset.
+        """
+        with self._cond:
+            self._abort_jobs()
+            self._paused = False
+            self._reset_until = time.monotonic() + RESET_TIMEOUT
+            self._cond.notify_all()
+        self.realtime(SOFT_RESET)
+
+    def _abort_jobs(self):
+        # called with self._cond held
+        jobs = list(self._jobs)
+        for job, __, __ in self._window:
+            if job not in jobs:
+                jobs.append(job)
+        self._jobs.clear()
+        self._window.clear()
+        self._window_bytes = 0
+        for job in jobs:
+            job._finish(aborted=True)
+            self.finished.emit(job)
+
+    def _stop_jobs(self):
+        # called with self._cond held; the lines not sent yet are dropped and the jobs end when the lines already sent
+        # are answered; returns the jobs that have no line waiting for an answer, to be finished
+        waiting = set(job for job, __, __ in self._window)
+        jobs = list(self._jobs)
+        self._jobs.clear()
+        for job, __, __ in self._window:
+            if job not in jobs:
+                jobs.append(job)
+        for job in jobs:
+            job.lines = job.lines[:job.sent]
+            job.aborted = True
+        return [job for job in jobs if job not in waiting]
+
+    def _write(self, data):
+        with self._write_lock:
+            self.port.write(data)
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                while True:
+                    if not self._running:
+                        return
+                    reset_wait = self._reset_until - time.monotonic()
+                    job = self._jobs[0] if self._jobs else None
+                    if job is not None and not self._paused and reset_wait <= 0:
+                        if job.sent == len(job.lines):
+                            # all sent; the answers are waited by the reader
+                            self._jobs.popleft()
+                            continue
+
+                        line = job.lines[job.sent] + '\n'
+                        size = len(line.encode('utf-8'))
+                        # a line longer than the buffer is sent when the buffer is empty
+                        if not self._window or self._window_bytes + size <= self.rx_buffer_size:
+                            break
+                    self._cond.wait(reset_wait if job is not None and reset_wait > 0 else None)
+
+                self._window.append((job, job.sent, size))
+                self._window_bytes += size
+                job.sent += 1
+                # taken before the window can be cleared by abort(): its soft reset is written after the line, so the
+                # line is dropped with the reset and its answer is not taken for the line of another job
+                self._write_lock.acquire()
+
+            try:
+                self.port.write(line.encode('utf-8'))
+            except Exception as e:
+                self._write_lock.release()
+                log.error("GrblSender._write_loop() --> %s" % str(e))
+                with self._cond:
+                    self._abort_jobs()
+            else:
+                self._write_lock.release()
+
+    def _read_loop(self):
+        partial = b''
+        last_status = 0.0
+        while self._running:
+            if self.status_interval is not None and self.busy and \
+                    time.monotonic() - last_status >= self.status_interval:
+                last_status = time.monotonic()
+                try:
+                    self.request_status()
+                except Exception as e:
+                    log.error("GrblSender._read_loop() --> %s" % str(e))
+
+            try:
+                # with the timeout of the port it can be a part of a line
+                partial += self.port.readline()
+            except Exception as e:
+                log.error("GrblSender._read_loop() --> %s" % str(e))
+                with self._cond:
+                    self._abort_jobs()
+                time.sleep(0.1)
+                continue
+
+            if not partial.endswith(b'\n'):
+                continue
+            line, partial = partial.decode('utf-8', errors='replace').strip(), b''
+            if line:
+                self._on_line(line)
+
+    def _on_line(self, line):
+        if line == 'ok' or line.startswith('error'):
+            self._on_answer(line)
+        elif line.startswith('<'):
+            self.status_report.emit(parse_status_report(line))
+        elif line.startswith('Grbl '):
+            # the welcome message: the controller was reset and the lines in its buffers are lost
+            with self._cond:
+                if time.monotonic() >= self._reset_until:
+                    # not the reset of abort(), whose jobs are already aborted; the jobs added after abort() are kept
+                    self._abort_jobs()
+                self._reset_until = 0.0
+                self._paused = False
+                self._cond.notify_all()
+            self.message.emit(line)
+        elif line.startswith('ALARM'):
+            # the controller is locked: the lines in its buffer are answered with errors and no more lines are sent
+            ended = []
+            with self._cond:
+                if time.monotonic() >= self._reset_until:
+                    ended = self._stop_jobs()
+                self._cond.notify_all()
+            for job in ended:
+                job._finish()
+                self.finished.emit(job)
+            self.message.emit(line)
+        elif line.startswith('[MSG:'):
+            self.message.emit(line)
+        else:
+            with self._cond:
+                if self._window:
+                    # the message comes before the answer of the line
+                    job, index, __ = self._window[0]
+                    job.responses.setdefault(index, []).append(line)
+                    return
+            self.message.emit(line)
+
+    def _on_answer(self, answer):
+        with self._cond:
+            if not self._window:
+                # the answer to a line sent by someone else
+                return
+            job, index, size = self._window.popleft()
+            self._window_bytes -= size
+            job.acked += 1
+
+            if answer != 'ok':
+                job.errors.append((index, answer))
+                if job.stop_on_error and job in self._jobs:
+                    # the lines not sent yet are dropped; those in the buffer are still answered
+                    job.lines = job.lines[:job.sent]
+                    job.aborted = True
+
+            ended = job.acked == len(job.lines)
+            if ended and job in self._jobs:
+                self._jobs.remove(job)
+            self._cond.notify_all()
+
+        total = len(job.lines)
+        if ended or (100 * job.acked) // total != (100 * (job.acked - 1)) // total:
+            self.progress.emit(job.acked, total)
+        if ended:
+            job._finish()
+            self.finished.emit(job)
@@ -0,0 +1,374 @@
+"""
+Ordering of the travel between a set of locations (drill holes, start points of the paths).
+
+The order starts from a nearest neighbour path built with a KD-tree and it is then improved with 2-Opt and Or-Opt
+moves, until no move improves the path or until the time budget is used. Only the moves that join a location to one
+of its k nearest neighbours are checked (sparse candidate lists) and each round checks all the locations at once, in
+NumPy arrays. The path is open: it starts in a fixed start point and it ends in any location.
+"""
+
+import time
+import bisect
+import logging
+
+import numpy as np
+
+HAS_SCIPY = True
+try:
+    from scipy.spatial import cKDTree
+except ModuleNotFoundError:
+    HAS_SCIPY = False
+
+log = logging.getLogger('base')
+
+
+def travel_distance(points, order=None, start=None):
+    """
+    The length of the travel through the points.
+
+    :param points:  Nx2 array (or list of x, y tuples) with the locations
+    :type points:   np.ndarray | list
+    :param order:   the order in which the locations are visited; None for the order of the points
+    :type order:    list | np.ndarray | None
+    :param start:   x, y coordinates from where the travel starts; None to start in the first visited location
+    :type start:    tuple | None
+    :return:        the length of the travel
+    :rtype:         float
+    """
+    pts = np.asarray(points, dtype=float).reshape(-1, 2)
+    if order is not None:
+        pts = pts[np.asarray(order, dtype=np.intp)]
+    if start is not None:
+        pts = np.concatenate([np.asarray(start, dtype=float).reshape(1, 2), pts])
+    if len(pts) < 2:
+        return 0.0
+    return float(np.hypot(*np.diff(pts, axis=0).T).sum())
+
+
+def knn_candidates(points, k, tree=None):
+    """
+    The k nearest neighbours of each location.
+
+    :param points:  Nx2 array with the locations
+    :type points:   np.ndarray
+    :param k:       number of neighbours
+    :type k:        int
+    :param tree:    a KD-tree made from the points; made here if None
+    :type tree:     cKDTree
+    :return:        Nxk array with the indexes of the neighbours, the nearest first
+    :rtype:         np.ndarray
+    """
+    if tree is None:
+        tree = cKDTree(points)
+    k = min(k, len(points) - 1)
+    if k < 1:
+        return np.empty((len(points), 0), dtype=np.intp)
+    __, idx = tree.query(points, k=k + 1)
+    idx = idx.reshape(len(points), k + 1)
+
+    # the nearest is usually the location itself, but not always when there are duplicated locations
+    not_self = idx != np.arange(len(points))[:, None]
+    not_self[not_self.sum(axis=1) > k, -1] = False
+    return idx[not_self].reshape(len(points), k)
+
+
+def nearest_neighbour_order(points, first=0, tree=None):
+    """
+    Path that goes each time to the nearest location not visited yet.
+
+    :param points:  Nx2 array with the locations
+    :type points:   np.ndarray
+    :param first:   index of the location where the path starts
+    :type first:    int
+    :param tree:    a KD-tree made from the points; made here if None
+    :type tree:     cKDTree
+    :return:        the indexes of the locations in the order of the path
+    :rtype:         np.ndarray
+    """
+    if tree is None:
+        tree = cKDTree(points)
+
+    nr_points = len(points)
+    visited = np.zeros(nr_points, dtype=bool)
+    order = np.empty(nr_points, dtype=np.intp)
+
+    current = first
+    visited[current] = True
+    order[0] = current
+    for step in range(1, nr_points):
+        nxt = -1
+        k = 8
+        while nxt < 0:
+            if k > 128:
+                # the neighbourhood is already visited: search among all the locations not visited
+                remaining = np.flatnonzero(~visited)
+                nxt = remaining[np.argmin(np.hypot(*(points[remaining] - points[current]).T))]
+                break
+
+            __, idx = tree.query(points[current], k=min(k, nr_points))
+            idx = np.atleast_1d(idx)
+            free = idx[~visited[idx]]
+            if len(free):
+                nxt = free[0]
+            k *= 4
+
+        visited[nxt] = True
+        order[step] = nxt
+        current = nxt
+
+    return order
+
+
+class PathOrdering:
+    """
+    Improves an open path through a set of locations with 2-Opt and Or-Opt moves.
+
+    The first location in the path is fixed (it is the start point) and it is never moved.
+    """
+
+    # improvements smaller than this are ignored, so the search does not cycle on rounding errors
+    eps = 1e-9
+
+    def __init__(self, points, order, candidates):
+        """
+
+        :param points:      Nx2 array with the locations
+        :type points:       np.ndarray
+        :param order:       initial order of the locations; order[0] is the fixed start
+        :type order:        np.ndarray
+        :param candidates:  Nxk array with the k nearest neighbours of each location
+        :type candidates:   np.ndarray
+        """
+        self.points = points
+        self.xs = np.ascontiguousarray(points[:, 0])
+        self.ys = np.ascontiguousarray(points[:, 1])
+        self.tour = np.array(order, dtype=np.intp)
+        self.pos = np.empty_like(self.tour)
+        self.pos[self.tour] = np.arange(len(self.tour))
+        self.candidates = candidates
+
+    def dist(self, a, b):
+        """
+        Distances between the locations with the indexes in the a and b arrays.
+        """
+        return np.hypot(self.xs[a] - self.xs[b], self.ys[a] - self.ys[b])
+
+    def length(self):
+        return travel_distance(self.points, self.tour)
+
+    def best_per_group(self, deltas, groups):
+        """
+        The indexes of the best improving move in each group of moves (the moves starting from the same location).
+
+        :return:    array of indexes in deltas
+        :rtype:     np.ndarray
+        """
+        improving = np.flatnonzero(deltas < -self.eps)
+        if len(improving) == 0:
+            return improving
+        improving = improving[np.argsort(deltas[improving], kind='stable')]
+        __, first = np.unique(groups[improving], return_index=True)
+        return improving[first]
+
+    @staticmethod
+    def disjoint_moves(deltas, lows, highs):
+        """
+        Choose, the best first, the improving moves that change disjoint ranges of the path, so they can all be
+        applied in the same round.
+
+        :return:    the indexes of the chosen moves
+        :rtype:     list
+        """
+        chosen = []
+        starts = []
+        ends = []
+        for move in np.argsort(deltas, kind='stable'):
+            lo = lows[move]
+            hi = highs[move]
+            at = bisect.bisect_left(starts, lo)
+            if at > 0 and ends[at - 1] >= lo:
+                continue
+            if at < len(starts) and starts[at] <= hi:
+                continue
+            starts.insert(at, lo)
+            ends.insert(at, hi)
+            chosen.append(move)
+        return chosen
+
+    def two_opt_round(self):
+        """
+        One round of 2-Opt moves: reverse the part of the path between two locations that are near each other, if
+        this makes the path shorter.
+
+        :return:    True if the path was improved
+        :rtype:     bool
+        """
+        tour = self.tour
+        nr = len(tour)
+        if nr < 3 or self.candidates.shape[1] == 0:
+            return False
+
+        # for each edge (i, i + 1) of the path, join i with each of its candidates j: reverse the path between them
+        i = np.repeat(np.arange(nr - 1), self.candidates.shape[1])
+        j = self.pos[self.candidates[tour[:-1]].ravel()]
+
+        lo = np.minimum(i, j)
+        hi = np.maximum(i, j)
+        valid = (hi > lo + 1) & (lo >= 0)
+        lo = lo[valid]
+        hi = hi[valid]
+        if len(lo) == 0:
+            return False
+
+        at_end = hi == nr - 1
+        hi_next = np.where(at_end, hi, hi + 1)
+        delta = self.dist(tour[lo], tour[hi]) - self.dist(tour[lo], tour[lo + 1]) + np.where(
+            at_end, 0.0, self.dist(tour[lo + 1], tour[hi_next]) - self.dist(tour[hi], tour[hi_next]))
+
+        improving = self.best_per_group(delta, lo)
+        if len(improving) == 0:
+            return False
+        delta = delta[improving]
+        lo = lo[improving].tolist()
+        hi = hi[improving].tolist()
+
+        for move in self.disjoint_moves(delta, lo, [h + 1 for h in hi]):
+            tour[lo[move] + 1:hi[move] + 1] = tour[lo[move] + 1:hi[move] + 1][::-1].copy()
+
+        self.pos[tour] = np.arange(nr)
+        return True
+
+    def or_opt_round(self, segment_len):
+        """
+        One round of Or-Opt moves: move a segment of segment_len consecutive locations (possibly reversed) next to
+        a location near one of its ends, if this makes the path shorter.
+
+        :param segment_len: the number of locations in the moved segments
+        :type segment_len:  int
+        :return:            True if the path was improved
+        :rtype:             bool
+        """
+        tour = self.tour
+        nr = len(tour)
+        k = self.candidates.shape[1]
+        if nr < segment_len + 2 or k == 0:
+            return False
+
+        # segments tour[s:e + 1]; the first location in the path is fixed, so s >= 1
+        s = np.arange(1, nr - segment_len + 1)
+        e = s + segment_len - 1
+        prev = s - 1
+        at_end = e == nr - 1
+        nxt = np.where(at_end, e, e + 1)
+        removal_gain = self.dist(tour[prev], tour[s]) + np.where(
+            at_end, 0.0, self.dist(tour[e], tour[nxt]) - self.dist(tour[prev], tour[nxt]))
+
+        # insert after the location j, with j a candidate (or the location before a candidate) of the segment ends
+        cand = np.concatenate([self.candidates[tour[s]], self.candidates[tour[e]]], axis=1)
+        cand_pos = self.pos[cand]
+        j = np.concatenate([cand_pos, cand_pos - 1], axis=1)
+
+        seg = np.repeat(np.arange(len(s)), j.shape[1])
+        j = j.ravel()
+        s = s[seg]
+        e = e[seg]
+        valid = (j >= 0) & ((j < s - 1) | (j > e))
+        seg, j, s, e = seg[valid], j[valid], s[valid], e[valid]
+        if len(j) == 0:
+            return False
+
+        j_at_end = j == nr - 1
+        j_next = np.where(j_at_end, j, j + 1)
+        old_edge = np.where(j_at_end, 0.0, self.dist(tour[j], tour[j_next]))
+        forward = self.dist(tour[j], tour[s]) + np.where(j_at_end, 0.0, self.dist(tour[e], tour[j_next])) - old_edge
+        backward = self.dist(tour[j], tour[e]) + np.where(j_at_end, 0.0, self.dist(tour[s], tour[j_next])) - old_edge
+        reverse = backward < forward
+        delta = np.minimum(forward, backward) - removal_gain[seg]
+
+        improving = self.best_per_group(delta, seg)
+        if len(improving) == 0:
+            return False
+        delta = delta[improving]
+        j = j[improving].tolist()
+        s = s[improving].tolist()
+        e = e[improving].tolist()
+        reverse = reverse[improving].tolist()
+
+        lows = [min(sv - 1, jv) for sv, jv in zip(s, j)]
+        highs = [max(ev + 1, jv + 1) for ev, jv in zip(e, j)]
+        for move in self.disjoint_moves(delta, lows, highs):
+            sv, ev, jv = s[move], e[move], j[move]
+            segment = tour[sv:ev + 1][::-1].copy() if reverse[move] else tour[sv:ev + 1].copy()
+            if jv > ev:
+                tour[sv:jv + 1] = np.concatenate([tour[ev + 1:jv + 1], segment])
+            else:
+                tour[jv + 1:ev + 1] = np.concatenate([segment, tour[jv + 1:sv]])
+
+        self.pos[tour] = np.arange(nr)
+        return True
+
+    def improve(self, time_budget, abort_check=None):
+        """
+        Apply rounds of 2-Opt and Or-Opt moves until none improves the path or until the time budget is used.
+
+        :param time_budget:     seconds
+        :type time_budget:      float
+        :param abort_check:     called after each round; it can raise an exception to abort the search
+        :type abort_check:      Callable
+        :return:                the number of rounds that improved the path
+        :rtype:                 int
+        """
+        stop_time = time.perf_counter() + time_budget
+        rounds = 0
+        while time.perf_counter() < stop_time:
+            improved = self.two_opt_round()
+            for segment_len in (1, 2, 3):
+                if time.perf_counter() >= stop_time:
+                    break
+                improved = self.or_opt_round(segment_len) or improved
+            if abort_check is not None:
+                abort_check()
+            if not improved:
+                break
+            rounds += 1
+        return rounds
+
+
+def local_search_order(points, start=None, time_budget=1.0, k=8, abort_check=None):
+    """
+    Order the locations: nearest neighbour path made with a KD-tree, improved with 2-Opt and Or-Opt moves that are
+    checked only on the k nearest neighbours of each location.
+
+    :param points:          list of x, y tuples (or Nx2 array) with the locations
+    :type points:           list | np.ndarray
+    :param start:           x, y coordinates from where the travel starts; None to start in the first location
+    :type start:            tuple | None
+    :param time_budget:     the maximum time spent in improving the nearest neighbour path, in seconds
+    :type time_budget:      float
+    :param k:               number of nearest neighbours checked for each location
+    :type k:                int
+    :param abort_check:     called after each improvement round; it can raise an exception to abort the search
+    :type abort_check:      Callable
+    :return:                the indexes of the locations in the order of the path and the travel distance
+    :rtype:                 tuple
+    """
+    pts = np.asarray(points, dtype=float).reshape(-1, 2)
+    if len(pts) == 0:
+        return [], 0.0
+
+    # the start point is added as the location 0, fixed at the start of the path
+    if start is None:
+        start = pts[0]
+    pts = np.concatenate([np.asarray(start, dtype=float).reshape(1, 2), pts])
+
+    tree = cKDTree(pts)
+    order = nearest_neighbour_order(pts, first=0, tree=tree)
+
+    ordering = PathOrdering(pts, order, knn_candidates(pts, k, tree=tree))
+    seed_length = ordering.length()
+    rounds = ordering.improve(time_budget, abort_check=abort_check)
+    length = ordering.length()
+    log.debug("PathOrdering.local_search_order() -> %d locations, nearest neighbour path: %.4f, "
+              "after %d rounds of 2-Opt/Or-Opt: %.4f" % (len(pts) - 1, seed_length, rounds, length))
+
+    return (ordering.tour[1:] - 1).tolist(), length
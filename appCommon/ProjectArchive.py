@@ -0,0 +1,734 @@
+"""
+Binary project container.
+
+The project is a ZIP archive with one chunk per object, an options chunk and a manifest:
+
+    manifest.json               format, app version, the list of objects and the SHA-256 of every chunk
+    options.json                the application options (compact JSON)
+    objects/NNNN.json           the object attributes (compact JSON); the geometry is replaced by references
+    objects/NNNN.geo            the object geometry: a NumPy array with the WKB offsets followed by the WKB data
+
+The geometry is serialized with the vectorized Shapely WKB functions, one call per object, and the objects are
+written one at a time so only one object is held serialized in memory. The saved file is verified with the
+checksums of its chunks; it does not need to be parsed again.
+
+Next to the archive there can be a journal (``<project>.journal``), an append-only file where the autosave writes
+only the objects that changed since the archive was saved. The journal is replayed when the archive is read and it
+is removed when the archive is saved again (compacted).
+"""
+
+import os
+import io
+import uuid
+import hashlib
+import zipfile
+import logging
+
+import numpy as np
+import shapely
+from shapely.geometry.base import BaseGeometry
+import simplejson as json
+
+log = logging.getLogger('base')
+
+FORMAT_NAME = 'flatcam-project'
+FORMAT_VERSION = 1
+MANIFEST = 'manifest.json'
+OPTIONS = 'options.json'
+
+# class name of the geometry references in the JSON chunks
+GEOMETRY_REF = 'ShplWKB'
+# class name of the WKT geometry in the JSON projects (see camlib.to_dict())
+WKT_REF = 'Shply'
+
+
+class ProjectArchiveError(Exception):
+    """
+    Raised when a project archive can't be read or when its chunks don't match the manifest checksums.
+    """
+    pass
+
+
+def is_project_archive(filename):
+    """
+    Check if the file is a project archive (and not a JSON or LZMA project).
+
+    :param filename:    path to the project file
+    :type filename:     str
+    :return:            True if the file is a ZIP archive that has a project manifest
+    :rtype:             bool
+    """
+    try:
+        if not zipfile.is_zipfile(filename):
+            return False
+        with zipfile.ZipFile(filename) as zf:
+            return MANIFEST in zf.namelist()
+    except OSError:
+        return False
+
+
+def dumps_compact(obj, default=None):
+    """
+    Serialize to compact JSON (no indentation, no spaces after the separators), UTF-8 encoded.
+
+    :param obj:         object to serialize
+    :param default:     function that makes the not serializable objects into a serializable form
+    :return:            the JSON document
+    :rtype:             bytes
+    """
+    return json.dumps(obj, default=default, separators=(',', ':')).encode('utf-8')
+
+
+def options_checksum(options, default=None):
+    """
+    :param options:     the application options
+    :type options:      dict
+    :param default:     function that makes the not serializable objects into a serializable form
+    :return:            the SHA-256 of the options, as they are saved
+    :rtype:             str
+    """
+    return hashlib.sha256(dumps_compact(options, default=default)).hexdigest()
+
+
+def encode_chunk(obj_dict, default=None):
+    """
+    Serialize one object. All the Shapely geometry found in the object attributes is collected and converted to WKB
+    in a single vectorized call and in the JSON document it is replaced by a reference to its index.
+
+    :param obj_dict:    the object attributes, as returned by the object ``to_dict()``
+    :type obj_dict:     dict
+    :param default:     function that makes the other not serializable objects into a serializable form
+    :return:            (JSON chunk, geometry chunk)
+    :rtype:             tuple
+    """
+    geoms = []
+
+    def encode(obj):
+        if isinstance(obj, BaseGeometry):
+            geoms.append(obj)
+            return {"__class__": GEOMETRY_REF, "__inst__": len(geoms) - 1}
+        return default(obj) if default is not None else obj
+
+    json_chunk = dumps_compact(obj_dict, default=encode)
+
+    geo_arr = np.empty(len(geoms), dtype=object)
+    geo_arr[:] = geoms
+    return json_chunk, encode_geometry(geo_arr)
+
+
+def encode_geometry(geoms):
+    """
+    Make the geometry chunk: the WKB offsets (a NumPy array) followed by the WKB of all the geometry.
+
+    :param geoms:   array of Shapely geometry
+    :type geoms:    np.ndarray
+    :return:        the geometry chunk
+    :rtype:         bytes
+    """
+    wkb = shapely.to_wkb(geoms) if len(geoms) else np.empty(0, dtype=object)
+    offsets = np.zeros(len(wkb) + 1, dtype=np.int64)
+    np.cumsum(np.fromiter(map(len, wkb), dtype=np.int64, count=len(wkb)), out=offsets[1:])
+
+    buf = io.BytesIO()
+    np.save(buf, offsets, allow_pickle=False)
+    buf.write(b''.join(wkb))
+    return buf.getvalue()
+
+
+def decode_geometry(geo_chunk):
+    """
+    Rebuild the geometry stored in a geometry chunk.
+
+    :param geo_chunk:   the geometry chunk made by ``encode_chunk()``
+    :type geo_chunk:    bytes
+    :return:            array of Shapely geometry, in the order of the references from the JSON chunk
+    :rtype:             np.ndarray
+    """
+    buf = io.BytesIO(geo_chunk)
+    offsets = np.load(buf, allow_pickle=False)
+    data = memoryview(geo_chunk)[buf.tell():]
+    wkb = np.empty(len(offsets) - 1, dtype=object)
+    wkb[:] = [bytes(data[start:stop]) for start, stop in zip(offsets[:-1], offsets[1:])]
+    return shapely.from_wkb(wkb) if len(wkb) else wkb
+
+
+def decode_chunk(json_chunk, geo_chunk, object_hook=None):
+    """
+    Rebuild the attributes of one object from its chunks.
+
+    :param json_chunk:  the JSON chunk made by ``encode_chunk()``
+    :type json_chunk:   bytes
+    :param geo_chunk:   the geometry chunk made by ``encode_chunk()``
+    :type geo_chunk:    bytes
+    :param object_hook: deserializer for the other objects found in the JSON chunk
+    :return:            the object attributes, ready for the object ``from_dict()``
+    :rtype:             dict
+    """
+    geoms = decode_geometry(geo_chunk)
+
+    def decode(d):
+        if d.get('__class__') == GEOMETRY_REF and '__inst__' in d:
+            return geoms[d['__inst__']]
+        return object_hook(d) if object_hook is not None else d
+
+    return json.loads(json_chunk.decode('utf-8'), object_hook=decode)
+
+
+def chunk_names(index):
+    """
+    :param index:   the position of the object in the project
+    :type index:    int
+    :return:        the names of the JSON chunk and of the geometry chunk of the object
+    :rtype:         tuple
+    """
+    return 'objects/%04d.json' % index, 'objects/%04d.geo' % index
+
+
+def write_project(filename, obj_dicts, options, version, default=None, compresslevel=None, ids=None):
+    """
+    Write a project archive. The archive is written to a temporary file that replaces ``filename`` only after
+    all the chunks were written, so a failed save does not destroy the previous project file. The journal of the
+    previous archive, if any, is removed.
+
+    :param filename:        path to the project file
+    :type filename:         str
+    :param obj_dicts:       iterable with the attributes of each object (the object ``to_dict()``); it is consumed
+                            one object at a time
+    :param options:         the application options
+    :type options:          dict
+    :param version:         the application version
+    :param default:         function that makes the not serializable objects into a serializable form
+    :param compresslevel:   Deflate level, from 1 to 9; None or 0 stores the chunks without compression
+    :type compresslevel:    int | None
+    :param ids:             the ids of the objects, used by the journal; None to make new ids
+    :type ids:              list | None
+    :return:                the manifest that was written
+    :rtype:                 dict
+    """
+    if compresslevel:
+        compression = zipfile.ZIP_DEFLATED
+        compresslevel = max(1, min(int(compresslevel), 9))
+    else:
+        compression = zipfile.ZIP_STORED
+        compresslevel = None
+
+    manifest = {
+        "format": FORMAT_NAME,
+        "format_version": FORMAT_VERSION,
+        "version": version,
+        "save_id": uuid.uuid4().hex,
+        "options": OPTIONS,
+        "objects": [],
+        "chunks": {}
+    }
+
+    tmp_filename = filename + '.tmp'
+    try:
+        with zipfile.ZipFile(tmp_filename, 'w', compression=compression, compresslevel=compresslevel) as zf:
+            def write_chunk(name, data):
+                zf.writestr(name, data)
+                manifest['chunks'][name] = hashlib.sha256(data).hexdigest()
+
+            write_chunk(OPTIONS, dumps_compact(options, default=default))
+
+            for index, obj_dict in enumerate(obj_dicts):
+                json_name, geo_name = chunk_names(index)
+                json_chunk, geo_chunk = encode_chunk(obj_dict, default=default)
+                write_chunk(json_name, json_chunk)
+                write_chunk(geo_name, geo_chunk)
+
+                try:
+                    name = obj_dict['obj_options']['name']
+                except KeyError:
+                    name = obj_dict['options']['name']
+                manifest['objects'].append({
+                    "id": ids[index] if ids is not None else uuid.uuid4().hex,
+                    "name": name,
+                    "kind": obj_dict['kind'],
+                    "json": json_name,
+                    "geometry": geo_name
+                })
+
+            zf.writestr(MANIFEST, dumps_compact(manifest))
+        os.replace(tmp_filename, filename)
+        ProjectJournal(filename).remove()
+    finally:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+
+    return manifest
+
+
+def read_manifest(zf):
+    """
+    :param zf:      an open project archive
+    :type zf:       zipfile.ZipFile
+    :return:        the manifest of the project archive
+    :rtype:         dict
+    """
+    try:
+        manifest = json.loads(zf.read(MANIFEST).decode('utf-8'))
+    except (KeyError, ValueError) as err:
+        raise ProjectArchiveError("Invalid project manifest: %s" % str(err))
+
+    if manifest.get('format') != FORMAT_NAME:
+        raise ProjectArchiveError("Not a project archive: %s" % str(manifest.get('format')))
+    if manifest.get('format_version', 0) > FORMAT_VERSION:
+        raise ProjectArchiveError("Unsupported project format version: %s" % str(manifest.get('format_version')))
+    return manifest
+
+
+def read_save_id(filename):
+    """
+    :param filename:    path to the project archive
+    :type filename:     str
+    :return:            the id of the save that wrote the archive, used to match the archive with its journal
+    :rtype:             str | None
+    """
+    with zipfile.ZipFile(filename) as zf:
+        return read_manifest(zf).get('save_id')
+
+
+def read_chunk(zf, manifest, name, verify=True):
+    """
+    Read one chunk and check it against the checksum from the manifest.
+
+    :param zf:          an open project archive
+    :type zf:           zipfile.ZipFile
+    :param manifest:    the manifest of the project archive
+    :type manifest:     dict
+    :param name:        the name of the chunk
+    :type name:         str
+    :param verify:      if True, check the SHA-256 of the chunk
+    :type verify:       bool
+    :return:            the chunk
+    :rtype:             bytes
+    """
+    try:
+        data = zf.read(name)
+    except (KeyError, zipfile.BadZipFile) as err:
+        raise ProjectArchiveError("Failed to read the chunk %s: %s" % (name, str(err)))
+
+    if verify and hashlib.sha256(data).hexdigest() != manifest['chunks'].get(name):
+        raise ProjectArchiveError("Checksum mismatch for the chunk: %s" % name)
+    return data
+
+
+def verify_project(filename):
+    """
+    Check a project archive without parsing it: every chunk listed in the manifest must exist and must have the
+    SHA-256 recorded in the manifest. The chunks are hashed as they are read, in blocks.
+
+    :param filename:    path to the project file
+    :type filename:     str
+    :return:            the names of the missing or damaged chunks; an empty list if the project is valid
+    :rtype:             list
+    """
+    bad_chunks = []
+    with zipfile.ZipFile(filename) as zf:
+        manifest = read_manifest(zf)
+        names = set(zf.namelist())
+        for name, checksum in manifest['chunks'].items():
+            if name not in names:
+                bad_chunks.append(name)
+                continue
+
+            hasher = hashlib.sha256()
+            try:
+                with zf.open(name) as f:
+                    for block in iter(lambda: f.read(1 << 20), b''):
+                        hasher.update(block)
+            except zipfile.BadZipFile:
+                bad_chunks.append(name)
+                continue
+            if hasher.hexdigest() != checksum:
+                bad_chunks.append(name)
+    return bad_chunks
+
+
+def read_project(filename, object_hook=None, verify=True, lazy=False):
+    """
+    Read a project archive into the same dictionary that the JSON project files hold. The journal of the archive,
+    if any, is replayed.
+
+    With ``lazy`` the geometry chunks are not read: the geometry stays as references in the object attributes and
+    the returned dictionary has an extra key, 'geometry_chunks', with a ``GeometryChunk`` (or ``JournalChunk``) for
+    each object. The references are replaced with ``resolve_geometry()``.
+
+    :param filename:        path to the project file
+    :type filename:         str
+    :param object_hook:     deserializer for the not JSON objects found in the chunks
+    :param verify:          if True, check the SHA-256 of each chunk as it is read
+    :type verify:           bool
+    :param lazy:            if True, do not read the geometry chunks
+    :type lazy:             bool
+    :return:                dictionary with the keys: 'objs', 'options', 'version', 'ids' (and 'geometry_chunks')
+    :rtype:                 dict
+    """
+    def hook(d):
+        if d.get('__class__') == GEOMETRY_REF:
+            return d
+        return object_hook(d) if object_hook is not None else d
+
+    # (id, JSON chunk, source of the geometry chunk) for each object
+    sources = []
+    with zipfile.ZipFile(filename) as zf:
+        manifest = read_manifest(zf)
+
+        options_chunk = read_chunk(zf, manifest, manifest['options'], verify)
+        for entry in manifest['objects']:
+            json_chunk = read_chunk(zf, manifest, entry['json'], verify)
+            checksum = manifest['chunks'][entry['geometry']] if verify else None
+            sources.append((entry.get('id'), json_chunk, GeometryChunk(filename, entry['geometry'], checksum)))
+
+    version = manifest['version']
+    journal = ProjectJournal(filename).replay(manifest.get('save_id'), verify=verify)
+    if journal is not None:
+        version = journal['version']
+        if journal['options'] is not None:
+            options_chunk = journal['options']
+        by_id = {obj_id: (obj_id, json_chunk, geo) for obj_id, json_chunk, geo in sources}
+        by_id.update(journal['objects'])
+        sources = [by_id[obj_id] for obj_id in journal['order'] if obj_id in by_id]
+
+    objs = []
+    for obj_id, json_chunk, geo in sources:
+        if lazy:
+            objs.append(json.loads(json_chunk.decode('utf-8'), object_hook=hook))
+        else:
+            objs.append(decode_chunk(json_chunk, geo.read(), object_hook=object_hook))
+
+    project = {
+        "objs":     objs,
+        "options":  json.loads(options_chunk.decode('utf-8'), object_hook=object_hook),
+        "version":  version,
+        "ids":      [obj_id for obj_id, __, __ in sources]
+    }
+    if lazy:
+        project['geometry_chunks'] = [geo for __, __, geo in sources]
+    return project
+
+
+class GeometryChunk:
+    """
+    The location of the geometry chunk of an object, in a project archive. It is picklable, so the chunk can be
+    read (and its checksum verified) in a process pool.
+    """
+
+    def __init__(self, filename, name, checksum=None):
+        """
+
+        :param filename:    path to the project archive
+        :type filename:     str
+        :param name:        the name of the geometry chunk
+        :type name:         str
+        :param checksum:    the SHA-256 of the chunk; None to skip the verification
+        :type checksum:     str | None
+        """
+        self.filename = filename
+        self.name = name
+        self.checksum = checksum
+
+    def read(self):
+        """
+        :return:    the geometry chunk
+        :rtype:     bytes
+        """
+        with zipfile.ZipFile(self.filename) as zf:
+            try:
+                data = zf.read(self.name)
+            except (KeyError, zipfile.BadZipFile) as err:
+                raise ProjectArchiveError("Failed to read the chunk %s: %s" % (self.name, str(err)))
+
+        if self.checksum is not None and hashlib.sha256(data).hexdigest() != self.checksum:
+            raise ProjectArchiveError("Checksum mismatch for the chunk: %s" % self.name)
+        return data
+
+
+class JournalChunk:
+    """
+    The location of a chunk in a project journal. It has the same interface as ``GeometryChunk``.
+    """
+
+    def __init__(self, filename, offset, length, checksum=None):
+        """
+
+        :param filename:    path to the journal
+        :type filename:     str
+        :param offset:      the position of the chunk in the journal
+        :type offset:       int
+        :param length:      the length of the chunk
+        :type length:       int
+        :param checksum:    the SHA-256 of the chunk; None to skip the verification
+        :type checksum:     str | None
+        """
+        self.filename = filename
+        self.offset = offset
+        self.length = length
+        self.checksum = checksum
+
+    def read(self):
+        """
+        :return:    the chunk
+        :rtype:     bytes
+        """
+        with open(self.filename, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(self.length)
+
+        if len(data) != self.length or \
+                (self.checksum is not None and hashlib.sha256(data).hexdigest() != self.checksum):
+            raise ProjectArchiveError("Damaged chunk in the journal %s at: %d" % (self.filename, self.offset))
+        return data
+
+
+class ProjectJournal:
+    """
+    Append-only journal of the changes made to a project archive since it was saved.
+
+    Each record is a line with a JSON header followed by the chunks that the header lists (length and SHA-256):
+        {"op": "base", "save_id": ...}                  the archive the journal belongs to; the first record
+        {"op": "object", "id": ..., "chunks": [...]}    the JSON chunk and the geometry chunk of a changed object
+        {"op": "options", "chunks": [...]}              the application options
+        {"op": "commit", "order": [...], "version": ...}
+    The changes are applied only by a "commit" record, which also holds the ids of all the objects in the project,
+    in order, so the deleted objects are dropped. A record left incomplete (the app was closed while writing it)
+    and everything after the last commit are ignored.
+    """
+
+    def __init__(self, project_filename):
+        """
+
+        :param project_filename:    path to the project archive
+        :type project_filename:     str
+        """
+        self.project_filename = project_filename
+        self.filename = project_filename + '.journal'
+
+    def exists(self):
+        return os.path.exists(self.filename)
+
+    def size(self):
+        """
+        :return:    the size of the journal in bytes; 0 if there is no journal
+        :rtype:     int
+        """
+        try:
+            return os.path.getsize(self.filename)
+        except OSError:
+            return 0
+
+    def remove(self):
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def base_save_id(self):
+        """
+        :return:    the 'save_id' of the archive the journal was started for; None if there is no valid journal
+        :rtype:     str | None
+        """
+        try:
+            with open(self.filename, 'rb') as f:
+                base = json.loads(f.readline().decode('utf-8'))
+        except (OSError, ValueError):
+            return None
+        if not isinstance(base, dict) or base.get('op') != 'base':
+            return None
+        return base.get('save_id')
+
+    def start(self, save_id):
+        """
+        Start a new, empty, journal for the archive that was saved with ``save_id``.
+
+        :param save_id:     the 'save_id' from the manifest of the archive
+        :type save_id:      str
+        :return:            None
+        """
+        with open(self.filename, 'wb') as f:
+            f.write(dumps_compact({"op": "base", "save_id": save_id}) + b'\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def append(self, objects, options, order, version, default=None):
+        """
+        Append the changes and commit them. The file is synced to disk before returning.
+
+        :param objects:     iterable of (id, attributes) for the changed objects; the attributes are the object
+                            ``to_dict()`` and they are serialized one object at a time
+        :param options:     the application options; None if they did not change
+        :type options:      dict | None
+        :param order:       the ids of all the objects in the project, in order
+        :type order:        list
+        :param version:     the application version
+        :param default:     function that makes the not serializable objects into a serializable form
+        :return:            the number of written objects
+        :rtype:             int
+        """
+        def record(f, header, chunks=()):
+            header['chunks'] = [[len(chunk), hashlib.sha256(chunk).hexdigest()] for chunk in chunks]
+            f.write(dumps_compact(header) + b'\n')
+            for chunk in chunks:
+                f.write(chunk)
+
+        nr_objects = 0
+        with open(self.filename, 'ab') as f:
+            for obj_id, obj_dict in objects:
+                record(f, {"op": "object", "id": obj_id}, encode_chunk(obj_dict, default=default))
+                nr_objects += 1
+            if options is not None:
+                record(f, {"op": "options"}, [dumps_compact(options, default=default)])
+            record(f, {"op": "commit", "order": list(order), "version": version})
+            f.flush()
+            os.fsync(f.fileno())
+        return nr_objects
+
+    def replay(self, save_id, verify=True):
+        """
+        Read the committed changes. The JSON chunks are read; the geometry chunks are left in the journal.
+
+        :param save_id:     the 'save_id' from the manifest of the archive; a journal of another archive is ignored
+        :type save_id:      str | None
+        :param verify:      if True, check the SHA-256 of the JSON chunks
+        :type verify:       bool
+        :return:            None if there is no valid journal, or a dictionary with the keys: 'objects' (a dictionary
+                            with the items: id -> (id, JSON chunk, JournalChunk)), 'options' (the options chunk
+                            or None), 'order', 'version'
+        :rtype:             dict | None
+        """
+        if save_id is None or not self.exists():
+            return None
+        if self.base_save_id() != save_id:
+            log.debug("ProjectJournal.replay() --> the journal does not belong to the project. Ignored.")
+            return None
+
+        committed = None
+        pending_objects = {}
+        pending_options = None
+        with open(self.filename, 'rb') as f:
+            # the base record
+            f.readline()
+
+            while True:
+                line = f.readline()
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    header = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    break
+
+                chunks = []
+                for length, checksum in header.get('chunks', []):
+                    offset = f.tell()
+                    chunks.append(JournalChunk(self.filename, offset, length, checksum if verify else None))
+                    f.seek(offset + length)
+
+                try:
+                    if header['op'] == 'object':
+                        json_chunk = chunks[0].read()
+                        pending_objects[header['id']] = (header['id'], json_chunk, chunks[1])
+                    elif header['op'] == 'options':
+                        pending_options = chunks[0].read()
+                    elif header['op'] == 'commit':
+                        if committed is None:
+                            committed = {"objects": {}, "options": None}
+                        committed['objects'].update(pending_objects)
+                        if pending_options is not None:
+                            committed['options'] = pending_options
+                        committed['order'] = header['order']
+                        committed['version'] = header['version']
+                        pending_objects = {}
+                        pending_options = None
+                except (ProjectArchiveError, IndexError, KeyError) as err:
+                    log.debug("ProjectJournal.replay() --> incomplete record, ignored: %s" % str(err))
+                    break
+
+        return committed
+
+
+def has_geometry(obj):
+    """
+    :param obj:     a JSON value read with ``read_project(lazy=True)`` or a JSON project read without object hook
+    :return:        True if there is a geometry reference (WKB or WKT) in the value
+    :rtype:         bool
+    """
+    if isinstance(obj, dict):
+        if obj.get('__class__') in (GEOMETRY_REF, WKT_REF) and '__inst__' in obj:
+            return True
+        return any(has_geometry(v) for v in obj.values())
+    if isinstance(obj, list):
+        return any(has_geometry(v) for v in obj)
+    return False
+
+
+def apply_object_hook(obj, object_hook):
+    """
+    Call the object hook for every dictionary in the value, from the innermost out, as ``json.loads()`` does it.
+
+    :param obj:             a JSON value read without object hook
+    :param object_hook:     the deserializer
+    :return:                the deserialized value
+    """
+    if isinstance(obj, dict):
+        return object_hook({k: apply_object_hook(v, object_hook) for k, v in obj.items()})
+    if isinstance(obj, list):
+        return [apply_object_hook(v, object_hook) for v in obj]
+    return obj
+
+
+def load_geometry(attrs, source):
+    """
+    Prepare the geometry of the deferred attributes of an object. Meant to run in a process pool, one object per task:
+    the chunk is read and verified, or the WKT geometry (from a JSON project) is parsed with one vectorized call and
+    converted to WKB. The result is small to send back (no Shapely objects) and it is made into geometry with
+    ``resolve_geometry()``.
+
+    :param attrs:       the deferred attributes, with geometry references; they are not needed (and they are
+                        returned as they are) when the geometry is read from a chunk
+    :type attrs:        dict | None
+    :param source:      the ``GeometryChunk`` of the object; None when the attributes hold WKT geometry
+    :type source:       GeometryChunk | None
+    :return:            (attributes with WKB references, geometry chunk)
+    :rtype:             tuple
+    """
+    if source is not None:
+        return attrs, source.read()
+
+    wkt = []
+
+    def collect(obj):
+        if isinstance(obj, dict):
+            if obj.get('__class__') == WKT_REF and '__inst__' in obj:
+                wkt.append(obj['__inst__'])
+                return {"__class__": GEOMETRY_REF, "__inst__": len(wkt) - 1}
+            return {k: collect(v) for k, v in obj.items()}
+        if isinstance(obj, list):
+            return [collect(v) for v in obj]
+        return obj
+
+    attrs = collect(attrs)
+    wkt_arr = np.empty(len(wkt), dtype=object)
+    wkt_arr[:] = wkt
+    return attrs, encode_geometry(shapely.from_wkt(wkt_arr) if len(wkt) else wkt_arr)
+
+
+def resolve_geometry(attrs, geo_chunk, object_hook=None):
+    """
+    Replace the geometry references in the attributes with the geometry from the chunk.
+
+    :param attrs:           attributes with WKB references, as returned by ``load_geometry()``
+    :type attrs:            dict
+    :param geo_chunk:       the geometry chunk
+    :type geo_chunk:        bytes
+    :param object_hook:     deserializer for the other objects found in the attributes
+    :return:                the attributes, with geometry
+    :rtype:                 dict
+    """
+    geoms = decode_geometry(geo_chunk)
+
+    def decode(d):
+        if d.get('__class__') == GEOMETRY_REF and '__inst__' in d:
+            return geoms[d['__inst__']]
+        return object_hook(d) if object_hook is not None else d
+
+    return apply_object_hook(attrs, decode)
@@ -2708,7 +2708,7 @@ class CopyEditorExc(FCShapeTool):
             maxx = -np.Inf
             maxy = -np.Inf
 
-            if type(geo) == list:
+            if isinstance(geo, list):
                 for shp in geo:
                     minx_, miny_, maxx_, maxy_ = geo_bounds(shp)
                     minx = min(minx, minx_)
@@ -2726,7 +2726,7 @@ class CopyEditorExc(FCShapeTool):
         currenty = pos[1]
 
         def translate_recursion(geom):
-            if type(geom) == list:
+            if isinstance(geom, list):
                 geoms = []
                 for local_geom in geom:
                     res_geo = translate_recursion(local_geom)
@@ -4797,7 +4797,7 @@ class AppExcEditor(QtCore.QObject):
         self.app.log.debug("on_shape_complete()")
 
         # Add shape
-        if type(storage) is list:
+        if isinstance(storage, list):
             for item_storage in storage:
                 self.add_exc_shape(self.active_tool.geometry, item_storage)
         else:
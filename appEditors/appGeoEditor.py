@@ -2658,7 +2658,7 @@ class DrawToolShape(object):
             return 0, 0, 0, 0
 
         def bounds_rec(shape_el):
-            if type(shape_el) is list:
+            if isinstance(shape_el, list):
                 minx = np.Inf
                 miny = np.Inf
                 maxx = -np.Inf
@@ -2694,7 +2694,7 @@ class DrawToolShape(object):
         xscale, yscale = {"X": (1.0, -1.0), "Y": (-1.0, 1.0)}[axis]
 
         def mirror_geom(shape_el):
-            if type(shape_el) is list:
+            if isinstance(shape_el, list):
                 new_obj = []
                 for g in shape_el:
                     new_obj.append(mirror_geom(g))
@@ -2729,7 +2729,7 @@ class DrawToolShape(object):
         px, py = point
 
         def rotate_geom(shape_el):
-            if type(shape_el) is list:
+            if isinstance(shape_el, list):
                 new_obj = []
                 for g in shape_el:
                     new_obj.append(rotate_geom(g))
@@ -2761,7 +2761,7 @@ class DrawToolShape(object):
         px, py = point
 
         def skew_geom(shape_el):
-            if type(shape_el) is list:
+            if isinstance(shape_el, list):
                 new_obj = []
                 for g in shape_el:
                     new_obj.append(skew_geom(g))
@@ -2791,7 +2791,7 @@ class DrawToolShape(object):
             return
 
         def translate_recursion(geom):
-            if type(geom) == list:
+            if isinstance(geom, list):
                 geoms = []
                 for local_geom in geom:
                     geoms.append(translate_recursion(local_geom))
@@ -2838,7 +2838,7 @@ class DrawToolShape(object):
             px, py = point
 
         def scale_recursion(geom):
-            if type(geom) == list:
+            if isinstance(geom, list):
                 geoms = []
                 for local_geom in geom:
                     geoms.append(scale_recursion(local_geom))
@@ -2862,7 +2862,7 @@ class DrawToolShape(object):
         """
 
         def buffer_recursion(geom):
-            if type(geom) == list:
+            if isinstance(geom, list):
                 geoms = []
                 for local_geom in geom:
                     geoms.append(buffer_recursion(local_geom))
@@ -2931,7 +2931,7 @@ class DrawTool(object):
     @staticmethod
     def bounds(obj):
         def bounds_rec(o):
-            if type(o) is list:
+            if isinstance(o, list):
                 minx = np.Inf
                 miny = np.Inf
                 maxx = -np.Inf
@@ -5086,7 +5086,7 @@ class FCCopy(FCShapeTool):
             maxx = -np.Inf
             maxy = -np.Inf
 
-            if type(geo) == list:
+            if isinstance(geo, list):
                 for shp in geo:
                     minx_, miny_, maxx_, maxy_ = geo_bounds(shp)
                     minx = min(minx, minx_)
@@ -5104,7 +5104,7 @@ class FCCopy(FCShapeTool):
         currenty = pos[1]
 
         def translate_recursion(geom):
-            if type(geom) == list:
+            if isinstance(geom, list):
                 geoms = []
                 for local_geom in geom:
                     res_geo = translate_recursion(local_geom)
@@ -134,7 +134,7 @@ class BufferEditorTool(AppToolEditor):
         self.app.log.debug("AppGerberEditor.BufferEditorTool.buffer()")
 
         def buffer_recursion(geom_el, selection):
-            if type(geom_el) == list:
+            if isinstance(geom_el, list):
                 geoms = []
                 for local_geom in geom_el:
                     geoms.append(buffer_recursion(local_geom, selection=selection))
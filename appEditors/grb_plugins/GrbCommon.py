@@ -119,7 +119,7 @@ class DrawTool(object):
     @staticmethod
     def bounds(obj):
         def bounds_rec(o):
-            if type(o) is list:
+            if isinstance(o, list):
                 minx = np.Inf
                 miny = np.Inf
                 maxx = -np.Inf
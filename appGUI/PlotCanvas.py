@@ -9,7 +9,7 @@ from PyQt6 import QtCore, QtGui
 
 import logging
 from appGUI.VisPyCanvas import VisPyCanvas, Color
-from appGUI.VisPyVisuals import ShapeGroup, ShapeCollection, TextCollection, TextGroup, Cursor
+from appGUI.VisPyVisuals import ShapeGroup, ShapeCollection, TextCollection, TextGroup, Cursor, set_instancing
 from vispy.scene.visuals import InfiniteLine, Line, Rectangle, Text
 
 import gettext
@@ -40,6 +40,9 @@ class PlotCanvas(QtCore.QObject, VisPyCanvas):
         :rtype: PlotCanvas
         """
 
+        # the OpenGL backend is chosen before the canvas is made
+        set_instancing(fcapp.options["global_graphic_engine_instancing"] is True)
+
         # super(PlotCanvas, self).__init__()
         # QtCore.QObject.__init__(self)
         # VisPyCanvas.__init__(self)
@@ -198,7 +201,12 @@ class PlotCanvas(QtCore.QObject, VisPyCanvas):
 
         self.shape_collections = []
 
-        self.shape_collection = self.new_shape_collection()
+        # the plotted objects are drawn with less detail when they are zoomed out
+        if self.fcapp.options["global_graphic_engine_lod"] is True:
+            self.shape_collection = self.new_shape_collection(lod_tolerances=(0.02, 0.1))
+            self.view.camera.pixel_size_callback = self.on_pixel_size_changed
+        else:
+            self.shape_collection = self.new_shape_collection()
         self.fcapp.pool_recreated.connect(self.on_pool_recreated)
         self.text_collection = self.new_text_collection()
 
@@ -502,6 +510,11 @@ class PlotCanvas(QtCore.QObject, VisPyCanvas):
         """
         self.view.camera.zoom(factor, center)
 
+    def on_pixel_size_changed(self, pixel_size):
+        # the camera changes while the shape collection updates are locked (fit_view()); select the level of detail
+        # after that
+        QtCore.QTimer.singleShot(0, lambda: self.shape_collection.set_pixel_size(pixel_size))
+
     def new_shape_group(self, shape_collection=None):
         if shape_collection:
             return ShapeGroup(shape_collection)
@@ -511,6 +524,7 @@ class PlotCanvas(QtCore.QObject, VisPyCanvas):
         # sc = ShapeCollection(parent=self.view.scene, pool=self.app.pool, **kwargs)
         # self.shape_collections.append(sc)
         # return sc
+        kwargs.setdefault('triangulation', self.fcapp.options["global_graphic_engine_triangulation"])
         return ShapeCollection(parent=self.view.scene, pool=self.fcapp.pool, fcoptions=self.fcapp.options, **kwargs)
 
     def new_cursor(self, big=None):
@@ -242,6 +242,7 @@ class PlotCanvas3d(QtCore.QObject, scene.SceneCanvas):
         # sc = ShapeCollection(parent=self.view.scene, pool=self.app.pool, **kwargs)
         # self.shape_collections.append(sc)
         # return sc
+        kwargs.setdefault('triangulation', self.fcapp.options["global_graphic_engine_triangulation"])
         return ShapeCollection(parent=self.view.scene, pool=self.fcapp.pool, **kwargs)
 
     def new_cursor(self):
@@ -1423,6 +1423,35 @@ class ShapeCollectionLegacy:
 
         return self.shape_id
 
+    def add_many(self, shapes, color=None, face_color=None, **kwargs):
+        """
+        Adds many shapes to the shape collection, for compatibility with the VisPy canvas
+
+        :param shapes:      list of Shapely shapes
+        :param color:       edge color of the shapes, hex value; a list holds a color for each shape
+        :param face_color:  the body color of the shapes, hex value; a list holds a color for each shape
+        :param kwargs:      the other arguments of add()
+        :return:            list of the shape ids
+        """
+        shapes = list(shapes)
+        colors = color if isinstance(color, list) else [color] * len(shapes)
+        face_colors = face_color if isinstance(face_color, list) else [face_color] * len(shapes)
+        return [self.add(shape=shape, color=shape_color, face_color=shape_face_color, **kwargs)
+                for shape, shape_color, shape_face_color in zip(shapes, colors, face_colors)]
+
+    def add_many_instanced(self, shapes, color=None, face_color=None, **kwargs):
+        """
+        Adds many shapes to the shape collection, for compatibility with the VisPy canvas where the copies of a shape
+        are drawn with instancing; here each shape is plotted on its own
+
+        :param shapes:      list of Shapely shapes
+        :param color:       edge color of the shapes, hex value
+        :param face_color:  the body color of the shapes, hex value
+        :param kwargs:      the other arguments of add()
+        :return:            list of the shape ids
+        """
+        return self.add_many(shapes, color=color, face_color=face_color, **kwargs)
+
     def remove(self, shape_id, update=None):
         for k in list(self._shapes.keys()):
             if shape_id == k:
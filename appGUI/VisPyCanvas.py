@@ -157,6 +157,14 @@ class Camera(scene.PanZoomCamera):
 
         self.zoom_callback = lambda *args: None
 
+    def _update_transform(self):
+        super(Camera, self)._update_transform()
+
+        # called with the size of a screen pixel in scene units, after each zoom, pan or resize
+        pixel_size_callback = getattr(self, 'pixel_size_callback', None)
+        if pixel_size_callback and self._viewbox.rect.width > 0:
+            pixel_size_callback(self._real_rect.width / self._viewbox.rect.width)
+
     def zoom(self, factor, center=None):
         center = center if (center is not None) else self.center
         super(Camera, self).zoom(factor, center)
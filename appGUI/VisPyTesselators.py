@@ -7,6 +7,12 @@
 # ##########################################################
 
 from OpenGL import GLU
+import numpy as np
+import shapely
+from shapely.errors import GEOSException
+
+# the constrained Delaunay triangulation of GEOSTess is in Shapely 2.1 and later
+HAS_CDT = hasattr(shapely, 'constrained_delaunay_triangles')
 
 
 class GLUTess:
@@ -97,3 +103,103 @@ class GLUTess:
         GLU.gluDeleteTess(tess)
 
         return self.tris, self.pts
+
+
+class GEOSTess:
+    # a polygon with more coordinates than this is cut in tiles of about this many coordinates before it is
+    # triangulated; the triangulation of a polygon with many holes is much slower than the triangulation of its tiles
+    tile_coordinates = 4000
+
+    def __init__(self):
+        """
+        GEOS constrained Delaunay triangulation class. The polygons are triangulated by GEOS in one call, with no
+        Python callback for each vertex, so many polygons are better triangulated at once with triangulate_many().
+        """
+        pass
+
+    def triangulate(self, polygon):
+        """
+        Triangulates polygon
+        :param polygon: shapely.geometry.polygon
+            Polygon to tessellate
+        :return: numpy.array, numpy.array
+            Array of triangle vertex indices [t0i0, t0i1, t0i2, t1i0, t1i1, ... ]
+            Array of triangle points [(x0, y0), (x1, y1), ... ]; three for each triangle
+        """
+        counts, pts = self.triangulate_many([polygon])
+        return np.arange(len(pts), dtype=np.uint32), pts
+
+    @classmethod
+    def triangulate_many(cls, polygons):
+        """
+        Triangulates many polygons
+        :param polygons: list, numpy.array
+            Polygons to tessellate
+        :return: numpy.array, numpy.array
+            The number of triangles of each polygon
+            Array of triangle points (three for each triangle, the triangles of a polygon follow the triangles of the
+            polygon before it) as a float64 Nx2 array
+        """
+        polygons = np.asarray(polygons, dtype=object)
+        pieces, index = cls._tiles(polygons)
+
+        try:
+            triangles = shapely.constrained_delaunay_triangles(pieces)
+        except GEOSException:
+            # an invalid polygon fails the whole array; do them one by one and repair the ones that fail
+            triangles = np.empty(len(pieces), dtype=object)
+            for i, piece in enumerate(pieces):
+                try:
+                    triangles[i] = shapely.constrained_delaunay_triangles(piece)
+                except GEOSException:
+                    try:
+                        triangles[i] = shapely.constrained_delaunay_triangles(shapely.make_valid(piece))
+                    except GEOSException as e:
+                        print("GEOSTess error:", str(e))
+                        triangles[i] = shapely.GeometryCollection()
+
+        counts = np.bincount(index, weights=shapely.get_num_geometries(triangles), minlength=len(polygons))
+        # each triangle is a closed ring of four points
+        pts = shapely.get_coordinates(triangles).reshape((-1, 4, 2))[:, :3]
+        return counts.astype(np.int64), pts.reshape((-1, 2))
+
+    @classmethod
+    def _tiles(cls, polygons):
+        """
+        Cuts the big polygons in tiles
+
+        :param polygons:    numpy.array of polygons
+        :return:            the polygons and the tiles, in order, and the index of the polygon of each one
+        :rtype:             tuple
+        """
+        index = np.arange(len(polygons))
+        nr_coordinates = shapely.get_num_coordinates(polygons)
+        big = np.flatnonzero(nr_coordinates > 2 * cls.tile_coordinates)
+        if len(big) == 0:
+            return polygons, index
+
+        pieces = [polygons[:big[0]]]
+        pieces_index = [index[:big[0]]]
+        for nr, i in enumerate(big):
+            nr_tiles = int(np.ceil(np.sqrt(nr_coordinates[i] / cls.tile_coordinates)))
+            xmin, ymin, xmax, ymax = polygons[i].bounds
+            xs = np.linspace(xmin, xmax, nr_tiles + 1)
+            ys = np.linspace(ymin, ymax, nr_tiles + 1)
+            try:
+                # GEOS clips by a rectangle much faster than it intersects two polygons
+                tiles = shapely.get_parts([
+                    shapely.clip_by_rect(polygons[i], xs[col], ys[row], xs[col + 1], ys[row + 1])
+                    for col in range(nr_tiles) for row in range(nr_tiles)
+                ])
+                tiles = tiles[shapely.get_type_id(tiles) == shapely.GeometryType.POLYGON]
+            except GEOSException:
+                # an invalid polygon; it is triangulated (and repaired) whole
+                tiles = polygons[i:i + 1]
+
+            pieces.append(tiles)
+            pieces_index.append(np.full(len(tiles), i))
+
+            stop = big[nr + 1] if nr + 1 < len(big) else len(polygons)
+            pieces.append(polygons[i + 1:stop])
+            pieces_index.append(index[i + 1:stop])
+        return np.concatenate(pieces), np.concatenate(pieces_index)
@@ -6,14 +6,17 @@
 # MIT Licence                                              #
 # ##########################################################
 
-from vispy.visuals import CompoundVisual, LineVisual, MeshVisual, TextVisual, MarkersVisual
+from vispy.visuals import Visual, CompoundVisual, TextVisual, MarkersVisual
 from vispy.scene.visuals import VisualNode, generate_docstring, visuals
-from vispy.gloo import set_state
+from vispy.gloo import set_state, gl, get_current_canvas, VertexBuffer, IndexBuffer
 from vispy.color import Color
+import shapely
 from shapely import Polygon, LineString, LinearRing
 import threading
+import inspect
+import re
 import numpy as np
-from appGUI.VisPyTesselators import GLUTess
+from appGUI.VisPyTesselators import GLUTess, GEOSTess, HAS_CDT
 
 
 # class FlatCAMLineVisual(LineVisual):
@@ -28,72 +31,136 @@ from appGUI.VisPyTesselators import GLUTess
 #         self.update()
 
 
-def _update_shape_buffers(data, triangulation='glu'):
+def _shape_buffers(geo, color, face_color, tolerance, triangulation='glu', mesh=None):
     """
-    Translates Shapely geometry to internal buffers for speedup redraws
-    :param data: dict
-        Input shape data
-    :param triangulation: str
-        Triangulation engine
+    Translates a Shapely geometry to the vertices of its mesh and of its edges
+
+    :param geo:             Shapely geometry (LineString, LinearRing or Polygon; other types are not drawn)
+    :param color:           Line/edge color; None for no edges
+    :param face_color:      Polygon face color; None for no faces
+    :param tolerance:       Geometry simplifying tolerance
+    :param triangulation:   Triangulation engine: 'glu' or 'geos'
+    :param mesh:            (faces, vertices) of the polygon when it is already triangulated
+    :return:                (mesh vertices, mesh faces, line vertices) as float32 Nx2, uint32 N and float32 Nx2 arrays
+    :rtype:                 tuple
     """
-    mesh_vertices = []                                              # Vertices for mesh
-    mesh_tris = []                                                  # Faces for mesh
-    mesh_colors = []                                                # Face colors
-    line_pts = []                                                   # Vertices for line
-    line_colors = []                                                # Line color
-
-    geo, color, face_color, tolerance = data['geometry'], data['color'], data['face_color'], data['tolerance']
+    tri_pts = []                                                            # Mesh vertices
+    tri_tris = []                                                           # Mesh faces
+    pts = []                                                                # Shape line points
 
     if geo is not None and not geo.is_empty:
         simplified_geo = geo.simplify(tolerance) if tolerance else geo      # Simplified shape
-        pts = []                                                            # Shape line points
-        tri_pts = []                                                        # Mesh vertices
-        tri_tris = []                                                       # Mesh faces
 
         if type(geo) == LineString:
             # Prepare lines
-            pts = _linestring_to_segments(simplified_geo.coords)
+            pts = [_linestring_to_segments(simplified_geo.coords)]
 
         elif type(geo) == LinearRing:
             # Prepare lines
-            pts = _linearring_to_segments(simplified_geo.coords)
+            pts = [_linearring_to_segments(simplified_geo.coords)]
 
         elif type(geo) == Polygon:
             # Prepare polygon faces
             if face_color is not None:
-                if triangulation == 'glu':
+                if mesh is not None:
+                    tri_tris, tri_pts = mesh
+                elif triangulation == 'glu':
                     gt = GLUTess()
                     tri_tris, tri_pts = gt.triangulate(simplified_geo)
+                elif triangulation == 'geos':
+                    gt = GEOSTess()
+                    tri_tris, tri_pts = gt.triangulate(simplified_geo)
                 else:
                     print("Triangulation type '%s' isn't implemented. Drawing only edges." % triangulation)
 
             # Prepare polygon edges
             if color is not None:
-                pts = _linearring_to_segments(simplified_geo.exterior.coords)
+                pts = [_linearring_to_segments(simplified_geo.exterior.coords)]
                 for ints in simplified_geo.interiors:
-                    pts += _linearring_to_segments(ints.coords)
-
-        # Appending data for mesh
-        if len(tri_pts) > 0 and len(tri_tris) > 0:
-            mesh_tris += tri_tris
-            mesh_vertices += tri_pts
-            face_color_rgba = Color(face_color).rgba
-            # mesh_colors += [face_color_rgba] * (len(tri_tris) // 3)
-            mesh_colors += [face_color_rgba for __ in range(len(tri_tris) // 3)]
-
-        # Appending data for line
-        if len(pts) > 0:
-            line_pts += pts
-            colo_rgba = Color(color).rgba
-            # line_colors += [colo_rgba] * len(pts)
-            line_colors += [colo_rgba for __ in range(len(pts))]
+                    pts.append(_linearring_to_segments(ints.coords))
+
+    mesh_vertices = np.empty((0, 2), dtype=np.float32)
+    mesh_tris = np.empty(0, dtype=np.uint32)
+    # a mesh is drawn only if it has both vertices and faces
+    if len(tri_pts) > 0 and len(tri_tris) > 0:
+        try:
+            mesh_tris = np.asarray(tri_tris, dtype=np.uint32)
+            mesh_vertices = np.asarray(tri_pts, dtype=np.float32)[:, :2]
+        except (TypeError, ValueError) as e:
+            # the GLU tessellator returns new vertices instead of indexes for the self-intersecting polygons
+            print("VisPyVisuals._shape_buffers() --> Triangulation error. %s" % str(e))
+            mesh_vertices = np.empty((0, 2), dtype=np.float32)
+            mesh_tris = np.empty(0, dtype=np.uint32)
+
+    line_pts = np.concatenate(pts) if pts else np.empty((0, 2), dtype=np.float32)
+    return mesh_vertices, mesh_tris, line_pts
+
+
+def _set_shape_buffers(data, mesh_vertices, mesh_tris, line_pts, rgba_cache=None):
+    """
+    Stores the buffers of a shape in its data, with the colors of the faces and of the line vertices
 
-    # Store buffers
-    data['line_pts'] = line_pts
-    data['line_colors'] = line_colors
+    :param data:            dict; the shape data
+    :param mesh_vertices:   float32 Nx2 array
+    :param mesh_tris:       uint32 array; three vertex indexes for each face
+    :param line_pts:        float32 Nx2 array; two vertices for each line segment
+    :param rgba_cache:      dict; colors already translated to RGBA
+    """
     data['mesh_vertices'] = mesh_vertices
     data['mesh_tris'] = mesh_tris
-    data['mesh_colors'] = mesh_colors
+    data['mesh_colors'] = _color_array(data['face_color'], len(mesh_tris) // 3, rgba_cache)
+    data['line_pts'] = line_pts
+    data['line_colors'] = _color_array(data['color'], len(line_pts), rgba_cache)
+
+
+def _color_array(color, length, rgba_cache=None):
+    """
+    The color repeated for each face/vertex. It is a read-only view (no memory is used for the repetition).
+
+    :param color:       color name, hex string or RGBA sequence
+    :param length:      the number of repetitions
+    :param rgba_cache:  dict; colors already translated to RGBA
+    :return:            float32 Nx4 array
+    """
+    if length == 0:
+        return np.empty((0, 4), dtype=np.float32)
+
+    if rgba_cache is None:
+        rgba = Color(color).rgba
+    else:
+        color_key = color if isinstance(color, str) else tuple(np.asarray(color).ravel())
+        try:
+            rgba = rgba_cache[color_key]
+        except KeyError:
+            rgba = rgba_cache[color_key] = Color(color).rgba
+    return np.broadcast_to(np.asarray(rgba, dtype=np.float32), (length, 4))
+
+
+def _empty_shape_buffers():
+    """
+    The buffers of a shape that is not translated yet
+    """
+    return {
+        'mesh_vertices': np.empty((0, 2), dtype=np.float32),    # Vertices for mesh
+        'mesh_tris': np.empty(0, dtype=np.uint32),              # Faces for mesh
+        'mesh_colors': np.empty((0, 4), dtype=np.float32),      # Face colors
+        'line_pts': np.empty((0, 2), dtype=np.float32),         # Vertices for line
+        'line_colors': np.empty((0, 4), dtype=np.float32)       # Line colors
+    }
+
+
+def _update_shape_buffers(data, triangulation='glu'):
+    """
+    Translates Shapely geometry to internal buffers for speedup redraws
+    :param data: dict
+        Input shape data
+    :param triangulation: str
+        Triangulation engine
+    """
+    geo, color, face_color, tolerance = data['geometry'], data['color'], data['face_color'], data['tolerance']
+
+    # Store buffers
+    _set_shape_buffers(data, *_shape_buffers(geo, color, face_color, tolerance, triangulation))
 
     # Clear shapely geometry
     del data['geometry']
@@ -101,6 +168,428 @@ def _update_shape_buffers(data, triangulation='glu'):
     return data
 
 
+def _shapes_buffers(geoms, colors, face_colors, tolerance, triangulation='glu'):
+    """
+    Translates many Shapely geometries to the vertices of their meshes and of their edges
+
+    :param geoms:           numpy.array of Shapely geometries
+    :param colors:          list of line/edge colors (None for no edges); one for each shape
+    :param face_colors:     list of face colors (None for no faces); one for each shape
+    :param tolerance:       Geometry simplifying tolerance
+    :param triangulation:   Triangulation engine: 'glu' or 'geos' (the polygons are triangulated at once)
+    :return:                list of (mesh vertices, mesh faces, line vertices) tuples, see _shape_buffers()
+    :rtype:                 list
+    """
+    if tolerance:
+        geoms = shapely.simplify(geoms, tolerance)
+
+    meshes = [None] * len(geoms)
+    if triangulation == 'geos':
+        filled = np.flatnonzero((shapely.get_type_id(geoms) == shapely.GeometryType.POLYGON) &
+                                ~shapely.is_empty(geoms) &
+                                np.array([face_color is not None for face_color in face_colors], dtype=bool))
+        counts, pts = GEOSTess.triangulate_many(geoms[filled])
+        for i, shape_pts in zip(filled, np.split(pts, np.cumsum(counts * 3)[:-1])):
+            meshes[i] = np.arange(len(shape_pts), dtype=np.uint32), shape_pts
+
+    return [
+        _shape_buffers(geo, color, face_color, None, triangulation, mesh=mesh)
+        for geo, color, face_color, mesh in zip(geoms, colors, face_colors, meshes)
+    ]
+
+
+def _update_shapes_buffers(shapes_wkb, colors, face_colors, tolerance, triangulation='glu'):
+    """
+    Translates a chunk of shapes to internal buffers. Made to run in the process pool: the shapes come as WKB and
+    the buffers of all the shapes go back in a few contiguous arrays (see _split_shapes_buffers()).
+
+    :param shapes_wkb:      list of shapes as WKB
+    :param colors:          list of line/edge colors (None for no edges); one for each shape
+    :param face_colors:     list of face colors (None for no faces); one for each shape
+    :param tolerance:       Geometry simplifying tolerance
+    :param triangulation:   Triangulation engine: 'glu' or 'geos' (the polygons of the chunk are triangulated at once)
+    :return:                the vertex counts of each shape (an int32 Nx3 array: mesh vertices, mesh faces indexes,
+                            line vertices) and the concatenated mesh vertices, mesh faces and line vertices
+    :rtype:                 tuple
+    """
+    buffers = _shapes_buffers(shapely.from_wkb(shapes_wkb), colors, face_colors, tolerance, triangulation)
+    if not buffers:
+        return np.empty((0, 3), dtype=np.int32), np.empty((0, 2), dtype=np.float32), \
+            np.empty(0, dtype=np.uint32), np.empty((0, 2), dtype=np.float32)
+
+    counts = np.array([[len(b) for b in shape_buffers] for shape_buffers in buffers], dtype=np.int32)
+    return (
+        counts,
+        np.concatenate([b[0] for b in buffers]),
+        np.concatenate([b[1] for b in buffers]),
+        np.concatenate([b[2] for b in buffers])
+    )
+
+
+def _split_shapes_buffers(counts, mesh_vertices, mesh_tris, line_pts):
+    """
+    Splits the arrays made by _update_shapes_buffers() in the buffers of each shape (views, not copies)
+
+    :return:    list of (mesh vertices, mesh faces, line vertices) tuples
+    :rtype:     list
+    """
+    ends = np.cumsum(counts, axis=0)[:-1]
+    return list(zip(
+        np.split(mesh_vertices, ends[:, 0]),
+        np.split(mesh_tris, ends[:, 1]),
+        np.split(line_pts, ends[:, 2])
+    ))
+
+
+class _ShapesChunkResult(object):
+    def __init__(self, async_result):
+        """
+        The translation of a chunk of shapes, done in the process pool
+
+        :param async_result: AsyncResult of _update_shapes_buffers()
+        """
+        self._async_result = async_result
+        self._buffers = None
+        self._lock = threading.Lock()
+
+    def wait(self):
+        async_result = self._async_result
+        if async_result is not None:
+            async_result.wait()
+
+    def ready(self):
+        async_result = self._async_result
+        return async_result is None or async_result.ready()
+
+    def buffers(self, position):
+        with self._lock:
+            if self._buffers is None:
+                self._buffers = _split_shapes_buffers(*self._async_result.get())
+                self._async_result = None
+        return self._buffers[position]
+
+
+class _ShapeResult(object):
+    def __init__(self, chunk_result, position, data, rgba_cache):
+        """
+        The translation of one shape of a chunk. It is used as the AsyncResult of a shape added with add()
+
+        :param chunk_result:    _ShapesChunkResult
+        :param position:        the position of the shape in the chunk
+        :param data:            the shape data, where the buffers are stored
+        :param rgba_cache:      dict; colors already translated to RGBA
+        """
+        self._chunk_result = chunk_result
+        self._position = position
+        self._data = data
+        self._rgba_cache = rgba_cache
+
+    def wait(self):
+        self._chunk_result.wait()
+
+    def get(self):
+        _set_shape_buffers(self._data, *self._chunk_result.buffers(self._position), rgba_cache=self._rgba_cache)
+        return [self._data]
+
+
+class _ArenaRegion(object):
+    def __init__(self, **columns):
+        """
+        Rows of some parallel NumPy arrays, packed and allocated in ranges. A released range is reused by the next
+        allocation of the same length; the arrays grow by doubling their capacity.
+
+        :param columns: the name of each array and its (row shape, dtype)
+        """
+        self.arrays = {name: np.zeros((0, ) + tuple(shape), dtype=dtype) for name, (shape, dtype) in columns.items()}
+        self.top = 0            # the rows above it were never allocated
+        self.free = {}          # length -> start of the released ranges
+        self.nr_free = 0        # the number of rows in the released ranges
+        # the ranges of rows written since the last upload: (start, stop); the arrays were replaced (they grew)
+        self.dirty = []
+        self.grown = True
+
+    def allocate(self, length):
+        """
+        :param length:  the number of rows
+        :return:        the first row of the range
+        """
+        if length == 0:
+            return 0
+
+        starts = self.free.get(length)
+        if starts:
+            self.nr_free -= length
+            return starts.pop()
+
+        start = self.top
+        self.top += length
+        capacity = len(self.arrays[next(iter(self.arrays))])
+        if self.top > capacity:
+            capacity = max(self.top, 2 * capacity, 1024)
+            for name, arr in self.arrays.items():
+                grown = np.zeros((capacity, ) + arr.shape[1:], dtype=arr.dtype)
+                grown[:start] = arr[:start]
+                self.arrays[name] = grown
+            self.grown = True
+        return start
+
+    def release(self, start, length):
+        if length == 0:
+            return
+        self.free.setdefault(length, []).append(start)
+        self.nr_free += length
+
+    @property
+    def fragmented(self):
+        """
+        True when at least half of the rows are in released ranges (and they are worth a compaction)
+        """
+        return self.nr_free > 4096 and 2 * self.nr_free > self.top
+
+    def touch(self, start, length):
+        """
+        Records a range of rows that was written, to be uploaded
+        """
+        if length == 0 or self.grown:
+            return
+        self.dirty.append((start, start + length))
+        if len(self.dirty) > 4096:
+            # so many small ranges cost more than one upload of the whole arrays
+            self.grown = True
+            self.dirty = []
+
+    def dirty_ranges(self):
+        """
+        :return:    the ranges of rows written since the last upload, sorted and merged; None when the arrays have to
+                    be uploaded whole
+        :rtype:     list
+        """
+        if self.grown:
+            return None
+        merged = []
+        for start, stop in sorted(self.dirty):
+            # the rows between two close ranges go with them, one upload is cheaper than two
+            if merged and start <= merged[-1][1] + 1024:
+                merged[-1][1] = max(merged[-1][1], stop)
+            else:
+                merged.append([start, stop])
+        return merged
+
+    def uploaded(self):
+        self.dirty = []
+        self.grown = False
+
+
+class _ShapeArena(object):
+    def __init__(self):
+        """
+        The buffers of the shapes of one layer of a ShapeCollectionVisual, packed in NumPy arrays that are mirrored in
+        GPU buffers (see ArenaShapesVisual). Each shape owns a range of mesh vertices, of faces and of line vertices,
+        so a shape that is added, removed, shown, hidden or recolored changes only its own ranges and only these are
+        uploaded again. The hidden and the removed shapes stay in the buffers, their vertices are marked as not
+        visible.
+        """
+        self._new_regions()
+
+        # key -> [vertices start, vertices count, faces start, faces count, line start, line count, visible, shape row]
+        self.slots = {}
+
+    def _new_regions(self):
+        # the vertices of a shape have the color of its faces (one color for each shape)
+        self.vertices = _ArenaRegion(pos=((2, ), np.float32), colors=((4, ), np.float32), visible=((), np.float32))
+        # the faces index the vertices of the arena (not the vertices of their shape)
+        self.faces = _ArenaRegion(tris=((3, ), np.uint32), visible=((), bool))
+        self.lines = _ArenaRegion(pos=((2, ), np.float32), colors=((4, ), np.float32), visible=((), np.float32))
+        # one row for each shape: the bounds of its faces and lines (xmin, ymin, xmax, ymax), drawn or not
+        self.shapes = _ArenaRegion(bounds=((4, ), np.float32), visible=((), bool))
+
+    @property
+    def changed(self):
+        """
+        True when some rows were written since the last upload
+        """
+        return any(region.grown or region.dirty for region in (self.vertices, self.faces, self.lines, self.shapes))
+
+    def insert(self, key, data):
+        """
+        Copies the buffers of a translated shape in the arena
+
+        :param key:     the shape index
+        :param data:    dict; the shape data, with the buffers made by _set_shape_buffers()
+        """
+        mesh_vertices, mesh_tris, line_pts = data['mesh_vertices'], data['mesh_tris'], data['line_pts']
+        nr_vertices, nr_faces, nr_line_pts = len(mesh_vertices), len(mesh_tris) // 3, len(line_pts)
+        visible = bool(data['visible'])
+        if nr_faces == 0:
+            nr_vertices = 0
+
+        v_start = self.vertices.allocate(nr_vertices)
+        f_start = self.faces.allocate(nr_faces)
+        l_start = self.lines.allocate(nr_line_pts)
+        row = self.shapes.allocate(1)
+
+        vertices = self.vertices.arrays
+        if nr_faces > 0:
+            vertices['pos'][v_start:v_start + nr_vertices] = mesh_vertices
+            vertices['colors'][v_start:v_start + nr_vertices] = data['mesh_colors'][0]
+            vertices['visible'][v_start:v_start + nr_vertices] = visible
+            self.faces.arrays['tris'][f_start:f_start + nr_faces] = mesh_tris.reshape((-1, 3)) + np.uint32(v_start)
+            self.faces.arrays['visible'][f_start:f_start + nr_faces] = visible
+
+        lines = self.lines.arrays
+        lines['pos'][l_start:l_start + nr_line_pts] = line_pts
+        lines['colors'][l_start:l_start + nr_line_pts] = data['line_colors']
+        lines['visible'][l_start:l_start + nr_line_pts] = visible
+
+        if nr_faces or nr_line_pts:
+            pts = np.concatenate((mesh_vertices, line_pts)) if nr_faces and nr_line_pts else \
+                (mesh_vertices if nr_faces else line_pts)
+            self.shapes.arrays['bounds'][row, :2] = pts.min(axis=0)
+            self.shapes.arrays['bounds'][row, 2:] = pts.max(axis=0)
+            self.shapes.arrays['visible'][row] = visible
+
+        self.vertices.touch(v_start, nr_vertices)
+        self.faces.touch(f_start, nr_faces)
+        self.lines.touch(l_start, nr_line_pts)
+        self.shapes.touch(row, 1)
+        self.slots[key] = [v_start, nr_vertices, f_start, nr_faces, l_start, nr_line_pts, visible, row]
+
+    def remove(self, key):
+        slot = self.slots.pop(key, None)
+        if slot is None:
+            return
+
+        v_start, nr_vertices, f_start, nr_faces, l_start, nr_line_pts, __, row = slot
+        self.vertices.arrays['visible'][v_start:v_start + nr_vertices] = 0
+        # the vertices may go to another shape, the faces must not draw them
+        self.faces.arrays['tris'][f_start:f_start + nr_faces] = 0
+        self.faces.arrays['visible'][f_start:f_start + nr_faces] = False
+        self.lines.arrays['visible'][l_start:l_start + nr_line_pts] = 0
+        self.shapes.arrays['visible'][row] = False
+
+        for region, start, length in ((self.vertices, v_start, nr_vertices), (self.faces, f_start, nr_faces),
+                                      (self.lines, l_start, nr_line_pts), (self.shapes, row, 1)):
+            region.touch(start, length)
+            region.release(start, length)
+
+    def set_visible(self, key, state):
+        slot = self.slots[key]
+        state = bool(state)
+        if slot[6] == state:
+            return
+
+        v_start, nr_vertices, f_start, nr_faces, l_start, nr_line_pts, __, row = slot
+        self.vertices.arrays['visible'][v_start:v_start + nr_vertices] = state
+        self.faces.arrays['visible'][f_start:f_start + nr_faces] = state
+        self.lines.arrays['visible'][l_start:l_start + nr_line_pts] = state
+        self.shapes.arrays['visible'][row] = state and (nr_faces > 0 or nr_line_pts > 0)
+        slot[6] = state
+
+        self.vertices.touch(v_start, nr_vertices)
+        self.lines.touch(l_start, nr_line_pts)
+        self.shapes.touch(row, 1)
+
+    def set_colors(self, key, face_rgba=None, line_rgba=None):
+        """
+        Writes the new colors of a shape in place
+
+        :param key:         the shape index
+        :param face_rgba:   RGBA of the faces; None to keep them
+        :param line_rgba:   RGBA of the line vertices; None to keep them
+        :return:            True for each of the faces and lines that were recolored (the shape has some)
+        :rtype:             tuple
+        """
+        v_start, nr_vertices, __, nr_faces, l_start, nr_line_pts, __, __ = self.slots[key]
+        recolor_faces = face_rgba is not None and nr_faces > 0
+        recolor_lines = line_rgba is not None and nr_line_pts > 0
+
+        if recolor_faces:
+            self.vertices.arrays['colors'][v_start:v_start + nr_vertices] = face_rgba
+            self.vertices.touch(v_start, nr_vertices)
+        if recolor_lines:
+            self.lines.arrays['colors'][l_start:l_start + nr_line_pts] = line_rgba
+            self.lines.touch(l_start, nr_line_pts)
+        return recolor_faces, recolor_lines
+
+    def copy(self):
+        """
+        :return:    a new arena with the shapes of this one, packed
+        :rtype:     _ShapeArena
+        """
+        arena = _ShapeArena()
+        arena.vertices, arena.faces, arena.lines, arena.shapes = self.vertices, self.faces, self.lines, self.shapes
+        arena.slots = {key: list(slot) for key, slot in self.slots.items()}
+        # the regions of this arena are only read
+        arena.compact()
+        return arena
+
+    @property
+    def fragmented(self):
+        return self.vertices.fragmented or self.faces.fragmented or self.lines.fragmented or self.shapes.fragmented
+
+    def compact(self):
+        """
+        Packs the ranges of the shapes again, dropping the released ones
+        """
+        vertices, faces, lines, shapes = self.vertices, self.faces, self.lines, self.shapes
+        self._new_regions()
+
+        for slot in self.slots.values():
+            v_start, nr_vertices, f_start, nr_faces, l_start, nr_line_pts, __, row = slot
+            new_v_start = self.vertices.allocate(nr_vertices)
+            new_f_start = self.faces.allocate(nr_faces)
+            new_l_start = self.lines.allocate(nr_line_pts)
+            new_row = self.shapes.allocate(1)
+
+            for name, arr in self.vertices.arrays.items():
+                arr[new_v_start:new_v_start + nr_vertices] = vertices.arrays[name][v_start:v_start + nr_vertices]
+            for name, arr in self.faces.arrays.items():
+                arr[new_f_start:new_f_start + nr_faces] = faces.arrays[name][f_start:f_start + nr_faces]
+            self.faces.arrays['tris'][new_f_start:new_f_start + nr_faces] += np.uint32(new_v_start)
+            self.faces.arrays['tris'][new_f_start:new_f_start + nr_faces] -= np.uint32(v_start)
+            for name, arr in self.lines.arrays.items():
+                arr[new_l_start:new_l_start + nr_line_pts] = lines.arrays[name][l_start:l_start + nr_line_pts]
+            for name, arr in self.shapes.arrays.items():
+                arr[new_row] = shapes.arrays[name][row]
+
+            slot[0], slot[2], slot[4], slot[7] = new_v_start, new_f_start, new_l_start, new_row
+
+    def bounds(self):
+        """
+        :return:    [(xmin, xmax), (ymin, ymax)] of the visible shapes; None when no shape is drawn
+        :rtype:     list
+        """
+        top = self.shapes.top
+        shapes_bounds = self.shapes.arrays['bounds'][:top][self.shapes.arrays['visible'][:top]]
+        if len(shapes_bounds) == 0:
+            return None
+        xmin, ymin = shapes_bounds[:, :2].min(axis=0)
+        xmax, ymax = shapes_bounds[:, 2:].max(axis=0)
+        return [(xmin, xmax), (ymin, ymax)]
+
+    def mesh_buffers(self):
+        """
+        Packs the faces of the visible shapes (the GPU buffers are not packed, this is to look at the drawing)
+
+        :return:    (vertices, faces, face colors) of the visible shapes; the vertices of the hidden and of the
+                    removed shapes are kept, no face uses them
+        :rtype:     tuple
+        """
+        top = self.faces.top
+        tris = self.faces.arrays['tris'][:top][self.faces.arrays['visible'][:top]]
+        vertices = self.vertices.arrays['pos'][:self.vertices.top]
+        return vertices, tris, self.vertices.arrays['colors'][tris[:, 0]]
+
+    def line_buffers(self):
+        """
+        :return:    (line vertices, line colors) of the visible shapes, packed
+        :rtype:     tuple
+        """
+        top = self.lines.top
+        visible = self.lines.arrays['visible'][:top] != 0
+        return self.lines.arrays['pos'][:top][visible], self.lines.arrays['colors'][:top][visible]
+
+
 def _linearring_to_segments(arr):
     # Close linear ring
     """
@@ -110,8 +599,9 @@ def _linearring_to_segments(arr):
     :return: numpy.array
         Line segments
     """
-    if arr[0] != arr[-1]:
-        arr.append(arr[0])
+    arr = np.asarray(arr)
+    if len(arr) and not np.array_equal(arr[0], arr[-1]):
+        arr = np.concatenate([arr, arr[:1]])
 
     return _linestring_to_segments(arr)
 
@@ -124,7 +614,545 @@ def _linestring_to_segments(arr):
     :return: numpy.array
         Line segments
     """
-    return [arr[i // 2] for i in range(0, len(arr) * 2)][1:-1]
+    arr = np.asarray(arr, dtype=np.float32)
+    if arr.ndim != 2 or len(arr) < 2:
+        return np.empty((0, 2), dtype=np.float32)
+    return np.repeat(arr[:, :2], 2, axis=0)[1:-1]
+
+
+# the VertexBuffer of this VisPy version can advance once per instance (instead of once per vertex)
+try:
+    _VBO_DIVISOR = 'divisor' in inspect.signature(VertexBuffer.__init__).parameters
+except (TypeError, ValueError):
+    _VBO_DIVISOR = False
+
+# if the copies of the shapes may be drawn with instancing, see set_instancing(); if they are drawn with instancing,
+# None until the OpenGL version is known
+_INSTANCING_ENABLED = False
+_INSTANCING = None
+
+_INSTANCES_VERT = """
+attribute vec2 a_position;
+attribute vec2 a_offset;
+attribute vec4 a_color;
+varying vec4 v_color;
+
+void main() {
+    v_color = a_color;
+    gl_Position = $transform(vec4(a_position + a_offset, 0.0, 1.0));
+}
+"""
+
+_INSTANCES_FRAG = """
+varying vec4 v_color;
+
+void main() {
+    gl_FragColor = v_color;
+}
+"""
+
+_ARENA_VERT = """
+attribute vec2 a_position;
+attribute vec4 a_color;
+attribute float a_visible;
+varying vec4 v_color;
+
+void main() {
+    v_color = a_color;
+    if (a_visible > 0.5) {
+        gl_Position = $transform(vec4(a_position, 0.0, 1.0));
+    } else {
+        // out of the clip volume: the faces and the lines of a hidden shape are not drawn
+        gl_Position = vec4(2.0, 2.0, 2.0, 1.0);
+    }
+}
+"""
+
+# the name of an array of a _ShapeArena -> the attribute of _ARENA_VERT
+_ARENA_ATTRIBUTES = {'pos': 'a_position', 'colors': 'a_color', 'visible': 'a_visible'}
+
+
+def _gl_version_has_instancing(version):
+    """
+    :param version: the OpenGL version string, e.g. '4.5 (Compatibility Profile) Mesa 22.3.6' or 'OpenGL ES 3.2 ...'
+    :return:        True for OpenGL 3.3 and up (instanced arrays are in the core)
+    :rtype:         bool
+    """
+    words = version.split()
+    if len(words) > 2 and words[0] == 'OpenGL':
+        # OpenGL ES; VisPy draws instances on it only if its backend already can
+        return hasattr(gl, 'glVertexAttribDivisor')
+
+    match = re.match(r'(\d+)\.(\d+)', words[0] if words else '')
+    return match is not None and (int(match.group(1)), int(match.group(2))) >= (3, 3)
+
+
+def set_instancing(enabled):
+    """
+    Chooses if the copies of the shapes are drawn with instancing. It is called once, at the start of the App and
+    before the first canvas is made: instancing needs the 'gl+' VisPy backend (the only desktop backend with
+    glVertexAttribDivisor()) and the backend is used by all the canvases of the App.
+
+    :param enabled: if the copies are drawn with instancing when the OpenGL context is new enough
+    :type enabled:  bool
+    :return:        if the backend can draw instances
+    :rtype:         bool
+    """
+    global _INSTANCING_ENABLED, _INSTANCING
+    _INSTANCING = None
+    if enabled and _VBO_DIVISOR and not hasattr(gl, 'glVertexAttribDivisor'):
+        try:
+            gl.use_gl('gl+')
+        except RuntimeError as e:
+            print("VisPyVisuals.set_instancing() --> The copies are not drawn with instancing. %s" % str(e))
+    _INSTANCING_ENABLED = bool(enabled and _VBO_DIVISOR and hasattr(gl, 'glVertexAttribDivisor'))
+    return _INSTANCING_ENABLED
+
+
+def _instancing_supported():
+    """
+    Instanced drawing needs OpenGL 3.3 and the backend chosen with set_instancing(). On an older OpenGL, e.g. an old
+    software OpenGL, the copies are expanded on the CPU. Called while drawing, when the OpenGL context is current.
+
+    :return:    True or False; None while the OpenGL version is not known yet
+    """
+    global _INSTANCING
+    if _INSTANCING is not None:
+        return _INSTANCING
+
+    if not _INSTANCING_ENABLED:
+        _INSTANCING = False
+        return _INSTANCING
+
+    try:
+        version = get_current_canvas().context.shared.parser.capabilities['gl_version']
+    except (AttributeError, KeyError):
+        version = None
+    if not version or version == 'Unknown':
+        # the first frame; the context is current, it can be asked directly
+        try:
+            version = gl.glGetParameter(gl.GL_VERSION)
+        except Exception:
+            return None
+    if not version:
+        return None
+
+    _INSTANCING = _gl_version_has_instancing(version)
+    return _INSTANCING
+
+
+def find_copies(shapes, decimals=9, min_copies=2):
+    """
+    Finds the shapes that are translated copies of one another, like the drills of a tool or the pads of an
+    aperture. Two shapes are copies when their coordinates, relative to the center of their bounds, are the same
+    when rounded to the given decimals.
+
+    :param shapes:      list of Shapely geometry
+    :param decimals:    the relative coordinates are compared rounded to this number of decimals
+    :param min_copies:  the shapes with less copies are not grouped
+    :return:            (list of (template centered in (0, 0), (N, 2) array of offsets, indexes of the copies),
+                        indexes of the shapes that are not grouped)
+    :rtype:             tuple
+    """
+    geoms = np.empty(len(shapes), dtype=object)
+    geoms[:] = list(shapes)
+
+    # only the types that are drawn are grouped: LineString (1), LinearRing (2) and Polygon (3)
+    type_ids = shapely.get_type_id(geoms)
+    candidates = np.flatnonzero(np.isin(type_ids, (1, 2, 3)) & ~shapely.is_empty(geoms))
+    others = np.flatnonzero(~np.isin(np.arange(len(geoms)), candidates)).tolist()
+    if len(candidates) == 0:
+        return [], others
+
+    cand_geoms = geoms[candidates]
+    bounds = shapely.bounds(cand_geoms)
+    centers = (bounds[:, :2] + bounds[:, 2:]) / 2
+    coords, coord_index = shapely.get_coordinates(cand_geoms, return_index=True)
+    # adding 0.0 makes the rounded -0.0 a 0.0, so they have the same bytes
+    relative = np.round(coords - centers[coord_index], decimals) + 0.0
+    rel_bytes = relative.tobytes()
+    row_size = relative.itemsize * 2
+    stops = np.cumsum(np.bincount(coord_index, minlength=len(cand_geoms))) * row_size
+    starts = np.concatenate(([0], stops[:-1]))
+    exteriors = shapely.get_num_coordinates(shapely.get_exterior_ring(cand_geoms))
+
+    groups = {}
+    for position, key in enumerate(zip(type_ids[candidates].tolist(), exteriors.tolist(),
+                                       shapely.get_num_interior_rings(cand_geoms).tolist(),
+                                       (rel_bytes[start:stop] for start, stop in zip(starts.tolist(),
+                                                                                       stops.tolist())))):
+        groups.setdefault(key, []).append(position)
+
+    copies = []
+    for positions in groups.values():
+        if len(positions) < min_copies:
+            others += candidates[positions].tolist()
+            continue
+        first = positions[0]
+        template = shapely.transform(cand_geoms[first], lambda c: c - centers[first])
+        copies.append((template, centers[positions], candidates[positions]))
+    return copies, others
+
+
+class _InstanceGroup(object):
+    def __init__(self, mesh_vertices, mesh_tris, line_pts):
+        """
+        The copies of one shape: the buffers of the shape, translated once, and the offset, the colors and the
+        visibility of each copy, in the rows of an _ArenaRegion
+
+        :param mesh_vertices:   float32 Nx2 array
+        :param mesh_tris:       uint32 array; three vertex indexes for each face
+        :param line_pts:        float32 Nx2 array; two vertices for each line segment
+        """
+        self.mesh_vertices = mesh_vertices
+        self.mesh_tris = mesh_tris
+        self.line_pts = line_pts
+        self.copies = _ArenaRegion(offsets=((2, ), np.float32), face_colors=((4, ), np.float32),
+                                   line_colors=((4, ), np.float32), visible=((), bool))
+        self.nr_copies = 0
+
+        # the copies changed since the buffers to draw were made
+        self.changed = True
+        # _InstanceBuffers; the buffers to draw
+        self.drawn = None
+
+    def add(self, offsets, face_rgba, line_rgba, visible):
+        """
+        :return: the rows of the copies
+        :rtype: range
+        """
+        nr_copies = len(offsets)
+        start = self.copies.allocate(nr_copies)
+        rows = slice(start, start + nr_copies)
+        self.copies.arrays['offsets'][rows] = offsets
+        self.copies.arrays['face_colors'][rows] = face_rgba
+        self.copies.arrays['line_colors'][rows] = line_rgba
+        self.copies.arrays['visible'][rows] = visible
+        self.nr_copies += nr_copies
+        self.changed = True
+        return range(start, start + nr_copies)
+
+    def remove(self, row):
+        self.copies.arrays['visible'][row] = False
+        self.copies.release(row, 1)
+        self.nr_copies -= 1
+        self.changed = True
+
+    def set_visible(self, row, state):
+        state = bool(state)
+        if self.copies.arrays['visible'][row] != state:
+            self.copies.arrays['visible'][row] = state
+            self.changed = True
+
+    def set_colors(self, row, face_rgba=None, line_rgba=None):
+        """
+        :return: True for each of the faces and lines that were recolored (the shape has some)
+        :rtype: tuple
+        """
+        recolor_faces = face_rgba is not None and len(self.mesh_tris) > 0
+        recolor_lines = line_rgba is not None and len(self.line_pts) > 0
+        if recolor_faces:
+            self.copies.arrays['face_colors'][row] = face_rgba
+        if recolor_lines:
+            self.copies.arrays['line_colors'][row] = line_rgba
+        if recolor_faces or recolor_lines:
+            self.changed = True
+        return recolor_faces, recolor_lines
+
+
+class _InstanceBuffers(object):
+    def __init__(self, group):
+        """
+        The buffers of the visible copies of an _InstanceGroup, as they are drawn. They are made again when the group
+        changes, so the drawing thread never sees a group while it is changed.
+
+        :param group: _InstanceGroup
+        """
+        top = group.copies.top
+        visible = group.copies.arrays['visible'][:top]
+        self.offsets = group.copies.arrays['offsets'][:top][visible]
+        self.face_colors = group.copies.arrays['face_colors'][:top][visible]
+        self.line_colors = group.copies.arrays['line_colors'][:top][visible]
+        self.mesh_vertices, self.mesh_tris, self.line_pts = group.mesh_vertices, group.mesh_tris, group.line_pts
+
+        self.bounds = None
+        vertices = self.mesh_vertices if len(self.mesh_tris) else np.empty((0, 2), dtype=np.float32)
+        vertices = np.concatenate((vertices, self.line_pts))
+        if len(self.offsets) and len(vertices):
+            self.bounds = np.concatenate((vertices.min(axis=0) + self.offsets.min(axis=0),
+                                          vertices.max(axis=0) + self.offsets.max(axis=0)))
+
+        # instancing (True or False) -> the draw calls
+        self._calls = {}
+
+    def calls(self, instancing):
+        """
+        The draw calls of the copies. With instancing the shape is uploaded once and each copy is an offset and a
+        color; without it (old OpenGL) the copies are expanded here, but the shape is still translated only once.
+
+        :param instancing:  bool
+        :return:            list of (draw mode, attribute values, index buffer or None)
+        :rtype:             list
+        """
+        try:
+            return self._calls[instancing]
+        except KeyError:
+            pass
+
+        calls = []
+        nr_copies = len(self.offsets)
+        parts = [('triangles', self.mesh_vertices, self.mesh_tris, self.face_colors),
+                 ('lines', self.line_pts, None, self.line_colors)]
+        for mode, vertices, tris, colors in parts:
+            if nr_copies == 0 or len(vertices) == 0 or (tris is not None and len(tris) == 0):
+                continue
+
+            if instancing:
+                attributes = {
+                    'a_position': VertexBuffer(vertices),
+                    'a_offset': VertexBuffer(self.offsets, divisor=1),
+                    'a_color': VertexBuffer(colors, divisor=1)
+                }
+                indices = IndexBuffer(tris) if tris is not None else None
+            else:
+                nr_vertices = len(vertices)
+                attributes = {
+                    'a_position': VertexBuffer(
+                        (np.tile(vertices, (nr_copies, 1)) + np.repeat(self.offsets, nr_vertices, axis=0))),
+                    'a_offset': (0.0, 0.0),
+                    'a_color': VertexBuffer(np.repeat(colors, nr_vertices, axis=0))
+                }
+                indices = None
+                if tris is not None:
+                    copy_start = np.arange(nr_copies, dtype=np.uint32) * np.uint32(nr_vertices)
+                    indices = IndexBuffer((tris[np.newaxis, :] + copy_start[:, np.newaxis]).ravel())
+            calls.append((mode, attributes, indices))
+
+        self._calls[instancing] = calls
+        return calls
+
+
+class InstancedShapesVisual(Visual):
+
+    def __init__(self, linewidth=1):
+        """
+        Draws the copies of some shapes (drills, pads). Each shape is translated once, its copies are an offset
+        and a color each, and they are drawn with instancing: one upload of the shape and one draw call for all
+        the copies. On an OpenGL older than 3.3 the copies are expanded on the CPU instead.
+        :param linewidth: float
+            Width of lines/edges
+        """
+        # group id -> _InstanceGroup
+        self._groups = {}
+        self._last_group = -1
+        # the _InstanceBuffers of the groups, as they are drawn, and their bounds
+        self._drawn = []
+        self._drawn_bounds = None
+        # the copies changed since commit()
+        self.changed = False
+        self.line_width = linewidth
+
+        Visual.__init__(self, vcode=_INSTANCES_VERT, fcode=_INSTANCES_FRAG)
+        self._draw_mode = 'triangles'
+        self.freeze()
+
+    def add(self, mesh_vertices, mesh_tris, line_pts, offsets, face_rgba, line_rgba, visible=True):
+        """
+        Adds the copies of a shape
+
+        :param mesh_vertices:   float32 Nx2 array; the buffers of the shape, see _shape_buffers()
+        :param mesh_tris:       uint32 array
+        :param line_pts:        float32 Nx2 array
+        :param offsets:         Nx2 array; the location of each copy
+        :param face_rgba:       RGBA of the faces
+        :param line_rgba:       RGBA of the lines
+        :param visible:         bool
+        :return:                (group id, rows of the copies)
+        :rtype:                 tuple
+        """
+        self._last_group += 1
+        group = _InstanceGroup(mesh_vertices, mesh_tris, line_pts)
+        rows = group.add(offsets, face_rgba, line_rgba, visible)
+        self._groups[self._last_group] = group
+        self.changed = True
+        return self._last_group, rows
+
+    def remove(self, group_id, row):
+        group = self._groups.get(group_id)
+        if group is None:
+            return
+        group.remove(row)
+        if group.nr_copies == 0:
+            del self._groups[group_id]
+        self.changed = True
+
+    def set_visible(self, group_id, row, state):
+        group = self._groups[group_id]
+        group.set_visible(row, state)
+        self.changed = self.changed or group.changed
+
+    def set_colors(self, group_id, row, face_rgba=None, line_rgba=None):
+        recolored = self._groups[group_id].set_colors(row, face_rgba, line_rgba)
+        self.changed = self.changed or any(recolored)
+        return recolored
+
+    def clear(self):
+        self._groups = {}
+        self.changed = True
+
+    def commit(self):
+        """
+        Makes the buffers to draw for the groups that changed
+        """
+        drawn = []
+        for group in list(self._groups.values()):
+            if group.changed or group.drawn is None:
+                group.drawn = _InstanceBuffers(group)
+                group.changed = False
+            if len(group.drawn.offsets):
+                drawn.append(group.drawn)
+
+        bounds = [buffers.bounds for buffers in drawn if buffers.bounds is not None]
+        if bounds:
+            bounds = np.array(bounds)
+            xmin, ymin = bounds[:, :2].min(axis=0)
+            xmax, ymax = bounds[:, 2:].max(axis=0)
+            self._drawn_bounds = [(xmin, xmax), (ymin, ymax)]
+        else:
+            self._drawn_bounds = None
+
+        self._drawn = drawn
+        self.changed = False
+        self._bounds_changed()
+        self.update()
+
+    def draw(self):
+        drawn = self._drawn
+        if not self.visible or not drawn:
+            return
+        if self._prepare_draw(view=self) is False:
+            return
+
+        instancing = bool(_instancing_supported())
+        for buffers in drawn:
+            for mode, attributes, indices in buffers.calls(instancing):
+                # the same OpenGL state as the ArenaShapesVisual of the layer
+                if mode == 'triangles':
+                    set_state(polygon_offset_fill=True, polygon_offset=(1, 1), cull_face=False)
+                else:
+                    set_state(blend=True, line_smooth=True, line_width=self.line_width)
+                for name, value in attributes.items():
+                    self.shared_program[name] = value
+                self._program.draw(mode, indices)
+
+    def _prepare_transforms(self, view):
+        view.view_program.vert['transform'] = view.get_transform()
+
+    def _compute_bounds(self, axis, view):
+        if self._drawn_bounds is None:
+            return None
+        return self._drawn_bounds[axis] if axis < 2 else (0, 0)
+
+
+class ArenaShapesVisual(Visual):
+
+    def __init__(self, linewidth=1):
+        """
+        Draws the shapes of one layer of a ShapeCollectionVisual from the buffers of its _ShapeArena. The GPU buffers
+        mirror the arrays of the arena, with their released rows, and only the rows written since the last upload are
+        uploaded again; the vertices of the hidden and of the removed shapes are moved out of the clip volume by the
+        vertex shader.
+        :param linewidth: float
+            Width of lines/edges
+        """
+        # the arena in the GPU buffers
+        self.arena = None
+        self.line_width = linewidth
+        # the name of an array of the arena -> its GPU buffer
+        self._mesh_buffers = {'pos': VertexBuffer(np.zeros((1, 2), dtype=np.float32)),
+                              'colors': VertexBuffer(np.zeros((1, 4), dtype=np.float32)),
+                              'visible': VertexBuffer(np.zeros(1, dtype=np.float32))}
+        self._tris = IndexBuffer(np.zeros(3, dtype=np.uint32))
+        self._line_buffers = {'pos': VertexBuffer(np.zeros((1, 2), dtype=np.float32)),
+                              'colors': VertexBuffer(np.zeros((1, 4), dtype=np.float32)),
+                              'visible': VertexBuffer(np.zeros(1, dtype=np.float32))}
+        self._nr_faces = 0
+        self._nr_line_pts = 0
+        self._arena_bounds = None
+
+        Visual.__init__(self, vcode=_ARENA_VERT, fcode=_INSTANCES_FRAG)
+        self._draw_mode = 'triangles'
+        self.freeze()
+
+    @staticmethod
+    def _upload_region(region, buffers, full):
+        """
+        :param region:  _ArenaRegion
+        :param buffers: dict; name of the array -> the GPU buffer
+        :param full:    True to upload the whole arrays
+        """
+        ranges = None if full else region.dirty_ranges()
+        if ranges is None:
+            for name, buffer in buffers.items():
+                buffer.set_data(region.arrays[name])
+        else:
+            for name, buffer in buffers.items():
+                arr = region.arrays[name]
+                # an index buffer is flat, a vertex buffer has one item for each row
+                row_size = arr[0].size if isinstance(buffer, IndexBuffer) else 1
+                for start, stop in ranges:
+                    buffer.set_subdata(arr[start:stop], offset=start * row_size)
+        region.uploaded()
+
+    def upload(self, arena):
+        """
+        Uploads the rows of the arena that changed, or all of them when the arena is not the one in the GPU buffers
+        or when its arrays grew
+
+        :param arena:   _ShapeArena
+        """
+        full = arena is not self.arena
+        self.arena = arena
+
+        vertices, faces, lines = arena.vertices, arena.faces, arena.lines
+        self._nr_faces = faces.top
+        self._nr_line_pts = lines.top
+        if faces.top:
+            self._upload_region(vertices, self._mesh_buffers, full)
+            self._upload_region(faces, {'tris': self._tris}, full)
+        if lines.top:
+            self._upload_region(lines, self._line_buffers, full)
+        arena.shapes.uploaded()
+
+        self._arena_bounds = arena.bounds()
+        self._bounds_changed()
+        self.update()
+
+    def draw(self):
+        if not self.visible or not (self._nr_faces or self._nr_line_pts):
+            return
+        if self._prepare_draw(view=self) is False:
+            return
+
+        # the OpenGL state of the MeshVisual and of the (antialiased) LineVisual of VisPy
+        if self._nr_faces:
+            set_state(polygon_offset_fill=True, polygon_offset=(1, 1), cull_face=False)
+            for name, buffer in self._mesh_buffers.items():
+                self.shared_program[_ARENA_ATTRIBUTES[name]] = buffer
+            self._program.draw('triangles', self._tris)
+        if self._nr_line_pts:
+            set_state(blend=True, line_smooth=True, line_width=self.line_width)
+            for name, buffer in self._line_buffers.items():
+                self.shared_program[_ARENA_ATTRIBUTES[name]] = buffer
+            self._program.draw('lines')
+
+    def _prepare_transforms(self, view):
+        view.view_program.vert['transform'] = view.get_transform()
+
+    def _compute_bounds(self, axis, view):
+        if self._arena_bounds is None:
+            return None
+        return self._arena_bounds[axis] if axis < 2 else (0, 0)
 
 
 class ShapeGroup(object):
@@ -150,6 +1178,26 @@ class ShapeGroup(object):
         self._indexes.append(key)
         return key
 
+    def add_many(self, **kwargs):
+        """
+        Adds many shapes to collection and store indexes in group
+        :param kwargs: keyword arguments
+            Arguments for ShapeCollection.add_many function
+        """
+        keys = self._collection.add_many(**kwargs)
+        self._indexes += keys
+        return keys
+
+    def add_many_instanced(self, **kwargs):
+        """
+        Adds many shapes to collection, the copies drawn with instancing, and store indexes in group
+        :param kwargs: keyword arguments
+            Arguments for ShapeCollection.add_many_instanced function
+        """
+        keys = self._collection.add_many_instanced(**kwargs)
+        self._indexes += keys
+        return keys
+
     def remove(self, idx, update=False):
         self._indexes.remove(idx)
         self._collection.remove(idx, False)
@@ -194,8 +1242,7 @@ class ShapeGroup(object):
         :param value: bool
         """
         self._visible = value
-        for i in self._indexes:
-            self._collection.data[i]['visible'] = value
+        self._collection.update_visibility(value, self._indexes)
 
         self._collection.redraw([])
 
@@ -218,30 +1265,33 @@ class ShapeGroup(object):
 
     def update_visibility(self, state, indexes=None):
         if indexes:
-            for i in indexes:
-                if i in self._indexes:
-                    self._collection.data[i]['visible'] = state
+            group_indexes = set(self._indexes)
+            self._collection.update_visibility(state, [i for i in indexes if i in group_indexes])
         else:
-            for i in self._indexes:
-                self._collection.data[i]['visible'] = state
+            self._collection.update_visibility(state, self._indexes)
 
         self._collection.redraw([])
 
 
 class ShapeCollectionVisual(CompoundVisual):
 
-    def __init__(self, linewidth=1, triangulation='vispy', layers=3, pool=None, fcoptions=None, **kwargs):
+    def __init__(self, linewidth=1, triangulation='glu', layers=3, pool=None, fcoptions=None, lod_tolerances=None,
+                 **kwargs):
         """
         Represents collection of shapes to draw on VisPy scene
         :param linewidth: float
             Width of lines/edges
         :param triangulation: str
             Triangulation method used for polygons translation
-            'vispy' - VisPy lib triangulation
-            'gpc' - Polygon2 lib
+            'glu' - OpenGL GLU tessellator, one polygon at a time
+            'geos' - GEOS constrained Delaunay triangulation, the polygons added together are triangulated at once
         :param layers: int
             Layers count
             Each layer adds 2 visuals on VisPy scene. Be careful: more layers cause less fps
+        :param lod_tolerances: tuple
+            Simplifying tolerances of the levels of detail, from the finest; for each one the shapes added with
+            add_many() are simplified and translated again in the process pool. A level is drawn when its tolerance is
+            smaller than half of a screen pixel (see set_pixel_size()). None - only the tolerance of each shape
         :param kwargs:
         """
         self.fc_options = fcoptions
@@ -253,30 +1303,42 @@ class ShapeCollectionVisual(CompoundVisual):
         self.key_lock = threading.Lock()
         self.results_lock = threading.Lock()
         self.update_lock = threading.Lock()
+        self.changes_lock = threading.Lock()
 
         # Process pool
         self.pool = pool
         self.results = {}
-
-        self._meshes = [MeshVisual() for _ in range(0, layers)]
-        # self._lines = [LineVisual(antialias=True) for _ in range(0, layers)]
-        self._lines = [LineVisual(antialias=True) for _ in range(0, layers)]
+        # the number of shapes sent to the process pool in one task by add_many()
+        self.chunk_size = 1000
+        # colors already translated to RGBA
+        self._rgba_cache = {}
+
+        # the packed buffers of each level of detail and layer; the shapes added, removed, shown or hidden since the
+        # last update
+        self.lod_tolerances = tuple(lod_tolerances) if lod_tolerances else ()
+        self.lod = 0
+        self._levels = self._new_levels(layers)
+        self._changed_keys = set()
+        # the translations of the shapes for the levels of detail, in the process pool: (level, keys, chunk result)
+        self._lod_jobs = []
+
+        # the faces and the lines of the shapes of each layer, from the arena of the level of detail that is drawn
+        self._arena_visuals = [ArenaShapesVisual(linewidth=linewidth) for _ in range(0, layers)]
+        # the copies of the shapes added with add_instances(), drawn over the other shapes of their layer
+        self._instances = [InstancedShapesVisual(linewidth=linewidth) for _ in range(0, layers)]
+        # shape index -> (layer, group id, row) of the copies
+        self._instance_slots = {}
 
         self._line_width = linewidth
-        self._triangulation = triangulation
+        # the GEOS triangulation needs Shapely 2.1; with an older one the polygons are triangulated with GLU
+        self._triangulation = 'glu' if triangulation == 'geos' and not HAS_CDT else triangulation
 
-        visuals_ = [self._lines[i // 2] if i % 2 else self._meshes[i // 2] for i in range(0, layers * 2)]
+        visuals_ = []
+        for i in range(0, layers):
+            visuals_ += [self._arena_visuals[i], self._instances[i]]
 
         CompoundVisual.__init__(self, visuals_, **kwargs)
 
-        for m in self._meshes:
-            pass
-            m.set_gl_state(polygon_offset_fill=True, polygon_offset=(1, 1), cull_face=False)
-
-        for lne in self._lines:
-            pass
-            lne.set_gl_state(blend=True)
-
         self.freeze()
 
     def add(self, shape=None, color=None, face_color=None, alpha=None, visible=True,
@@ -321,30 +1383,222 @@ class ShapeCollectionVisual(CompoundVisual):
             'layer': layer,
             'tolerance': tolerance,
             # the following keys are updated in the _update_shape_buffers() method
-            'mesh_vertices': [],    # Vertices for mesh
-            'mesh_tris': [],        # Faces for mesh
-            'mesh_colors': [],      # Face colors
-            'line_pts': [],         # Vertices for line
-            'line_colors': []       # Line colors
+            **_empty_shape_buffers()
         }
 
         if linewidth:
             self._line_width = linewidth
 
         if self.fc_options and self.fc_options["global_graphic_engine_3d_no_mp"] is True:
-            self.data[key] = _update_shape_buffers(self.data[key])
+            self.data[key] = _update_shape_buffers(self.data[key], self._triangulation)
         else:
             # Add data to process pool if pool exists
             try:
-                self.results[key] = self.pool.map_async(_update_shape_buffers, [self.data[key]])
+                self.results[key] = self.pool.starmap_async(_update_shape_buffers,
+                                                            [(self.data[key], self._triangulation)])
             except Exception:
-                self.data[key] = _update_shape_buffers(self.data[key])
+                self.data[key] = _update_shape_buffers(self.data[key], self._triangulation)
+        self._mark_changed([key])
 
         if update:
             self.redraw()   # redraw() waits for pool process end
 
         return key
 
+    def add_many(self, shapes, color=None, face_color=None, alpha=None, visible=True,
+                 update=False, layer=1, tolerance=0.001, linewidth=None):
+        """
+        Adds many shapes to collection. The shapes go to the process pool in chunks of WKB and the buffers of a
+        chunk come back in a few NumPy arrays, instead of one pool task for each shape.
+        :param shapes: list
+            Shapely geometry objects
+        :param color: str, tuple, list
+            Line/edge color; a list holds a color for each shape
+        :param face_color: str, tuple, list
+            Polygon face color; a list holds a color for each shape
+        :param alpha: str
+            Polygon transparency
+        :param visible: bool
+            Shapes visibility
+        :param update: bool
+            Set True to redraw collection
+        :param layer: int
+            Layer number. 0 - lowest.
+        :param tolerance: float
+            Geometry simplifying tolerance
+        :param linewidth: int
+            Width of the line
+        :return: list
+            Indexes of shapes
+        """
+        shapes = list(shapes)
+        nr_shapes = len(shapes)
+        colors = color if isinstance(color, list) else [color] * nr_shapes
+        face_colors = face_color if isinstance(face_color, list) else [face_color] * nr_shapes
+
+        # Get new keys
+        self.key_lock.acquire(True)
+        keys = list(range(self.last_key + 1, self.last_key + 1 + nr_shapes))
+        self.last_key += nr_shapes
+        self.key_lock.release()
+
+        for key, shape_color, shape_face_color in zip(keys, colors, face_colors):
+            self.data[key] = {
+                'color': shape_color,
+                'alpha': alpha,
+                'face_color': shape_face_color,
+                'visible': visible,
+                'layer': layer,
+                'tolerance': tolerance,
+                # the following keys are updated when the shapes are translated
+                **_empty_shape_buffers()
+            }
+
+        if linewidth:
+            self._line_width = linewidth
+
+        use_pool = self.pool is not None and not (
+                self.fc_options and self.fc_options["global_graphic_engine_3d_no_mp"] is True)
+
+        for start in range(0, nr_shapes, self.chunk_size):
+            stop = start + self.chunk_size
+            chunk_keys = keys[start:stop]
+            if use_pool:
+                try:
+                    chunk_result = _ShapesChunkResult(self.pool.apply_async(
+                        _update_shapes_buffers,
+                        args=(shapely.to_wkb(shapes[start:stop]).tolist(), colors[start:stop],
+                              face_colors[start:stop], tolerance, self._triangulation)))
+                    for position, key in enumerate(chunk_keys):
+                        self.results[key] = _ShapeResult(chunk_result, position, self.data[key], self._rgba_cache)
+
+                    # the coarser levels of detail are drawn from the shapes of the finest one until they are done
+                    for level, lod_tolerance in enumerate(self.lod_tolerances, start=1):
+                        self._lod_jobs.append((level, chunk_keys, _ShapesChunkResult(self.pool.apply_async(
+                            _update_shapes_buffers,
+                            args=(shapely.to_wkb(shapes[start:stop]).tolist(), colors[start:stop],
+                                  face_colors[start:stop], max(tolerance or 0, lod_tolerance), self._triangulation)))))
+                    continue
+                except Exception:
+                    use_pool = False
+
+            chunk_buffers = _shapes_buffers(np.array(shapes[start:stop], dtype=object), colors[start:stop],
+                                            face_colors[start:stop], tolerance, self._triangulation)
+            for key, shape_buffers in zip(chunk_keys, chunk_buffers):
+                _set_shape_buffers(self.data[key], *shape_buffers, rgba_cache=self._rgba_cache)
+        self._mark_changed(keys)
+
+        if update:
+            self.redraw()   # redraw() waits for pool process end
+
+        return keys
+
+    def add_instances(self, template, offsets, color=None, face_color=None, alpha=None, visible=True,
+                      update=False, layer=1, tolerance=0.001, linewidth=None):
+        """
+        Adds the copies of a shape to collection. The shape is translated once and the copies are drawn with
+        instancing (see InstancedShapesVisual); each copy is a shape of the collection, with its own index.
+        :param template: shapely.geometry
+            Shapely geometry object (LineString, LinearRing or Polygon) centered in (0, 0)
+        :param offsets: numpy.array
+            The location of each copy, Nx2 array
+        :param color: str, tuple
+            Line/edge color
+        :param face_color: str, tuple
+            Polygon face color
+        :param alpha: str
+            Polygon transparency
+        :param visible: bool
+            Shapes visibility
+        :param update: bool
+            Set True to redraw collection
+        :param layer: int
+            Layer number. 0 - lowest.
+        :param tolerance: float
+            Geometry simplifying tolerance
+        :param linewidth: int
+            Width of the line
+        :return: list
+            Indexes of the copies
+        """
+        offsets = np.asarray(offsets, dtype=np.float64).reshape(-1, 2)
+        nr_copies = len(offsets)
+        if nr_copies == 0:
+            return []
+
+        # Get new keys
+        self.key_lock.acquire(True)
+        keys = list(range(self.last_key + 1, self.last_key + 1 + nr_copies))
+        self.last_key += nr_copies
+        self.key_lock.release()
+
+        for key in keys:
+            self.data[key] = {
+                'color': color,
+                'alpha': alpha,
+                'face_color': face_color,
+                'visible': visible,
+                'layer': layer,
+                'tolerance': tolerance
+            }
+
+        if linewidth:
+            self._line_width = linewidth
+
+        mesh_vertices, mesh_tris, line_pts = _shape_buffers(template, color, face_color, tolerance,
+                                                            self._triangulation)
+        face_rgba = np.zeros(4) if face_color is None else _color_array(face_color, 1, self._rgba_cache)[0]
+        line_rgba = np.zeros(4) if color is None else _color_array(color, 1, self._rgba_cache)[0]
+
+        self.update_lock.acquire(True)
+        group_id, rows = self._instances[layer].add(mesh_vertices, mesh_tris, line_pts, offsets, face_rgba,
+                                                    line_rgba, visible)
+        for key, row in zip(keys, rows):
+            self._instance_slots[key] = (layer, group_id, row)
+        self.update_lock.release()
+
+        if update:
+            self.redraw()
+
+        return keys
+
+    def add_many_instanced(self, shapes, color=None, face_color=None, alpha=None, visible=True,
+                           update=False, layer=1, tolerance=0.001, linewidth=None):
+        """
+        Adds many shapes to collection, like add_many(), but the shapes that are translated copies of one another
+        (see find_copies()) are added with add_instances()
+        :param shapes: list
+            Shapely geometry objects
+        :param color: str, tuple
+            Line/edge color; with a list (a color for each shape) the shapes are added with add_many()
+        :param face_color: str, tuple
+            Polygon face color; with a list (a color for each shape) the shapes are added with add_many()
+        :return: list
+            Indexes of shapes, in the order of the shapes
+        """
+        shapes = list(shapes)
+        if isinstance(color, list) or isinstance(face_color, list):
+            return self.add_many(shapes, color=color, face_color=face_color, alpha=alpha, visible=visible,
+                                 update=update, layer=layer, tolerance=tolerance, linewidth=linewidth)
+
+        copies, others = find_copies(shapes)
+        keys = [None] * len(shapes)
+        for template, offsets, indexes in copies:
+            copy_keys = self.add_instances(template, offsets, color=color, face_color=face_color, alpha=alpha,
+                                           visible=visible, layer=layer, tolerance=tolerance, linewidth=linewidth)
+            for idx, key in zip(indexes.tolist(), copy_keys):
+                keys[idx] = key
+        other_keys = self.add_many([shapes[idx] for idx in others], color=color, face_color=face_color,
+                                   alpha=alpha, visible=visible, layer=layer, tolerance=tolerance,
+                                   linewidth=linewidth)
+        for idx, key in zip(others, other_keys):
+            keys[idx] = key
+
+        if update:
+            self.redraw()   # redraw() waits for pool process end
+
+        return keys
+
     def remove(self, key, update=False):
         """
         Removes shape from collection
@@ -362,6 +1616,7 @@ class ShapeCollectionVisual(CompoundVisual):
         # Remove data
         if key in self.data:
             del self.data[key]
+        self._mark_changed([key])
 
         if update:
             self.__update()
@@ -374,22 +1629,68 @@ class ShapeCollectionVisual(CompoundVisual):
         """
         self.last_key = -1
         self.data.clear()
+
+        self.update_lock.acquire(True)
+        self._levels = self._new_levels(len(self._arena_visuals))
+        self._instance_slots = {}
+        for instances in self._instances:
+            instances.clear()
+        # the keys are used again
+        self._lod_jobs = []
+        self.changes_lock.acquire(True)
+        self._changed_keys.clear()
+        self.changes_lock.release()
+        self.update_lock.release()
+
         if update:
             self.__update()
 
     def update_visibility(self, state: bool, indexes=None) -> None:
         # Lock sub-visuals updates
         self.update_lock.acquire(True)
-        if indexes is None:
-            for k, data in list(self.data.items()):
-                self.data[k]['visible'] = state
-        else:
-            for k, data in list(self.data.items()):
-                if k in indexes:
-                    self.data[k]['visible'] = state
+        keys = list(self.data.keys()) if indexes is None else indexes
+        for k in keys:
+            data = self.data.get(k)
+            if data is not None:
+                data['visible'] = state
+        self._mark_changed(keys)
 
         self.update_lock.release()
 
+    def _new_levels(self, layers):
+        """
+        :param layers:  the number of layers
+        :return:        the arenas of each level of detail and layer; a coarser level shares the arena of the finest
+                        level until some of its shapes are simplified (see __update_lod_jobs())
+        :rtype:         list
+        """
+        finest = [_ShapeArena() for _ in range(0, layers)]
+        return [finest] + [list(finest) for _ in self.lod_tolerances]
+
+    def _layer_arenas(self, layer):
+        """
+        :param layer:   the layer number
+        :return:        the distinct arenas of the layer, from the finest level of detail
+        :rtype:         list
+        """
+        arenas = []
+        for arenas_of_level in self._levels:
+            arena = arenas_of_level[layer]
+            if all(arena is not other for other in arenas):
+                arenas.append(arena)
+        return arenas
+
+    def _mark_changed(self, keys):
+        """
+        Records the shapes that were added, removed, shown or hidden; they are moved to the arenas of their layers
+        at the next update
+        :param keys: list
+            Shape indexes
+        """
+        self.changes_lock.acquire(True)
+        self._changed_keys.update(keys)
+        self.changes_lock.release()
+
     def update_color(self, new_mesh_color=None, new_line_color=None, indexes=None):
         if new_mesh_color is None and new_line_color is None:
             return
@@ -398,183 +1699,186 @@ class ShapeCollectionVisual(CompoundVisual):
             return
 
         # if a new color is empty string then make it None so it will not be updated
-        # if a new color is valid then transform it here in a format palatable
-        mesh_color_rgba = None
-        line_color_rgba = None
-        if new_mesh_color:
-            if new_mesh_color != '':
-                mesh_color_rgba = Color(new_mesh_color).rgba
-            else:
-                new_mesh_color = None
-        if new_line_color:
-            if new_line_color != '':
-                line_color_rgba = Color(new_line_color).rgba
-            else:
-                new_line_color = None
+        if not new_mesh_color:
+            new_mesh_color = None
+        if not new_line_color:
+            new_line_color = None
 
-        mesh_colors = [[] for _ in range(0, len(self._meshes))]     # Face colors
-        line_colors = [[] for _ in range(0, len(self._meshes))]     # Line colors
-        line_pts = [[] for _ in range(0, len(self._lines))]         # Vertices for line
+        face_rgba = None if new_mesh_color is None else _color_array(new_mesh_color, 1, self._rgba_cache)[0]
+        line_rgba = None if new_line_color is None else _color_array(new_line_color, 1, self._rgba_cache)[0]
 
         # Lock sub-visuals updates
         self.update_lock.acquire(True)
-        # Merge shapes buffers
-
-        if indexes is None:
-            for k, data in list(self.data.items()):
-                if data['visible'] and 'line_pts' in data:
-                    if new_mesh_color and new_mesh_color != '':
-                        dim_mesh_tris = (len(data['mesh_tris']) // 3)
-                        if dim_mesh_tris != 0:
-                            try:
-                                mesh_colors[data['layer']] += [mesh_color_rgba] * dim_mesh_tris
-                                self.data[k]['face_color'] = new_mesh_color
-
-                                data['mesh_colors'] = [mesh_color_rgba for __ in range(len(data['mesh_colors']))]
-                            except Exception as e:
-                                print("VisPyVisuals.ShapeCollectionVisual.update_color(). "
-                                      "Create mesh colors --> Data error. %s" % str(e))
-
-                    if new_line_color and new_line_color != '':
-                        dim_line_pts = (len(data['line_pts']))
-                        if dim_line_pts != 0:
-                            try:
-                                line_pts[data['layer']] += data['line_pts']
-                                line_colors[data['layer']] += [line_color_rgba] * dim_line_pts
-                                self.data[k]['color'] = new_line_color
-
-                                data['line_colors'] = [mesh_color_rgba for __ in range(len(data['line_colors']))]
-                            except Exception as e:
-                                print("VisPyVisuals.ShapeCollectionVisual.update_color(). "
-                                      "Create line colors --> Data error. %s" % str(e))
-        else:
-            for k, data in list(self.data.items()):
-                if data['visible'] and 'line_pts' in data:
-                    dim_mesh_tris = (len(data['mesh_tris']) // 3)
-                    dim_line_pts = (len(data['line_pts']))
-
-                    if k in indexes:
-                        if new_mesh_color and new_mesh_color != '':
-                            if dim_mesh_tris != 0:
-                                try:
-                                    mesh_colors[data['layer']] += [mesh_color_rgba] * dim_mesh_tris
-                                    self.data[k]['face_color'] = new_mesh_color
-
-                                    data['mesh_colors'] = [mesh_color_rgba for __ in range(len(data['mesh_colors']))]
-                                except Exception as e:
-                                    print("VisPyVisuals.ShapeCollectionVisual.update_color(). "
-                                          "Create mesh colors --> Data error. %s" % str(e))
-                        if new_line_color and new_line_color != '':
-                            if dim_line_pts != 0:
-                                try:
-                                    line_pts[data['layer']] += data['line_pts']
-                                    line_colors[data['layer']] += [line_color_rgba] * dim_line_pts
-                                    self.data[k]['color'] = new_line_color
-
-                                    data['line_colors'] = [mesh_color_rgba for __ in range(len(data['line_colors']))]
-                                except Exception as e:
-                                    print("VisPyVisuals.ShapeCollectionVisual.update_color(). "
-                                          "Create line colors --> Data error. %s" % str(e))
-                    else:
-                        if dim_mesh_tris != 0:
-                            try:
-                                mesh_colors[data['layer']] += [Color(data['face_color']).rgba] * dim_mesh_tris
-                            except Exception as e:
-                                print("VisPyVisuals.ShapeCollectionVisual.update_color(). "
-                                      "Create mesh colors --> Data error. %s" % str(e))
-
-                        if dim_line_pts != 0:
-                            try:
-                                line_pts[data['layer']] += data['line_pts']
-                                line_colors[data['layer']] += [Color(data['color']).rgba] * dim_line_pts
-                            except Exception as e:
-                                print("VisPyVisuals.ShapeCollectionVisual.update_color(). "
-                                      "Create line colors --> Data error. %s" % str(e))
-
-        # Updating meshes
-        if new_mesh_color and new_mesh_color != '':
-            for i, mesh in enumerate(self._meshes):
-                if mesh_colors[i]:
-                    try:
-                        mesh._meshdata.set_face_colors(colors=np.asarray(mesh_colors[i]))
-                        mesh.mesh_data_changed()
-                    except Exception as e:
-                        print("VisPyVisuals.ShapeCollectionVisual.update_color(). "
-                              "Apply mesh colors --> Data error. %s" % str(e))
-
-        # Updating lines
-        if new_line_color and new_line_color != '':
-            for i, line in enumerate(self._lines):
-                if len(line_pts[i]) > 0:
-                    line.visible = True
-                    try:
-                        line._color = np.asarray(line_colors[i])
-                        line._changed['color'] = True
-                        line.update()
-                    except Exception as e:
-                        print("VisPyVisuals.ShapeCollectionVisual.update_color(). "
-                              "Apply line colors --> Data error. %s" % str(e))
+        # Patch the colors of the shapes in place
+        for k in (list(self.data.keys()) if indexes is None else indexes):
+            data = self.data.get(k)
+            if data is None or not data['visible']:
+                continue
+
+            try:
+                arenas = self._layer_arenas(data['layer'])
+                if k in self._instance_slots:
+                    layer, group_id, row = self._instance_slots[k]
+                    recolor_faces, recolor_lines = self._instances[layer].set_colors(group_id, row, face_rgba,
+                                                                                     line_rgba)
+                elif k in arenas[0].slots:
+                    recolor_faces, recolor_lines = False, False
+                    for arena in arenas:
+                        if k in arena.slots:
+                            faces, lines = arena.set_colors(k, face_rgba, line_rgba)
+                            recolor_faces, recolor_lines = recolor_faces or faces, recolor_lines or lines
+                elif 'line_pts' in data:
+                    # translated but not in the arena yet
+                    recolor_faces = face_rgba is not None and len(data['mesh_tris']) != 0
+                    recolor_lines = line_rgba is not None and len(data['line_pts']) != 0
+                    if recolor_faces:
+                        data['mesh_colors'] = _color_array(new_mesh_color, len(data['mesh_tris']) // 3,
+                                                           self._rgba_cache)
+                    if recolor_lines:
+                        data['line_colors'] = _color_array(new_line_color, len(data['line_pts']), self._rgba_cache)
                 else:
-                    # line.clear_data()
-                    line.visible = False
+                    continue
+
+                if recolor_faces:
+                    data['face_color'] = new_mesh_color
+                if recolor_lines:
+                    data['color'] = new_line_color
+            except Exception as e:
+                print("VisPyVisuals.ShapeCollectionVisual.update_color() --> Data error. %s" % str(e))
 
         self.update_lock.release()
 
-    def __update(self):
+        self.__update()
+
+    def __update_arenas(self):
         """
-        Merges internal buffers, sets data to visuals, redraws collection on scene
+        Moves the changes of the shapes (added, removed, shown or hidden) to the arenas of their layers
+        """
+        self.changes_lock.acquire(True)
+        changed_keys = self._changed_keys
+        self._changed_keys = set()
+        self.changes_lock.release()
+
+        pending_keys = []
+        for key in changed_keys:
+            data = self.data.get(key)
+            if key in self._instance_slots:
+                layer, group_id, row = self._instance_slots[key]
+                if data is None:
+                    # removed
+                    del self._instance_slots[key]
+                    self._instances[layer].remove(group_id, row)
+                else:
+                    self._instances[layer].set_visible(group_id, row, data['visible'])
+                continue
+
+            if data is None:
+                # removed
+                for arenas in self._levels:
+                    for arena in arenas:
+                        arena.remove(key)
+                continue
+
+            if key in self.results:
+                # not translated yet
+                pending_keys.append(key)
+                continue
+
+            try:
+                translated = 'line_pts' in data
+                for arena in self._layer_arenas(data['layer']):
+                    if key in arena.slots:
+                        arena.set_visible(key, data['visible'])
+                    elif translated:
+                        # the levels of detail that are not done yet get the shape of the finest level
+                        arena.insert(key, data)
+                if translated:
+                    # the arenas hold the buffers from now on
+                    for buffer_key in _empty_shape_buffers():
+                        del data[buffer_key]
+            except Exception as e:
+                print("VisPyVisuals.ShapeCollectionVisual._update() --> Data error. %s" % str(e))
+        self._mark_changed(pending_keys)
+
+        self.__update_lod_jobs()
+
+        for arenas in self._levels:
+            for arena in arenas:
+                if arena.fragmented:
+                    arena.compact()
+
+    def __update_lod_jobs(self):
+        """
+        Moves the shapes translated for the levels of detail to their arenas, replacing the shapes of the finest level
         """
-        mesh_vertices = [[] for _ in range(0, len(self._meshes))]       # Vertices for mesh
-        mesh_tris = [[] for _ in range(0, len(self._meshes))]           # Faces for mesh
-        mesh_colors = [[] for _ in range(0, len(self._meshes))]         # Face colors
-        line_pts = [[] for _ in range(0, len(self._lines))]             # Vertices for line
-        line_colors = [[] for _ in range(0, len(self._lines))]          # Line color
+        lod_jobs = []
+        for level, keys, chunk_result in self._lod_jobs:
+            if not chunk_result.ready():
+                lod_jobs.append((level, keys, chunk_result))
+                continue
 
+            for position, key in enumerate(keys):
+                data = self.data.get(key)
+                if data is None:
+                    continue
+
+                try:
+                    lod_data = {'color': data['color'], 'face_color': data['face_color'], 'visible': data['visible']}
+                    _set_shape_buffers(lod_data, *chunk_result.buffers(position), rgba_cache=self._rgba_cache)
+                    layer = data['layer']
+                    arena = self._levels[level][layer]
+                    if arena is self._levels[0][layer]:
+                        # the first simplified shape of the level and layer, the level gets its own arena
+                        arena = self._levels[level][layer] = arena.copy()
+                    arena.remove(key)
+                    arena.insert(key, lod_data)
+                except Exception as e:
+                    print("VisPyVisuals.ShapeCollectionVisual._update() --> Level of detail error. %s" % str(e))
+                    break
+        self._lod_jobs = lod_jobs
+
+    def set_pixel_size(self, pixel_size):
+        """
+        Selects the level of detail to draw: the coarsest one with a tolerance smaller than half of a pixel
+        :param pixel_size: float
+            The size of a screen pixel in the units of the shapes
+        """
+        lod = 0
+        for level, lod_tolerance in enumerate(self.lod_tolerances, start=1):
+            if lod_tolerance < pixel_size / 2:
+                lod = level
+
+        if lod != self.lod:
+            self.update_lock.acquire(True)
+            # the visuals upload the whole arenas of the level, they hold the buffers of another one
+            self.lod = lod
+            self.update_lock.release()
+
+            self.__update()
+
+    def __update(self):
+        """
+        Moves the changed shapes to the layer buffers, sets data to visuals, redraws collection on scene.
+        Only the rows of the layer buffers that changed are uploaded again.
+        """
         # Lock sub-visuals updates
         self.update_lock.acquire(True)
 
-        # Merge shapes buffers
-        for data in list(self.data.values()):
-            if data['visible'] and 'line_pts' in data:
-                try:
-                    line_pts[data['layer']] += data['line_pts']
-                    line_colors[data['layer']] += data['line_colors']
+        self.__update_arenas()
 
-                    mesh_tris[data['layer']] += [x + len(mesh_vertices[data['layer']]) for x in data['mesh_tris']]
-                    mesh_vertices[data['layer']] += data['mesh_vertices']
-                    mesh_colors[data['layer']] += data['mesh_colors']
-                except Exception as e:
-                    print("VisPyVisuals.ShapeCollectionVisual._update() --> Data error. %s" % str(e))
-
-        # Updating meshes
-        for i, mesh in enumerate(self._meshes):
-            if len(mesh_vertices[i]) > 0:
-                set_state(polygon_offset_fill=False)
-                faces_array = np.asarray(mesh_tris[i], dtype=np.uint32)
-                mesh.set_data(
-                    vertices=np.asarray(mesh_vertices[i]),
-                    faces=faces_array.reshape((-1, 3)),
-                    face_colors=np.asarray(mesh_colors[i])
-                )
-            else:
-                mesh.set_data()
-
-            mesh._bounds_changed()
-
-        # Updating lines
-        for i, line in enumerate(self._lines):
-            if len(line_pts[i]) > 0:
-                line.visible = True
-                line.set_data(
-                    pos=np.asarray(line_pts[i]),
-                    color=np.asarray(line_colors[i]),
-                    width=self._line_width,
-                    connect='segments')
-            else:
-                # line.clear_data()
-                line.visible = False
+        # only the arenas of the level of detail that is drawn are uploaded, and only the rows that changed
+        for visual, arena in zip(self._arena_visuals, self._levels[self.lod]):
+            try:
+                if arena is not visual.arena or arena.changed:
+                    visual.line_width = self._line_width
+                    visual.upload(arena)
+            except Exception as e:
+                print("VisPyVisuals.ShapeCollectionVisual._update() --> Data error. %s" % str(e))
 
-            line._bounds_changed()
+        for instances in self._instances:
+            if instances.changed:
+                instances.line_width = self._line_width
+                instances.commit()
 
         self._bounds_changed()
         self.update_lock.release()
@@ -590,12 +1894,13 @@ class ShapeCollectionVisual(CompoundVisual):
         self.results_lock.acquire(True)
 
         for i in list(self.data.keys()) if not indexes else indexes:
-            if i in list(self.results.keys()):
+            if i in self.results:
                 try:
                     self.results[i].wait()                                  # Wait for process results
                     if i in self.data:
                         self.data[i] = self.results[i].get()[0]             # Store translated data
                         del self.results[i]
+                        self._mark_changed([i])
                 except Exception as e:
                     print("VisPyVisuals.ShapeCollectionVisual.redraw() --> Data error = %s. Indexes = %s" %
                           (str(e), str(indexes)))
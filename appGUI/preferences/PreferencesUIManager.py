@@ -58,6 +58,9 @@ class PreferencesUIManager(QtCore.QObject):
             "units_precision": self.ui.general_pref_form.general_app_group.precision_metric_entry,
             "global_graphic_engine": self.ui.general_pref_form.general_app_group.ge_radio,
             "global_graphic_engine_3d_no_mp": self.ui.general_pref_form.general_app_group.ge_comp_cb,
+            "global_graphic_engine_triangulation": self.ui.general_pref_form.general_app_group.tri_radio,
+            "global_graphic_engine_lod": self.ui.general_pref_form.general_app_group.lod_cb,
+            "global_graphic_engine_instancing": self.ui.general_pref_form.general_app_group.instancing_cb,
             "global_app_level": self.ui.general_pref_form.general_app_group.app_level_radio,
             "global_log_verbose": self.ui.general_pref_form.general_app_group.verbose_combo,
             "global_portable": self.ui.general_pref_form.general_app_group.portability_cb,
@@ -74,6 +77,7 @@ class PreferencesUIManager(QtCore.QObject):
             "global_process_number": self.ui.general_pref_form.general_app_group.process_number_sb,
             "global_tolerance": self.ui.general_pref_form.general_app_group.tol_entry,
 
+            "global_project_format": self.ui.general_pref_form.general_app_group.proj_format_radio,
             "global_compression_level": self.ui.general_pref_form.general_app_group.compress_spinner,
             "global_save_compressed": self.ui.general_pref_form.general_app_group.save_type_cb,
             "global_autosave": self.ui.general_pref_form.general_app_group.autosave_cb,
@@ -143,6 +147,7 @@ class PreferencesUIManager(QtCore.QObject):
             "gerber_def_zeros": self.ui.gerber_pref_form.gerber_gen_group.gerber_zeros_radio,
             "gerber_clean_apertures": self.ui.gerber_pref_form.gerber_gen_group.gerber_clean_cb,
             "gerber_extra_buffering": self.ui.gerber_pref_form.gerber_gen_group.gerber_extra_buffering,
+            "gerber_tiled_union": self.ui.gerber_pref_form.gerber_gen_group.tiled_union_cb,
             "gerber_plot_on_select": self.ui.gerber_pref_form.gerber_gen_group.gerber_plot_on_select_cb,
             "gerber_plot_fill": self.ui.gerber_pref_form.gerber_gen_group.fill_color_entry,
             "gerber_plot_line": self.ui.gerber_pref_form.gerber_gen_group.line_color_entry,
@@ -478,6 +483,7 @@ class PreferencesUIManager(QtCore.QObject):
             "tools_ncc_tipangle":        self.ui.plugin_eng_pref_form.tools_ncc_group.tipangle_entry,
             "tools_ncc_newdia":          self.ui.plugin_eng_pref_form.tools_ncc_group.newdia_entry,
             "tools_ncc_plotting":       self.ui.plugin_eng_pref_form.tools_ncc_group.plotting_radio,
+            "tools_ncc_parallel":       self.ui.plugin_eng_pref_form.tools_ncc_group.parallel_cb,
             "tools_ncc_check_valid":    self.ui.plugin_eng_pref_form.tools_ncc_group.valid_cb,
 
             # CutOut Tool
@@ -512,6 +518,7 @@ class PreferencesUIManager(QtCore.QObject):
             "tools_paint_connect":        self.ui.plugin_eng_pref_form.tools_paint_group.pathconnect_cb,
             "tools_paint_contour":       self.ui.plugin_eng_pref_form.tools_paint_group.contour_cb,
             "tools_paint_plotting":     self.ui.plugin_eng_pref_form.tools_paint_group.paint_plotting_radio,
+            "tools_paint_parallel":     self.ui.plugin_eng_pref_form.tools_paint_group.parallel_cb,
 
             "tools_paint_rest":          self.ui.plugin_eng_pref_form.tools_paint_group.rest_cb,
             "tools_paint_cutz":          self.ui.plugin_eng_pref_form.tools_paint_group.cutz_entry,
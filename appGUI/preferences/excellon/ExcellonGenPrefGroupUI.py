@@ -6,6 +6,7 @@ from PyQt6 import QtWidgets, QtCore, QtGui
 from appGUI.GUIElements import FCCheckBox, FCSpinner, RadioSet, FCSliderWithSpinner, FCColorEntry, FCLabel, \
     GLay, FCFrame, FCButton
 from appGUI.preferences.OptionsGroupUI import OptionsGroupUI
+from appCommon.PathOrdering import HAS_SCIPY
 
 import gettext
 import appTranslation as fcTranslate
@@ -239,6 +240,8 @@ class ExcellonGenPrefGroupUI(OptionsGroupUI):
               "MetaHeuristic Guided Local Path is used. Default search time is 3sec.\n"
               "- Basic -> Using Google OR-Tools Basic algorithm\n"
               "- TSA -> Using Travelling Salesman algorithm\n"
+              "- 2-Opt -> Nearest neighbour path improved with 2-Opt and Or-Opt moves.\n"
+              "Fast for many thousands of locations. Default search time is 3sec.\n"
               "\n"
               "Some options are disabled when the application works in 32bit mode.")
         )
@@ -248,7 +251,8 @@ class ExcellonGenPrefGroupUI(OptionsGroupUI):
                 {'label': _('Rtree'), 'value': 'R'},
                 {'label': _('MetaHeuristic'), 'value': 'M'},
                 {'label': _('Basic'), 'value': 'B'},
-                {'label': _('TSA'), 'value': 'T'}
+                {'label': _('TSA'), 'value': 'T'},
+                {'label': _('2-Opt'), 'value': 'L'}
             ], orientation='vertical', compact=True)
 
         opt_grid.addWidget(self.excellon_optimization_label, 0, 0)
@@ -257,7 +261,7 @@ class ExcellonGenPrefGroupUI(OptionsGroupUI):
         self.optimization_time_label = FCLabel('%s:' % _('Duration'))
         self.optimization_time_label.setAlignment(QtCore.Qt.AlignmentFlag.AlignLeft)
         self.optimization_time_label.setToolTip(
-            _("When OR-Tools Metaheuristic (MH) is enabled there is a\n"
+            _("When OR-Tools Metaheuristic (MH) or 2-Opt is enabled there is a\n"
               "maximum threshold for how much time is spent doing the\n"
               "path optimization. This max duration is set here.\n"
               "In seconds.")
@@ -370,6 +374,9 @@ class ExcellonGenPrefGroupUI(OptionsGroupUI):
         # call it once to make sure it is updated at startup
         self.on_update_exc_export(state=self.app.options["excellon_update"])
 
+        if not HAS_SCIPY:
+            self.excellon_optimization_radio.setOptionsDisabled([_('2-Opt')], True)
+
         self.excellon_optimization_radio.activated_custom.connect(self.optimization_selection)
 
     def optimization_selection(self, val):
@@ -381,7 +388,7 @@ class ExcellonGenPrefGroupUI(OptionsGroupUI):
                 self.excellon_optimization_radio.set_value('T')
                 self.excellon_optimization_radio.blockSignals(False)
 
-        if val == 'M':
+        if val in ['M', 'L']:
             self.optimization_time_label.setDisabled(False)
             self.optimization_time_entry.setDisabled(False)
         else:
@@ -6,6 +6,7 @@ from PyQt6.QtCore import QSettings
 from appGUI.GUIElements import RadioSet, FCSpinner, FCCheckBox, FCComboBox, FCButton, OptionalInputSection, \
     FCDoubleSpinner, FCLabel, GLay, RadioSetDefaults, FCFrame, FCComboBox2
 from appGUI.preferences.OptionsGroupUI import OptionsGroupUI
+from appGUI.VisPyTesselators import HAS_CDT
 
 import gettext
 import appTranslation as fcTranslate
@@ -82,7 +83,36 @@ class GeneralAppPrefGroupUI(OptionsGroupUI):
         self.ge_comp_cb.setToolTip(_("Check this if you have problems in 3D mode. Works only for 3D mode.\n"
                                      "It will disable performance mods but perhaps add more compatibility."))
 
-        grid1.addWidget(self.ge_comp_cb, 1, 0, 1, 2)
+        grid1.addWidget(self.ge_comp_cb, 1, 0)
+
+        self.lod_cb = FCCheckBox(_("Level of detail"))
+        self.lod_cb.setToolTip(_("Check this to draw the objects with less detail when they are zoomed out.\n"
+                                 "Simplified copies of the objects are made in the background. Works only for 3D mode.\n"
+                                 "After change, it will be applied at next App start."))
+
+        grid1.addWidget(self.lod_cb, 1, 1)
+
+        # Triangulation of the filled polygons
+        self.tri_label = FCLabel('%s:' % _('Triangulation'))
+        self.tri_label.setToolTip(_("The method used to split the filled polygons in triangles for the 3D mode.\n"
+                                    "GLU -> the OpenGL tessellator, one polygon at a time.\n"
+                                    "GEOS -> the polygons of an object are triangulated together, faster.\n"
+                                    "It needs Shapely 2.1 or newer.\n"
+                                    "After change, it will be applied at next App start."))
+        self.tri_radio = RadioSet([{'label': _('GLU'), 'value': 'glu'},
+                                   {'label': _('GEOS'), 'value': 'geos'}], compact=True)
+        if not HAS_CDT:
+            self.tri_radio.setOptionsDisabled([_('GEOS')], True)
+
+        grid1.addWidget(self.tri_label, 2, 0)
+        grid1.addWidget(self.tri_radio, 2, 1)
+
+        self.instancing_cb = FCCheckBox(_("Instancing"))
+        self.instancing_cb.setToolTip(_("Check this to draw the copies of a shape (drills, pads) with\n"
+                                        "OpenGL instancing. It needs OpenGL 3.3 and PyOpenGL. Works only for 3D mode.\n"
+                                        "After change, it will be applied at next App start."))
+
+        grid1.addWidget(self.instancing_cb, 3, 0, 1, 2)
 
         # separator_line = QtWidgets.QFrame()
         # separator_line.setFrameShape(QtWidgets.QFrame.Shape.HLine)
@@ -102,8 +132,8 @@ class GeneralAppPrefGroupUI(OptionsGroupUI):
         self.worker_number_sb = FCSpinner()
         self.worker_number_sb.set_range(2, 32)
 
-        grid1.addWidget(self.worker_number_label, 2, 0)
-        grid1.addWidget(self.worker_number_sb, 2, 1)
+        grid1.addWidget(self.worker_number_label, 4, 0)
+        grid1.addWidget(self.worker_number_sb, 4, 1)
 
         # Process Numbers
         self.process_number_label = FCLabel('%s:' % _('Process number'))
@@ -115,8 +145,8 @@ class GeneralAppPrefGroupUI(OptionsGroupUI):
         self.process_number_sb = FCSpinner()
         self.process_number_sb.set_range(2, 32)
 
-        grid1.addWidget(self.process_number_label, 4, 0)
-        grid1.addWidget(self.process_number_sb, 4, 1)
+        grid1.addWidget(self.process_number_label, 5, 0)
+        grid1.addWidget(self.process_number_sb, 5, 1)
 
         # Geometric tolerance
         tol_label = FCLabel('%s:' % _("Geo Tolerance"))
@@ -300,6 +330,20 @@ class GeneralAppPrefGroupUI(OptionsGroupUI):
 
         grid6.addWidget(self.save_type_cb, 0, 0, 1, 2)
 
+        # Project Format
+        self.proj_format_label = FCLabel('%s:' % _('Format'))
+        self.proj_format_label.setToolTip(
+            _("The format of the saved project files.\n"
+              "- Archive -> the objects are saved in separate chunks, with binary geometry.\n"
+              "It is faster to save and to load and it is verified with checksums.\n"
+              "- JSON -> a single JSON document, readable by older app versions.")
+        )
+        self.proj_format_radio = RadioSet([{'label': _('Archive'), 'value': 'archive'},
+                                           {'label': _('JSON'), 'value': 'json'}])
+
+        grid6.addWidget(self.proj_format_label, 1, 0)
+        grid6.addWidget(self.proj_format_radio, 1, 1)
+
         # Project LZMA Comppression Level
         self.compress_spinner = FCSpinner()
         self.compress_spinner.set_range(0, 9)
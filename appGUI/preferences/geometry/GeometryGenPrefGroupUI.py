@@ -3,6 +3,7 @@ from PyQt6 import QtGui
 
 from appGUI.GUIElements import FCCheckBox, FCSpinner, FCColorEntry, RadioSet, FCLabel, GLay, FCFrame
 from appGUI.preferences.OptionsGroupUI import OptionsGroupUI
+from appCommon.PathOrdering import HAS_SCIPY
 
 import platform
 
@@ -87,6 +88,8 @@ class GeometryGenPrefGroupUI(OptionsGroupUI):
               "MetaHeuristic Guided Local Path is used. Default search time is 3sec.\n"
               "- Basic -> Using Google OR-Tools Basic algorithm\n"
               "- TSA -> Using Travelling Salesman algorithm\n"
+              "- 2-Opt -> Nearest neighbour path improved with 2-Opt and Or-Opt moves.\n"
+              "Fast for many thousands of locations. Default search time is 3sec.\n"
               "\n"
               "Some options are disabled when the application works in 32bit mode.")
         )
@@ -97,6 +100,7 @@ class GeometryGenPrefGroupUI(OptionsGroupUI):
                 {'label': _('MetaHeuristic'), 'value': 'M'},
                 {'label': _('Basic'), 'value': 'B'},
                 {'label': _('TSA'), 'value': 'T'},
+                {'label': _('2-Opt'), 'value': 'L'},
                 {'label': _('None'), 'value': 'N'}
             ], orientation='vertical', compact=True)
 
@@ -105,7 +109,7 @@ class GeometryGenPrefGroupUI(OptionsGroupUI):
 
         self.optimization_time_label = FCLabel('%s:' % _('Duration'))
         self.optimization_time_label.setToolTip(
-            _("When OR-Tools Metaheuristic (MH) is enabled there is a\n"
+            _("When OR-Tools Metaheuristic (MH) or 2-Opt is enabled there is a\n"
               "maximum threshold for how much time is spent doing the\n"
               "path optimization. This max duration is set here.\n"
               "In seconds.")
@@ -180,6 +184,9 @@ class GeometryGenPrefGroupUI(OptionsGroupUI):
             self.optimization_time_label.setDisabled(True)
             self.optimization_time_entry.setDisabled(True)
 
+        if not HAS_SCIPY:
+            self.opt_algorithm_radio.setOptionsDisabled([_('2-Opt')], True)
+
         self.opt_algorithm_radio.activated_custom.connect(self.optimization_selection)
 
         # Setting plot colors signals
@@ -197,7 +204,7 @@ class GeometryGenPrefGroupUI(OptionsGroupUI):
                 self.opt_algorithm_radio.set_value('R')
                 self.opt_algorithm_radio.blockSignals(False)
 
-        if val == 'M':
+        if val in ['M', 'L']:
             self.optimization_time_label.setDisabled(False)
             self.optimization_time_entry.setDisabled(False)
         else:
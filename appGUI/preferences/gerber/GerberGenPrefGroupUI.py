@@ -163,6 +163,15 @@ class GerberGenPrefGroupUI(OptionsGroupUI):
         )
         param_grid.addWidget(self.gerber_extra_buffering, 2, 0, 1, 3)
 
+        # Tiled Union
+        self.tiled_union_cb = FCCheckBox(label='%s' % _('Tiled union'))
+        self.tiled_union_cb.setToolTip(
+            _("Will join the polygons while the file is parsed,\n"
+              "in tiles, instead of all at once at the end.\n"
+              "Uses less memory for big files (e.g. copper pours).")
+        )
+        param_grid.addWidget(self.tiled_union_cb, 3, 0, 1, 3)
+
         # Plot on Select
         self.gerber_plot_on_select_cb = FCCheckBox(label='%s' % _('Plot on Select'))
         self.gerber_plot_on_select_cb.setToolTip(
@@ -343,6 +343,15 @@ class ToolsNCCPrefGroupUI(OptionsGroupUI):
         gen_grid.addWidget(plotting_label, 8, 0)
         gen_grid.addWidget(self.plotting_radio, 8, 1)
 
+        # Parallel clearing
+        self.parallel_cb = FCCheckBox(label=_('Parallel'))
+        self.parallel_cb.setToolTip(
+            _("If checked, the polygons are cleared in parallel, in the worker processes.\n"
+              "It is not used with the 'Progressive' plotting.")
+        )
+
+        gen_grid.addWidget(self.parallel_cb, 9, 0, 1, 2)
+
         # Check Tool validity
         self.valid_cb = FCCheckBox(label=_('Check validity'))
         self.valid_cb.setToolTip(
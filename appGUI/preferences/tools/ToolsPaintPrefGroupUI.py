@@ -308,6 +308,15 @@ class ToolsPaintPrefGroupUI(OptionsGroupUI):
         gen_grid.addWidget(plotting_label, 8, 0)
         gen_grid.addWidget(self.paint_plotting_radio, 8, 1)
 
+        # Parallel clearing
+        self.parallel_cb = FCCheckBox(label=_('Parallel'))
+        self.parallel_cb.setToolTip(
+            _("If checked, the polygons are painted in parallel, in the worker processes.\n"
+              "It is not used with the 'Progressive' plotting.")
+        )
+
+        gen_grid.addWidget(self.parallel_cb, 10, 0, 1, 2)
+
         GLay.set_common_column_size([tool_grid, param_grid, gen_grid], 0)
 
         self.layout.addStretch(1)
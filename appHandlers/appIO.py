@@ -8,6 +8,8 @@ from appEditors.appGerberEditor import AppGerberEditor
 
 from appGUI.GUIElements import FCFileSaveDialog, FCMessageBox
 from camlib import to_dict, dict2obj, ET, ParseError
+from appCommon.ProjectArchive import is_project_archive, read_project, write_project, verify_project, \
+    has_geometry, apply_object_hook, load_geometry, resolve_geometry, read_save_id, options_checksum, ProjectJournal
 from appParsers.ParseHPGL2 import HPGL2
 
 from appObjects.ObjectCollection import GerberObject, ExcellonObject, GeometryObject, ScriptObject, CNCJobObject
@@ -71,6 +73,10 @@ class appIO(QtCore.QObject):
         self.app_units = self.app.app_units
         self.pagesize = {}
 
+        # the state of the saved project (options and order of the objects), compared by the autosave
+        self.saved_options_checksum = None
+        self.saved_order = None
+
         self.app.new_project_signal.connect(self.on_new_project_house_keeping)
 
     def on_file_open_gerber(self, name=None):
@@ -2521,8 +2527,24 @@ class appIO(QtCore.QObject):
                         self.inform.emit('[ERROR_NOTCL] %s: %s' % (_("Failed to open project file"), prj_filename))
                         return
 
+                if is_project_archive(prj_filename):
+                    f.close()
+
+                    # Open and parse a binary Project file (archive of per-object chunks)
+                    # the geometry chunks are read later, in the process pool, when the objects are restored
+                    try:
+                        d = read_project(prj_filename, object_hook=dict2obj, lazy=True)
+                    except Exception as e:
+                        self.log.error("Failed to open project file: %s with error: %s" % (prj_filename, str(e)))
+                        self.inform.emit('[ERROR_NOTCL] %s: %s' % (_("Failed to open project file"), prj_filename))
+                        return
+                else:
+                    d = None
+
+                # the geometry (WKT) is not parsed here but when the objects are restored, in the process pool
                 try:
-                    d = json.load(f, object_hook=dict2obj)
+                    if d is None:
+                        d = json.load(f)
                 except Exception as e:
                     self.log.debug(
                         "Failed to parse project file, trying to see if it loads as an LZMA archive: %s because %s" %
@@ -2533,7 +2555,7 @@ class appIO(QtCore.QObject):
                     try:
                         with lzma.open(prj_filename) as f:
                             file_content = f.read().decode('utf-8')
-                            d = json.loads(file_content, object_hook=dict2obj)
+                            d = json.loads(file_content)
                     except Exception as e:
                         self.log.error("Failed to open project file: %s with error: %s" % (prj_filename, str(e)))
                         self.inform.emit('[ERROR_NOTCL] %s: %s' % (_("Failed to open project file"), prj_filename))
@@ -2575,6 +2597,7 @@ class appIO(QtCore.QObject):
                         self.app.log.error("Legacy Project. Loading not supported.")
                         return
 
+                d['options'] = apply_object_hook(d['options'], dict2obj)
                 self.app.restore_project.emit(d, prj_filename, run_from_arg, from_tcl, cli, plot)
 
         self.app.worker_task.emit({'fcn': parse_worker, 'params': [project_filename]})
@@ -2627,12 +2650,99 @@ class appIO(QtCore.QObject):
         self.app.restore_project_objects_sig.emit(proj_dict, filename, cli, plot)
 
     def restore_project_objects(self, proj_dict, filename, cli, plot):
+        """
+        Re-create the objects of a loaded project.
+
+        The attributes that hold geometry are prepared in the process pool, one object per task, while the objects
+        are created. Until then, and until they are first used, these attributes are deferred (see
+        FlatCAMObj.set_lazy_attributes()) so the objects show in the Project tab without waiting for their geometry.
+        The visible objects are plotted, one at a time, after all the objects were created.
+
+        :param proj_dict:   the project, as read by open_project()
+        :type proj_dict:    dict
+        :param filename:    the project file
+        :type filename:     str
+        :param cli:         Run from command line
+        :param plot:        If True plot the visible objects in the project
+        :return:            None
+        """
+
+        def start_geometry_job(attrs, chunk):
+            try:
+                return self.app.pool.apply_async(load_geometry, (attrs, chunk))
+            except Exception as job_err:
+                self.app.log.debug("appIO.restore_project_objects() --> geometry loaded in the app: %s" % str(job_err))
+                return None
+
+        def restore_tools_keys(new_obj, app_inst):
+            # try to make the keys in the tools dictionary to be integers
+            # JSON serialization makes them strings
+            # not all FlatCAM objects have the 'tools' dictionary attribute
+            try:
+                new_obj.tools = {
+                    int(tool): tool_dict for tool, tool_dict in list(new_obj.tools.items())
+                }
+            except ValueError:
+                # for older loaded projects
+                new_obj.tools = {
+                    float(tool): tool_dict for tool, tool_dict in list(new_obj.tools.items())
+                }
+            except Exception as other_error_msg:
+                app_inst.log.error('appIO.open_project() keys to int--> ' + str(other_error_msg))
+                return 'fail'
+
+        def make_geometry_loader(attrs, chunk, job):
+            def loader(new_obj):
+                try:
+                    if job is not None:
+                        refs, geo_chunk = job.get()
+                    else:
+                        refs, geo_chunk = load_geometry(attrs, chunk)
+                    loaded_attrs = resolve_geometry(attrs if refs is None else refs, geo_chunk, dict2obj)
+                except Exception as loader_err:
+                    self.app.log.error('appIO.open_project() --> loading the geometry of %s failed: %s' %
+                                       (str(new_obj.obj_options['name']), str(loader_err)))
+                    self.inform.emit('[ERROR_NOTCL] %s: %s' % (_("Failed to load the geometry of"),
+                                                               str(new_obj.obj_options['name'])))
+                    # the empty values only keep the object usable; they are not saved (see failed_objects())
+                    new_obj.load_failed = True
+                    loaded_attrs = {attr: [] if attr != 'tools' else {} for attr in attrs}
+
+                # loading the attributes is not a change of the object
+                was_dirty = new_obj.dirty
+                for attr, value in loaded_attrs.items():
+                    setattr(new_obj, attr, value)
+                if 'tools' in loaded_attrs:
+                    restore_tools_keys(new_obj, self.app)
+                new_obj.dirty = was_dirty
+            return loader
+
+        def saved_bounds(obj_options):
+            try:
+                bounds = tuple(float(obj_options[k]) for k in ('xmin', 'ymin', 'xmax', 'ymax'))
+            except (KeyError, TypeError, ValueError):
+                return None
+            return bounds if all(np.isfinite(bounds)) else None
 
         def worker_task():
             with self.app.proc_container.new('%s' % _("Loading...")):
                 # Re-create objects
                 self.log.debug(" **************** Started PROEJCT loading... **************** ")
-                for obj in proj_dict['objs']:
+                objs = proj_dict['objs']
+                geometry_chunks = proj_dict.get('geometry_chunks') or [None] * len(objs)
+                project_ids = proj_dict.get('ids') or [None] * len(objs)
+
+                # start the preparation of the geometry for all the objects, one object per task
+                geometry_jobs = []
+                for obj, chunk in zip(objs, geometry_chunks):
+                    legacy = 'apertures' in obj or 'cnc_tools' in obj or 'exc_cnc_tools' in obj
+                    deferred = {} if legacy else {k: v for k, v in obj.items() if has_geometry(v)}
+                    # the attributes of the objects from a project archive already hold WKB references
+                    job = start_geometry_job(deferred if chunk is None else None, chunk) if deferred else None
+                    geometry_jobs.append((deferred, chunk, job))
+
+                created_objs = []
+                for obj_idx, (obj, (deferred, chunk, job)) in enumerate(zip(objs, geometry_jobs)):
                     try:
                         obj_name = obj['obj_options']['name']
                     except KeyError:
@@ -2641,9 +2751,19 @@ class appIO(QtCore.QObject):
                     self.app.log.debug(
                         f"Recreating from opened project an {obj['kind'].capitalize()} object: {obj_name}")
 
+                    if not deferred and chunk is None:
+                        # the older projects are loaded at once, so they can be converted below
+                        obj = apply_object_hook(obj, dict2obj)
+
                     def obj_init(new_obj, app_inst):
+                        if deferred:
+                            obj_options = obj.get('obj_options', obj.get('options', {}))
+                            new_obj.set_lazy_attributes(list(deferred.keys()),
+                                                        make_geometry_loader(deferred, chunk, job),
+                                                        bounds=saved_bounds(obj_options))
                         try:
-                            new_obj.from_dict(obj)
+                            new_obj.from_dict({k: apply_object_hook(v, dict2obj) for k, v in obj.items()
+                                               if k not in deferred})
                         except Exception as except_error:
                             app_inst.log.error('appIO.open_project() --> ' + str(except_error))
                             return 'fail'
@@ -2679,20 +2799,8 @@ class appIO(QtCore.QObject):
                         # #############################################################################################
                         # #############################################################################################
 
-                        # try to make the keys in the tools dictionary to be integers
-                        # JSON serialization makes them strings
-                        # not all FlatCAM objects have the 'tools' dictionary attribute
-                        try:
-                            new_obj.tools = {
-                                int(tool): tool_dict for tool, tool_dict in list(new_obj.tools.items())
-                            }
-                        except ValueError:
-                            # for older loaded projects
-                            new_obj.tools = {
-                                float(tool): tool_dict for tool, tool_dict in list(new_obj.tools.items())
-                            }
-                        except Exception as other_error_msg:
-                            app_inst.log.error('appIO.open_project() keys to int--> ' + str(other_error_msg))
+                        # the tools of the lazy objects are converted when they are loaded
+                        if 'tools' not in deferred and restore_tools_keys(new_obj, app_inst) == 'fail':
                             return 'fail'
 
                         # #############################################################################################
@@ -2709,6 +2817,14 @@ class appIO(QtCore.QObject):
                             # CNCJob.set_ui()
                             new_obj.is_loaded_from_project = True
 
+                        # the object is as saved in the project, so the autosave journal can skip it
+                        if project_ids[obj_idx] is not None:
+                            new_obj.project_id = project_ids[obj_idx]
+                        new_obj.dirty = False
+
+                    # only the last object is selected; selecting an object loads its geometry for the UI
+                    autoselected = obj_idx == len(objs) - 1
+
                     # for some reason, setting ui_title does not work when this method is called from Tcl Shell
                     # it's because the TclCommand is run in another thread (it inherits TclCommandSignaled)
                     try:
@@ -2716,21 +2832,26 @@ class appIO(QtCore.QObject):
                             self.app.ui.set_ui_title(name="{} {}: {}".format(
                                 _("Loading Project ... restoring"), obj['kind'].upper(), obj_name))
 
-                        ret = self.app.app_obj.new_object(obj['kind'], obj['obj_options']['name'], obj_init, plot=plot)
+                        ret = self.app.app_obj.new_object(obj['kind'], obj['obj_options']['name'], obj_init,
+                                                          plot=False, autoselected=autoselected)
                     except KeyError:
                         # allowance for older projects
                         if cli is None:
                             self.app.ui.set_ui_title(name="{} {}: {}".format(
                                 _("Loading Project ... restoring"), obj['kind'].upper(), obj_name))
                         try:
-                            ret = self.app.app_obj.new_object(obj['kind'], obj_name, obj_init, plot=plot)
+                            ret = self.app.app_obj.new_object(obj['kind'], obj_name, obj_init, plot=False,
+                                                              autoselected=autoselected)
                         except Exception:
                             continue
                     if ret == 'fail':
                         continue
+                    created_objs.append(ret)
 
                 self.inform.emit('[success] %s: %s' % (_("Project loaded from"), filename))
 
+                self.saved_options_checksum = None
+                self.saved_order = [new_obj.project_id for new_obj in created_objs]
                 self.app.should_we_save = False
                 self.app.file_opened.emit("project", filename)
 
@@ -2742,6 +2863,14 @@ class appIO(QtCore.QObject):
                 if cli is None:
                     self.app.ui.set_ui_title(name=self.app.project_filename)
 
+                # plot the visible objects, one task for each, now that the Project tab is complete; the hidden
+                # objects load their geometry when they are first used
+                if plot:
+                    for new_obj in created_objs:
+                        if new_obj.obj_options.get('plot', True) and new_obj.kind in \
+                                ['gerber', 'excellon', 'geometry', 'cncjob']:
+                            self.app.worker_task.emit({'fcn': self.app.app_obj.plotting_task, 'params': [new_obj]})
+
                 self.log.debug(" **************** Finished PROJECT loading... **************** ")
 
         self.app.worker_task.emit({'fcn': worker_task, 'params': []})
@@ -2774,13 +2903,73 @@ class appIO(QtCore.QObject):
                 self.log.error("save_project() --> There was no active object. Skipping read_form. %s" % str(e))
 
             app_options = {k: v for k, v in self.app.options.items()}
+            project_objs = self.app.collection.get_list()
+
+            # the geometry that failed to load would be saved empty, over the one in the project file
+            failed_objs = self.failed_objects(project_objs, load=True)
+            if failed_objs:
+                self.log.error("appIO.save_project() -> The geometry of these objects failed to load: %s. "
+                               "Project not saved." % ', '.join(failed_objs))
+                self.inform.emit('[ERROR_NOTCL] %s: %s' % (_("Project not saved. Failed to load the geometry of"),
+                                                           ', '.join(failed_objs)))
+                self.app.save_in_progress = False
+                return
+
+            def objs_to_dict():
+                for project_obj in project_objs:
+                    # the change flag is cleared before the object is serialized so a change made meanwhile is kept
+                    project_obj.dirty = False
+                    yield project_obj.to_dict()
+
+            # the project archive serializes the objects one at a time, as they are written
+            objs_dicts = objs_to_dict()
+            if self.options["global_project_format"] != 'archive':
+                objs_dicts = list(objs_dicts)
             d = {
-                "objs":             [obj.to_dict() for obj in self.app.collection.get_list()],
+                "objs":             objs_dicts,
                 "options":          app_options,
                 "version":          self.app.version
             }
 
-            if self.options["global_save_compressed"] is True:
+            if self.options["global_project_format"] == 'archive':
+                compresslevel = int(self.options['global_compression_level']) if \
+                    self.options["global_save_compressed"] is True else None
+                try:
+                    write_project(filename, d["objs"], d["options"], d["version"], default=to_dict,
+                                  compresslevel=compresslevel, ids=[obj.project_id for obj in project_objs])
+                except Exception as e:
+                    self.log.error("Failed to save project file: %s because: %s" % (str(filename), str(e)))
+                    self.inform.emit('[ERROR_NOTCL] %s' % _("Failed."))
+                    for project_obj in project_objs:
+                        project_obj.dirty = True
+                    self.app.save_in_progress = False
+                    return
+
+                # verification of the saved project, with the checksums of its chunks
+                try:
+                    bad_chunks = verify_project(filename)
+                except Exception as e:
+                    self.log.error("Failed to verify project file: %s because: %s" % (str(filename), str(e)))
+                    bad_chunks = [filename]
+
+                if bad_chunks:
+                    self.log.error("Failed to verify project file: %s. Damaged chunks: %s" %
+                                   (str(filename), ', '.join(bad_chunks)))
+                    if silent is False:
+                        self.inform.emit('[ERROR_NOTCL] %s: %s %s' %
+                                         (_("Failed to verify project file"), str(filename), _("Retry to save it.")))
+                    for project_obj in project_objs:
+                        project_obj.dirty = True
+                    self.app.save_in_progress = False
+                    return
+
+                # what the autosave journal compares with
+                self.saved_options_checksum = options_checksum(app_options, default=to_dict)
+                self.saved_order = [obj.project_id for obj in project_objs]
+
+                if silent is False:
+                    self.inform.emit('[success] %s: %s' % (_("Project saved to"), str(filename)))
+            elif self.options["global_save_compressed"] is True:
                 try:
                     project_as_json = json.dumps(d, default=to_dict, indent=2, sort_keys=True).encode('utf-8')
                 except Exception as e:
@@ -2883,6 +3072,95 @@ class appIO(QtCore.QObject):
             # t.start()
             self.app.start_delayed_quit(delay=500, filename=filename, should_quit=quit_action)
 
+    @staticmethod
+    def failed_objects(project_objs, load=False):
+        """
+        :param project_objs:    the objects of the project
+        :type project_objs:     list
+        :param load:            if True load first the deferred attributes of the objects, to know if they fail
+        :type load:             bool
+        :return:                the names of the objects whose deferred attributes failed to load
+        :rtype:                 list
+        """
+        if load:
+            for obj in project_objs:
+                obj.load_lazy_attributes()
+        return [str(obj.obj_options['name']) for obj in project_objs if obj.load_failed]
+
+    def autosave_project(self, filename):
+        """
+        Autosaves the project. Only the objects that changed since the project was saved are written, in the journal
+        of the project archive. The journal is compacted into the project file (a full save) when it grows larger
+        than the project file.
+        Projects saved as JSON are saved in full, every time.
+
+        :param filename:        Name of the project file.
+        :type filename:         str
+        :return:                None
+        """
+        if self.options["global_project_format"] != 'archive' or not is_project_archive(filename):
+            self.save_project(filename, silent=True)
+            return
+
+        journal = ProjectJournal(filename)
+        save_id = read_save_id(filename)
+        if journal.exists() and journal.base_save_id() != save_id:
+            # the journal was started for another save of the archive (the archive was replaced or saved by another
+            # session); it is ignored when the project is read, so the changes would be lost
+            self.log.debug("appIO.autosave_project() -> The project journal belongs to another save. Full save.")
+            self.save_project(filename, silent=True)
+            return
+        project_objs = self.app.collection.get_list()
+        # the compaction would be refused (see save_project()); the journal keeps the objects that failed to load
+        # as they are in the project file
+        if journal.size() > max(os.path.getsize(filename), 1048576) and not self.failed_objects(project_objs):
+            self.log.debug("appIO.autosave_project() -> Compacting the project journal.")
+            self.save_project(filename, silent=True)
+            return
+
+        self.app.save_in_progress = True
+
+        dirty_objs = [obj for obj in project_objs if obj.dirty]
+        order = [obj.project_id for obj in project_objs]
+        app_options = {k: v for k, v in self.app.options.items()}
+        checksum = options_checksum(app_options, default=to_dict)
+
+        if not dirty_objs and order == self.saved_order and checksum == self.saved_options_checksum:
+            self.app.save_in_progress = False
+            return
+
+        def changed_objects():
+            for obj in dirty_objs:
+                obj.load_lazy_attributes()
+                if obj.load_failed:
+                    # not written: the object is replayed as it is in the project file
+                    self.log.debug("appIO.autosave_project() -> The geometry of %s failed to load. Not written." %
+                                   str(obj.obj_options['name']))
+                    continue
+                # the change flag is cleared before the object is serialized so a change made meanwhile is kept
+                obj.dirty = False
+                yield obj.project_id, obj.to_dict()
+
+        try:
+            if not journal.exists():
+                journal.start(save_id)
+            nr_objects = journal.append(changed_objects(),
+                                        app_options if checksum != self.saved_options_checksum else None,
+                                        order, self.app.version, default=to_dict)
+        except Exception as e:
+            self.log.error("Failed to autosave the project: %s because: %s" % (str(filename), str(e)))
+            self.inform.emit('[ERROR_NOTCL] %s' % _("Failed."))
+            for obj in dirty_objs:
+                obj.dirty = True
+            self.app.save_in_progress = False
+            return
+
+        self.saved_options_checksum = checksum
+        self.saved_order = order
+        self.app.save_in_progress = False
+        self.log.debug("appIO.autosave_project() -> %d changed objects written to the journal: %s" %
+                       (nr_objects, journal.filename))
+
     def save_source_file(self, obj_name, filename):
         """
         Exports a FlatCAM Object to a Gerber/Excellon file.
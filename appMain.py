@@ -73,6 +73,7 @@ from appCommon.Common import color_variant
 from appCommon.Common import ExclusionAreas
 from appCommon.Common import AppLogging
 from appCommon.RegisterFileKeywords import RegisterFK, Extensions, KeyWords
+from appCommon.GeometryArray import GeometryArray
 
 from appHandlers.appIO import appIO
 from appHandlers.appEdit import appEditor
@@ -6220,7 +6221,12 @@ class App(QtCore.QObject):
                     # it's a line without area
                     if obj.obj_options['xmin'] == obj.obj_options['xmax'] or \
                             obj.obj_options['ymin'] == obj.obj_options['ymax']:
-                        poly_obj = unary_union(obj.solid_geometry).buffer(0.001)
+                        if sel_type is False and isinstance(obj.solid_geometry, GeometryArray):
+                            # the 'touch' selection needs only the geometry that is in the selection area
+                            poly_obj = unary_union(
+                                obj.solid_geometry.query(poly_selection, predicate='intersects')).buffer(0.001)
+                        else:
+                            poly_obj = unary_union(obj.solid_geometry).buffer(0.001)
                     # it's a geometry with area
                     else:
                         poly_obj = Polygon([(obj.obj_options['xmin'], obj.obj_options['ymin']),
@@ -7787,11 +7793,19 @@ class App(QtCore.QObject):
         Called periodically to save the project.
         It will save if there is no block on the save, if the project was saved at least once and if there is no save in
         # progress.
+        A project saved as archive is saved incrementally: only the changed objects are written, in its journal.
 
         :return:
         """
 
-        if self.block_autosave is False and self.should_we_save is True and self.save_in_progress is False:
+        if self.block_autosave is True or self.save_in_progress is True:
+            return
+
+        if self.project_filename is not None and self.options["global_project_format"] == 'archive':
+            if self.should_we_save is True or any(obj.dirty for obj in self.collection.get_list()):
+                self.worker_task.emit({'fcn': self.f_handlers.autosave_project, 'params': [self.project_filename]})
+                self.should_we_save = False
+        elif self.should_we_save is True:
             self.f_handlers.on_file_save_project()
 
     def save_project_auto_update(self):
@@ -350,34 +350,42 @@ class AppObject(QtCore.QObject):
         else:
             self.app.collection.set_all_inactive()
 
-        # here it is done the object plotting
-        def plotting_task(t_obj):
-            with self.app.proc_container.new('%s ...' % _("Plotting")):
-                if t_obj.kind == 'cncjob':
-                    t_obj.plot(kind=self.app.options["cncjob_plot_kind"])
-                elif t_obj.kind == 'gerber':
-                    t_obj.plot(color=t_obj.outline_color, face_color=t_obj.fill_color)
-                else:
-                    t_obj.plot()
-
-                t1 = time.time()  # DEBUG
-                msg = "%f seconds adding object and plotting." % (t1 - t0)
-                self.app.log.debug(msg)
-                self.object_plotted.emit(t_obj)
-
-                if t_obj.kind == 'gerber' and self.app.options["gerber_buffering"] != 'full' and \
-                        self.app.options["gerber_delayed_buffering"]:
-                    t_obj.do_buffer_signal.emit()
-
         # Send to worker
         # self.worker.add_task(worker_task, [self])
         if plot is True:
-            self.app.worker_task.emit({'fcn': plotting_task, 'params': [obj]})
+            self.app.worker_task.emit({'fcn': self.plotting_task, 'params': [obj, t0]})
 
         if callback is not None:
             # callback(*callback_params)
             self.app.worker_task.emit({'fcn': callback, 'params': callback_params})
 
+    def plotting_task(self, t_obj, t0=None):
+        """
+        Plot an object. Meant to run in a worker thread.
+
+        :param t_obj:   the object to plot
+        :param t0:      the time when the object was created, used to log the time spent until it was plotted
+        :type t0:       float | None
+        :return:        None
+        """
+        with self.app.proc_container.new('%s ...' % _("Plotting")):
+            if t_obj.kind == 'cncjob':
+                t_obj.plot(kind=self.app.options["cncjob_plot_kind"])
+            elif t_obj.kind == 'gerber':
+                t_obj.plot(color=t_obj.outline_color, face_color=t_obj.fill_color)
+            else:
+                t_obj.plot()
+
+            if t0 is not None:
+                t1 = time.time()  # DEBUG
+                msg = "%f seconds adding object and plotting." % (t1 - t0)
+                self.app.log.debug(msg)
+            self.object_plotted.emit(t_obj)
+
+            if t_obj.kind == 'gerber' and self.app.options["gerber_buffering"] != 'full' and \
+                    self.app.options["gerber_delayed_buffering"]:
+                t_obj.do_buffer_signal.emit()
+
     def on_object_changed(self, obj):
         """
         Called whenever the geometry of the object was changed in some way.
@@ -388,6 +396,9 @@ class AppObject(QtCore.QObject):
         :return: None
         """
 
+        # the object has to be saved again
+        obj.dirty = True
+
         try:
             xmin, ymin, xmax, ymax = obj.bounds()
         except TypeError:
@@ -20,9 +20,14 @@ from appGUI.VisPyVisuals import ShapeCollection
 from shapely.ops import unary_union
 from shapely import Polygon, MultiPolygon, Point, LineString
 
+from camlib import transform_bounds
+
 from copy import deepcopy, copy
+import numpy as np
 import sys
 import math
+import uuid
+import threading
 import inspect
 
 import gettext
@@ -73,6 +78,16 @@ class FlatCAMObj(QtCore.QObject):
 
         QtCore.QObject.__init__(self)
 
+        # identifies the object in the saved project (and in its autosave journal)
+        self.project_id = uuid.uuid4().hex
+        # a new object has to be saved
+        self._dirty = True
+        # guards the deferred attributes (see set_lazy_attributes())
+        self._lazy_lock = threading.RLock()
+        # set when the deferred attributes could not be loaded: what the object holds is not its geometry and it
+        # must not be saved over the one in the project file
+        self.load_failed = False
+
         # View
         self.ui = None
 
@@ -145,6 +160,9 @@ class FlatCAMObj(QtCore.QObject):
         """
 
         for attr in self.ser_attrs:
+            # the deferred attributes are set by their loader
+            if not self.is_loaded and attr in self._lazy_names:
+                continue
 
             if attr == 'options':
                 self.obj_options.update(d[attr])
@@ -157,6 +175,156 @@ class FlatCAMObj(QtCore.QObject):
                                        "have all attributes in the latest application version." % str(attr))
                     pass
 
+    def __setattr__(self, name, value):
+        # a deferred attribute is loaded first, otherwise its loader would overwrite the new value
+        if name in self.__dict__.get('_lazy_names', ()) and not self.is_loaded:
+            self.load_lazy_attributes()
+
+        # a new value for a serialized attribute means the object has to be saved again
+        if name in self.__dict__.get('ser_attrs', ()):
+            old_value = self.__dict__.get(name)
+            if old_value is not value and (not isinstance(value, (str, int, float, bool)) or old_value != value):
+                self.__dict__['_dirty'] = True
+        super().__setattr__(name, value)
+
+    @property
+    def dirty(self):
+        """
+        :return:    True if the object changed since it was last saved: a serialized attribute was set, an option
+                    changed or the app reported a change of the object (AppObject.on_object_changed())
+        :rtype:     bool
+        """
+        obj_options = self.__dict__.get('obj_options')
+        return self.__dict__.get('_dirty', True) or bool(getattr(obj_options, 'modified', False))
+
+    @dirty.setter
+    def dirty(self, state):
+        self.__dict__['_dirty'] = state
+        if state is False and isinstance(self.__dict__.get('obj_options'), LoudDict):
+            self.obj_options.modified = False
+
+    def set_lazy_attributes(self, names, loader, bounds=None):
+        """
+        Defer some attributes (usually the ones that hold geometry) until they are first used. The attributes are
+        removed from the object; reading any of them calls the loader, once, which must set all of them.
+        The values removed are set back just before the loader is called. If some attributes are already deferred,
+        their loader is called first.
+
+        :param names:   names of the deferred attributes
+        :type names:    list
+        :param loader:  function called with this object as parameter
+        :type loader:   function
+        :param bounds:  (xmin, ymin, xmax, ymax) returned by bounds() until the attributes are loaded; None to
+                        load the attributes when the bounds are needed
+        :type bounds:   tuple | None
+        :return:        None
+        """
+        with self._lazy_lock:
+            previous_loader = self.__dict__.get('_lazy_loader')
+            previous_names = self.__dict__.get('_lazy_names', set()) if previous_loader is not None else set()
+            values = {name: self.__dict__.pop(name) for name in names if name in self.__dict__}
+
+            def chained_loader(obj):
+                obj.__dict__.update(values)
+                if previous_loader is not None:
+                    previous_loader(obj)
+                loader(obj)
+
+            self._lazy_bounds = bounds
+            self._lazy_loader = chained_loader
+            self._lazy_names = previous_names | set(names)
+
+    @property
+    def is_loaded(self):
+        """
+        :return:    False while there are deferred attributes that were not loaded
+        :rtype:     bool
+        """
+        return self.__dict__.get('_lazy_loader') is None
+
+    def load_lazy_attributes(self):
+        """
+        Load the deferred attributes, if they were not loaded yet. Thread safe.
+
+        :return:    None
+        """
+        if self.is_loaded:
+            return
+        with self._lazy_lock:
+            loader = self._lazy_loader
+            if loader is None:
+                return
+            # the loader runs only once, even if it fails
+            self._lazy_loader = None
+            self._lazy_bounds = None
+            # loading what was deferred is not a change of the object
+            dirty = self.__dict__.get('_dirty', True)
+            try:
+                loader(self)
+            finally:
+                self.__dict__['_dirty'] = dirty
+
+    def transform(self, matrix, size_factor=1.0):
+        """
+        Transform the geometry of the object with an affine matrix. The transformation is not applied now: it is
+        composed with the pending one and the geometry is transformed (apply_affine()), in one pass, only when it
+        is first used. Until then the bounds are transformed, when they can be known without the geometry.
+
+        :param matrix:      3x3 affine matrix
+        :type matrix:       np.ndarray
+        :param size_factor: factor for the sizes of the tools (apertures), when they are scaled with the geometry
+        :type size_factor:  float
+        :return:            None
+        """
+        with self._lazy_lock:
+            if self.__dict__.get('_pending_affine') is None:
+                try:
+                    base_bounds = self.bounds()
+                except Exception:
+                    base_bounds = None
+                self._pending_affine = np.identity(3)
+                self._pending_size_factor = 1.0
+                self._pending_bounds = base_bounds
+                self.set_lazy_attributes(self.affine_attrs, FlatCAMObj.apply_pending_affine)
+
+            self._pending_affine = np.dot(matrix, self._pending_affine)
+            self._pending_size_factor *= size_factor
+            # the drills are made again with the same diameter so their bounds are known only if the size is kept
+            self._lazy_bounds = transform_bounds(self._pending_bounds, self._pending_affine,
+                                                 rigid=self.kind == 'excellon')
+            self.dirty = True
+
+    @staticmethod
+    def apply_pending_affine(obj):
+        """
+        Loader of the attributes deferred by transform(): applies the composed transformation.
+
+        :param obj: the object with the pending transformation
+        :type obj:  FlatCAMObj
+        :return:    None
+        """
+        matrix = obj.__dict__.pop('_pending_affine', None)
+        size_factor = obj.__dict__.pop('_pending_size_factor', 1.0)
+        obj.__dict__.pop('_pending_bounds', None)
+        if matrix is not None:
+            obj.apply_affine(matrix, size_factor=size_factor)
+
+    def __getattr__(self, name):
+        # called only when the attribute is not found the usual way
+        if name in self.__dict__.get('_lazy_names', ()):
+            self.load_lazy_attributes()
+            try:
+                return self.__dict__[name]
+            except KeyError:
+                pass
+        raise AttributeError("'%s' object has no attribute '%s'" % (type(self).__name__, name))
+
+    def bounds(self, *args, **kwargs):
+        lazy_bounds = self.__dict__.get('_lazy_bounds')
+        if lazy_bounds is not None and not self.is_loaded:
+            return lazy_bounds
+        return super().bounds(*args, **kwargs)
+
     def on_options_change(self, key):
         # Update form on programmatically options change
         self.set_form_item(key)
@@ -200,6 +368,38 @@ class FlatCAMObj(QtCore.QObject):
             key = self.shapes.add(tolerance=tol, **kwargs)
         return key
 
+    def add_shapes(self, **kwargs):
+        """
+        Adds many shapes at once (see ShapeCollection.add_many()).
+
+        :param kwargs:  shapes (a list of Shapely geometry) and the other arguments of add_shape(); color and
+                        face_color can be lists with a color for each shape
+        :return:        list of the shape keys
+        """
+        tol = kwargs.pop('tolerance') if 'tolerance' in kwargs else self.drawing_tolerance
+
+        if self.deleted:
+            raise ObjectDeleted()
+        else:
+            keys = self.shapes.add_many(tolerance=tol, **kwargs)
+        return keys
+
+    def add_instanced_shapes(self, **kwargs):
+        """
+        Adds many shapes at once, like add_shapes(); the shapes that are copies of one another (drills, pads) are
+        drawn as copies of one shape (see ShapeCollection.add_many_instanced()).
+
+        :param kwargs:  shapes (a list of Shapely geometry) and the other arguments of add_shape()
+        :return:        list of the shape keys
+        """
+        tol = kwargs.pop('tolerance') if 'tolerance' in kwargs else self.drawing_tolerance
+
+        if self.deleted:
+            raise ObjectDeleted()
+        else:
+            keys = self.shapes.add_many_instanced(tolerance=tol, **kwargs)
+        return keys
+
     def add_mark_shape(self, **kwargs):
         tol = kwargs['tolerance'] if 'tolerance' in kwargs else self.drawing_tolerance
 
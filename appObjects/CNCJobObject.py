@@ -16,14 +16,13 @@ from appEditors.appTextEditor import AppTextEditor
 from appObjects.AppObjectTemplate import FlatCAMObj, ObjectDeleted
 from appGUI.GUIElements import FCFileSaveDialog, FCCheckBox
 from appGUI.ObjectUI import CNCObjectUI
-from camlib import CNCjob
+from camlib import CNCjob, GCodeWriter
 
 import os
 import sys
 import math
 import re
 
-from io import StringIO
 from datetime import datetime as dt
 from copy import deepcopy
 
@@ -576,7 +575,7 @@ class CNCJobObject(FlatCAMObj, CNCjob):
 
         # set the Source File attribute with the calculated GCode
         try:
-            # gc is StringIO
+            # gc is a GCodeWriter
             self.source_file = gc.getvalue()
         except AttributeError:
             # gc is text
@@ -751,14 +750,9 @@ class CNCJobObject(FlatCAMObj, CNCjob):
 
         try:
             force_windows_line_endings = self.app.options['cncjob_line_ending']
-            if force_windows_line_endings and sys.platform != 'win32':
-                with open(filename, 'w', newline='\r\n') as f:
-                    for line in self.source_file:
-                        f.write(line)
-            else:
-                with open(filename, 'w') as f:
-                    for line in self.source_file:
-                        f.write(line)
+            newline = '\r\n' if force_windows_line_endings and sys.platform != 'win32' else None
+            with open(filename, 'w', newline=newline) as f, GCodeWriter(sink=f) as writer:
+                writer.write(self.source_file)
         except FileNotFoundError:
             self.app.inform.emit('[WARNING_NOTCL] %s' % _("No such file or directory"))
             return
@@ -994,7 +988,7 @@ class CNCJobObject(FlatCAMObj, CNCjob):
         :param to_file:     if False then no actual file is saved but the app will know that a file was created
         :param from_tcl:    True if run from Tcl Shell
         :param glob_gcode:  Passing an object attribute that is used to hold GCode; string
-        :return:            None
+        :return:            None, 'fail' or, if to_file is True, a GCodeWriter holding the G-Code
         """
 
         global_gcode = self.gcode if glob_gcode == '' else glob_gcode
@@ -1065,59 +1059,36 @@ class CNCJobObject(FlatCAMObj, CNCjob):
                 # when self.tools is empty - old projects
                 include_header = self.app.preprocessors['default'].include_header
 
-        gcode = ''
+        # the G-Code is assembled as a list of chunks which are written one after another, so the (possibly huge)
+        # G-Code of the tools is not copied again into a single string just to be saved
+        gcode = []
 
-        if include_header is False:
-            # detect if using multi-tool and make the Gcode summation correctly for each case
-            if self.multitool is True:
-                try:
-                    if self.obj_options['type'].lower() == 'geometry':
-                        for tooluid_key in self.tools:
-                            for key, value in self.tools[tooluid_key].items():
-                                if key == 'gcode':
-                                    gcode += value
-                                    break
-                except TypeError:
-                    pass
-            else:
-                gcode += global_gcode
-
-            # g = sstart_code + '\n' + preamble + '\n' + gcode + '\n' + postamble
-            g = ''
-            end_gcode = self.gcode_footer() if self.app.options['cncjob_footer'] is True else ''
-            if preamble != '' and postamble != '':
-                g = start_code + '\n' + preamble + '\n' + gcode + '\n' + postamble + '\n' + end_gcode
-            if preamble == '':
-                g = start_code + '\n' + gcode + '\n' + postamble + '\n' + end_gcode
-            if postamble == '':
-                g = start_code + '\n' + preamble + '\n' + gcode + '\n' + end_gcode
-            if preamble == '' and postamble == '':
-                g = start_code + '\n' + gcode + '\n' + end_gcode
+        # detect if using multi-tool and make the Gcode summation correctly for each case
+        if self.multitool is True:
+            # for the case that self.tools is empty: old projects
+            try:
+                if include_header is not False or self.obj_options['type'].lower() == 'geometry':
+                    for tooluid_key in self.tools:
+                        tool_gcode = self.tools[tooluid_key].get('gcode')
+                        if tool_gcode:
+                            gcode.append(tool_gcode)
+            except TypeError:
+                pass
         else:
-            # detect if using multi-tool and make the Gcode summation correctly for each case
-            if self.multitool is True:
-                # for the case that self.tools is empty: old projects
-                try:
-                    if self.obj_options['type'].lower() == 'excellon':
-                        for tooluid_key in self.tools:
-                            for key, value in self.tools[tooluid_key].items():
-                                if key == 'gcode' and value:
-                                    gcode += value
-                                    break
-                    else:
-                        # it's made from a Geometry object
-                        for tooluid_key in self.tools:
-                            for key, value in self.tools[tooluid_key].items():
-                                if key == 'gcode' and value:
-                                    gcode += value
-                                    break
-                except TypeError:
-                    pass
-            else:
-                gcode += global_gcode
+            gcode.append(global_gcode)
 
-            end_gcode = self.gcode_footer() if self.app.options['cncjob_footer'] is True else ''
+        end_gcode = self.gcode_footer() if self.app.options['cncjob_footer'] is True else ''
 
+        if include_header is False:
+            # g = start_code + '\n' + preamble + '\n' + gcode + '\n' + postamble + '\n' + end_gcode
+            g = [start_code, '\n']
+            if preamble != '':
+                g += [preamble, '\n']
+            g += gcode + ['\n']
+            if postamble != '':
+                g += [postamble, '\n']
+            g.append(end_gcode)
+        else:
             # detect if using a HPGL preprocessor
             hpgl = False
             # for the case that self.tools is empty: old projects
@@ -1138,49 +1109,39 @@ class CNCJobObject(FlatCAMObj, CNCjob):
                 hpgl = False
 
             if hpgl:
-                processed_body_gcode = ''
+                processed_body_gcode = []
                 pa_re = re.compile(r"^PA\s*(-?\d+\.\d*),?\s*(-?\d+\.\d*)*;?$")
 
                 # process body gcode
-                for gline in gcode.splitlines():
+                for gline in ''.join(gcode).splitlines():
                     match = pa_re.search(gline)
                     if match:
                         x_int = int(float(match.group(1)))
                         y_int = int(float(match.group(2)))
-                        new_line = 'PA%d,%d;\n' % (x_int, y_int)
-                        processed_body_gcode += new_line
+                        processed_body_gcode.append('PA%d,%d;\n' % (x_int, y_int))
                     else:
-                        processed_body_gcode += gline + '\n'
+                        processed_body_gcode.append(gline + '\n')
 
-                gcode = processed_body_gcode
-                g = self.gc_header + '\n' + start_code + '\n' + preamble + '\n' + \
-                    gcode + '\n' + postamble + end_gcode
+                g = [self.gc_header, '\n', start_code, '\n', preamble, '\n'] + processed_body_gcode + \
+                    ['\n', postamble, end_gcode]
             else:
-                g = ''
-                if preamble != '' and postamble != '':
-                    g = self.gc_header + start_code + '\n' + preamble + '\n' + gcode + '\n' + \
-                        postamble + '\n' + end_gcode
-                if preamble == '':
-                    g = self.gc_header + start_code + '\n' + gcode + '\n' + postamble + '\n' + end_gcode
-                if postamble == '':
-                    g = self.gc_header + start_code + '\n' + preamble + '\n' + gcode + '\n' + end_gcode
-                if preamble == '' and postamble == '':
-                    g = self.gc_header + start_code + '\n' + gcode + '\n' + end_gcode
-
-        lines = StringIO(g)
+                # g = self.gc_header + start_code + '\n' + preamble + '\n' + gcode + '\n' + postamble + '\n' + end_gcode
+                g = [self.gc_header, start_code, '\n']
+                if preamble != '':
+                    g += [preamble, '\n']
+                g += gcode + ['\n']
+                if postamble != '':
+                    g += [postamble, '\n']
+                g.append(end_gcode)
 
         # Write
         if filename is not None:
             try:
+                # the G-Code is streamed into the file, it is never assembled in memory
                 force_windows_line_endings = self.app.options['cncjob_line_ending']
-                if force_windows_line_endings and sys.platform != 'win32':
-                    with open(filename, 'w', newline='\r\n') as f:
-                        for line in lines:
-                            f.write(line)
-                else:
-                    with open(filename, 'w') as f:
-                        for line in lines:
-                            f.write(line)
+                newline = '\r\n' if force_windows_line_endings and sys.platform != 'win32' else None
+                with open(filename, 'w', newline=newline) as f, GCodeWriter(sink=f) as writer:
+                    writer.writelines(g)
             except FileNotFoundError:
                 self.app.inform.emit('[WARNING_NOTCL] %s' % _("No such file or directory"))
                 return
@@ -1198,7 +1159,10 @@ class CNCJobObject(FlatCAMObj, CNCjob):
 
             self.app.inform.emit('[success] %s: %s' % (_("Saved to"), filename))
         else:
-            return lines
+            # a GCodeWriter keeps the G-Code as one string: getvalue() does not make another copy of it
+            writer = GCodeWriter()
+            writer.writelines(g)
+            return writer
 
     def get_gcode(self, preamble='', postamble=''):
         """
@@ -1309,31 +1309,30 @@ class ExcellonObject(FlatCAMObj, Excellon):
                     else:
                         self.tools[tool]['multicolor'] = None
 
-                    # tool is a dict also
-                    for geo in self.tools[tool]["solid_geometry"]:
-                        idx = self.add_shape(shape=geo,
-                                             color=geo_color if multicolored else self.outline_color,
-                                             face_color=geo_color if multicolored else self.fill_color,
-                                             visible=visible,
-                                             layer=2)
-                        try:
-                            self.shape_indexes_dict[tool].append(idx)
-                        except KeyError:
-                            self.shape_indexes_dict[tool] = [idx]
+                    # tool is a dict also; the drills of a tool are drawn as copies of one circle
+                    indexes = self.add_instanced_shapes(shapes=self.tools[tool]["solid_geometry"],
+                                                        color=geo_color if multicolored else self.outline_color,
+                                                        face_color=geo_color if multicolored else self.fill_color,
+                                                        visible=visible,
+                                                        layer=2)
+                    try:
+                        self.shape_indexes_dict[tool] += indexes
+                    except KeyError:
+                        self.shape_indexes_dict[tool] = indexes
             else:
                 for tool in self.tools:
+                    exteriors = []
+                    interiors = []
                     for geo in self.tools[tool]['solid_geometry']:
-                        idx = self.add_shape(shape=geo.exterior, color='red', visible=visible)
-                        try:
-                            self.shape_indexes_dict[tool].append(idx)
-                        except KeyError:
-                            self.shape_indexes_dict[tool] = [idx]
-                        for ints in geo.interiors:
-                            idx = self.add_shape(shape=ints, color='orange', visible=visible)
-                            try:
-                                self.shape_indexes_dict[tool].append(idx)
-                            except KeyError:
-                                self.shape_indexes_dict[tool] = [idx]
+                        exteriors.append(geo.exterior)
+                        interiors += list(geo.interiors)
+
+                    indexes = self.add_instanced_shapes(shapes=exteriors, color='red', visible=visible)
+                    indexes += self.add_instanced_shapes(shapes=interiors, color='orange', visible=visible)
+                    try:
+                        self.shape_indexes_dict[tool] += indexes
+                    except KeyError:
+                        self.shape_indexes_dict[tool] = indexes
                 # for geo in self.solid_geometry:
                 #     self.add_shape(shape=geo.exterior, color='red', visible=visible)
                 #     for ints in geo.interiors:
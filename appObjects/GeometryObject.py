@@ -16,10 +16,9 @@ from appGUI.GUIElements import FCCheckBox
 from appGUI.ObjectUI import GeometryObjectUI
 
 from shapely import MultiLineString, LinearRing, Polygon, MultiPolygon, LineString
-from shapely.affinity import scale, translate
 from shapely.ops import unary_union
 
-from camlib import Geometry, flatten_shapely_geometry
+from camlib import Geometry, flatten_shapely_geometry, scale_matrix, translation_matrix
 
 import re
 import ezdxf
@@ -1173,63 +1172,7 @@ class GeometryObject(FlatCAMObj, Geometry):
         if xfactor == 1 and yfactor == 1:
             return
 
-        if point is None:
-            px = 0
-            py = 0
-        else:
-            px, py = point
-
-        self.geo_len = 0
-        self.old_disp_number = 0
-        self.el_count = 0
-
-        def scale_recursion(geom):
-            if type(geom) is list:
-                geoms = []
-                for local_geom in geom:
-                    geoms.append(scale_recursion(local_geom))
-                return geoms
-            else:
-                try:
-                    self.el_count += 1
-                    disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
-                    if self.old_disp_number < disp_number <= 100:
-                        self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                        self.old_disp_number = disp_number
-
-                    return scale(geom, xfactor, yfactor, origin=(px, py))
-                except AttributeError:
-                    return geom
-
-        if self.multigeo is True:
-            for tool in self.tools:
-                # variables to display the percentage of work done
-                self.geo_len = 0
-                try:
-                    self.geo_len = len(self.tools[tool]['solid_geometry'])
-                except TypeError:
-                    self.geo_len = 1
-                self.old_disp_number = 0
-                self.el_count = 0
-
-                self.tools[tool]['solid_geometry'] = scale_recursion(self.tools[tool]['solid_geometry'])
-
-        try:
-            # variables to display the percentage of work done
-            self.geo_len = 0
-            try:
-                self.geo_len = len(self.solid_geometry)
-            except TypeError:
-                self.geo_len = 1
-            self.old_disp_number = 0
-            self.el_count = 0
-
-            self.solid_geometry = scale_recursion(self.solid_geometry)
-        except AttributeError:
-            self.solid_geometry = []
-            return
-
-        self.app.proc_container.new_text = ''
+        self.transform(scale_matrix(xfactor, yfactor, origin=(0, 0) if point is None else point))
         self.app.inform.emit('[success] %s' % _("Done."))
 
     def offset(self, vect):
@@ -1254,60 +1197,7 @@ class GeometryObject(FlatCAMObj, Geometry):
         if dx == 0 and dy == 0:
             return
 
-        self.geo_len = 0
-        self.old_disp_number = 0
-        self.el_count = 0
-
-        def translate_recursion(geom):
-            if type(geom) is list:
-                geoms = []
-                for local_geom in geom:
-                    geoms.append(translate_recursion(local_geom))
-                return geoms
-            else:
-                try:
-                    self.el_count += 1
-                    disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
-                    if self.old_disp_number < disp_number <= 100:
-                        self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                        self.old_disp_number = disp_number
-
-                    return translate(geom, xoff=dx, yoff=dy)
-                except AttributeError:
-                    return geom
-
-        if self.multigeo is True:
-            for tool in self.tools:
-                # variables to display the percentage of work done
-                self.geo_len = 0
-                try:
-                    source_geo = self.tools[tool]['solid_geometry']
-                    work_geo = source_geo.geoms if isinstance(source_geo, (MultiPolygon, MultiLineString)) else \
-                        source_geo
-                    self.geo_len = len(work_geo)
-                except TypeError:
-                    self.geo_len = 1
-                self.old_disp_number = 0
-                self.el_count = 0
-
-                self.tools[tool]['solid_geometry'] = translate_recursion(self.tools[tool]['solid_geometry'])
-
-        # variables to display the percentage of work done
-        self.geo_len = 0
-        try:
-            source_geo = self.solid_geometry
-            work_geo = source_geo.geoms if isinstance(source_geo, (MultiPolygon, MultiLineString)) else \
-                source_geo
-            self.geo_len = len(work_geo)
-        except TypeError:
-            self.geo_len = 1
-
-        self.old_disp_number = 0
-        self.el_count = 0
-
-        self.solid_geometry = translate_recursion(self.solid_geometry)
-
-        self.app.proc_container.new_text = ''
+        self.transform(translation_matrix(dx, dy))
         self.app.inform.emit('[success] %s' % _("Done."))
 
     def convert_units(self, units):
@@ -1417,16 +1307,8 @@ class GeometryObject(FlatCAMObj, Geometry):
             color = '#FF0000FF'
 
         visible = visible if visible else self.obj_options['plot']
-        try:
-            if isinstance(element, (MultiPolygon, MultiLineString)):
-                for sub_el in element.geoms:
-                    self.plot_element(sub_el, color=color)
-            else:
-                for sub_el in element:
-                    self.plot_element(sub_el, color=color)
-        except TypeError:  # Element is not iterable...
-            # if self.app.use_3d_engine:
-            self.add_shape(shape=element, color=color, visible=visible, layer=0)
+        # the shapes are added all at once
+        self.add_shapes(shapes=flatten_shapely_geometry(element), color=color, visible=visible, layer=0)
 
     def plot(self, visible=None, kind=None, plot_tool=None):
         """
@@ -1602,7 +1484,7 @@ class GeometryObject(FlatCAMObj, Geometry):
                             log.error("Failed to copy option %s. Error: %s" % (str(option), str(e)))
 
             # Expand lists
-            if type(geo_obj) is list:
+            if isinstance(geo_obj, list):
                 GeometryObject.merge(geo_list=geo_obj, geo_final=geo_final, log=log)
             # If not list, just append
             else:
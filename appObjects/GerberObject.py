@@ -950,22 +950,20 @@ class GerberObject(FlatCAMObj, Gerber):
         try:
             plot_geometry = geometry.geoms if isinstance(geometry, (MultiPolygon, MultiLineString)) else geometry
             try:
-                for g in plot_geometry:
-                    if self.obj_options["solid"]:
-                        used_color = color
-                        used_face_color = random_color() if self.obj_options['multicolored'] else face_color
-                    else:
-                        used_color = random_color() if self.obj_options['multicolored'] else 'black'
-                        used_face_color = None
-
-                    if self.app.options["gerber_plot_line_enable"] is False:
-                        used_color = None
-                    if isinstance(g, (Polygon, LineString)):
-                        self.add_shape(shape=g, color=used_color, face_color=used_face_color, visible=visible)
-                    elif isinstance(g, LinearRing):
-                        g = LineString(g)
-                        self.add_shape(shape=g, color=used_color, face_color=used_face_color, visible=visible)
+                plot_geometry = list(plot_geometry)
             except TypeError:
+                plot_geometry = [plot_geometry]
+
+            # the shapes are added all at once, with a color for each of them
+            shapes = []
+            used_colors = []
+            used_face_colors = []
+            for g in plot_geometry:
+                if isinstance(g, LinearRing):
+                    g = LineString(g)
+                elif not isinstance(g, (Polygon, LineString)):
+                    continue
+
                 if self.obj_options["solid"]:
                     used_color = color
                     used_face_color = random_color() if self.obj_options['multicolored'] else face_color
@@ -975,11 +973,12 @@ class GerberObject(FlatCAMObj, Gerber):
 
                 if self.app.options["gerber_plot_line_enable"] is False:
                     used_color = None
-                if isinstance(plot_geometry, (Polygon, LineString)):
-                    self.add_shape(shape=plot_geometry, color=used_color, face_color=used_face_color, visible=visible)
-                elif isinstance(plot_geometry, LinearRing):
-                    plot_geometry = LineString(plot_geometry)
-                    self.add_shape(shape=plot_geometry, color=used_color, face_color=used_face_color, visible=visible)
+
+                shapes.append(g)
+                used_colors.append(used_color)
+                used_face_colors.append(used_face_color)
+
+            self.add_shapes(shapes=shapes, color=used_colors, face_color=used_face_colors, visible=visible)
             self.shapes.redraw(
                 # update_colors=(self.fill_color, self.outline_color),
                 # indexes=self.app.plotcanvas.shape_collection.data.keys()
@@ -1024,21 +1023,35 @@ class GerberObject(FlatCAMObj, Gerber):
             with self.app.proc_container.new('%s ...' % _("Plotting")):
                 try:
                     if aperture_to_plot_mark in app_obj.tools:
+                        # the flashes are drawn as copies of one shape
+                        flashes = []
                         for elem in app_obj.tools[aperture_to_plot_mark]['geometry']:
                             if 'solid' in elem:
-                                if only_flashes and not isinstance(elem['follow'], Point):
+                                is_flash = isinstance(elem['follow'], Point)
+                                if only_flashes and not is_flash:
                                     continue
                                 geo = elem['solid']
                                 s_geo = geo.geoms if isinstance(geo, (MultiLineString, MultiPolygon)) else geo
                                 try:
                                     for el in s_geo:
+                                        if is_flash:
+                                            flashes.append(el)
+                                            continue
                                         shape_key = app_obj.add_mark_shape(shape=el, color=color, face_color=color,
                                                                            visible=visibility)
                                         app_obj.mark_shapes_storage[aperture_to_plot_mark].append(shape_key)
                                 except TypeError:
+                                    if is_flash:
+                                        flashes.append(s_geo)
+                                        continue
                                     shape_key = app_obj.add_mark_shape(shape=s_geo, color=color, face_color=color,
                                                                        visible=visibility)
                                     app_obj.mark_shapes_storage[aperture_to_plot_mark].append(shape_key)
+                        if flashes:
+                            app_obj.mark_shapes_storage[aperture_to_plot_mark] += \
+                                app_obj.mark_shapes.add_many_instanced(shapes=flashes, color=color, face_color=color,
+                                                                       visible=visibility, layer=0,
+                                                                       tolerance=app_obj.drawing_tolerance)
                     app_obj.mark_shapes.redraw()
                 except (ObjectDeleted, AttributeError):
                     app_obj.clear_plot_apertures()
@@ -1199,6 +1212,12 @@ class GerberObject(FlatCAMObj, Gerber):
 
             return x_form, y_form
 
+        def flashes_format(locations):
+            # the D03 commands of the flashes, from their locations
+            format_fcn = tz_format if g_zeros == 'T' else lz_format
+            return ["X{xform}Y{yform}D03*\n".format(xform=x_formatted, yform=y_formatted)
+                    for x_formatted, y_formatted in (format_fcn(x, y, factor) for x, y in locations.tolist())]
+
         # Gerber code is stored here
         gerber_code = ''
 
@@ -1507,9 +1526,15 @@ class GerberObject(FlatCAMObj, Gerber):
             else:
                 gerber_code += 'D%s*\n' % str(apid)
                 if 'geometry' in self.tools[apid]:
-                    for geo_elem in self.tools[apid]['geometry']:
+                    # the flashes are formatted in one pass, from the flash locations of the aperture
+                    flash_locations, flash_indexes = self.flash_locations(apid)
+                    flashes_code = dict(zip(flash_indexes.tolist(), flashes_format(flash_locations)))
+
+                    for geo_idx, geo_elem in enumerate(self.tools[apid]['geometry']):
                         try:
-                            if 'follow' in geo_elem:
+                            if geo_idx in flashes_code:
+                                gerber_code += flashes_code[geo_idx]
+                            elif 'follow' in geo_elem:
                                 geo = geo_elem['follow']
                                 if not geo.is_empty:
                                     if isinstance(geo, Point):
@@ -1682,14 +1707,14 @@ class GerberObject(FlatCAMObj, Gerber):
         if not grb_final.tools:
             grb_final.tools = {}
 
-        if type(grb_final.solid_geometry) is not list:
+        if not isinstance(grb_final.solid_geometry, list):
             grb_final.solid_geometry = [grb_final.solid_geometry]
             grb_final.follow_geometry = [grb_final.follow_geometry]
 
         for grb in grb_list:
 
             # Expand lists
-            if type(grb) is list:
+            if isinstance(grb, list):
                 GerberObject.merge(grb_list=grb, grb_final=grb_final)
             else:   # If not list, just append
                 for option in grb.obj_options:
@@ -0,0 +1,373 @@
+"""
+Flattening of the curves found in the imported files (SVG, PDF, DXF) into polylines.
+
+The curves are evaluated in bulk with NumPy: all the curves of a path (or of a file) are given at once and all their
+points are computed with array operations, instead of one point at a time.
+
+The number of segments of each curve is chosen from the curve, not from its length:
+    - steps_per_circle: the curve gets as many segments as an arc that turns by the same angle would get
+      (the same meaning as geometry_circle_steps / gerber_circle_steps used for the buffered circles)
+    - tolerance: the distance between the curve and the polyline is not more than the tolerance. The curve is
+      first evaluated with a few segments and, since the error of a polyline goes down with the square of the number
+      of segments, the error measured there gives the number of segments needed; it is never more than the
+      (pessimistic) bound computed from the control points.
+The larger of the two is used and the result is limited to max_segments. The tolerance is optional.
+"""
+
+import math
+
+import numpy as np
+
+MAX_SEGMENTS = 1000
+
+# number of segments of the first evaluation, used to measure the error
+TRIAL_SEGMENTS = 16
+# more segments than the measured error asks for, as the error of a segment is measured only in its middle
+TOLERANCE_MARGIN = 1.1
+
+
+def _clamp_segments(segments, max_segments):
+    return np.clip(segments, 1, max_segments).astype(np.int64)
+
+
+def _sample(segments):
+    """
+    The parameters t in [0, 1] for curves with the given number of segments; each curve gets segments + 1 values.
+
+    :param segments:    number of segments of each curve
+    :type segments:     np.ndarray
+    :return:            (curve index of each value, t values, offsets of each curve in the values)
+    :rtype:             tuple
+    """
+    counts = segments + 1
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    curve_idx = np.repeat(np.arange(len(counts)), counts)
+    local_idx = np.arange(offsets[-1]) - offsets[:-1][curve_idx]
+    return curve_idx, local_idx / segments[curve_idx], offsets
+
+
+def _segments_for_tolerance(trial_points, trial_segments, tolerance):
+    """
+    Number of segments needed for the tolerance, from the curves evaluated at 2 * trial_segments + 1 uniform
+    parameters: the even points are the vertices of the trial polyline and the odd points are the middle of its
+    segments. The error of a segment is the distance from its middle point to its chord.
+
+    :param trial_points:    points of the curves, shape (nr_curves, 2 * trial_segments + 1, 2)
+    :type trial_points:     np.ndarray
+    :param trial_segments:  number of segments of the trial polyline
+    :type trial_segments:   int
+    :param tolerance:       maximum distance between the curve and the polyline
+    :type tolerance:        float
+    :return:                number of segments of each curve
+    :rtype:                 np.ndarray
+    """
+    start = trial_points[:, 0:-1:2]
+    middle = trial_points[:, 1::2] - start
+    chord = trial_points[:, 2::2] - start
+    chord_len = np.hypot(chord[..., 0], chord[..., 1])
+    cross = np.abs(chord[..., 0] * middle[..., 1] - chord[..., 1] * middle[..., 0])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        error = np.where(chord_len > 0, cross / chord_len, np.hypot(middle[..., 0], middle[..., 1])).max(axis=1)
+    return np.ceil(trial_segments * np.sqrt(error / tolerance) * TOLERANCE_MARGIN)
+
+
+def _bernstein(degree, t):
+    t = np.asarray(t, dtype=float)[:, None]
+    powers = np.arange(degree + 1)
+    binomial = np.array([math.comb(degree, i) for i in powers], dtype=float)
+    return binomial * t ** powers * (1 - t) ** (degree - powers)
+
+
+def bezier_segments(controls, steps_per_circle=64, tolerance=None, max_segments=MAX_SEGMENTS):
+    """
+    Number of segments for each Bezier curve.
+
+    The turning of the control polygon bounds the turning of the curve. For the tolerance, the error is measured on
+    a trial evaluation and it is limited by the bound of the uniform subdivision of a Bezier curve of degree d:
+    d * (d - 1) * max|P[i + 2] - 2 * P[i + 1] + P[i]| / (8 * n^2)
+
+    :param controls:            control points of the curves, shape (nr_curves, degree + 1, 2)
+    :type controls:             np.ndarray
+    :param steps_per_circle:    segments for a full turn
+    :type steps_per_circle:     int
+    :param tolerance:           maximum distance between the curve and the polyline; not used if None
+    :type tolerance:            float | None
+    :param max_segments:        upper limit of the segments of one curve
+    :type max_segments:         int
+    :return:                    number of segments of each curve
+    :rtype:                     np.ndarray
+    """
+    controls = np.asarray(controls, dtype=float)
+    degree = controls.shape[1] - 1
+
+    edges = np.diff(controls, axis=1)
+    if degree > 1:
+        cross = edges[:, :-1, 0] * edges[:, 1:, 1] - edges[:, :-1, 1] * edges[:, 1:, 0]
+        dot = np.einsum('ijk,ijk->ij', edges[:, :-1], edges[:, 1:])
+        turning = np.abs(np.arctan2(cross, dot)).sum(axis=1)
+    else:
+        turning = np.zeros(len(controls))
+    segments = np.ceil(turning * steps_per_circle / (2 * math.pi))
+
+    if tolerance and degree > 1:
+        second_diff = np.linalg.norm(np.diff(edges, axis=1), axis=2).max(axis=1)
+        bound = np.ceil(np.sqrt(degree * (degree - 1) * second_diff / (8 * tolerance)))
+
+        basis = _bernstein(degree, np.linspace(0.0, 1.0, 2 * TRIAL_SEGMENTS + 1))
+        trial_points = np.einsum('tj,kjc->ktc', basis, controls)
+        needed = _segments_for_tolerance(trial_points, TRIAL_SEGMENTS, tolerance)
+        segments = np.maximum(segments, np.minimum(needed, bound))
+
+    return _clamp_segments(segments, max_segments)
+
+
+def flatten_beziers(controls, steps_per_circle=64, tolerance=None, max_segments=MAX_SEGMENTS):
+    """
+    Points of many Bezier curves of the same degree, evaluated at once (Bernstein form).
+
+    :param controls:            control points of the curves, shape (nr_curves, degree + 1, 2)
+    :type controls:             np.ndarray
+    :param steps_per_circle:    segments for a full turn
+    :type steps_per_circle:     int
+    :param tolerance:           maximum distance between the curve and the polyline; not used if None
+    :type tolerance:            float | None
+    :param max_segments:        upper limit of the segments of one curve
+    :type max_segments:         int
+    :return:                    (points, offsets); the points of curve i, both ends included, are
+                                points[offsets[i]:offsets[i + 1]]
+    :rtype:                     tuple
+    """
+    controls = np.asarray(controls, dtype=float)
+    if len(controls) == 0:
+        return np.empty((0, 2)), np.zeros(1, dtype=np.int64)
+
+    degree = controls.shape[1] - 1
+    segments = bezier_segments(controls, steps_per_circle, tolerance, max_segments)
+    curve_idx, t, offsets = _sample(segments)
+
+    points = np.einsum('ij,ijk->ik', _bernstein(degree, t), controls[curve_idx])
+    return points, offsets
+
+
+def bezier_chain(controls, steps_per_circle=64, tolerance=None, max_segments=MAX_SEGMENTS):
+    """
+    Polyline of consecutive Bezier curves (the end of a curve is the start of the next one). The shared ends are
+    not repeated.
+
+    :param controls:            control points of the curves, shape (nr_curves, degree + 1, 2)
+    :type controls:             np.ndarray
+    :param steps_per_circle:    segments for a full turn
+    :type steps_per_circle:     int
+    :param tolerance:           maximum distance between the curve and the polyline; not used if None
+    :type tolerance:            float | None
+    :param max_segments:        upper limit of the segments of one curve
+    :type max_segments:         int
+    :return:                    points of the polyline, shape (nr_points, 2)
+    :rtype:                     np.ndarray
+    """
+    points, offsets = flatten_beziers(controls, steps_per_circle, tolerance, max_segments)
+    if len(points) == 0:
+        return points
+    keep = np.ones(len(points), dtype=bool)
+    keep[offsets[1:-1] - 1] = False
+    return points[keep]
+
+
+def quadratic_to_cubic(controls):
+    """
+    Degree elevation: the cubic Bezier curves that are the same as the given quadratic ones. Used so the two kinds
+    are evaluated in the same batch.
+
+    :param controls:    control points of the quadratic curves, shape (nr_curves, 3, 2)
+    :type controls:     np.ndarray
+    :return:            control points of the cubic curves, shape (nr_curves, 4, 2)
+    :rtype:             np.ndarray
+    """
+    controls = np.asarray(controls, dtype=float)
+    q0, q1, q2 = controls[:, 0], controls[:, 1], controls[:, 2]
+    return np.stack((q0, q0 + 2.0 / 3.0 * (q1 - q0), q2 + 2.0 / 3.0 * (q1 - q2), q2), axis=1)
+
+
+def arc_segments(radius, sweep, steps_per_circle=64, tolerance=None, max_segments=MAX_SEGMENTS):
+    """
+    Number of segments for each arc: steps_per_circle for a full turn and, with a tolerance, enough segments so
+    the sagitta radius * (1 - cos(angle / 2)) of a segment is not more than the tolerance.
+
+    :param radius:              the largest radius of each arc
+    :type radius:               np.ndarray
+    :param sweep:               sweep angle of each arc, in degrees
+    :type sweep:                np.ndarray
+    :param steps_per_circle:    segments for a full turn
+    :type steps_per_circle:     int
+    :param tolerance:           maximum distance between the arc and the polyline; not used if None
+    :type tolerance:            float | None
+    :param max_segments:        upper limit of the segments of one arc
+    :type max_segments:         int
+    :return:                    number of segments of each arc
+    :rtype:                     np.ndarray
+    """
+    radius = np.abs(np.asarray(radius, dtype=float))
+    sweep = np.abs(np.radians(np.asarray(sweep, dtype=float)))
+    segments = np.ceil(sweep * steps_per_circle / (2 * math.pi))
+
+    if tolerance:
+        ratio = np.clip(1.0 - tolerance / np.maximum(radius, tolerance), -1.0, 1.0)
+        max_angle = 2 * np.arccos(ratio)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            tol_segments = np.where(max_angle > 0, np.ceil(sweep / max_angle), 1)
+        segments = np.maximum(segments, tol_segments)
+
+    return _clamp_segments(segments, max_segments)
+
+
+def flatten_arcs(centers, radii, rotation, start_angle, sweep, steps_per_circle=64, tolerance=None,
+                 max_segments=MAX_SEGMENTS):
+    """
+    Points of many elliptical arcs, evaluated at once. The point at t in [0, 1] is at the angle
+    start_angle + sweep * t on the ellipse with the given radii, rotated by rotation around its center
+    (the center parametrization of the SVG arcs).
+
+    :param centers:             centers of the arcs, shape (nr_arcs, 2)
+    :param radii:               (rx, ry) of the arcs, shape (nr_arcs, 2); the same value twice for circular arcs
+    :param rotation:            rotation of the x axis of each ellipse, in degrees
+    :param start_angle:         start angle of each arc, in degrees
+    :param sweep:               sweep angle of each arc, in degrees; negative for the clockwise arcs
+    :param steps_per_circle:    segments for a full turn
+    :type steps_per_circle:     int
+    :param tolerance:           maximum distance between the arc and the polyline; not used if None
+    :type tolerance:            float | None
+    :param max_segments:        upper limit of the segments of one arc
+    :type max_segments:         int
+    :return:                    (points, offsets); the points of arc i, both ends included, are
+                                points[offsets[i]:offsets[i + 1]]
+    :rtype:                     tuple
+    """
+    centers = np.asarray(centers, dtype=float).reshape(-1, 2)
+    radii = np.asarray(radii, dtype=float).reshape(-1, 2)
+    rotation = np.broadcast_to(np.asarray(rotation, dtype=float), (len(centers), ))
+    start_angle = np.broadcast_to(np.asarray(start_angle, dtype=float), (len(centers), ))
+    sweep = np.broadcast_to(np.asarray(sweep, dtype=float), (len(centers), ))
+    if len(centers) == 0:
+        return np.empty((0, 2)), np.zeros(1, dtype=np.int64)
+
+    segments = arc_segments(np.abs(radii).max(axis=1), sweep, steps_per_circle, tolerance, max_segments)
+    arc_idx, t, offsets = _sample(segments)
+
+    angle = np.radians(start_angle[arc_idx] + sweep[arc_idx] * t)
+    rot = np.radians(rotation[arc_idx])
+    cos_r, sin_r = np.cos(rot), np.sin(rot)
+    ex = np.cos(angle) * radii[arc_idx, 0]
+    ey = np.sin(angle) * radii[arc_idx, 1]
+
+    points = np.empty((len(t), 2))
+    points[:, 0] = cos_r * ex - sin_r * ey + centers[arc_idx, 0]
+    points[:, 1] = sin_r * ex + cos_r * ey + centers[arc_idx, 1]
+    return points, offsets
+
+
+def _bspline_basis(knots, degree, t):
+    """
+    Values of all the B-spline basis functions (Cox - de Boor recursion) for all the parameters at once.
+
+    :param knots:   knot vector, len(knots) = nr_control_points + degree + 1
+    :param degree:  degree of the spline
+    :param t:       parameters, inside [knots[degree], knots[-degree - 1]]
+    :return:        basis values, shape (len(t), nr_control_points)
+    :rtype:         np.ndarray
+    """
+    nr_ctrl = len(knots) - degree - 1
+    t = t[:, None]
+
+    # degree 0; the last parameter belongs to the last non-empty span
+    basis = ((knots[:-1] <= t) & (t < knots[1:])).astype(float)
+    last_span = np.flatnonzero(knots[:-1] < knots[1:])
+    if len(last_span):
+        at_end = (t[:, 0] >= knots[last_span[-1] + 1])
+        basis[at_end] = 0.0
+        basis[at_end, last_span[-1]] = 1.0
+
+    for k in range(1, degree + 1):
+        left_den = knots[k:-1] - knots[:-k - 1]
+        right_den = knots[k + 1:] - knots[1:-k]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            left = np.where(left_den > 0, (t - knots[:-k - 1]) / left_den, 0.0)
+            right = np.where(right_den > 0, (knots[k + 1:] - t) / right_den, 0.0)
+        basis = left * basis[:, :-1] + right * basis[:, 1:]
+
+    return basis[:, :nr_ctrl]
+
+
+def flatten_bspline(control_points, degree, knots=None, weights=None, closed=False, steps_per_circle=64,
+                    tolerance=None, max_segments=MAX_SEGMENTS):
+    """
+    Points of a (rational) B-spline curve.
+
+    :param control_points:      control points, shape (nr_control_points, 2) (more columns are ignored)
+    :param degree:              degree of the spline
+    :type degree:               int
+    :param knots:               knot vector; a clamped uniform one is used if None or if it does not fit the
+                                control points
+    :param weights:             weights of the control points; all 1.0 if None
+    :param closed:              periodic spline; the first `degree` control points are repeated at the end and a
+                                uniform knot vector is used
+    :type closed:               bool
+    :param steps_per_circle:    segments for a full turn
+    :type steps_per_circle:     int
+    :param tolerance:           maximum distance between the curve and the polyline; not used if None
+    :type tolerance:            float | None
+    :param max_segments:        upper limit of the segments
+    :type max_segments:         int
+    :return:                    points of the curve, shape (nr_points, 2); None if the spline is not valid
+    :rtype:                     np.ndarray | None
+    """
+    ctrl = np.asarray(control_points, dtype=float)
+    if ctrl.ndim != 2 or degree < 1 or len(ctrl) < 2:
+        return None
+    ctrl = ctrl[:, :2]
+    weights = np.ones(len(ctrl)) if weights is None or len(weights) != len(ctrl) else \
+        np.asarray(weights, dtype=float)
+
+    # the first and the last point are the same: it is already closed
+    if closed and np.sum((ctrl[0] - ctrl[-1]) ** 2) < 1e-10:
+        closed = False
+
+    if closed:
+        ctrl = np.concatenate((ctrl, ctrl[:degree]))
+        weights = np.concatenate((weights, weights[:degree]))
+
+    nr_ctrl = len(ctrl)
+    if nr_ctrl < degree + 1:
+        return None
+
+    if closed:
+        knots = np.arange(nr_ctrl + degree + 1, dtype=float)
+    elif knots is None or len(knots) != nr_ctrl + degree + 1:
+        inner = np.arange(1, nr_ctrl - degree, dtype=float)
+        knots = np.concatenate((np.zeros(degree + 1), inner, np.full(degree + 1, float(nr_ctrl - degree))))
+    else:
+        knots = np.asarray(knots, dtype=float)
+
+    # the segments are chosen from the control polygon, as for a Bezier curve of the same degree on each span
+    nr_spans = max(int(np.count_nonzero(np.diff(knots[degree:nr_ctrl + 1]) > 0)), 1)
+    polygon = ctrl[None, :, :]
+    segments = int(bezier_segments(polygon, steps_per_circle, None, max_segments * nr_spans)[0])
+    if tolerance and degree > 1 and nr_ctrl > 2:
+        second_diff = float(np.linalg.norm(np.diff(ctrl, 2, axis=0), axis=1).max())
+        bound = nr_spans * math.ceil(math.sqrt(degree * (degree - 1) * second_diff / (8 * tolerance)))
+
+        trial = nr_spans * TRIAL_SEGMENTS
+        trial_points = _evaluate_bspline(ctrl, weights, knots, degree, 2 * trial)
+        needed = int(_segments_for_tolerance(trial_points[None, :, :], trial, tolerance)[0])
+        segments = max(segments, min(needed, bound))
+    segments = min(max(segments, nr_spans), max_segments * nr_spans)
+
+    return _evaluate_bspline(ctrl, weights, knots, degree, segments)
+
+
+def _evaluate_bspline(ctrl, weights, knots, degree, segments):
+    t = np.linspace(knots[degree], knots[len(ctrl)], segments + 1)
+    basis = _bspline_basis(knots, degree, t) * weights
+    denominator = basis.sum(axis=1)
+    denominator[denominator == 0] = 1.0
+    return basis.dot(ctrl) / denominator[:, None]
@@ -5,8 +5,9 @@
 # MIT Licence                                              #
 # ##########################################################
 
-from appParsers.ParseDXF_Spline import spline2Polyline, normalize_2
+from appParsers.ParseDXF_Spline import normalize_2
 from appParsers.ParseDXF_Spline import Vector as DxfVector
+from appParsers.ParseCurves import flatten_arcs, flatten_bspline
 
 from shapely import LineString, Point, Polygon
 from shapely.affinity import rotate, translate, scale
@@ -60,7 +61,7 @@ def dxfcircle2shapely(circle, n_points=100):
     return geo
 
 
-def dxfarc2shapely(arc, n_points=100):
+def dxfarc2shapely(arc, steps_per_circle=64, tolerance=None):
     # ocs = arc.ocs()
     # # if the extrusion attribute is not (0, 0, 1) then we have to change the coordinate system from OCS to WCS
     # if arc.dxf.extrusion != (0, 0, 1):
@@ -117,37 +118,18 @@ def dxfarc2shapely(arc, n_points=100):
         end_angle = arc.dxf.end_angle
         direction = 'CCW'
 
-    center_x = arc_center[0]
-    center_y = arc_center[1]
     radius = arc.dxf.radius
 
-    point_list = []
-
     if start_angle > end_angle:
         start_angle = start_angle - 360
-    angle = start_angle
+    sweep = end_angle - start_angle
 
-    step_angle = float(abs(end_angle - start_angle) / n_points)
+    if direction == 'CW':
+        start_angle = -start_angle
+        sweep = -sweep
 
-    while angle <= end_angle:
-        if direction == 'CCW':
-            x = center_x + radius * math.cos(math.radians(angle))
-            y = center_y + radius * math.sin(math.radians(angle))
-        else:
-            x = center_x + radius * math.cos(math.radians(-angle))
-            y = center_y + radius * math.sin(math.radians(-angle))
-        point_list.append((x, y))
-        angle += abs(step_angle)
-
-    # in case the number of segments do not cover everything until the end of the arc
-    if angle != end_angle:
-        if direction == 'CCW':
-            x = center_x + radius * math.cos(math.radians(end_angle))
-            y = center_y + radius * math.sin(math.radians(end_angle))
-        else:
-            x = center_x + radius * math.cos(math.radians(- end_angle))
-            y = center_y + radius * math.sin(math.radians(- end_angle))
-        point_list.append((x, y))
+    point_list, __ = flatten_arcs([(arc_center[0], arc_center[1])], [(radius, radius)], 0.0, start_angle, sweep,
+                                  steps_per_circle=steps_per_circle, tolerance=tolerance)
 
     # log.debug("X = %.4f, Y = %.4f, Radius = %.4f, start_angle = %.1f, stop_angle = %.1f, step_angle = %.4f" %
     #           (center_x, center_y, radius, start_angle, end_angle, step_angle))
@@ -250,7 +232,7 @@ def dxfsolid2shapely(solid):
         return Polygon(corner_list)
 
 
-def dxfspline2shapely(spline):
+def dxfspline2shapely(spline, steps_per_circle=64, tolerance=None):
     # for old version of ezdxf
     # with spline.edit_data() as spline_data:
     #     ctrl_points = spline_data.control_points
@@ -265,8 +247,15 @@ def dxfspline2shapely(spline):
     is_closed = spline.closed
     degree = spline.dxf.degree
 
-    x_list, y_list, _ = spline2Polyline(ctrl_points, degree=degree, closed=is_closed, segments=20, knots=knot_values)
-    points_list = zip(x_list, y_list)
+    try:
+        weights = list(spline.weights)
+    except AttributeError:
+        weights = None
+
+    points_list = flatten_bspline(list(ctrl_points), degree=degree, knots=list(knot_values), weights=weights or None,
+                                  closed=is_closed, steps_per_circle=steps_per_circle, tolerance=tolerance)
+    if points_list is None:
+        return None
 
     geo = LineString(points_list)
     return geo
@@ -282,17 +271,26 @@ def dxftrace2shapely(trace):
         return Polygon(corner_list)
 
 
-def getdxfgeo(dxf_object):
+def getdxfgeo(dxf_object, steps_per_circle=64, tolerance=None):
+    """
+    :param dxf_object:          the DXF document
+    :param steps_per_circle:    number of segments for a full turn of the circles, arcs and splines
+    :type steps_per_circle:     int
+    :param tolerance:           maximum distance between an arc or a spline and its polyline; not used if None
+    :type tolerance:            float | None
+    :return:                    list of Shapely geometry
+    :rtype:                     list
+    """
 
     msp = dxf_object.modelspace()
-    geos = get_geo(dxf_object, msp)
+    geos = get_geo(dxf_object, msp, steps_per_circle=steps_per_circle, tolerance=tolerance)
 
     # geo_block = get_geo_from_block(dxf_object)
 
     return geos
 
 
-def get_geo_from_insert(dxf_object, insert):
+def get_geo_from_insert(dxf_object, insert, steps_per_circle=64, tolerance=None):
     geo_block_transformed = []
 
     phi = insert.dxf.rotation
@@ -311,7 +309,7 @@ def get_geo_from_insert(dxf_object, insert):
     block_coords = (block.block.dxf.base_point[0], block.block.dxf.base_point[1])
 
     # get a list of geometries found in the block
-    geo_block = get_geo(dxf_object, block)
+    geo_block = get_geo(dxf_object, block, steps_per_circle=steps_per_circle, tolerance=tolerance)
 
     # iterate over the geometries found and apply any transformation found in the 'INSERT' entity attributes
     for geo in geo_block:
@@ -343,7 +341,7 @@ def get_geo_from_insert(dxf_object, insert):
     return geo_block_transformed
 
 
-def get_geo(dxf_object, container):
+def get_geo(dxf_object, container, steps_per_circle=64, tolerance=None):
     # store shapely geometry here
     geo = []
 
@@ -355,9 +353,9 @@ def get_geo(dxf_object, container):
         elif dxf_entity.dxftype() == 'LINE':
             g = dxfline2shapely(dxf_entity,)
         elif dxf_entity.dxftype() == 'CIRCLE':
-            g = dxfcircle2shapely(dxf_entity)
+            g = dxfcircle2shapely(dxf_entity, n_points=steps_per_circle)
         elif dxf_entity.dxftype() == 'ARC':
-            g = dxfarc2shapely(dxf_entity)
+            g = dxfarc2shapely(dxf_entity, steps_per_circle=steps_per_circle, tolerance=tolerance)
         elif dxf_entity.dxftype() == 'ELLIPSE':
             g = dxfellipse2shapely(dxf_entity)
         elif dxf_entity.dxftype() == 'LWPOLYLINE':
@@ -369,9 +367,10 @@ def get_geo(dxf_object, container):
         elif dxf_entity.dxftype() == 'TRACE':
             g = dxftrace2shapely(dxf_entity)
         elif dxf_entity.dxftype() == 'SPLINE':
-            g = dxfspline2shapely(dxf_entity)
+            g = dxfspline2shapely(dxf_entity, steps_per_circle=steps_per_circle, tolerance=tolerance)
         elif dxf_entity.dxftype() == 'INSERT':
-            g = get_geo_from_insert(dxf_object, dxf_entity)
+            g = get_geo_from_insert(dxf_object, dxf_entity, steps_per_circle=steps_per_circle,
+                                    tolerance=tolerance)
         else:
             log.debug(" %s is not supported yet." % dxf_entity.dxftype())
 
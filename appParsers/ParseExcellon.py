@@ -6,8 +6,12 @@
 # MIT Licence                                                 #
 # ########################################################## ##
 
-from camlib import Geometry, grace
+from camlib import Geometry, grace, affine_transform_geometry, scale_matrix, translation_matrix, rotation_matrix, \
+    skew_matrix
+from appCommon.GeometryArray import GeometryArray
+from appParsers.ParseGerber import place_flashes
 
+import shapely
 import shapely.affinity as affinity
 from shapely import Point, LineString, LinearRing, MultiLineString, MultiPolygon
 import numpy as np
@@ -59,6 +63,9 @@ class Excellon(Geometry):
         "excellon_circle_steps": '16'
     }
 
+    # attributes that hold the geometry changed by apply_affine()
+    affine_attrs = ['solid_geometry', 'tools']
+
     def __init__(self, zeros=None, excellon_format_upper_mm=None, excellon_format_lower_mm=None,
                  excellon_format_upper_in=None, excellon_format_lower_in=None, excellon_units=None,
                  excellon_circle_steps=None):
@@ -80,6 +87,9 @@ class Excellon(Geometry):
         # dictionary to store tools, see above for description
         self.tools = {}
 
+        # the drill centers and the slot ends of the tools as NumPy arrays, see tool_arrays()
+        self.drill_index = {}
+
         self.source_file = ''
 
         # it serves to flag if a start routing or a stop routing was encountered
@@ -1070,39 +1080,27 @@ class Excellon(Geometry):
         self.app.log.debug("appParsers.ParseExcellon.Excellon.create_geometry()")
         self.solid_geometry = []
         try:
-            # clear the solid_geometry in self.tools
-            for tool in self.tools:
-                self.tools[tool]['solid_geometry'] = []
-                self.tools[tool]['data'] = {}
+            steps = int(self.excellon_circle_steps)
+            # one circle for each tool diameter, placed at all the drills of the tools with that diameter
+            templates = {}
 
             for tool in self.tools:
                 tooldia = self.tools[tool]['tooldia']
+                centers, slot_ends = self.tool_arrays(tool)
 
-                if 'drills' in self.tools[tool]:
-                    for drill in self.tools[tool]['drills']:
-                        poly = drill.buffer(tooldia / 2.0, int(self.excellon_circle_steps))
-
-                        # add poly in the tools geometry
-                        self.tools[tool]['solid_geometry'].append(poly)
-                        self.tools[tool]['data'] = deepcopy(self.default_data)
-
-                        # add poly to the total solid geometry
-                        self.solid_geometry.append(poly)
-
-                if 'slots' in self.tools[tool]:
-                    for slot in self.tools[tool]['slots']:
-                        start = slot[0]
-                        stop = slot[1]
+                holes = []
+                if len(centers):
+                    if tooldia not in templates:
+                        templates[tooldia] = Point(0, 0).buffer(tooldia / 2.0, steps)
+                    holes += list(place_flashes(templates[tooldia], centers))
+                if len(slot_ends):
+                    holes += list(shapely.buffer(shapely.linestrings(slot_ends), tooldia / 2.0, quad_segs=steps))
 
-                        lines_string = LineString([start, stop])
-                        poly = lines_string.buffer(tooldia / 2.0, int(self.excellon_circle_steps))
+                self.tools[tool]['solid_geometry'] = GeometryArray(holes)
+                self.tools[tool]['data'] = deepcopy(self.default_data) if holes else {}
 
-                        # add poly in the tools geometry
-                        self.tools[tool]['solid_geometry'].append(poly)
-                        self.tools[tool]['data'] = deepcopy(self.default_data)
-
-                        # add poly to the total solid geometry
-                        self.solid_geometry.append(poly)
+                # add the tool geometry to the total solid geometry
+                self.solid_geometry += holes
 
         except Exception as e:
             err_msg = "appParsers.ParseExcellon.Excellon.create_geometry() -> " \
@@ -1110,6 +1108,30 @@ class Excellon(Geometry):
             self.app.log.error(err_msg)
             return "fail"
 
+    def tool_arrays(self, tool):
+        """
+        The drill centers and the slot ends of a tool as NumPy arrays. They are made once and kept in
+        ``self.drill_index`` until the drills or the slots of the tool change.
+
+        :param tool:    the tool key in self.tools
+        :type tool:     int
+        :return:        (drill centers as a (N, 2) array, slot ends as a (M, 2, 2) array)
+        :rtype:         tuple
+        """
+        drills = self.tools[tool].get('drills', [])
+        slots = self.tools[tool].get('slots', [])
+        try:
+            indexed_drills, indexed_slots, nr_drills, nr_slots, centers, slot_ends = self.drill_index[tool]
+            if indexed_drills is drills and indexed_slots is slots and \
+                    nr_drills == len(drills) and nr_slots == len(slots):
+                return centers, slot_ends
+        except KeyError:
+            pass
+
+        centers, slot_ends = get_drill_centers(drills), get_slot_ends(slots)
+        self.drill_index[tool] = (drills, slots, len(drills), len(slots), centers, slot_ends)
+        return centers, slot_ends
+
     def bounds(self, flatten=None):
         """
         Returns coordinates of rectangular bounds
@@ -1205,6 +1227,32 @@ class Excellon(Geometry):
         self.create_geometry()
         return factor
 
+    def apply_affine(self, matrix, size_factor=1.0):
+        """
+        Transforms, in one vectorized pass, the drills and the slots of all the tools and creates the geometry
+        again. Tool sizes, feedrates an Z-plane dimensions are untouched.
+
+        :param matrix:      3x3 affine matrix
+        :type matrix:       np.ndarray
+        :param size_factor: not used, the tool diameters are not scaled
+        :type size_factor:  float
+        :return:            None
+        """
+        self.app.log.debug("appParsers.ParseExcellon.Excellon.apply_affine()")
+
+        tool_keys = list(self.tools)
+        transformed = affine_transform_geometry(
+            [(self.tools[tool].get('drills'), self.tools[tool].get('slots')) for tool in tool_keys], matrix)
+
+        self.drill_index = {}
+        for tool, (drills, slots) in zip(tool_keys, transformed):
+            if drills is not None:
+                self.tools[tool]['drills'] = drills
+            if slots is not None:
+                self.tools[tool]['slots'] = slots
+
+        self.create_geometry()
+
     def scale(self, xfactor, yfactor=None, point=None):
         """
         Scales geometry on the XY plane in the object by a given factor.
@@ -1223,66 +1271,10 @@ class Excellon(Geometry):
         if yfactor is None:
             yfactor = xfactor
 
-        if point is None:
-            px = 0
-            py = 0
-        else:
-            px, py = point
-
         if xfactor == 0 and yfactor == 0:
             return
 
-        def scale_geom(obj):
-            if type(obj) is list:
-                new_obj = []
-                for g in obj:
-                    new_obj.append(scale_geom(g))
-                return new_obj
-            else:
-                try:
-                    return affinity.scale(obj, xfactor, yfactor, origin=(px, py))
-                except AttributeError:
-                    return obj
-
-        # variables to display the percentage of work done
-        self.geo_len = 0
-        try:
-            self.geo_len = len(self.tools)
-        except TypeError:
-            self.geo_len = 1
-        self.old_disp_number = 0
-        self.el_count = 0
-
-        for tool in self.tools:
-            # Scale Drills
-            if 'drills' in self.tools[tool]:
-                new_drills = []
-                for drill in self.tools[tool]['drills']:
-                    new_drills.append(affinity.scale(drill, xfactor, yfactor, origin=(px, py)))
-                self.tools[tool]['drills'] = new_drills
-
-            # Scale Slots
-            if 'slots' in self.tools[tool]:
-                new_slots = []
-                for slot in self.tools[tool]['slots']:
-                    new_start = affinity.scale(slot[0], xfactor, yfactor, origin=(px, py))
-                    new_stop = affinity.scale(slot[1], xfactor, yfactor, origin=(px, py))
-                    new_slot = (new_start, new_stop)
-                    new_slots.append(new_slot)
-                self.tools[tool]['slots'] = new_slots
-
-            # Scale solid_geometry
-            self.tools[tool]['solid_geometry'] = scale_geom(self.tools[tool]['solid_geometry'])
-
-            # update status display
-            self.el_count += 1
-            disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
-            if self.old_disp_number < disp_number <= 100:
-                self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                self.old_disp_number = disp_number
-
-        self.create_geometry()
-        self.app.proc_container.new_text = ''
+        self.transform(scale_matrix(xfactor, yfactor, origin=(0, 0) if point is None else point))
 
     def offset(self, vect):
         """
@@ -1299,58 +1291,7 @@ class Excellon(Geometry):
         if dx == 0 and dy == 0:
             return
 
-        def offset_geom(obj):
-            try:
-                new_obj = []
-                for geo in obj:
-                    new_obj.append(offset_geom(geo))
-                return new_obj
-            except TypeError:
-                try:
-                    return affinity.translate(obj, xoff=dx, yoff=dy)
-                except AttributeError:
-                    return obj
-
-        # variables to display the percentage of work done
-        self.geo_len = 0
-        try:
-            self.geo_len = len(self.tools)
-        except TypeError:
-            self.geo_len = 1
-        self.old_disp_number = 0
-        self.el_count = 0
-
-        for tool in self.tools:
-            # Offset Drills
-            if 'drills' in self.tools[tool]:
-                new_drills = []
-                for drill in self.tools[tool]['drills']:
-                    new_drills.append(affinity.translate(drill, xoff=dx, yoff=dy))
-                self.tools[tool]['drills'] = new_drills
-
-            # Offset Slots
-            if 'slots' in self.tools[tool]:
-                new_slots = []
-                for slot in self.tools[tool]['slots']:
-                    new_start = affinity.translate(slot[0], xoff=dx, yoff=dy)
-                    new_stop = affinity.translate(slot[1], xoff=dx, yoff=dy)
-                    new_slot = (new_start, new_stop)
-                    new_slots.append(new_slot)
-                self.tools[tool]['slots'] = new_slots
-
-            # Offset solid_geometry
-            self.tools[tool]['solid_geometry'] = offset_geom(self.tools[tool]['solid_geometry'])
-
-            # update status display
-            self.el_count += 1
-            disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
-            if self.old_disp_number < disp_number <= 100:
-                self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                self.old_disp_number = disp_number
-
-        # Recreate geometry
-        self.create_geometry()
-        self.app.proc_container.new_text = ''
+        self.transform(translation_matrix(dx, dy))
 
     def mirror(self, axis, point):
         """
@@ -1363,63 +1304,9 @@ class Excellon(Geometry):
         """
         self.app.log.debug("appParsers.ParseExcellon.Excellon.mirror()")
 
-        px, py = point
         xscale, yscale = {"X": (1.0, -1.0), "Y": (-1.0, 1.0)}[axis]
 
-        def mirror_geom(obj):
-            try:
-                new_obj = []
-                for geo in obj:
-                    new_obj.append(mirror_geom(geo))
-                return new_obj
-            except TypeError:
-                try:
-                    return affinity.scale(obj, xscale, yscale, origin=(px, py))
-                except AttributeError:
-                    return obj
-
-        # Modify data
-
-        # variables to display the percentage of work done
-        self.geo_len = 0
-        try:
-            self.geo_len = len(self.tools)
-        except TypeError:
-            self.geo_len = 1
-        self.old_disp_number = 0
-        self.el_count = 0
-
-        for tool in self.tools:
-            # Offset Drills
-            if 'drills' in self.tools[tool]:
-                new_drills = []
-                for drill in self.tools[tool]['drills']:
-                    new_drills.append(affinity.scale(drill, xscale, yscale, origin=(px, py)))
-                self.tools[tool]['drills'] = new_drills
-
-            # Offset Slots
-            if 'slots' in self.tools[tool]:
-                new_slots = []
-                for slot in self.tools[tool]['slots']:
-                    new_start = affinity.scale(slot[0], xscale, yscale, origin=(px, py))
-                    new_stop = affinity.scale(slot[1], xscale, yscale, origin=(px, py))
-                    new_slot = (new_start, new_stop)
-                    new_slots.append(new_slot)
-                self.tools[tool]['slots'] = new_slots
-
-            # Offset solid_geometry
-            self.tools[tool]['solid_geometry'] = mirror_geom(self.tools[tool]['solid_geometry'])
-
-            # update status display
-            self.el_count += 1
-            disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
-            if self.old_disp_number < disp_number <= 100:
-                self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                self.old_disp_number = disp_number
-
-        # Recreate geometry
-        self.create_geometry()
-        self.app.proc_container.new_text = ''
+        self.transform(scale_matrix(xscale, yscale, origin=point))
 
     def skew(self, angle_x=None, angle_y=None, point=None):
         """
@@ -1447,69 +1334,14 @@ class Excellon(Geometry):
         if angle_x == 0 and angle_y == 0:
             return
 
-        def skew_geom(obj):
-            try:
-                new_obj = []
-                for g in obj:
-                    new_obj.append(skew_geom(g))
-                return new_obj
-            except TypeError:
-                try:
-                    return affinity.skew(obj, angle_x, angle_y, origin=(px, py))
-                except AttributeError:
-                    return obj
-
-        # variables to display the percentage of work done
-        self.geo_len = 0
-        try:
-            self.geo_len = len(self.tools)
-        except TypeError:
-            self.geo_len = 1
-        self.old_disp_number = 0
-        self.el_count = 0
-
-        if point is None:
-            px, py = 0, 0
-        else:
-            px, py = point
-
-        for tool in self.tools:
-            # Offset Drills
-            if 'drills' in self.tools[tool]:
-                new_drills = []
-                for drill in self.tools[tool]['drills']:
-                    new_drills.append(affinity.skew(drill, angle_x, angle_y, origin=(px, py)))
-                self.tools[tool]['drills'] = new_drills
-
-            # Offset Slots
-            if 'slots' in self.tools[tool]:
-                new_slots = []
-                for slot in self.tools[tool]['slots']:
-                    new_start = affinity.skew(slot[0], angle_x, angle_y, origin=(px, py))
-                    new_stop = affinity.skew(slot[1], angle_x, angle_y, origin=(px, py))
-                    new_slot = (new_start, new_stop)
-                    new_slots.append(new_slot)
-                self.tools[tool]['slots'] = new_slots
-
-            # Offset solid_geometry
-            self.tools[tool]['solid_geometry'] = skew_geom(self.tools[tool]['solid_geometry'])
-
-            # update status display
-            self.el_count += 1
-            disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
-            if self.old_disp_number < disp_number <= 100:
-                self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                self.old_disp_number = disp_number
-
-        self.create_geometry()
-        self.app.proc_container.new_text = ''
+        self.transform(skew_matrix(angle_x, angle_y, origin=(0, 0) if point is None else point))
 
     def rotate(self, angle, point=None):
         """
         Rotate the geometry of an object by an angle around the 'point' coordinates
 
         :param angle:
-        :param point:   tuple of coordinates (x, y)
+        :param point:   tuple of coordinates (x, y); if None, the center of the object bounding box
         :return:        None
         """
         self.app.log.debug("appParsers.ParseExcellon.Excellon.rotate()")
@@ -1517,68 +1349,11 @@ class Excellon(Geometry):
         if angle == 0:
             return
 
-        def rotate_geom(obj, origin=None):
-            if type(obj) is list:
-                new_obj = []
-                for g in obj:
-                    new_obj.append(rotate_geom(g))
-                return new_obj
-            else:
-                if origin:
-                    try:
-                        return affinity.rotate(obj, angle, origin=origin)
-                    except AttributeError:
-                        return obj
-                else:
-                    try:
-                        return affinity.rotate(obj, angle, origin=orig)
-                    except AttributeError:
-                        return obj
-
-        # variables to display the percentage of work done
-        self.geo_len = 0
-        try:
-            self.geo_len = len(self.tools)
-        except TypeError:
-            self.geo_len = 1
-        self.old_disp_number = 0
-        self.el_count = 0
-
         if point is None:
-            orig = 'center'
-        else:
-            orig = point
+            xmin, ymin, xmax, ymax = self.bounds()
+            point = ((xmin + xmax) / 2.0, (ymin + ymax) / 2.0)
 
-        for tool in self.tools:
-            # Offset Drills
-            if 'drills' in self.tools[tool]:
-                new_drills = []
-                for drill in self.tools[tool]['drills']:
-                    new_drills.append(affinity.rotate(drill, angle, origin=orig))
-                self.tools[tool]['drills'] = new_drills
-
-            # Offset Slots
-            if 'slots' in self.tools[tool]:
-                new_slots = []
-                for slot in self.tools[tool]['slots']:
-                    new_start = affinity.rotate(slot[0], angle, origin=orig)
-                    new_stop = affinity.rotate(slot[1], angle, origin=orig)
-                    new_slot = (new_start, new_stop)
-                    new_slots.append(new_slot)
-                self.tools[tool]['slots'] = new_slots
-
-            # Offset solid_geometry
-            self.tools[tool]['solid_geometry'] = rotate_geom(self.tools[tool]['solid_geometry'], origin=orig)
-
-            # update status display
-            self.el_count += 1
-            disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
-            if self.old_disp_number < disp_number <= 100:
-                self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                self.old_disp_number = disp_number
-
-        self.create_geometry()
-        self.app.proc_container.new_text = ''
+        self.transform(rotation_matrix(angle, origin=point))
 
     def buffer(self, distance, join, factor, only_exterior=False):
         """
@@ -1626,3 +1401,64 @@ class Excellon(Geometry):
                 self.tools[tool]['tooldia'] *= (distance * 2)
 
         self.create_geometry()
+
+
+def get_drill_centers(drills):
+    """
+    :param drills:  the drills of a tool, Shapely Points
+    :type drills:   list
+    :return:        the drill centers as a (N, 2) array
+    :rtype:         np.ndarray
+    """
+    return shapely.get_coordinates(list(drills or [])).reshape(-1, 2)
+
+
+def get_slot_ends(slots):
+    """
+    :param slots:   the slots of a tool, tuples (start Point, stop Point)
+    :type slots:    list
+    :return:        the slot ends as a (M, 2, 2) array: [slot][start or stop][x or y]
+    :rtype:         np.ndarray
+    """
+    return shapely.get_coordinates([pt for slot in (slots or []) for pt in slot[:2]]).reshape(-1, 2, 2)
+
+
+def get_slot_drills(slot_ends, overlap, add_last_pt=False):
+    """
+    The drills that make the slots: on each slot, from its start, one drill every ``overlap`` distance that is before
+    the slot stop and, if add_last_pt is True, one drill in the slot stop unless the last drill is closer to it
+    than overlap / 10. It is the vectorized ToolDrilling.process_slot_as_drills() for all the slots of a tool.
+
+    :param slot_ends:   the slot ends as a (M, 2, 2) array, see get_slot_ends()
+    :type slot_ends:    np.ndarray
+    :param overlap:     distance between the drills
+    :type overlap:      float
+    :param add_last_pt: add a drill in the slot stop
+    :type add_last_pt:  bool
+    :return:            the drill centers as a (N, 2) array, the drills of each slot in order
+    :rtype:             np.ndarray
+    """
+    slot_ends = np.asarray(slot_ends, dtype=float).reshape(-1, 2, 2)
+    starts, stops = slot_ends[:, 0], slot_ends[:, 1]
+    lengths = np.hypot(*(stops - starts).T)
+
+    # number of drills made before the slot stop, the slot start included
+    if overlap > 0:
+        nr_drills = np.ceil(lengths / overlap).astype(np.intp)
+        nr_drills[nr_drills < 1] = 1
+    else:
+        nr_drills = np.ones(len(slot_ends), dtype=np.intp)
+
+    slot_idx = np.repeat(np.arange(len(slot_ends)), nr_drills)
+    # position of each drill on its slot
+    rank = np.arange(len(slot_idx)) - np.repeat(np.cumsum(nr_drills) - nr_drills, nr_drills)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = np.where(lengths[slot_idx] > 0, rank * overlap / lengths[slot_idx], 0.0)
+    drills = starts[slot_idx] + fraction[:, None] * (stops - starts)[slot_idx]
+
+    if add_last_pt and len(slot_ends):
+        last = drills[np.cumsum(nr_drills) - 1]
+        add_stop = np.hypot(*(stops - last).T) >= overlap / 10
+        # insert the slot stop after the last drill of its slot
+        drills = np.insert(drills, np.cumsum(nr_drills)[add_stop], stops[add_stop], axis=0)
+    return drills
@@ -0,0 +1,935 @@
+"""
+G-Code parser of the CNCJob objects.
+
+The G-Code is tokenized in the dialect of its preprocessors (see gcode_dialect()) and parsed, in batch, by
+GCodeParser into the flat arrays of a GCodeParsed object: the vertices of the paths (X, Y, Z, G code and feedrate)
+and the kind of each path (travel or cut, fast or slow).
+"""
+
+import math
+import re
+import logging
+from collections.abc import Sequence
+
+import numpy as np
+import shapely
+from shapely import LinearRing
+from shapely.affinity import affine_transform
+
+log = logging.getLogger('base')
+
+# kind codes; a segment with no bits set is a cut ('C') at fast ('F') speed
+KIND_TRAVEL = 1
+KIND_SLOW = 2
+KIND_HOLE = 4
+
+
+def kind_to_list(code):
+    """
+    Converts a kind code into the legacy ['C'|'T', 'F'|'S'] list used in the 'gcode_parsed' dictionaries.
+
+    :param code:    bitwise OR of KIND_TRAVEL and KIND_SLOW
+    :type code:     int
+    :return:        list like ["C", "F"]  # T=travel, C=cut, F=fast, S=slow
+    :rtype:         list
+    """
+    return ['T' if code & KIND_TRAVEL else 'C', 'S' if code & KIND_SLOW else 'F']
+
+
+def kind_from_list(kind):
+    code = KIND_TRAVEL if kind[0] == 'T' else 0
+    if kind[1] == 'S':
+        code |= KIND_SLOW
+    return code
+
+
+class GCodeParsed(Sequence):
+    """
+    Columnar result of parsing a G-Code program.
+
+    All the vertices of all the paths are kept in flat NumPy arrays (x, y, z, g, feed) and each path (segment)
+    is a slice of them described by 'offsets' and a 'kinds' code. Drill holes are stored as closed rings.
+
+    The object behaves as the legacy list of dictionaries:
+    {
+        "geom": LineString(path),
+        "kind": kind
+    }
+    but the dictionaries are created only when they are requested by indexing or iteration. Plotting and
+    exporting should use geometries() and kinds which do not create any dictionary.
+    """
+
+    def __init__(self, x, y, z, g, feed, offsets, kinds):
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.z = np.asarray(z, dtype=np.float64)
+        self.g = np.asarray(g, dtype=np.int8)
+        self.feed = np.asarray(feed, dtype=np.float64)
+        # segment 'i' is made out of the vertices in the range offsets[i]:offsets[i+1]
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.kinds = np.asarray(kinds, dtype=np.uint8)
+
+        # cache for the Shapely geometries created from the arrays
+        self._geoms = None
+        # once the legacy dictionaries are requested they become the authoritative storage because the callers
+        # are free to change them
+        self._items = None
+
+    def __len__(self):
+        if self._items is not None:
+            return len(self._items)
+        return len(self.kinds)
+
+    def __getitem__(self, index):
+        return self.materialize()[index]
+
+    def __iter__(self):
+        return iter(self.materialize())
+
+    def __add__(self, other):
+        return self.to_list() + list(other)
+
+    def __radd__(self, other):
+        return list(other) + self.to_list()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # the Shapely objects are recreated from the arrays on demand
+        state['_geoms'] = None
+        return state
+
+    @classmethod
+    def concatenate(cls, parts):
+        """
+        Joins parsed G-Code objects (or legacy lists) in a single GCodeParsed object.
+
+        :param parts:   iterable of GCodeParsed objects; empty parts (like an empty list) are skipped
+        :type parts:    list
+        :return:        GCodeParsed if all the parts are not materialized, else a list of dictionaries
+        :rtype:         GCodeParsed | list
+        """
+        parts = [part for part in parts if len(part)]
+        if not all(isinstance(part, GCodeParsed) and not part.is_materialized for part in parts):
+            joined = []
+            for part in parts:
+                joined += list(part)
+            return joined
+
+        offsets = [np.zeros(1, dtype=np.int64)]
+        vertex_start = 0
+        for part in parts:
+            offsets.append(part.offsets[1:] + vertex_start)
+            vertex_start += len(part.x)
+
+        return cls(
+            np.concatenate([part.x for part in parts] + [np.zeros(0)]),
+            np.concatenate([part.y for part in parts] + [np.zeros(0)]),
+            np.concatenate([part.z for part in parts] + [np.zeros(0)]),
+            np.concatenate([part.g for part in parts] + [np.zeros(0, dtype=np.int8)]),
+            np.concatenate([part.feed for part in parts] + [np.zeros(0)]),
+            np.concatenate(offsets),
+            np.concatenate([part.kinds for part in parts] + [np.zeros(0, dtype=np.uint8)])
+        )
+
+    @property
+    def is_materialized(self):
+        return self._items is not None
+
+    def geometries(self):
+        """
+        Creates (in bulk) and returns the Shapely geometry of each segment.
+
+        :return:    LineString for paths, LinearRing for drill holes
+        :rtype:     numpy.ndarray
+        """
+        if self._items is not None:
+            geoms = np.empty(len(self._items), dtype=object)
+            geoms[:] = [it['geom'] for it in self._items]
+            return geoms
+
+        if self._geoms is None:
+            nr_segments = len(self.kinds)
+            geoms = np.empty(nr_segments, dtype=object)
+            if nr_segments:
+                counts = np.diff(self.offsets)
+                seg_idx = np.repeat(np.arange(nr_segments), counts)
+                coords = np.column_stack((self.x, self.y))
+
+                is_hole = (self.kinds & KIND_HOLE) != 0
+                is_line = ~is_hole & (counts > 1)
+
+                for mask, maker in ((is_line, shapely.linestrings), (is_hole & (counts > 3), shapely.linearrings)):
+                    if not mask.any():
+                        continue
+                    sel = mask[seg_idx]
+                    # renumber the selected segments so the indices are contiguous
+                    _, indices = np.unique(seg_idx[sel], return_inverse=True)
+                    geoms[mask] = maker(coords[sel], indices=indices)
+            self._geoms = geoms
+        return self._geoms
+
+    def kind_codes(self):
+        if self._items is not None:
+            return np.array([kind_from_list(it['kind']) | (KIND_HOLE if isinstance(it['geom'], LinearRing) else 0)
+                             for it in self._items], dtype=np.uint8)
+        return self.kinds
+
+    def to_list(self):
+        """
+        Creates the legacy list of dictionaries without storing it.
+
+        :return:    list of {"geom": geometry, "kind": kind}
+        :rtype:     list
+        """
+        if self._items is not None:
+            return list(self._items)
+        return [{"geom": geo, "kind": kind_to_list(code)} for geo, code in zip(self.geometries(), self.kinds)]
+
+    def materialize(self):
+        if self._items is None:
+            self._items = self.to_list()
+            self._geoms = None
+        return self._items
+
+    def affine(self, matrix):
+        """
+        Applies an affine transformation to all the geometry at once.
+
+        :param matrix:  the [a, b, d, e, xoff, yoff] coefficients as used by shapely.affinity.affine_transform()
+        :type matrix:   list
+        :return:        None
+        """
+        a, b, d, e, xoff, yoff = matrix
+        if self._items is not None:
+            for it in self._items:
+                it['geom'] = affine_transform(it['geom'], matrix)
+            return
+
+        x = self.x
+        self.x = a * x + b * self.y + xoff
+        self.y = d * x + e * self.y + yoff
+        self._geoms = None
+
+    def bounds(self):
+        if self._items is not None:
+            return shapely.total_bounds(self.geometries()).tolist()
+        if self.x.size == 0:
+            return [np.inf, np.inf, -np.inf, -np.inf]
+        return [float(self.x.min()), float(self.y.min()), float(self.x.max()), float(self.y.max())]
+
+
+def affine_matrix_translate(dx, dy):
+    return [1.0, 0.0, 0.0, 1.0, dx, dy]
+
+
+def affine_matrix_scale(xfactor, yfactor, origin):
+    px, py = origin
+    return [xfactor, 0.0, 0.0, yfactor, px - px * xfactor, py - py * yfactor]
+
+
+def affine_matrix_rotate(angle, origin):
+    """
+    :param angle:   angle in degrees, positive is counter-clockwise (same as shapely.affinity.rotate())
+    """
+    px, py = origin
+    theta = math.radians(angle)
+    cosp = math.cos(theta)
+    sinp = math.sin(theta)
+    if abs(cosp) < 2.5e-16:
+        cosp = 0.0
+    if abs(sinp) < 2.5e-16:
+        sinp = 0.0
+    return [cosp, -sinp, sinp, cosp, px - px * cosp + py * sinp, py - px * sinp - py * cosp]
+
+
+def affine_matrix_skew(angle_x, angle_y, origin):
+    """
+    :param angle_x: angle in degrees (same as shapely.affinity.skew())
+    :param angle_y: angle in degrees
+    """
+    px, py = origin
+    tanx = math.tan(math.radians(angle_x))
+    tany = math.tan(math.radians(angle_y))
+    if abs(tanx) < 2.5e-16:
+        tanx = 0.0
+    if abs(tany) < 2.5e-16:
+        tany = 0.0
+    return [1.0, tanx, tany, 1.0, -py * tanx, -px * tany]
+
+
+class DrillIndex:
+    """
+    Hash index from the drill coordinates, rounded to a number of decimals, to the diameter of the tool that
+    has the drill. Built once and used when parsing the G-Code of the Excellon objects to find the size of the
+    drill holes in constant time.
+    """
+
+    def __init__(self, tools, decimals):
+        """
+
+        :param tools:       the Excellon tools dict; each tool may have a 'drills' key holding a list of Points
+        :type tools:        dict
+        :param decimals:    the coordinates are rounded to this number of decimals
+        :type decimals:     int
+        """
+        self.decimals = decimals
+        self._index = {}
+
+        setdefault = self._index.setdefault
+        for tool_dict in tools.values():
+            if 'drills' not in tool_dict or not tool_dict['drills']:
+                continue
+            dia = tool_dict['tooldia']
+            # if the same location is in multiple tools, the first tool wins
+            for x, y in shapely.get_coordinates(tool_dict['drills']).tolist():
+                setdefault((round(x, decimals), round(y, decimals)), dia)
+
+    def __len__(self):
+        return len(self._index)
+
+    def lookup(self, x, y, default=None):
+        """
+        :return:    the diameter of the tool that has a drill in the (x, y) location or the default value
+        :rtype:     float | None
+        """
+        return self._index.get((round(x, self.decimals), round(y, self.decimals)), default)
+
+
+def gcode_dialect(pp_excellon_name, pp_geometry_name, pp_solderpaste_name=None):
+    """
+    Finds which tokenizer has to be used for the G-Code generated with the given preprocessors. The first match
+    wins: a Roland or an HPGL preprocessor, then a laser (or solder paste) one; the other solder paste
+    preprocessors have no tokens except the 'Paste' one; everything else is generic G-Code.
+
+    :return:    one of 'roland', 'hpgl', 'laser', 'paste', 'generic'
+    :rtype:     str
+    """
+    pp_excellon_name = pp_excellon_name or ''
+    pp_geometry_name = pp_geometry_name or ''
+
+    if 'Roland' in pp_excellon_name or 'Roland' in pp_geometry_name:
+        return 'roland'
+    if 'hpgl' in pp_excellon_name or 'hpgl' in pp_geometry_name:
+        return 'hpgl'
+    if 'laser' in pp_excellon_name.lower() or 'laser' in pp_geometry_name.lower() or \
+            (pp_solderpaste_name is not None and 'paste' in pp_solderpaste_name.lower()):
+        return 'laser'
+    if pp_solderpaste_name is not None:
+        if 'Paste' in pp_solderpaste_name:
+            return 'paste'
+        return 'none'
+    return 'generic'
+
+
+# ##############################################################################################################
+# Tokenizers. Each one takes the list of the G-Code lines and yields for each line a dictionary like
+# {'G': 1.0, 'X': 1234.0, 'Y': 987.0}. The generic G-Code, unless it is not ASCII, is tokenized by
+# tokenize_generic_buffer() instead.
+# ##############################################################################################################
+_generic_prefix_re = re.compile(r'^(?:\s*[A-Z]\s*[+\-.\d\s]+)+')
+_generic_word_re = re.compile(r'\s*([A-Z])\s*([+\-.\d\s]+)')
+
+
+def tokenize_generic(lines):
+    prefix_match = _generic_prefix_re.match
+    findall = _generic_word_re.findall
+    for line in lines:
+        command = {}
+        match = prefix_match(line)
+        if match:
+            for letter, value in findall(match.group()):
+                try:
+                    command[letter] = float(value.replace(" ", ""))
+                except ValueError:
+                    pass
+        yield command
+
+
+_roland_re = re.compile(r"^Z(\s*-?\d+\.\d+?),(\s*\s*-?\d+\.\d+?),(\s*\s*-?\d+\.\d+?)*;$")
+
+
+def tokenize_roland(lines):
+    search = _roland_re.search
+    for line in lines:
+        match_z = search(line)
+        if match_z:
+            yield {
+                'G': 0,
+                'X': float(match_z.group(1).replace(" ", "")) * 0.01,
+                'Y': float(match_z.group(2).replace(" ", "")) * 0.01,
+                'Z': float(match_z.group(3).replace(" ", "")) * 0.025
+            }
+        else:
+            yield {}
+
+
+_hpgl_pa_re = re.compile(r"^PA(\s*-?\d+\.\d+?),(\s*\s*-?\d+\.\d+?)*;$")
+_hpgl_pen_re = re.compile(r"^(P[U|D])")
+_hpgl_sp_re = re.compile(r"^SP\d*")
+
+
+def tokenize_hpgl(lines):
+    search = _hpgl_pa_re.search
+    match_pen_re = _hpgl_pen_re.match
+    match_sp_re = _hpgl_sp_re.match
+    for line in lines:
+        command = {}
+        match_pa = search(line)
+        if match_pa:
+            command['G'] = 0
+            command['X'] = float(match_pa.group(1).replace(" ", "")) / 40
+            command['Y'] = float(match_pa.group(2).replace(" ", "")) / 40
+        match_pen = match_pen_re(line)
+        if match_pen:
+            # the value does not matter, only that it is positive so the move is of kind T (travel)
+            command['Z'] = 1 if match_pen.group(1) == 'PU' else 0
+        if match_sp_re(line):
+            command['Z'] = 1
+        yield command
+
+
+_xy_re = re.compile(r"X([+-]?\d+.[+-]?\d+)\s*Y([+-]?\d+.[+-]?\d+)")
+_laser_on_off_re = re.compile(r"^(M0?[3-5])")
+_laser_fan_re = re.compile(r"^(M10[6|7])")
+
+
+def tokenize_laser(lines):
+    search_xy = _xy_re.search
+    match_on_off = _laser_on_off_re.match
+    match_fan = _laser_fan_re.match
+    for line in lines:
+        command = {}
+        match_lsr = search_xy(line)
+        if match_lsr:
+            command['X'] = float(match_lsr.group(1).replace(" ", ""))
+            command['Y'] = float(match_lsr.group(2).replace(" ", ""))
+
+        match_lsr_pos = match_on_off(line)
+        if match_lsr_pos:
+            # the value does not matter, only that it is positive so the move is of kind T (travel)
+            command['Z'] = 1 if match_lsr_pos.group(1) in ('M05', 'M5') else 0
+
+        match_lsr_pos_2 = match_fan(line)
+        if match_lsr_pos_2:
+            command['Z'] = 1 if match_lsr_pos_2.group(1) == 'M107' else 0
+
+        if 'laser OFF' in line:
+            command['Z'] = 1
+        yield command
+
+
+def tokenize_paste(lines):
+    search_xy = _xy_re.search
+    for line in lines:
+        command = {}
+        match_paste = search_xy(line)
+        if match_paste:
+            command['X'] = float(match_paste.group(1).replace(" ", ""))
+            command['Y'] = float(match_paste.group(2).replace(" ", ""))
+        yield command
+
+
+def tokenize_none(lines):
+    for __ in lines:
+        yield {}
+
+
+TOKENIZERS = {
+    'generic':  tokenize_generic,
+    'roland':   tokenize_roland,
+    'hpgl':     tokenize_hpgl,
+    'laser':    tokenize_laser,
+    'paste':    tokenize_paste,
+    'none':     tokenize_none,
+}
+
+
+# the words used by the parser; the others (M, S, T ...) are ignored
+COLUMNS = 'GXYZFIJ'
+
+# character classes of the generic tokenizer; same as the classes used by _generic_prefix_re and _generic_word_re.
+# The characters from _CHAR_EOL up end the words of a line
+_CHAR_SPACE = 0
+_CHAR_NUMBER = 1
+_CHAR_LETTER = 2
+_CHAR_EOL = 3
+_CHAR_OTHER = 4
+
+_char_class = np.full(256, _CHAR_OTHER, dtype=np.uint8)
+_char_class[ord('A'):ord('Z') + 1] = _CHAR_LETTER
+_char_class[np.frombuffer(b'0123456789+-.', dtype=np.uint8)] = _CHAR_NUMBER
+# the ASCII characters matched by '\s' which do not end a line for str.splitlines()
+_char_class[np.frombuffer(b' \t\x1f', dtype=np.uint8)] = _CHAR_SPACE
+_char_class[np.frombuffer(b'\n\r\x0b\x0c\x1c\x1d\x1e', dtype=np.uint8)] = _CHAR_EOL
+
+# a value is converted with a division of two exact floats (which is what float() does, correctly rounded) only if
+# it has at most this number of digits and of decimals
+_MAX_EXACT_DIGITS = 15
+_MAX_EXACT_DECIMALS = 22
+_POW10 = 10.0 ** np.arange(_MAX_EXACT_DECIMALS + 1)
+# number of characters tokenized at once
+_TOKENIZE_BLOCK_SIZE = 1 << 22
+
+
+def tokenize_generic_buffer(gcode):
+    """
+    Same as tokenize_generic() but done with NumPy on the whole G-Code at once, without splitting it in lines.
+
+    Each character is classified (letter, number, space, end of line, other). The part of each line matched by
+    _generic_prefix_re is found from the positions of the characters which end it. The letters in this part start
+    the words and the numbers that follow a letter, with the spaces removed, make its value. The values are
+    converted from their digits, as float() does.
+
+    :param gcode:   the G-Code text
+    :type gcode:    str
+    :return:        the number of lines and a dict with an array for each letter in COLUMNS, holding the value of
+                    the letter in each line that has at least one of them (NaN if the line does not have it), or
+                    None if the G-Code is not ASCII (then tokenize_generic() has to be used)
+    :rtype:         tuple | None
+    """
+    try:
+        data = gcode.encode('ascii')
+    except UnicodeEncodeError:
+        return None
+
+    # the G-Code is tokenized in blocks of whole lines, so the temporary arrays (a few for each character) stay small
+    nr_lines = 0
+    blocks = []
+    start = 0
+    while start < len(data):
+        stop = data.find(b'\n', start + _TOKENIZE_BLOCK_SIZE) + 1 or len(data)
+        block_lines, block_columns = _tokenize_block(np.frombuffer(data, dtype=np.uint8, count=stop - start,
+                                                                   offset=start))
+        nr_lines += block_lines
+        blocks.append(block_columns)
+        start = stop
+
+    if len(blocks) == 1:
+        return nr_lines, blocks[0]
+    return nr_lines, {letter: np.concatenate([block[letter] for block in blocks] + [np.zeros(0)])
+                      for letter in COLUMNS}
+
+
+def _tokenize_block(chars):
+    """
+    Tokenizes whole lines of G-Code; see tokenize_generic_buffer().
+
+    :param chars:   the characters of the lines
+    :type chars:    numpy.ndarray
+    :return:        the number of lines and the columns
+    :rtype:         tuple
+    """
+    nr_chars = len(chars)
+    # the class of each character and an end of line after the last one
+    classes = np.empty(nr_chars + 1, dtype=np.uint8)
+    np.take(_char_class, chars, out=classes[:-1])
+    classes[-1] = _CHAR_EOL
+
+    eol_pos = np.flatnonzero(classes[:-1] == _CHAR_EOL)
+    # the same count as len(gcode.splitlines()): '\r\n' is one line end and the last line may have no line end
+    crlf = np.count_nonzero((eol_pos[1:] == eol_pos[:-1] + 1) & (chars[eol_pos[:-1]] == 13) &
+                            (chars[eol_pos[1:]] == 10))
+    nr_lines = int(len(eol_pos) - crlf) + (1 if nr_chars and classes[-2] != _CHAR_EOL else 0)
+    line_start = np.concatenate(([0], eol_pos + 1))
+
+    # the part of each line matched by _generic_prefix_re ends at the first character that is not a letter, a number
+    # or a space, or at the first letter not followed by a number or a space
+    letter_pos = np.flatnonzero(classes == _CHAR_LETTER)
+    stops = np.flatnonzero(classes >= _CHAR_EOL)
+    bad_letters = letter_pos[classes[letter_pos + 1] > _CHAR_NUMBER]
+    prefix_end = stops[np.searchsorted(stops, line_start)]
+    if len(bad_letters):
+        prefix_end = np.minimum(prefix_end, np.append(bad_letters, nr_chars)[np.searchsorted(bad_letters, line_start)])
+    # and it is empty if the line does not start with a letter, after the spaces
+    first = line_start.copy()
+    spaced = np.flatnonzero(classes[first] == _CHAR_SPACE)
+    while len(spaced):
+        first[spaced] += 1
+        spaced = spaced[classes[first[spaced]] == _CHAR_SPACE]
+    prefix_end = np.where(classes[first] == _CHAR_LETTER, prefix_end, line_start)
+
+    # each line is its prefix followed by the rest of the line
+    spans = np.empty(2 * len(line_start), dtype=np.int64)
+    spans[0::2] = prefix_end - line_start
+    spans[1::2] = np.append(line_start[1:], nr_chars) - prefix_end
+    in_prefix = np.repeat(np.tile([True, False], len(line_start)), spans)
+
+    # the words: each letter in the prefix and the numbers which follow it, without the spaces
+    tokens = np.flatnonzero(in_prefix & (classes[:-1] != _CHAR_SPACE))
+    is_letter = classes[tokens] == _CHAR_LETTER
+    letter_idx = np.flatnonzero(is_letter)
+    word_pos = tokens[letter_idx]
+    nr_words = len(word_pos)
+    value_chars = chars[tokens[~is_letter]]
+    # the values are one after the other, the value of the word 'k' is value_chars[value_start[k]:value_end[k]]
+    value_start = letter_idx - np.arange(nr_words)
+    value_end = np.append(value_start[1:], len(value_chars))[:nr_words]
+
+    is_digit = value_chars >= 48
+    digits_before = np.zeros(len(value_chars) + 1, dtype=np.int32)
+    np.cumsum(is_digit, out=digits_before[1:])
+    nr_digits = digits_before[value_end] - digits_before[value_start]
+    dot_idx = np.flatnonzero(value_chars == 46)
+    dot_word = np.searchsorted(value_start, dot_idx, side='right') - 1
+    nr_dots = np.bincount(dot_word, minlength=nr_words)
+    nr_signs = value_end - value_start - nr_digits - nr_dots
+    first_char = value_chars.take(value_start, mode='clip') if len(value_chars) else np.zeros(nr_words, np.uint8)
+    # the values that float() accepts: an optional sign ('+' or '-'), then digits with at most one decimal point
+    valid = (nr_digits > 0) & (nr_dots <= 1) & (nr_signs == (first_char < 46))
+
+    # the number of decimals: the digits after the decimal point
+    decimals = np.zeros(nr_words, dtype=np.int32)
+    decimals[dot_word] = digits_before[value_end[dot_word]] - digits_before[dot_idx + 1]
+
+    # the digits as an integer: each digit multiplied by 10 to the number of digits after it in its value
+    digit_word = np.repeat(np.arange(nr_words), nr_digits)
+    digits_after = np.repeat(digits_before[value_end], nr_digits) - np.arange(1, len(digit_word) + 1)
+    mantissa = np.bincount(digit_word, weights=(value_chars[is_digit] - 48.0) *
+                           _POW10[np.minimum(digits_after, _MAX_EXACT_DECIMALS)], minlength=nr_words)
+
+    exact = valid & (nr_digits <= _MAX_EXACT_DIGITS) & (decimals <= _MAX_EXACT_DECIMALS)
+    values = mantissa / _POW10[np.where(exact, decimals, 0)]
+    values = np.where(first_char == 45, -values, values)
+
+    # the few values with too many digits are converted by Python
+    for word in np.flatnonzero(valid & ~exact).tolist():
+        values[word] = float(value_chars[value_start[word]:value_end[word]].tobytes())
+
+    # only the valid words of the letters in COLUMNS, one row for each line that has them
+    letters = chars[word_pos]
+    keep = valid & np.isin(letters, np.frombuffer(COLUMNS.encode('ascii'), dtype=np.uint8))
+    word_line = np.searchsorted(line_start, word_pos[keep], side='right')
+    letters = letters[keep]
+    values = values[keep]
+    # the words are in the order of the lines
+    word_row = np.zeros(len(word_line), dtype=np.int64)
+    np.cumsum(word_line[1:] != word_line[:-1], out=word_row[1:])
+    nr_rows = int(word_row[-1]) + 1 if len(word_row) else 0
+
+    columns = {}
+    for letter in COLUMNS:
+        column = np.full(nr_rows, np.nan)
+        sel = np.flatnonzero(letters == ord(letter))
+        # if a letter is more than once in a line, the last value wins
+        last = last_of_runs(word_row[sel])
+        column[word_row[sel][last]] = values[sel][last]
+        columns[letter] = column
+    return nr_lines, columns
+
+
+def commands_to_columns(commands):
+    """
+    Converts the dictionaries yielded by a tokenizer into the columns used by GCodeParser.
+
+    :param commands:    iterable of dictionaries like {'G': 1.0, 'X': 1234.0, 'Y': 987.0}
+    :type commands:     iterable
+    :return:            a dict with an array for each letter in COLUMNS; NaN where the command does not have it
+    :rtype:             dict
+    """
+    rows = [command for command in commands if command]
+    nan = math.nan
+    return {letter: np.array([command.get(letter, nan) for command in rows], dtype=np.float64)
+            for letter in COLUMNS}
+
+
+def last_of_runs(keys):
+    """
+    :return:    a mask of the last item of each run of equal keys
+    :rtype:     numpy.ndarray
+    """
+    last = np.ones(len(keys), dtype=bool)
+    last[:-1] = keys[1:] != keys[:-1]
+    return last
+
+
+def forward_fill(values, initial):
+    """
+    :return:    the values with each NaN replaced by the last value before it, or by the initial value
+    :rtype:     numpy.ndarray
+    """
+    idx = np.where(np.isnan(values), 0, np.arange(1, len(values) + 1))
+    np.maximum.accumulate(idx, out=idx)
+    return np.concatenate(([initial], values))[idx]
+
+
+def arc_points(center, radius, start, stop, direction, steps_per_circ):
+    """
+    Same as camlib.arc() but returns the X and the Y coordinates as two arrays.
+    """
+    if direction == "ccw" and stop <= start:
+        stop += 2 * np.pi
+    if direction == "cw" and stop >= start:
+        stop -= 2 * np.pi
+
+    angle = abs(stop - start)
+    steps = max([int(np.ceil(angle / (2 * np.pi) * steps_per_circ)), 2])
+    delta_angle = (-1.0 if direction == "cw" else 1.0) * angle / steps
+    theta = start + delta_angle * np.arange(steps + 1)
+    return center[0] + radius * np.cos(theta), center[1] + radius * np.sin(theta)
+
+
+class GCodeParser:
+    """
+    Batch G-Code parser. The tokenizer is chosen once per file (see gcode_dialect()); the generic G-Code is
+    tokenized with NumPy, all at once (see tokenize_generic_buffer()). The tokens are columns of values from which
+    the paths are made, also all at once, into the flat arrays of a GCodeParsed object.
+    """
+
+    def __init__(self, dialect='generic', steps_per_circle=64, start_xy=(0, 0), drill_lookup=None,
+                 warn_non_orthogonal=True):
+        """
+
+        :param dialect:             one of the keys of TOKENIZERS
+        :type dialect:              str
+        :param steps_per_circle:    used when parsing G-code arcs
+        :type steps_per_circle:     int
+        :param start_xy:            the point coordinates from where to start the parsing
+        :type start_xy:             tuple
+        :param drill_lookup:        a callable (x, y) -> diameter or None; if set then a ring is added in the
+                                    parsed geometry for each plunge below zero (drill holes)
+        :type drill_lookup:         callable
+        :param warn_non_orthogonal: log a warning for moves that change Z and XY at the same time
+        :type warn_non_orthogonal:  bool
+        """
+        self.dialect = dialect
+        self.tokenizer = TOKENIZERS[dialect]
+        self.steps_per_circle = int(steps_per_circle)
+        self.start_xy = start_xy
+        self.drill_lookup = drill_lookup
+        self.warn_non_orthogonal = warn_non_orthogonal and dialect == 'generic'
+
+        # units found in the G-Code (G20/G21), if any
+        self.units = None
+        self.nr_lines = 0
+
+        # unit circle used for the drill holes; same number of segments as the Shapely buffer() default
+        theta = np.linspace(0, 2 * np.pi, 65)
+        unit_x = np.cos(theta)
+        unit_y = np.sin(theta)
+        unit_x[-1] = unit_x[0]
+        unit_y[-1] = unit_y[0]
+        self._unit_circle = (unit_x, unit_y)
+
+    def parse(self, gcode, force_parsing=None):
+        """
+        Parses the G-Code.
+
+        :param gcode:           the G-Code text
+        :type gcode:            str
+        :param force_parsing:   if False or None, the presence of Gerber-like content ('%', 'MOIN', 'MOMM')
+                                makes the parsing fail
+        :type force_parsing:    bool
+        :return:                the parsed geometry or 'fail'
+        :rtype:                 GCodeParsed | str
+        """
+        if force_parsing is False or force_parsing is None:
+            if '%' in gcode or 'MOIN' in gcode or 'MOMM' in gcode:
+                return "fail"
+
+        tokens = tokenize_generic_buffer(gcode) if self.dialect == 'generic' else None
+        if tokens is None:
+            lines = gcode.splitlines()
+            tokens = len(lines), commands_to_columns(self.tokenizer(lines))
+        self.nr_lines, columns = tokens
+
+        return self.parse_columns(columns)
+
+    def parse_columns(self, columns):
+        """
+        Makes the paths from the tokenized G-Code, for all the lines at once.
+
+        The modal values (position, Z, G and feedrate) are forward filled from the lines that set them. A line with
+        a Z word ends the current path (if it has more than its start point) and starts a new one, at the last
+        point of the previous path; so the paths are the groups of lines between the Z lines. Each line adds one
+        point (G0, G1) or the points of an arc (G2, G3). When drilling, a plunge below zero adds a ring for the
+        drill hole before the path which follows it.
+
+        :param columns:     a dict with an array for each letter in COLUMNS, one row for each line, NaN where a line
+                            does not have the letter
+        :type columns:      dict
+        :return:            the parsed geometry
+        :rtype:             GCodeParsed
+        """
+        g_col = columns['G']
+
+        # ## Units; the lines that set them are not used otherwise
+        units_lines = (g_col == 20.0) | (g_col == 21.0)
+        if units_lines.any():
+            self.units = {20.0: "IN", 21.0: "MM"}[g_col[units_lines][-1]]
+            columns = {letter: column[~units_lines] for letter, column in columns.items()}
+            g_col = columns['G']
+
+        x_col = columns['X']
+        y_col = columns['Y']
+        z_col = columns['Z']
+        nr_rows = len(g_col)
+
+        # the state after each line and before it
+        cur_x = forward_fill(x_col, 0.0)
+        cur_y = forward_fill(y_col, 0.0)
+        cur_z = forward_fill(z_col, 0.0)
+        cur_g = forward_fill(g_col, 0.0).astype(np.int64)
+        cur_f = forward_fill(columns['F'], 0.0)
+        prev_x = np.concatenate(([0.0], cur_x[:-1]))
+        prev_y = np.concatenate(([0.0], cur_y[:-1]))
+        prev_z = np.concatenate(([0.0], cur_z[:-1]))
+        prev_g = np.concatenate(([0], cur_g[:-1]))
+        prev_f = np.concatenate(([0.0], cur_f[:-1]))
+
+        has_z = ~np.isnan(z_col)
+        has_xy = ~np.isnan(x_col) | ~np.isnan(y_col)
+
+        if self.warn_non_orthogonal:
+            for row in np.flatnonzero(has_z & has_xy & (z_col != prev_z)).tolist():
+                log.warning("Non-orthogonal motion: From %s" % str(
+                    {'X': prev_x[row], 'Y': prev_y[row], 'Z': prev_z[row], 'G': prev_g[row]}))
+                log.warning("  To: %s" % str(
+                    {letter: columns[letter][row] for letter in COLUMNS if not np.isnan(columns[letter][row])}))
+
+        # ## The points added by each line
+        line_rows = np.flatnonzero(has_xy & ((cur_g == 0) | (cur_g == 1)))
+        arc_rows = np.flatnonzero(has_xy & ((cur_g == 2) | (cur_g == 3)))
+        no_center = np.isnan(columns['I'][arc_rows]) | np.isnan(columns['J'][arc_rows])
+        if no_center.any():
+            raise KeyError('I' if np.isnan(columns['I'][arc_rows[no_center][0]]) else 'J')
+
+        i_val = columns['I'][arc_rows]
+        j_val = columns['J'][arc_rows]
+        center_x = i_val + prev_x[arc_rows]
+        center_y = j_val + prev_y[arc_rows]
+        radius = np.sqrt(i_val ** 2 + j_val ** 2)
+        start = np.arctan2(-j_val, -i_val)
+        stop = np.arctan2(-center_y + cur_y[arc_rows], -center_x + cur_x[arc_rows])
+        ccw = cur_g[arc_rows] == 3
+        stop = np.where(ccw & (stop <= start), stop + 2 * np.pi, stop)
+        stop = np.where(~ccw & (stop >= start), stop - 2 * np.pi, stop)
+        angle = np.abs(stop - start)
+        steps = np.maximum(np.ceil(angle / (2 * np.pi) * self.steps_per_circle).astype(np.int64), 2)
+        delta_angle = np.where(ccw, 1.0, -1.0) * angle / steps
+
+        row_points = np.zeros(nr_rows, dtype=np.int64)
+        row_points[line_rows] = 1
+        row_points[arc_rows] = steps + 1
+
+        # ## The paths: the rows after a Z line (included) and before the next one
+        row_group = np.cumsum(has_z)
+        nr_groups = int(row_group[-1]) + 1 if nr_rows else 1
+        z_rows = np.flatnonzero(has_z)
+        group_points = np.bincount(row_group, weights=row_points, minlength=nr_groups).astype(np.int64)
+        is_path = group_points > 0
+        path_groups = np.flatnonzero(is_path)
+
+        # ## The drill holes, made when a Z line plunges below zero
+        hole_radius = np.zeros(nr_groups)
+        has_hole = np.zeros(nr_groups, dtype=bool)
+        if self.drill_lookup is not None:
+            for row in z_rows[cur_z[z_rows] < 0].tolist():
+                dia = self.drill_lookup(prev_x[row], prev_y[row])
+                if dia is not None:
+                    has_hole[row_group[row]] = True
+                    hole_radius[row_group[row]] = dia / 2.0
+        ring_size = len(self._unit_circle[0])
+
+        # each group is made of: the hole ring, the start point of the path and the points of its rows
+        group_size = has_hole * ring_size + is_path + group_points
+        group_start = np.cumsum(group_size) - group_size
+        nr_points = int(group_size.sum())
+
+        xs = np.empty(nr_points)
+        ys = np.empty(nr_points)
+        zs = np.empty(nr_points)
+        gs = np.empty(nr_points, dtype=np.int8)
+        fs = np.empty(nr_points)
+
+        # the points of the rows
+        row_start = group_start[row_group] + has_hole[row_group] * ring_size + is_path[row_group] + \
+            (np.cumsum(row_points) - row_points) - (np.cumsum(group_points) - group_points)[row_group]
+        pos = row_start[line_rows]
+        xs[pos] = cur_x[line_rows]
+        ys[pos] = cur_y[line_rows]
+        zs[pos] = cur_z[line_rows]
+        gs[pos] = cur_g[line_rows]
+        fs[pos] = cur_f[line_rows]
+
+        arc_idx = np.repeat(np.arange(len(arc_rows)), steps + 1)
+        arc_step = np.arange(len(arc_idx)) - np.repeat(np.cumsum(steps + 1) - (steps + 1), steps + 1)
+        theta = start[arc_idx] + delta_angle[arc_idx] * arc_step
+        pos = row_start[arc_rows][arc_idx] + arc_step
+        xs[pos] = center_x[arc_idx] + radius[arc_idx] * np.cos(theta)
+        ys[pos] = center_y[arc_idx] + radius[arc_idx] * np.sin(theta)
+        zs[pos] = cur_z[arc_rows][arc_idx]
+        gs[pos] = cur_g[arc_rows][arc_idx]
+        fs[pos] = cur_f[arc_rows][arc_idx]
+
+        # the drill hole rings
+        hole_groups = np.flatnonzero(has_hole)
+        hole_rows = z_rows[hole_groups - 1]
+        ux, uy = self._unit_circle
+        pos = (group_start[hole_groups][:, None] + np.arange(ring_size)).ravel()
+        xs[pos] = (ux * hole_radius[hole_groups][:, None] + prev_x[hole_rows][:, None]).ravel()
+        ys[pos] = (uy * hole_radius[hole_groups][:, None] + prev_y[hole_rows][:, None]).ravel()
+        zs[pos] = np.repeat(cur_z[hole_rows], ring_size)
+        gs[pos] = np.repeat(prev_g[hole_rows], ring_size)
+        fs[pos] = np.repeat(prev_f[hole_rows], ring_size)
+
+        # the start points of the paths: the first one starts from start_xy, the next ones from the last point of
+        # the previous path, at the height set by the Z line that ended it
+        path_end = group_start[path_groups] + group_size[path_groups]
+        pos = path_end - group_points[path_groups] - 1
+        if len(path_groups):
+            xs[pos[0]] = float(self.start_xy[0])
+            ys[pos[0]] = float(self.start_xy[1])
+            zs[pos[0]] = 0.0
+            gs[pos[0]] = 0
+            fs[pos[0]] = 0.0
+            last = path_end[:-1] - 1
+            xs[pos[1:]] = xs[last]
+            ys[pos[1:]] = ys[last]
+            zs[pos[1:]] = cur_z[z_rows[path_groups[:-1]]]
+            gs[pos[1:]] = gs[last]
+            fs[pos[1:]] = fs[last]
+
+        # the kind of a path is the one of its last move
+        xy_rows = np.flatnonzero(has_xy)
+        row_kind = np.where(cur_z[xy_rows] > 0, KIND_TRAVEL, 0) | np.where(cur_g[xy_rows] > 0, KIND_SLOW, 0)
+        xy_groups = row_group[xy_rows]
+        last = last_of_runs(xy_groups)
+        group_kind = np.zeros(nr_groups, dtype=np.uint8)
+        group_kind[xy_groups[last]] = row_kind[last]
+
+        # the segments in order: the ring and the path of each group
+        ends = np.concatenate((group_start[hole_groups] + ring_size, path_end))
+        kinds = np.concatenate((np.full(len(hole_groups), KIND_HOLE, dtype=np.uint8), group_kind[path_groups]))
+        order = np.lexsort((np.concatenate((np.zeros(len(hole_groups)), np.ones(len(path_groups)))),
+                            np.concatenate((hole_groups, path_groups))))
+
+        return GCodeParsed(xs, ys, zs, gs, fs, np.concatenate(([0], ends[order])), kinds[order])
+
+
+def parsed_geometries(gcode_parsed):
+    """
+    Returns the geometry of a parsed G-Code without creating the legacy dictionaries.
+
+    :param gcode_parsed:    a GCodeParsed object or a legacy list of {"geom": geometry, "kind": kind}
+    :return:                array of Shapely geometries
+    :rtype:                 numpy.ndarray
+    """
+    if isinstance(gcode_parsed, GCodeParsed):
+        return gcode_parsed.geometries()
+
+    geoms = np.empty(len(gcode_parsed), dtype=object)
+    geoms[:] = [geo['geom'] for geo in gcode_parsed]
+    return geoms
+
+
+def parsed_kinds(gcode_parsed):
+    """
+    Returns the kind codes (KIND_TRAVEL | KIND_SLOW | KIND_HOLE) of a parsed G-Code.
+
+    :param gcode_parsed:    a GCodeParsed object or a legacy list of {"geom": geometry, "kind": kind}
+    :return:                array of kind codes
+    :rtype:                 numpy.ndarray
+    """
+    if isinstance(gcode_parsed, GCodeParsed):
+        return gcode_parsed.kind_codes()
+    return np.array([kind_from_list(geo['kind']) for geo in gcode_parsed], dtype=np.uint8).reshape(-1)
@@ -1,11 +1,16 @@
 
 from PyQt6 import QtWidgets
-from camlib import Geometry, arc, arc_angle, ApertureMacro, grace, flatten_shapely_geometry
+from camlib import Geometry, arc, arc_angle, ApertureMacro, grace, flatten_shapely_geometry, TiledUnion, \
+    affine_transform_geometry, scale_matrix, translation_matrix, rotation_matrix, skew_matrix
+from appCommon.GeometryArray import GeometryArray
 
 from appParsers.ParseDXF import getdxfgeo
 from appParsers.ParseSVG import svgparselength, getsvggeo, svgparse_viewbox
+from appParsers.ParseGerber_Tokenizer import GerberTokenizer, read_gerber_file, COMMENT, X2, LPOL, FMT, MODE, \
+    FMT_ALT, FMT_ORCAD, UNITS, ABSREL, AM, AD, OPCODE, TOOL, REGION_ON, REGION_OFF, INTERP, LIN, QUAD, CIRC, EOF
 
 import numpy as np
+import shapely
 import traceback
 from copy import deepcopy
 
@@ -76,6 +81,9 @@ class Gerber(Geometry):
 
     app = None
 
+    # attributes that hold the geometry changed by apply_affine()
+    affine_attrs = ['solid_geometry', 'follow_geometry', 'tools']
+
     def __init__(self, steps_per_circle=None):
         """
         Use ``gerber.parse_files()`` or ``gerber.parse_lines()`` to populate the object from Gerber source.
@@ -145,6 +153,13 @@ class Gerber(Geometry):
 
         self.source_file = ''
 
+        # the geometry of the apertures, at (0, 0), placed at each flash by create_flash_geometry()
+        # the key is made by flash_template_key()
+        self.flash_templates = {}
+
+        # the locations of the flashes of each aperture, made by flash_locations()
+        self.flash_index = {}
+
         # #############################################################################################################
         # ################################# Parser patterns ###########################################################
         # #############################################################################################################
@@ -328,9 +343,8 @@ class Gerber(Geometry):
 
     def parse_file(self, filename, follow=False):
         """
-        Calls Gerber.parse_lines() with generator of lines
-        read from the given file. Will split the lines if multiple
-        statements are found in a single original line.
+        Reads the given file in one go and calls Gerber.parse_tokens() with the commands of the file. Will split the
+        lines if multiple statements are found in a single original line.
 
         The following line is split into two::
 
@@ -346,61 +360,25 @@ class Gerber(Geometry):
         :return:                None
         """
 
-        with open(filename, 'r') as gfile:
-
-            read_gfile = gfile.read()
+        self.source_file = read_gerber_file(filename)
+        split_lines = self.source_file.splitlines()
 
-            # clean KiCAD files of garbage
-            if '%TF.' in read_gfile or '%TO.' in read_gfile or '%TD' in read_gfile or '%TA' in read_gfile:
-                new_gfile = ""
-                for line in read_gfile.splitlines():
-                    if '%TF.' in line or '%TO.' in line or '%TD' in line or '%TA' in line:
-                        continue
-                    new_gfile += '%s\n' % line
-                split_lines = new_gfile.splitlines()
-            else:
-                split_lines = read_gfile.splitlines()
-
-            def line_generator():
-                for line in split_lines:
-                    line = line.strip(' \r\n')
-                    while len(line) > 0:
-
-                        # If ends with '%' leave as is.
-                        if line[-1] == '%':
-                            yield line
-                            break
-
-                        # Split after '*' if any.
-                        starpos = line.find('*')
-                        if starpos > -1:
-                            cleanline = line[:starpos + 1]
-                            yield cleanline
-                            line = line[starpos + 1:]
-
-                        # Otherwise leave as is.
-                        else:
-                            # yield clean line
-                            yield line
-                            break
+        # the KiCAD attributes (%TF., %TO., %TD, %TA) are skipped by the tokenizer
+        tokens = GerberTokenizer(self).tokenize(split_lines)
+        ret_val = self.parse_tokens(tokens, nr_lines=len(split_lines))
 
-            processed_lines = list(line_generator())
-            ret_val = self.parse_lines(processed_lines)
-
-            if ret_val == 'fail':
-                return 'fail'
-            elif ret_val == "defective":
-                return "defective"
-            elif ret_val == 'drill':
-                return 'drill_gx2'
-            else:
-                return
+        if ret_val == 'fail':
+            return 'fail'
+        elif ret_val == "defective":
+            return "defective"
+        elif ret_val == 'drill':
+            return 'drill_gx2'
+        else:
+            return
 
-    # @profile
     def parse_lines(self, glines):
         """
-        Main Gerber parser. Reads Gerber and populates ``self.paths``, ``self.tools``,
-        ``self.flashes``, ``self.regions`` and ``self.units``.
+        Parses Gerber code that is already split in commands, one for each element of the list.
 
         :param glines: Gerber code as list of strings, each element being
             one line of the source file.
@@ -408,6 +386,28 @@ class Gerber(Geometry):
         :return: only errors/warnings
         :rtype: str
         """
+        self.source_file = ''.join('%s\n' % gline for gline in glines)
+
+        tokens = GerberTokenizer(self).tokenize(glines, split=False, strip_attributes=False)
+        return self.parse_tokens(tokens, nr_lines=len(glines))
+
+    # @profile
+    def parse_tokens(self, tokens, nr_lines=0):
+        """
+        Main Gerber parser. Builds the geometry from the Gerber commands, classified by the GerberTokenizer.
+        Populates ``self.paths``, ``self.tools``, ``self.flashes``, ``self.regions`` and ``self.units``.
+
+        :param tokens:      the Gerber commands, in order, as (kind, line number, command, groups)
+        :type tokens:       collections.abc.Iterable[tuple]
+        :param nr_lines:    number of lines of the Gerber source, for the user
+        :type nr_lines:     int
+        :return:            only errors/warnings
+        :rtype:             str
+        """
+
+        # the commands that the parser does not accept for their kind (e.g. moves without an aperture) are
+        # classified again, with the patterns that follow
+        tokenizer = GerberTokenizer(self)
 
         is_excellon_gx2 = False
 
@@ -424,7 +424,8 @@ class Gerber(Geometry):
         # Only then they are combined via unary_union and added or
         # subtracted from solid_geometry. This is ~100 times faster than
         # applying a union for every new polygon.
-        poly_buffer = []
+        # With the tiled union the polygons are joined while they are added, per tile.
+        poly_buffer = self.new_poly_buffer()
 
         # store here the follow geometry
         follow_buffer = []
@@ -468,33 +469,26 @@ class Gerber(Geometry):
 
         s_tol = float(self.app.options["gerber_simp_tolerance"])
 
-        self.app.inform.emit('%s %d %s.' % (_("Gerber processing. Parsing"), len(glines), _("Lines").lower()))
+        self.app.inform.emit('%s %d %s.' % (_("Gerber processing. Parsing"), nr_lines, _("Lines").lower()))
         try:
-            for gline in glines:
+            for kind, line_num, gline, groups in tokens:
                 if self.app.abort_flag:
                     # graceful abort requested by the user
                     raise grace
 
-                line_num += 1
-                self.source_file += gline + '\n'
-
-                # Cleanup #
-                gline = gline.strip(' \r\n')
                 # self.app.log.debug("Line=%3s %s" % (line_num, gline))
 
                 # ###############################################################
                 # ################   Ignored lines   ############################
                 # ################     Comments      ############################
                 # ###############################################################
-                match = self.comm_re.search(gline)
-                if match:
+                if kind == COMMENT:
                     continue
 
                 # ######################################################################################################
                 # ######## Detect GERBER X2 format #####################################################################
                 # ######################################################################################################
-                match = self.gx2_re.search(gline)
-                if match:
+                if kind == X2:
                     self.app.log.warning('Gerber X2 format detected !!!')
                     self.app.inform.emit(
                         '[WARNING] %s' % _('Gerber X2 format detected. Parsing may not be done correctly.'))
@@ -512,9 +506,8 @@ class Gerber(Geometry):
                 # ########   If polarity changes, creates geometry from current #
                 # ########    buffer, then adds or subtracts accordingly.       #
                 # ###############################################################
-                match = self.lpol_re.search(gline)
-                if match:
-                    new_polarity = match.group(1)
+                if kind == LPOL:
+                    new_polarity = groups[0]
                     # self.app.log.info("Polarity CHANGE, LPC = %s, poly_buff = %s" % (self.is_lpc, poly_buffer))
                     self.is_lpc = True if new_polarity == 'C' else False
                     try:
@@ -564,14 +557,19 @@ class Gerber(Geometry):
                         buff_length = 1
 
                     if buff_length > 0:
+                        if isinstance(poly_buffer, TiledUnion):
+                            new_poly = poly_buffer.result()
+                        else:
+                            new_poly = unary_union(poly_buffer)
+
                         if current_polarity == 'D':
-                            self.solid_geometry = self.solid_geometry.union(unary_union(poly_buffer))
+                            self.solid_geometry = self.solid_geometry.union(new_poly)
 
                         else:
-                            self.solid_geometry = self.solid_geometry.difference(unary_union(poly_buffer))
+                            self.solid_geometry = self.solid_geometry.difference(new_poly)
 
                         # follow_buffer = []
-                        poly_buffer = []
+                        poly_buffer = self.new_poly_buffer()
 
                     current_polarity = new_polarity
                     continue
@@ -581,13 +579,12 @@ class Gerber(Geometry):
                 # #####################  Example: %FSLAX24Y24*%  #################
                 # ################################################################
 
-                match = self.fmt_re.search(gline)
-                if match:
-                    absolute = {'A': 'Absolute', 'I': 'Relative'}[match.group(2)]
-                    if match.group(1) is not None:
-                        self.gerber_zeros = match.group(1)
-                    self.int_digits = int(match.group(3))
-                    self.frac_digits = int(match.group(4))
+                if kind == FMT:
+                    absolute = {'A': 'Absolute', 'I': 'Relative'}[groups[1]]
+                    if groups[0] is not None:
+                        self.gerber_zeros = groups[0]
+                    self.int_digits = int(groups[2])
+                    self.frac_digits = int(groups[3])
                     self.app.log.debug("Gerber format found. (%s) " % str(gline))
 
                     self.app.log.debug(
@@ -600,9 +597,8 @@ class Gerber(Geometry):
                 # ######################## Mode (IN/MM)    #######################
                 # #####################    Example: %MOIN*%  #####################
                 # ################################################################
-                match = self.mode_re.search(gline)
-                if match:
-                    self.units = match.group(1)
+                if kind == MODE:
+                    self.units = groups[0]
                     self.app.log.debug("Gerber units found = %s" % self.units)
                     # Changed for issue #80
                     # self.convert_units(match.group(1))
@@ -614,20 +610,19 @@ class Gerber(Geometry):
                 # ################################################################
                 # Combined Number format and Mode --- Allegro does this ##########
                 # ################################################################
-                match = self.fmt_re_alt.search(gline)
-                if match:
-                    absolute = {'A': 'Absolute', 'I': 'Relative'}[match.group(2)]
-                    if match.group(1) is not None:
-                        self.gerber_zeros = match.group(1)
-                    self.int_digits = int(match.group(3))
-                    self.frac_digits = int(match.group(4))
+                if kind == FMT_ALT:
+                    absolute = {'A': 'Absolute', 'I': 'Relative'}[groups[1]]
+                    if groups[0] is not None:
+                        self.gerber_zeros = groups[0]
+                    self.int_digits = int(groups[2])
+                    self.frac_digits = int(groups[3])
                     self.app.log.debug("Gerber format found. (%s) " % str(gline))
                     self.app.log.debug(
                         "Gerber format found. Gerber zeros = %s (L-omit leading zeros, T-omit trailing zeros, "
                         "D-no zero suppression)" % self.gerber_zeros)
                     self.app.log.debug("Gerber format found. Coordinates type = %s (Absolute or Relative)" % absolute)
 
-                    self.units = match.group(5)
+                    self.units = groups[4]
                     s_tol = float(self.app.options["gerber_simp_tolerance"]) / 25.4 if self.units == 'IN' else s_tol
 
                     self.app.log.debug("Gerber units found = %s" % self.units)
@@ -639,19 +634,18 @@ class Gerber(Geometry):
                 # ################################################################
                 # ####     Search for OrCAD way for having Number format  ########
                 # ################################################################
-                match = self.fmt_re_orcad.search(gline)
-                if match:
-                    if match.group(1) is not None:
-                        if match.group(1) == 'G74':
+                if kind == FMT_ORCAD:
+                    if groups[0] is not None:
+                        if groups[0] == 'G74':
                             quadrant_mode = 'SINGLE'
-                        elif match.group(1) == 'G75':
+                        elif groups[0] == 'G75':
                             quadrant_mode = 'MULTI'
-                        absolute = {'A': 'Absolute', 'I': 'Relative'}[match.group(3)]
-                        if match.group(2) is not None:
-                            self.gerber_zeros = match.group(2)
+                        absolute = {'A': 'Absolute', 'I': 'Relative'}[groups[2]]
+                        if groups[1] is not None:
+                            self.gerber_zeros = groups[1]
 
-                        self.int_digits = int(match.group(4))
-                        self.frac_digits = int(match.group(5))
+                        self.int_digits = int(groups[3])
+                        self.frac_digits = int(groups[4])
                         self.app.log.debug("Gerber format found. (%s) " % str(gline))
                         self.app.log.debug(
                             "Gerber format found. Gerber zeros = %s (L-omit leading zeros, T-omit trailing zeros, "
@@ -659,7 +653,7 @@ class Gerber(Geometry):
                         self.app.log.debug(
                             "Gerber format found. Coordinates type = %s (Absolute or Relative)" % absolute)
 
-                        self.units = match.group(1)
+                        self.units = groups[0]
                         s_tol = float(
                             self.app.options["gerber_simp_tolerance"]) / 25.4 if self.units == 'IN' else s_tol
 
@@ -668,13 +662,13 @@ class Gerber(Geometry):
                         # self.convert_units(match.group(5))
                         self.conversion_done = True
                         continue
+                    kind, groups = tokenizer.classify(gline, after=FMT_ORCAD, in_macro=current_macro is not None)
 
                 # ################################################################
                 # ############     Units (G70/1) OBSOLETE   ######################
                 # ################################################################
-                match = self.units_re.search(gline)
-                if match:
-                    obs_gerber_units = {'0': 'IN', '1': 'MM'}[match.group(1)]
+                if kind == UNITS:
+                    obs_gerber_units = {'0': 'IN', '1': 'MM'}[groups[0]]
                     self.units = obs_gerber_units
                     s_tol = float(self.app.options["gerber_simp_tolerance"]) / 25.4 if self.units == 'IN' else s_tol
 
@@ -687,9 +681,8 @@ class Gerber(Geometry):
                 # ################################################################
                 # #####   Absolute/relative coordinates G90/1 OBSOLETE ###########
                 # ################################################################
-                match = self.absrel_re.search(gline)
-                if match:
-                    absolute = {'0': "Absolute", '1': "Relative"}[match.group(1)]
+                if kind == ABSREL:
+                    absolute = {'0': "Absolute", '1': "Relative"}[groups[0]]
                     self.app.log.warning(
                         "Gerber obsolete coordinates type found = %s (Absolute or Relative) " % absolute)
                     continue
@@ -702,25 +695,23 @@ class Gerber(Geometry):
                 # ################################################################
                 # ################################################################
                 if current_macro is None:  # No macro started yet
-                    match = self.am1_re.search(gline)
                     # Start macro if there is a match, else not an AM, carry on.
-                    if match:
+                    if kind == AM:
                         self.app.log.debug("Starting macro. Line %d: %s" % (line_num, gline))
-                        current_macro = match.group(1)
+                        current_macro = groups[0]
                         self.aperture_macros[current_macro] = ApertureMacro(name=current_macro)
-                        if match.group(2):  # Append
-                            self.aperture_macros[current_macro].append(match.group(2))
-                        if match.group(3):  # Finish macro
+                        if groups[1]:  # Append
+                            self.aperture_macros[current_macro].append(groups[1])
+                        if groups[2]:  # Finish macro
                             # self.aperture_macros[current_macro].parse_content()
                             current_macro = None
                             self.app.log.debug("Macro complete in 1 line.")
                         continue
                 else:  # Continue macro
                     self.app.log.debug("Continuing macro. Line %d." % line_num)
-                    match = self.am2_re.search(gline)
-                    if match:  # Finish macro
+                    if groups[1]:  # Finish macro
                         self.app.log.debug("End of macro. Line %d." % line_num)
-                        self.aperture_macros[current_macro].append(match.group(1))
+                        self.aperture_macros[current_macro].append(groups[0])
                         # self.aperture_macros[current_macro].parse_content()
                         current_macro = None
                     else:  # Append
@@ -730,10 +721,9 @@ class Gerber(Geometry):
                 # ################################################################
                 # ##############   Aperture definitions %ADD...  #################
                 # ################################################################
-                match = self.ad_re.search(gline)
-                if match:
+                if kind == AD:
                     # log.info("Found aperture definition. Line %d: %s" % (line_num, gline))
-                    self.aperture_parse(match.group(1), match.group(2), match.group(3))
+                    self.aperture_parse(groups[0], groups[1], groups[2])
                     continue
 
                 # ################################################################
@@ -741,9 +731,10 @@ class Gerber(Geometry):
                 # ###########   Operation code alone, usually just D03 (Flash) ###
                 # self.opcode_re = re.compile(r'^D0?([123])\*$')
                 # ################################################################
-                match = self.opcode_re.search(gline)
-                if match and current_aperture != "failure":
-                    current_operation_code = int(match.group(1))
+                if kind == OPCODE and current_aperture == "failure":
+                    kind, groups = tokenizer.classify(gline, after=OPCODE)
+                if kind == OPCODE:
+                    current_operation_code = int(groups[0])
                     current_d = current_operation_code
 
                     if current_operation_code == 3:
@@ -753,7 +744,7 @@ class Gerber(Geometry):
                             # self.app.log.debug("Bare op-code %d." % current_operation_code)
                             geo_dict = {}
                             flash = self.create_flash_geometry(
-                                Point(current_x, current_y), self.tools[current_aperture],
+                                (current_x, current_y), self.tools[current_aperture],
                                 self.steps_per_circle)
 
                             geo_dict['follow'] = Point([current_x, current_y])
@@ -786,9 +777,8 @@ class Gerber(Geometry):
                 # ################  Example: D12*         ########################
                 # self.tool_re = re.compile(r'^(?:G54)?D(\d\d+)\*$')
                 # ################################################################
-                match = self.tool_re.search(gline)
-                if match:
-                    current_aperture = int(match.group(1))
+                if kind == TOOL:
+                    current_aperture = int(groups[0])
 
                     # self.app.log.debug("Line %d: Aperture change to (%s)" % (line_num, current_aperture))
 
@@ -851,7 +841,9 @@ class Gerber(Geometry):
                 # ################################################################
                 # ################  G36* - Begin region   ########################
                 # ################################################################
-                if self.regionon_re.search(gline) and current_aperture != "failure":
+                if kind == REGION_ON and current_aperture == "failure":
+                    kind, groups = tokenizer.classify(gline, after=REGION_ON)
+                if kind == REGION_ON:
                     try:
                         path_length = len(path)
                     except TypeError:
@@ -925,7 +917,9 @@ class Gerber(Geometry):
                 # ################################################################
                 # ################  G37* - End region     ########################
                 # ################################################################
-                if self.regionoff_re.search(gline) and current_aperture != "failure":
+                if kind == REGION_OFF and current_aperture == "failure":
+                    kind, groups = tokenizer.classify(gline, after=REGION_OFF)
+                if kind == REGION_OFF:
                     making_region = False
 
                     if 0 not in self.tools:
@@ -1059,9 +1053,8 @@ class Gerber(Geometry):
                 # ####  sometimes by itself (handled here).  #####################
                 # ####  Example: G01*                        #####################
                 # ################################################################
-                match = self.interp_re.search(gline)
-                if match:
-                    current_interpolation_mode = int(match.group(1))
+                if kind == INTERP:
+                    current_interpolation_mode = int(groups[0])
                     continue
 
                 # ################################################################
@@ -1069,8 +1062,9 @@ class Gerber(Geometry):
                 # ######### Operation code (D0x) missing is deprecated   #########
                 # REGEX: r'^(?:G0?(1))?(?:X(-?\d+))?(?:Y(-?\d+))?(?:D0([123]))?\*$'
                 # ################################################################
-                match = self.lin_re.search(gline)
-                if match and current_aperture != "failure":
+                if kind == LIN and current_aperture == "failure":
+                    kind, groups = tokenizer.classify(gline, after=LIN)
+                if kind == LIN:
                     # Dxx alone?
                     # if match.group(1) is None and match.group(2) is None and match.group(3) is None:
                     #     try:
@@ -1082,22 +1076,22 @@ class Gerber(Geometry):
                     #       operation code.
 
                     # Parse coordinates
-                    if match.group(2) is not None:
-                        linear_x = parse_gerber_number(match.group(2),
+                    if groups[1] is not None:
+                        linear_x = parse_gerber_number(groups[1],
                                                        self.int_digits, self.frac_digits, self.gerber_zeros)
                         current_x = linear_x
                     else:
                         linear_x = current_x
-                    if match.group(3) is not None:
-                        linear_y = parse_gerber_number(match.group(3),
+                    if groups[2] is not None:
+                        linear_y = parse_gerber_number(groups[2],
                                                        self.int_digits, self.frac_digits, self.gerber_zeros)
                         current_y = linear_y
                     else:
                         linear_y = current_y
 
                     # Parse operation code
-                    if match.group(4) is not None:
-                        current_operation_code = int(match.group(4))
+                    if groups[3] is not None:
+                        current_operation_code = int(groups[3])
 
                         # Pen down: add segment
                     if current_operation_code == 1:
@@ -1124,7 +1118,7 @@ class Gerber(Geometry):
 
                                     # this treats the case when we are storing geometry as solids
                                     flash = self.create_flash_geometry(
-                                        Point([current_x, current_y]),
+                                        (current_x, current_y),
                                         self.tools[current_aperture],
                                         self.steps_per_circle
                                     )
@@ -1380,7 +1374,7 @@ class Gerber(Geometry):
 
                         # this treats the case when we are storing geometry as solids
                         flash = self.create_flash_geometry(
-                            Point([linear_x, linear_y]),
+                            (linear_x, linear_y),
                             self.tools[current_aperture],
                             self.steps_per_circle
                         )
@@ -1414,9 +1408,8 @@ class Gerber(Geometry):
                 # ################################################################
                 # ######### G74/75* - Single or multiple quadrant arcs  ##########
                 # ################################################################
-                match = self.quad_re.search(gline)
-                if match:
-                    if match.group(1) == '4':
+                if kind == QUAD:
+                    if groups[0] == '4':
                         quadrant_mode = 'SINGLE'
                     else:
                         quadrant_mode = 'MULTI'
@@ -1428,11 +1421,12 @@ class Gerber(Geometry):
                 # ######### Ex. format: G03 X0 Y50 I-50 J0 where the     #########
                 # ######### X, Y coords are the coords of the End Point  #########
                 # ################################################################
-                match = self.circ_re.search(gline)
-                if match and current_aperture != "failure":
+                if kind == CIRC and current_aperture == "failure":
+                    kind, groups = tokenizer.classify(gline, after=CIRC)
+                if kind == CIRC:
                     arcdir = [None, None, "cw", "ccw"]
 
-                    mode, circular_x, circular_y, i, j, d = match.groups()
+                    mode, circular_x, circular_y, i, j, d = groups
 
                     try:
                         circular_x = parse_gerber_number(circular_x,
@@ -1615,12 +1609,12 @@ class Gerber(Geometry):
                             continue
                         else:
                             self.app.log.warning("Invalid arc in line %d." % line_num)
+                            kind, groups = tokenizer.classify(gline, after=CIRC)
 
                 # ################################################################
                 # ######### EOF - END OF FILE ####################################
                 # ################################################################
-                match = self.eof_re.search(gline)
-                if match:
+                if kind == EOF:
                     continue
 
                 # ################################################################
@@ -1705,7 +1699,13 @@ class Gerber(Geometry):
             self.app.log.warning("Joining %d polygons." % buff_length)
             self.app.inform.emit('%s: %d.' % (_("Gerber processing. Joining polygons"), buff_length))
 
-            if self.use_buffer_for_union:
+            if isinstance(poly_buffer, TiledUnion):
+                self.app.log.debug("Union by tiles...")
+                new_poly = poly_buffer.result()
+                new_poly = new_poly.buffer(0, int(self.steps_per_circle))
+                self.app.log.warning("Union(tiles) done.")
+
+            elif self.use_buffer_for_union:
                 self.app.log.debug("Union by buffer...")
 
                 new_poly = MultiPolygon(poly_buffer)
@@ -1801,65 +1801,128 @@ class Gerber(Geometry):
         if is_excellon_gx2 is True:
             return 'drill'
 
+    def new_poly_buffer(self):
+        """
+        Makes the storage for the polygons of a polarity layer: a list, joined when the polarity changes, or a
+        TiledUnion when the tiled union is used, which joins the polygons while they are added.
+
+        :return:    the storage for the polygons
+        :rtype:     list | TiledUnion
+        """
+        if not self.app.options["gerber_tiled_union"]:
+            return []
+
+        pool = self.app.pool if self.app.options["global_process_number"] > 1 else None
+        tile_size = 10.0 if str(self.units).upper() == 'MM' else 0.4
+        return TiledUnion(tile_size, pool=pool)
+
     def create_flash_geometry(self, location, aperture, steps_per_circle=None):
+        """
+        The geometry of a flash: the geometry of the aperture (see flash_template()) moved to the flash location.
+
+        :param location:            the flash location
+        :type location:             Point | list | tuple
+        :param aperture:            the aperture dict (see aperture_parse())
+        :type aperture:             dict
+        :param steps_per_circle:    number of segments used to approximate a circle
+        :type steps_per_circle:     int
+        :return:                    the flash geometry; None for an unknown aperture type
+        """
 
         # self.app.log.debug('Flashing @%s, Aperture: %s' % (location, aperture))
 
-        if type(location) == list:
-            location = Point(location)
+        if isinstance(location, Point):
+            location = location.coords[0]
+
+        template = self.flash_template(aperture, steps_per_circle)
+        if template is None or template.is_empty:
+            return template
+        return shapely.transform(template, lambda coords: coords + location)
+
+    def flash_template(self, aperture, steps_per_circle=None):
+        """
+        The geometry of an aperture, centered in (0, 0). It is made once for each aperture and number of steps per
+        circle and kept in ``self.flash_templates``.
+
+        :param aperture:            the aperture dict (see aperture_parse())
+        :type aperture:             dict
+        :param steps_per_circle:    number of segments used to approximate a circle
+        :type steps_per_circle:     int
+        :return:                    the aperture geometry; None for an unknown aperture type
+        """
+        key = flash_template_key(aperture, steps_per_circle)
+        try:
+            return self.flash_templates[key]
+        except KeyError:
+            pass
 
+        template = None
         if aperture['type'] == 'C':  # Circles
-            return location.buffer(aperture['size'] / 2, int(steps_per_circle))
+            template = Point(0, 0).buffer(aperture['size'] / 2, int(steps_per_circle))
 
-        if aperture['type'] == 'R':  # Rectangles
-            loc = location.coords[0]
+        elif aperture['type'] == 'R':  # Rectangles
             width = aperture['width']
             height = aperture['height']
-            minx = loc[0] - width / 2
-            maxx = loc[0] + width / 2
-            miny = loc[1] - height / 2
-            maxy = loc[1] + height / 2
-            return shply_box(minx, miny, maxx, maxy).buffer(0.0000001)
-
-        if aperture['type'] == 'O':  # Obround
-            loc = location.coords[0]
+            template = shply_box(-width / 2, -height / 2, width / 2, height / 2).buffer(0.0000001)
+
+        elif aperture['type'] == 'O':  # Obround
             width = aperture['width']
             height = aperture['height']
             if width > height:
-                p1 = Point(loc[0] + 0.5 * (width - height), loc[1])
-                p2 = Point(loc[0] - 0.5 * (width - height), loc[1])
+                p1 = Point(0.5 * (width - height), 0)
+                p2 = Point(-0.5 * (width - height), 0)
                 c1 = p1.buffer(height * 0.5, int(steps_per_circle))
                 c2 = p2.buffer(height * 0.5, int(steps_per_circle))
             else:
-                p1 = Point(loc[0], loc[1] + 0.5 * (height - width))
-                p2 = Point(loc[0], loc[1] - 0.5 * (height - width))
+                p1 = Point(0, 0.5 * (height - width))
+                p2 = Point(0, -0.5 * (height - width))
                 c1 = p1.buffer(width * 0.5, int(steps_per_circle))
                 c2 = p2.buffer(width * 0.5, int(steps_per_circle))
-            return unary_union([c1, c2]).convex_hull
+            template = unary_union([c1, c2]).convex_hull
 
-        if aperture['type'] == 'P':  # Regular polygon
-            loc = location.coords[0]
+        elif aperture['type'] == 'P':  # Regular polygon
             diam = aperture['diam']
             n_vertices = aperture['nVertices']
-            points = []
-            for i in range(0, n_vertices):
-                x = loc[0] + 0.5 * diam * (np.cos(2 * np.pi * i / n_vertices))
-                y = loc[1] + 0.5 * diam * (np.sin(2 * np.pi * i / n_vertices))
-                points.append((x, y))
-            ply = Polygon(points)
+            angles = 2 * np.pi * np.arange(n_vertices) / n_vertices
+            template = Polygon(np.column_stack((0.5 * diam * np.cos(angles), 0.5 * diam * np.sin(angles))))
             if 'rotation' in aperture:
-                ply = affinity.rotate(ply, aperture['rotation'])
-            return ply
+                template = affinity.rotate(template, aperture['rotation'])
 
-        if aperture['type'] == 'AM':  # Aperture Macro
-            loc = location.coords[0]
-            flash_geo = aperture['macro'].make_geometry(aperture['modifiers'])
-            if flash_geo.is_empty:
+        elif aperture['type'] == 'AM':  # Aperture Macro
+            template = aperture['macro'].make_geometry(aperture['modifiers'])
+            if template.is_empty:
                 self.app.log.warning("Empty geometry for Aperture Macro: %s" % str(aperture['macro'].name))
-            return affinity.translate(flash_geo, xoff=loc[0], yoff=loc[1])
 
-        self.app.log.warning("Unknown aperture type: %s" % aperture['type'])
-        return None
+        else:
+            self.app.log.warning("Unknown aperture type: %s" % aperture['type'])
+            return None
+
+        self.flash_templates[key] = template
+        return template
+
+    def flash_locations(self, apid):
+        """
+        The locations of the flashes of an aperture: the elements of ``self.tools[apid]['geometry']`` that have a
+        Point as 'follow' (see get_flash_locations()). They are found once and kept in ``self.flash_index`` until
+        the geometry of the aperture changes, so the flashes can be used without going through the geometry elements
+        and their polygons.
+
+        :param apid:    the aperture ID
+        :type apid:     int
+        :return:        (locations as a (N, 2) array, indexes of the flash elements in the aperture geometry)
+        :rtype:         tuple
+        """
+        geometry = self.tools[apid].get('geometry', [])
+        try:
+            indexed_geometry, nr_elements, locations, indexes = self.flash_index[apid]
+            if indexed_geometry is geometry and nr_elements == len(geometry):
+                return locations, indexes
+        except KeyError:
+            pass
+
+        locations, indexes = get_flash_locations(geometry)
+        self.flash_index[apid] = (geometry, len(geometry), locations, indexes)
+        return locations, indexes
 
     def create_geometry(self):
         """
@@ -1917,6 +1980,9 @@ class Gerber(Geometry):
             self.app.log.debug("solid_geometry is None")
             return 0, 0, 0, 0
 
+        if isinstance(self.solid_geometry, GeometryArray):
+            return self.solid_geometry.bounds
+
         def bounds_rec(obj):
             if type(obj) is list and type(obj) is not MultiPolygon:
                 minx = np.Inf
@@ -2010,8 +2076,10 @@ class Gerber(Geometry):
 
         units = self.app.app_units if units is None else units
         res = self.app.options['gerber_circle_steps']
+        tol = float(self.app.options['global_tolerance'])
         factor = svgparse_viewbox(svg_root)
-        geos = getsvggeo(svg_root, 'gerber', units=units, res=res, factor=factor, app=self.app)
+        geos = getsvggeo(svg_root, 'gerber', units=units, res=res, factor=factor, app=self.app,
+                         tolerance=tol)
 
         self.app.log.debug("appParsers.ParseGerber.Gerber.import_svg(). Finished parsing the SVG geometry.")
 
@@ -2031,7 +2099,7 @@ class Gerber(Geometry):
         # else:  # It's shapely geometry
         #     self.solid_geometry = [self.solid_geometry, geos]
 
-        if type(geos) == list:
+        if isinstance(geos, list):
             # HACK for importing QRCODE exported by FlatCAM
             try:
                 geos_length = len(geos)
@@ -2044,13 +2112,13 @@ class Gerber(Geometry):
                     geo_qrcode.append(Polygon(i_el).buffer(0, resolution=res))
                 geos = [poly for poly in geo_qrcode]
 
-            if type(self.solid_geometry) == list:
+            if isinstance(self.solid_geometry, list):
                 self.solid_geometry += geos
             else:
                 geos.append(self.solid_geometry)
                 self.solid_geometry = geos
         else:
-            if type(self.solid_geometry) == list:
+            if isinstance(self.solid_geometry, list):
                 self.solid_geometry.append(geos)
             else:
                 self.solid_geometry = [self.solid_geometry, geos]
@@ -2085,7 +2153,8 @@ class Gerber(Geometry):
 
         # Parse into list of shapely objects
         dxf = ezdxf.readfile(filename)
-        geos = getdxfgeo(dxf)
+        geos = getdxfgeo(dxf, steps_per_circle=int(self.app.options['gerber_circle_steps']),
+                         tolerance=float(self.app.options['global_tolerance']))
 
         # trying to optimize the resulting geometry by merging contiguous lines
         geos = list(self.flatten_list(geos))
@@ -2111,8 +2180,8 @@ class Gerber(Geometry):
         if self.solid_geometry is None:
             self.solid_geometry = []
 
-        if type(self.solid_geometry) is list:
-            if type(geos) is list:
+        if isinstance(self.solid_geometry, list):
+            if isinstance(geos, list):
                 self.solid_geometry += geos
             else:
                 self.solid_geometry.append(geos)
@@ -2140,20 +2209,54 @@ class Gerber(Geometry):
             new_el = {'solid': pol, 'follow': pol}
             self.tools[0]['geometry'].append(new_el)
 
+    def apply_affine(self, matrix, size_factor=1.0):
+        """
+        Transforms, in one vectorized pass, the geometry of the object and the geometry stored in the apertures.
+
+        :param matrix:      3x3 affine matrix
+        :type matrix:       np.ndarray
+        :param size_factor: factor for the aperture sizes
+        :type size_factor:  float
+        :return:            None
+        """
+        self.app.log.debug("parseGerber.Gerber.apply_affine()")
+
+        # the flashes are moved with the geometry elements (in place) and the aperture sizes may change
+        self.flash_index = {}
+        # the geometry elements of the apertures are dicts, updated in place
+        transformed = affine_transform_geometry(
+            [self.solid_geometry, self.follow_geometry, [ap.get('geometry') for ap in self.tools.values()]], matrix)
+        self.solid_geometry = transformed[0]
+        self.follow_geometry = transformed[1]
+
+        if size_factor == 1.0:
+            return
+
+        for apid in self.tools:
+            try:
+                if str(self.tools[apid]['type']) == 'R' or str(self.tools[apid]['type']) == 'O':
+                    self.tools[apid]['width'] *= size_factor
+                    self.tools[apid]['height'] *= size_factor
+                elif str(self.tools[apid]['type']) == 'P':
+                    self.tools[apid]['diam'] *= size_factor
+                    self.tools[apid]['nVertices'] *= size_factor
+            except KeyError:
+                pass
+
+            try:
+                if self.tools[apid]['size'] is not None:
+                    self.tools[apid]['size'] = float(self.tools[apid]['size'] * size_factor)
+            except KeyError:
+                pass
+
     def scale(self, xfactor, yfactor=None, point=None):
         """
         Scales the objects' geometry on the XY plane by a given factor.
         These are:
 
-        * ``buffered_paths``
-        * ``flash_geometry``
         * ``solid_geometry``
-        * ``regions``
-
-        NOTE:
-        Does not modify the data used to create these elements. If these
-        are recreated, the scaling will be lost. This behavior was modified
-        because of the complexity reached in this class.
+        * ``follow_geometry``
+        * the geometry stored in the apertures, whose sizes are scaled by ``xfactor``
 
         :param xfactor: Number by which to scale on X axis.
         :type xfactor: float
@@ -2184,108 +2287,18 @@ class Gerber(Geometry):
         if xfactor == 0 and yfactor == 0:
             return
 
-        if point is None:
-            px = 0
-            py = 0
-        else:
-            px, py = point
-
-        # variables to display the percentage of work done
-        self.geo_len = 0
-        try:
-            if isinstance(self.solid_geometry, MultiPolygon):
-                self.geo_len = len(self.solid_geometry.geoms)
-            else:
-                self.geo_len = len(self.solid_geometry)
-        except TypeError:
-            self.geo_len = 1
-
-        self.old_disp_number = 0
-        self.el_count = 0
-
-        def scale_geom(obj):
-            if type(obj) is list:
-                new_obj = []
-                for g in obj:
-                    new_obj.append(scale_geom(g))
-                return new_obj
-            else:
-                try:
-                    self.el_count += 1
-                    disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 99]))
-                    if self.old_disp_number < disp_number <= 100:
-                        self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                        self.old_disp_number = disp_number
-
-                    return affinity.scale(obj, xfactor, yfactor, origin=(px, py))
-                except AttributeError:
-                    return obj
-
-        self.solid_geometry = scale_geom(self.solid_geometry)
-        self.follow_geometry = scale_geom(self.follow_geometry)
-
-        # we need to scale the geometry stored in the Gerber apertures, too
-        try:
-            for apid in self.tools:
-                new_geometry = []
-                if 'geometry' in self.tools[apid]:
-                    for geo_el in self.tools[apid]['geometry']:
-                        new_geo_el = {}
-                        if 'solid' in geo_el:
-                            new_geo_el['solid'] = scale_geom(geo_el['solid'])
-                        if 'follow' in geo_el:
-                            new_geo_el['follow'] = scale_geom(geo_el['follow'])
-                        if 'clear' in geo_el:
-                            new_geo_el['clear'] = scale_geom(geo_el['clear'])
-                        new_geometry.append(new_geo_el)
-
-                self.tools[apid]['geometry'] = deepcopy(new_geometry)
-
-                try:
-                    if str(self.tools[apid]['type']) == 'R' or str(self.tools[apid]['type']) == 'O':
-                        self.tools[apid]['width'] *= xfactor
-                        self.tools[apid]['height'] *= xfactor
-                    elif str(self.tools[apid]['type']) == 'P':
-                        self.tools[apid]['diam'] *= xfactor
-                        self.tools[apid]['nVertices'] *= xfactor
-                except KeyError:
-                    pass
-
-                try:
-                    if self.tools[apid]['size'] is not None:
-                        self.tools[apid]['size'] = float(self.tools[apid]['size'] * xfactor)
-                except KeyError:
-                    pass
-
-        except Exception as e:
-            self.app.log.error('ParseGerber.Gerber.scale() Exception --> %s' % str(e))
-            return 'fail'
-
+        self.transform(scale_matrix(xfactor, yfactor, origin=(0, 0) if point is None else point),
+                       size_factor=xfactor)
         self.app.inform.emit('[success] %s' % _("Done."))
-        self.app.proc_container.new_text = ''
-
-        # ## solid_geometry ???
-        #  It's a cascaded union of objects.
-        # self.solid_geometry = affinity.scale(self.solid_geometry, factor,
-        #                                      factor, origin=(0, 0))
-
-        # # Now buffered_paths, flash_geometry and solid_geometry
-        # self.create_geometry()
 
     def offset(self, vect):
         """
         Offsets the objects' geometry on the XY plane by a given vector.
         These are:
 
-        * ``buffered_paths``
-        * ``flash_geometry``
         * ``solid_geometry``
-        * ``regions``
-
-        NOTE:
-        Does not modify the data used to create these elements. If these
-        are recreated, the scaling will be lost. This behavior was modified
-        because of the complexity reached in this class.
+        * ``follow_geometry``
+        * the geometry stored in the apertures
 
         :param vect: (x, y) offset vector.
         :type vect: tuple
@@ -2304,74 +2317,17 @@ class Gerber(Geometry):
         if dx == 0 and dy == 0:
             return
 
-        # variables to display the percentage of work done
-        if isinstance(self.solid_geometry, (MultiPolygon, MultiLineString)):
-            self.geo_len = len(self.solid_geometry.geoms)
-        elif isinstance(self.solid_geometry, list):
-            self.geo_len = len(self.solid_geometry)
-        elif isinstance(self.solid_geometry, Polygon):
-            self.geo_len = 1
-        else:
-            self.geo_len = 0
-
-        self.old_disp_number = 0
-        self.el_count = 0
-
-        def offset_geom(obj):
-            if type(obj) is list:
-                new_obj = []
-                for g in obj:
-                    new_obj.append(offset_geom(g))
-                return new_obj
-            else:
-                try:
-                    self.el_count += 1
-                    disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 99]))
-                    if self.old_disp_number < disp_number <= 100:
-                        self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                        self.old_disp_number = disp_number
-
-                    return affinity.translate(obj, xoff=dx, yoff=dy)
-                except AttributeError:
-                    return obj
-
-        # ## Solid geometry
-        self.solid_geometry = offset_geom(self.solid_geometry)
-        self.follow_geometry = offset_geom(self.follow_geometry)
-
-        # we need to offset the geometry stored in the Gerber apertures, too
-        try:
-            for apid in self.tools:
-                if 'geometry' in self.tools[apid]:
-                    for geo_el in self.tools[apid]['geometry']:
-                        if 'solid' in geo_el:
-                            geo_el['solid'] = offset_geom(geo_el['solid'])
-                        if 'follow' in geo_el:
-                            geo_el['follow'] = offset_geom(geo_el['follow'])
-                        if 'clear' in geo_el:
-                            geo_el['clear'] = offset_geom(geo_el['clear'])
-
-        except Exception as e:
-            self.app.log.error('ParseGerber.Gerber.offset() Exception --> %s' % str(e))
-            return 'fail'
-
+        self.transform(translation_matrix(dx, dy))
         self.app.inform.emit('[success] %s' % _("Done."))
-        self.app.proc_container.new_text = ''
 
     def mirror(self, axis, point):
         """
         Mirrors the object around a specified axis passing through
         the given point. What is affected:
 
-        * ``buffered_paths``
-        * ``flash_geometry``
         * ``solid_geometry``
-        * ``regions``
-
-        NOTE:
-        Does not modify the data used to create these elements. If these
-        are recreated, the scaling will be lost. This behavior was modified
-        because of the complexity reached in this class.
+        * ``follow_geometry``
+        * the geometry stored in the apertures
 
         :param axis: "X" or "Y" indicates around which axis to mirror.
         :type axis: str
@@ -2381,57 +2337,10 @@ class Gerber(Geometry):
         """
         self.app.log.debug("parseGerber.Gerber.mirror()")
 
-        px, py = point
         xscale, yscale = {"X": (1.0, -1.0), "Y": (-1.0, 1.0)}[axis]
 
-        # variables to display the percentage of work done
-        self.geo_len = 0
-        try:
-            self.geo_len = len(self.solid_geometry)
-        except TypeError:
-            self.geo_len = 1
-
-        self.old_disp_number = 0
-        self.el_count = 0
-
-        def mirror_geom(obj):
-            if type(obj) is list:
-                new_obj = []
-                for g in obj:
-                    new_obj.append(mirror_geom(g))
-                return new_obj
-            else:
-                try:
-                    self.el_count += 1
-                    disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 99]))
-                    if self.old_disp_number < disp_number <= 100:
-                        self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                        self.old_disp_number = disp_number
-
-                    return affinity.scale(obj, xscale, yscale, origin=(px, py))
-                except AttributeError:
-                    return obj
-
-        self.solid_geometry = mirror_geom(self.solid_geometry)
-        self.follow_geometry = mirror_geom(self.follow_geometry)
-
-        # we need to mirror the geometry stored in the Gerber apertures, too
-        try:
-            for apid in self.tools:
-                if 'geometry' in self.tools[apid]:
-                    for geo_el in self.tools[apid]['geometry']:
-                        if 'solid' in geo_el:
-                            geo_el['solid'] = mirror_geom(geo_el['solid'])
-                        if 'follow' in geo_el:
-                            geo_el['follow'] = mirror_geom(geo_el['follow'])
-                        if 'clear' in geo_el:
-                            geo_el['clear'] = mirror_geom(geo_el['clear'])
-        except Exception as e:
-            self.app.log.error('ParseGerber.Gerber.mirror() Exception --> %s' % str(e))
-            return 'fail'
-
+        self.transform(scale_matrix(xscale, yscale, origin=point))
         self.app.inform.emit('[success] %s' % _("Done."))
-        self.app.proc_container.new_text = ''
 
     def skew(self, angle_x, angle_y, point):
         """
@@ -2453,59 +2362,11 @@ class Gerber(Geometry):
         """
         self.app.log.debug("parseGerber.Gerber.skew()")
 
-        px, py = point
-
         if angle_x == 0 and angle_y == 0:
             return
 
-        # variables to display the percentage of work done
-        self.geo_len = 0
-        try:
-            self.geo_len = len(self.solid_geometry)
-        except TypeError:
-            self.geo_len = 1
-
-        self.old_disp_number = 0
-        self.el_count = 0
-
-        def skew_geom(obj):
-            if type(obj) is list:
-                new_obj = []
-                for g in obj:
-                    new_obj.append(skew_geom(g))
-                return new_obj
-            else:
-                try:
-                    self.el_count += 1
-                    disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
-                    if self.old_disp_number < disp_number <= 100:
-                        self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                        self.old_disp_number = disp_number
-
-                    return affinity.skew(obj, angle_x, angle_y, origin=(px, py))
-                except AttributeError:
-                    return obj
-
-        self.solid_geometry = skew_geom(self.solid_geometry)
-        self.follow_geometry = skew_geom(self.follow_geometry)
-
-        # we need to skew the geometry stored in the Gerber apertures, too
-        try:
-            for apid in self.tools:
-                if 'geometry' in self.tools[apid]:
-                    for geo_el in self.tools[apid]['geometry']:
-                        if 'solid' in geo_el:
-                            geo_el['solid'] = skew_geom(geo_el['solid'])
-                        if 'follow' in geo_el:
-                            geo_el['follow'] = skew_geom(geo_el['follow'])
-                        if 'clear' in geo_el:
-                            geo_el['clear'] = skew_geom(geo_el['clear'])
-        except Exception as e:
-            self.app.log.error('ParseGerber.Gerber.skew() Exception --> %s' % str(e))
-            return 'fail'
-
+        self.transform(skew_matrix(angle_x, angle_y, origin=point))
         self.app.inform.emit('[success] %s' % _("Done."))
-        self.app.proc_container.new_text = ''
 
     def rotate(self, angle, point):
         """
@@ -2516,58 +2377,11 @@ class Gerber(Geometry):
         """
         self.app.log.debug("parseGerber.Gerber.rotate()")
 
-        px, py = point
-
         if angle == 0:
             return
 
-        # variables to display the percentage of work done
-        self.geo_len = 0
-        try:
-            self.geo_len = len(self.solid_geometry)
-        except TypeError:
-            self.geo_len = 1
-
-        self.old_disp_number = 0
-        self.el_count = 0
-
-        def rotate_geom(obj):
-            if type(obj) is list:
-                new_obj = []
-                for g in obj:
-                    new_obj.append(rotate_geom(g))
-                return new_obj
-            else:
-                try:
-                    self.el_count += 1
-                    disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
-                    if self.old_disp_number < disp_number <= 100:
-                        self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                        self.old_disp_number = disp_number
-
-                    return affinity.rotate(obj, angle, origin=(px, py))
-                except AttributeError:
-                    return obj
-
-        self.solid_geometry = rotate_geom(self.solid_geometry)
-        self.follow_geometry = rotate_geom(self.follow_geometry)
-
-        # we need to rotate the geometry stored in the Gerber apertures, too
-        try:
-            for apid in self.tools:
-                if 'geometry' in self.tools[apid]:
-                    for geo_el in self.tools[apid]['geometry']:
-                        if 'solid' in geo_el:
-                            geo_el['solid'] = rotate_geom(geo_el['solid'])
-                        if 'follow' in geo_el:
-                            geo_el['follow'] = rotate_geom(geo_el['follow'])
-                        if 'clear' in geo_el:
-                            geo_el['clear'] = rotate_geom(geo_el['clear'])
-        except Exception as e:
-            self.app.log.error('ParseGerber.Gerber.rotate() Exception --> %s' % str(e))
-            return 'fail'
+        self.transform(rotation_matrix(angle, origin=point))
         self.app.inform.emit('[success] %s' % _("Done."))
-        self.app.proc_container.new_text = ''
 
     def buffer(self, distance, join=2, factor=None, only_exterior=False):
         """
@@ -2723,6 +2537,65 @@ class Gerber(Geometry):
         self.app.proc_container.new_text = ''
 
 
+def flash_template_key(aperture, steps_per_circle):
+    """
+    :param aperture:            the aperture dict (see Gerber.aperture_parse())
+    :type aperture:             dict
+    :param steps_per_circle:    number of segments used to approximate a circle
+    :type steps_per_circle:     int
+    :return:                    the key of the aperture geometry in Gerber.flash_templates; the apertures with the
+                                same shape have the same key
+    :rtype:                     tuple
+    """
+    ap_type = aperture['type']
+    if ap_type == 'C':
+        return ap_type, aperture['size'], steps_per_circle
+    if ap_type == 'R':
+        return ap_type, aperture['width'], aperture['height']
+    if ap_type == 'O':
+        return ap_type, aperture['width'], aperture['height'], steps_per_circle
+    if ap_type == 'P':
+        return ap_type, aperture['diam'], aperture['nVertices'], aperture.get('rotation')
+    if ap_type == 'AM':
+        return ap_type, id(aperture['macro']), tuple(aperture['modifiers'] or ()), steps_per_circle
+    return ap_type, None
+
+
+def place_flashes(template, locations):
+    """
+    Copies of the geometry made for (0, 0) at each location, made in one pass: the coordinates of all the copies
+    are translated together.
+
+    :param template:    Shapely geometry centered in (0, 0)
+    :param locations:   the locations, as a (N, 2) array or a list of (x, y)
+    :return:            array of N Shapely geometry
+    :rtype:             np.ndarray
+    """
+    locations = np.asarray(locations, dtype=float).reshape(-1, 2)
+    copies = np.empty(len(locations), dtype=object)
+    copies[:] = [template] * len(locations)
+    if template.is_empty or not len(locations):
+        return copies
+
+    offsets = np.repeat(locations, shapely.get_num_coordinates(template), axis=0)
+    return shapely.transform(copies, lambda coords: coords + offsets)
+
+
+def get_flash_locations(geometry):
+    """
+    The flashes of an aperture are the geometry elements that have a Point (not empty) as 'follow'.
+
+    :param geometry:    the geometry elements of an aperture (dicts with the 'solid', 'follow', 'clear' keys)
+    :type geometry:     list
+    :return:            (locations as a (N, 2) array, indexes of the flash elements in geometry)
+    :rtype:             tuple
+    """
+    indexes = [idx for idx, elem in enumerate(geometry)
+               if isinstance(elem.get('follow'), Point) and not elem['follow'].is_empty]
+    locations = shapely.get_coordinates([geometry[idx]['follow'] for idx in indexes])
+    return locations.reshape(-1, 2), np.array(indexes, dtype=np.intp)
+
+
 def parse_gerber_number(strnumber, int_digits, frac_digits, zeros):
     """
     Parse a single number of Gerber coordinates.
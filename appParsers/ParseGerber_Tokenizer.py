@@ -0,0 +1,224 @@
+"""
+Front end of the Gerber parser.
+
+The Gerber source is read once, as one string, and split into commands (``G54D11*G36*`` gives ``G54D11*`` and
+``G36*``). Each command is classified into a token, a tuple (kind, line number, command, groups); the groups are
+those of the Gerber pattern (Gerber.lin_re, Gerber.ad_re etc.) that matched the command. Gerber.parse_tokens()
+builds the geometry from the tokens.
+
+Instead of trying all the patterns on each command, the leading letters of the command select the few patterns that
+can match it (``X..`` can only be a linear or a circular move, ``G36*`` only a region start etc.). They are tried
+in the same order as the Gerber parser always tried them, so the first matching pattern is the same one.
+"""
+
+import re
+
+# The kinds of the tokens, in the order in which the patterns are tried
+COMMENT, X2, LPOL, FMT, MODE, FMT_ALT, FMT_ORCAD, UNITS, ABSREL, AM, AM_CONTENT, AD, OPCODE, TOOL, REGION_ON, \
+    REGION_OFF, INTERP, LIN, QUAD, CIRC, EOF = range(21)
+# the command did not match any pattern
+UNKNOWN = -1
+
+# the Gerber pattern (attribute of the Gerber object) of each kind
+PATTERNS = [
+    (COMMENT, 'comm_re'),
+    (X2, 'gx2_re'),
+    (LPOL, 'lpol_re'),
+    (FMT, 'fmt_re'),
+    (MODE, 'mode_re'),
+    (FMT_ALT, 'fmt_re_alt'),
+    (FMT_ORCAD, 'fmt_re_orcad'),
+    (UNITS, 'units_re'),
+    (ABSREL, 'absrel_re'),
+    (AM, 'am1_re'),
+    (AD, 'ad_re'),
+    (OPCODE, 'opcode_re'),
+    (TOOL, 'tool_re'),
+    (REGION_ON, 'regionon_re'),
+    (REGION_OFF, 'regionoff_re'),
+    (INTERP, 'interp_re'),
+    (LIN, 'lin_re'),
+    (QUAD, 'quad_re'),
+    (CIRC, 'circ_re'),
+    (EOF, 'eof_re'),
+]
+
+# ## Dispatch tables: the kinds that a command can have, from its leading letters
+# first letter of the command
+FIRST_LETTER = {
+    'D': (OPCODE, TOOL),
+    'X': (LIN, CIRC),
+    'Y': (LIN, CIRC),
+    'I': (CIRC, ),
+    'J': (CIRC, ),
+    'M': (MODE, EOF),
+}
+
+# number of the G code (the 1 or 2 characters after G)
+G_CODES = {
+    '1': (INTERP, LIN), '01': (INTERP, LIN),
+    '2': (INTERP, CIRC), '02': (INTERP, CIRC),
+    '3': (INTERP, CIRC), '03': (INTERP, CIRC),
+    '36': (REGION_ON, ),
+    '37': (REGION_OFF, ),
+    '54': (TOOL, ),
+    '55': (OPCODE, ),
+    '70': (UNITS, ), '71': (UNITS, ),
+    '74': (QUAD, ), '75': (QUAD, ),
+    '90': (ABSREL, ), '91': (ABSREL, ),
+}
+
+# extended commands: the 2 letters after %
+EXTENDED = {
+    'LP': (LPOL, ),
+    'MO': (MODE, ),
+    'AM': (AM, ),
+    'AD': (AD, ),
+}
+
+ALL_KINDS = tuple(kind for kind, __ in PATTERNS)
+
+# The usual move/flash: ``X..Y..D0x*`` (each part optional), the most frequent command by far. When it matches with
+# coordinates it is a linear move and the groups are the same as those of Gerber.lin_re, found without its lookaheads.
+MOVE_RE = re.compile(r'^(?:G0?(1))?(?:X([+-]?\d+))?(?:Y([+-]?\d+))?(?:D0?([123]))?\*$')
+
+# attributes of the Gerber X2 files (KiCAD) that are removed before parsing
+X2_ATTRIBUTES = ('%TF.', '%TO.', '%TD', '%TA')
+
+
+def read_gerber_file(filename):
+    """
+    Reads a Gerber file in one go.
+
+    :param filename:    path to the Gerber file
+    :type filename:     str
+    :return:            the content of the file
+    :rtype:             str
+    """
+    with open(filename, 'r') as gfile:
+        return gfile.read()
+
+
+def split_commands(line):
+    """
+    Splits a line of the Gerber source after each '*' unless it ends with '%' (extended commands are kept as they
+    are). ``G54D11*G36*`` gives ``G54D11*`` and ``G36*``.
+
+    :param line:    a line of the Gerber source
+    :type line:     str
+    :return:        the commands
+    :rtype:         list
+    """
+    line = line.strip(' \r\n')
+    # If ends with '%' (or has no other command) leave as is.
+    if not line or line[-1] == '%' or line.find('*') == len(line) - 1:
+        return [line] if line else []
+
+    # Split after each '*'.
+    commands = line.split('*')
+    last = commands.pop()
+    commands = [command + '*' for command in commands]
+    if last:
+        commands.append(last)
+    return commands
+
+
+class GerberTokenizer:
+    """
+    Classifies the Gerber commands into tokens, using the patterns of a Gerber object.
+    """
+
+    def __init__(self, gerber):
+        """
+        :param gerber:  the Gerber object whose patterns are used
+        :type gerber:   appParsers.ParseGerber.Gerber
+        """
+        self.patterns = {kind: getattr(gerber, name) for kind, name in PATTERNS}
+        self.macro_end_re = gerber.am2_re
+
+    @staticmethod
+    def candidates(line):
+        """
+        :param line:    a Gerber command
+        :type line:     str
+        :return:        the kinds that the command may have, in the order the patterns are tried
+        :rtype:         tuple
+        """
+        # the format specification and the X2 file function patterns are searched anywhere in the command
+        if 'FS' in line or '%TF.FileFunction' in line:
+            return ALL_KINDS
+
+        first = line[:1]
+        if first == 'G':
+            code = line[1:3]
+            if not code.isdigit():
+                code = line[1:2]
+            if code[:1] == '4' or code == '04':
+                return (COMMENT, )
+            return G_CODES.get(code, ())
+        if first == '%':
+            return EXTENDED.get(line[1:3], ())
+        return FIRST_LETTER.get(first, ())
+
+    def classify(self, line, after=None, in_macro=False):
+        """
+        The kind of a Gerber command: the first pattern, in the parser order, that matches.
+
+        :param line:        a Gerber command
+        :type line:         str
+        :param after:       only the patterns tried after the pattern of this kind are tried; when the parser does
+                            not accept a command for its kind (e.g. a move without an aperture) it looks further
+        :type after:        int | None
+        :param in_macro:    if an aperture macro is being defined; the commands that do not match one of the
+                            patterns before the macro patterns are part of the macro
+        :type in_macro:     bool
+        :return:            (kind, groups of the matched pattern)
+        :rtype:             tuple
+        """
+        for kind in self.candidates(line):
+            if after is not None and kind <= after:
+                continue
+            if in_macro and kind >= AM:
+                break
+            match = self.patterns[kind].search(line)
+            if match:
+                return kind, match.groups()
+
+        if in_macro:
+            match = self.macro_end_re.search(line)
+            # (content, end of macro)
+            return AM_CONTENT, (match.group(1), True) if match else (line, False)
+        return UNKNOWN, ()
+
+    def tokenize(self, lines, split=True, strip_attributes=True):
+        """
+        :param lines:               the lines of the Gerber source
+        :type lines:                list
+        :param split:               split the lines into commands; if False each line is one command
+        :type split:                bool
+        :param strip_attributes:    remove the lines with X2 attributes (%TF., %TO., %TD, %TA)
+        :type strip_attributes:     bool
+        :return:                    generator of tokens: (kind, line number, command, groups)
+        """
+        move_match = MOVE_RE.match
+        in_macro = False
+        line_num = 0
+        for line in lines:
+            if strip_attributes and '%T' in line and any(attr in line for attr in X2_ATTRIBUTES):
+                continue
+
+            for command in (split_commands(line) if split else (line.strip(' \r\n'), )):
+                line_num += 1
+                if not in_macro:
+                    match = move_match(command)
+                    if match and (match.group(2) is not None or match.group(3) is not None):
+                        yield LIN, line_num, command, match.groups()
+                        continue
+
+                kind, groups = self.classify(command, in_macro=in_macro)
+                if kind == AM:
+                    # the macro continues on the next lines if its end (%) is not on this line
+                    in_macro = not groups[2]
+                elif kind == AM_CONTENT and groups[1]:
+                    in_macro = False
+                yield kind, line_num, command, groups
@@ -8,6 +8,7 @@
 from PyQt6 import QtCore
 
 from appCommon.Common import GracefulException as grace
+from appParsers.ParseCurves import flatten_beziers, bezier_chain
 
 from shapely import Polygon, LineString, MultiPolygon
 
@@ -21,8 +22,10 @@ log = logging.getLogger('base')
 
 class PdfParser:
 
-    def __init__(self, units, resolution, abort):
+    def __init__(self, units, resolution, abort, tolerance=None):
         self.step_per_circles = resolution
+        # maximum distance between a Bezier curve and the polyline that replaces it
+        self.tolerance = tolerance
         self.units = units
         self.abort_flag = abort
 
@@ -473,9 +476,7 @@ class PdfParser:
                 if current_subpath == 'bezier':
                     if path['bezier']:
                         for subp in path['bezier']:
-                            geo = []
-                            for b in subp:
-                                geo += self.bezier_to_points(start=b[0], c1=b[1], c2=b[2], stop=b[3])
+                            geo = self.beziers_to_points(subp)
                             try:
                                 geo = LineString(geo).buffer((float(applied_size) / 2),
                                                              resolution=self.step_per_circles)
@@ -485,9 +486,7 @@ class PdfParser:
                         # the path was painted therefore initialize it
                         path['bezier'] = []
                     else:
-                        geo = []
-                        for b in subpath['bezier']:
-                            geo += self.bezier_to_points(start=b[0], c1=b[1], c2=b[2], stop=b[3])
+                        geo = self.beziers_to_points(subpath['bezier'])
                         try:
                             geo = LineString(geo).buffer((float(applied_size) / 2), resolution=self.step_per_circles)
                             path_geo.append(geo)
@@ -633,10 +632,9 @@ class PdfParser:
                         # the path was painted therefore initialize it
                         path['bezier'] = []
                     else:
-                        for b in subpath['bezier']:
-                            geo += self.bezier_to_points(start=b[0], c1=b[1], c2=b[2], stop=b[3])
+                        geo = self.beziers_to_points(subpath['bezier'])
                         if close_subpath is False:
-                            geo.append(start_point)
+                            geo = np.vstack((geo, [start_point]))
                         try:
                             geo_el = Polygon(geo).buffer(0.0000001, resolution=self.step_per_circles)
                             path_geo.append(geo_el)
@@ -793,28 +791,23 @@ class PdfParser:
                                     pass
                         # stroke
                         for subp in path['bezier']:
-                            geo = []
-                            for b in subp:
-                                geo += self.bezier_to_points(start=b[0], c1=b[1], c2=b[2], stop=b[3])
+                            geo = self.beziers_to_points(subp)
                             geo = LineString(geo).buffer((float(applied_size) / 2), resolution=self.step_per_circles)
                             path_geo.append(geo)
                         # the path was painted therefore initialize it
                         path['bezier'] = []
                     else:
                         # fill
-                        for b in subpath['bezier']:
-                            geo += self.bezier_to_points(start=b[0], c1=b[1], c2=b[2], stop=b[3])
+                        geo = self.beziers_to_points(subpath['bezier'])
                         if close_subpath is False:
-                            geo.append(start_point)
+                            geo = np.vstack((geo, [start_point]))
                         try:
                             geo_el = Polygon(geo).buffer(0.0000001, resolution=self.step_per_circles)
                             fill_geo.append(geo_el)
                         except ValueError:
                             pass
                         # stroke
-                        geo = []
-                        for b in subpath['bezier']:
-                            geo += self.bezier_to_points(start=b[0], c1=b[1], c2=b[2], stop=b[3])
+                        geo = self.beziers_to_points(subpath['bezier'])
                         geo = LineString(geo).buffer((float(applied_size) / 2), resolution=self.step_per_circles)
                         path_geo.append(geo)
                         subpath['bezier'] = []
@@ -988,24 +981,26 @@ class PdfParser:
         # with the final point P3. Intermediate values of t generate intermediate points along the curve.
         # The curve does not, in general, pass through the two control points P1 and P2
 
-        :return: A list of point coordinates tuples (x, y)
+        :return: A list of point coordinates tuples (x, y); the end point (t = 1.0) is not included
         """
 
-        # here we store the geometric points
-        points = []
+        points, __ = flatten_beziers(np.array([[start, c1, c2, stop]], dtype=float),
+                                     steps_per_circle=self.step_per_circles, tolerance=self.tolerance)
+        return points[:-1].tolist()
 
-        nr_points = np.arange(0.0, 1.0, (1 / self.step_per_circles))
-        for t in nr_points:
-            term_p0 = (1 - t) ** 3
-            term_p1 = 3 * t * (1 - t) ** 2
-            term_p2 = 3 * (1 - t) * t ** 2
-            term_p3 = t ** 3
+    def beziers_to_points(self, beziers):
+        """
+        Flattens a chain of Bezier curves (each one starts where the previous one ends) at once.
+        See bezier_to_points().
 
-            x = start[0] * term_p0 + c1[0] * term_p1 + c2[0] * term_p2 + stop[0] * term_p3
-            y = start[1] * term_p0 + c1[1] * term_p1 + c2[1] * term_p2 + stop[1] * term_p3
-            points.append([x, y])
+        :param beziers: list of [start, c1, c2, stop] curves
+        :type beziers:  list
+        :return:        The point coordinates (x, y) of the chain, shape (nr_points, 2); both ends are included
+        :rtype:         np.ndarray
+        """
 
-        return points
+        return bezier_chain(np.array(beziers, dtype=float).reshape(-1, 4, 2),
+                            steps_per_circle=self.step_per_circles, tolerance=self.tolerance)
 
     # def bezier_to_circle(self, path):
     #     lst = []
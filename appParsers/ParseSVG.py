@@ -28,6 +28,8 @@ from shapely import LineString, MultiLineString, Point
 from shapely.affinity import skew, affine_transform, rotate
 import numpy as np
 
+from appParsers.ParseCurves import flatten_beziers, flatten_arcs, quadratic_to_cubic
+
 from appParsers.ParseFont import *
 
 log = logging.getLogger('base2')
@@ -73,18 +75,78 @@ def svgparse_viewbox(root):
     return w / v_w
 
 
-def path2shapely(path, object_type, res=1.0, units='MM', factor=1.0):
+def flatten_path_curves(path, steps_per_circle=64, tolerance=None):
+    """
+    Flattens all the curves (Arc, CubicBezier, QuadraticBezier) of a svg.path.Path at once.
+
+    :param path:                svg.path.Path instance
+    :param steps_per_circle:    number of segments for a full turn of a curve
+    :type steps_per_circle:     int
+    :param tolerance:           maximum distance between a curve and its polyline, in path units; not used if None
+    :type tolerance:            float | None
+    :return:                    for the index of each curve in the path, the points of the curve (both ends
+                                included) as an array of shape (nr_points, 2)
+    :rtype:                     dict
+    """
+
+    curves = {}
+    beziers = []
+    bezier_idx = []
+    arcs = []
+    arc_idx = []
+
+    for idx, component in enumerate(path):
+        if isinstance(component, CubicBezier):
+            beziers.append([(component.start.real, component.start.imag),
+                            (component.control1.real, component.control1.imag),
+                            (component.control2.real, component.control2.imag),
+                            (component.end.real, component.end.imag)])
+            bezier_idx.append(idx)
+        elif isinstance(component, QuadraticBezier):
+            beziers.append(quadratic_to_cubic([[(component.start.real, component.start.imag),
+                                                (component.control.real, component.control.imag),
+                                                (component.end.real, component.end.imag)]])[0])
+            bezier_idx.append(idx)
+        elif isinstance(component, Arc):
+            if component.start == component.end or component.radius.real == 0 or component.radius.imag == 0:
+                # omitted segment or a straight line
+                curves[idx] = np.array([(component.start.real, component.start.imag),
+                                        (component.end.real, component.end.imag)])
+                continue
+            radius = component.radius * component.radius_scale
+            arcs.append((component.center.real, component.center.imag, radius.real, radius.imag,
+                         component.rotation, component.theta, component.delta))
+            arc_idx.append(idx)
+
+    if beziers:
+        points, offsets = flatten_beziers(np.array(beziers, dtype=float), steps_per_circle, tolerance)
+        for i, idx in enumerate(bezier_idx):
+            curves[idx] = points[offsets[i]:offsets[i + 1]]
+
+    if arcs:
+        arcs = np.array(arcs, dtype=float)
+        points, offsets = flatten_arcs(arcs[:, 0:2], arcs[:, 2:4], arcs[:, 4], arcs[:, 5], arcs[:, 6],
+                                       steps_per_circle, tolerance)
+        for i, idx in enumerate(arc_idx):
+            curves[idx] = points[offsets[i]:offsets[i + 1]]
+
+    return curves
+
+
+def path2shapely(path, object_type, res=64, units='MM', factor=1.0, tolerance=None):
     """
     Converts an svg.path.Path into a Shapely
     Polygon or LinearString.
 
     :param path:        svg.path.Path instance
     :param object_type:
-    :param res:         Resolution (minimum step along path)
+    :param res:         Resolution: number of segments for a full turn of a curve
     :param units:       FlatCAM units
     :type units:        str
     :param factor:      correction factor due of virtual units
     :type factor:       float
+    :param tolerance:   maximum distance between a curve and its polyline, in FlatCAM units; not used if None
+    :type tolerance:    float | None
     :return:            Shapely geometry object
     :rtype :            Polygon
     :rtype :            LineString
@@ -96,7 +158,11 @@ def path2shapely(path, object_type, res=1.0, units='MM', factor=1.0):
     rings = []
     closed = False
 
-    for component in path:
+    # the curves are in the path units which are scaled by factor
+    curves = flatten_path_curves(path, steps_per_circle=res,
+                                 tolerance=tolerance / factor if tolerance and factor else None)
+
+    for idx, component in enumerate(path):
         # Line
         if isinstance(component, Line):
             start = component.start
@@ -108,34 +174,11 @@ def path2shapely(path, object_type, res=1.0, units='MM', factor=1.0):
             continue
 
         # Arc, CubicBezier or QuadraticBezier
-        if isinstance(component, Arc) or \
-           isinstance(component, CubicBezier) or \
-           isinstance(component, QuadraticBezier):
-
-            # How many points to use in the discrete representation.
-            length = component.length(res / 10.0)
-            # steps = int(length / res + 0.5)
-            steps = int(length) * 2
-
-            if units == 'IN':
-                steps *= 25
-
-            # solve error when step is below 1,
-            # it may cause other problems, but LineString needs at least two points
-            # later edit: made the minimum nr of steps to be 10; left it like that to see that steps can be 0
-            if steps == 0 or steps < 10:
-                steps = 10
-
-            frac = 1.0 / steps
-
-            # print length, steps, frac
-            for i in range(steps):
-                point = component.point(i * frac)
-                x, y = point.real, point.imag
-                if len(points) == 0 or points[-1] != (x, y):
-                    points.append((factor * x, factor * y))
-            end = component.point(1.0)
-            points.append((factor * end.real, factor * end.imag))
+        if idx in curves:
+            curve_points = [(x, y) for x, y in (curves[idx] * factor).tolist()]
+            if points and points[-1] == curve_points[0]:
+                curve_points = curve_points[1:]
+            points += curve_points
             continue
 
         # Move
@@ -422,7 +465,7 @@ def svgpolygon2shapely(polygon, n_points=64, factor=1.0):
     # return LinearRing(points)
 
 
-def getsvggeo(node, object_type, root=None, units='MM', res=64, factor=1.0, app=None):
+def getsvggeo(node, object_type, root=None, units='MM', res=64, factor=1.0, app=None, tolerance=None):
     """
     Extracts and flattens all geometry from an SVG node
     into a list of Shapely geometry.
@@ -435,6 +478,8 @@ def getsvggeo(node, object_type, root=None, units='MM', res=64, factor=1.0, app=
     :param factor:      correction factor due of virtual units
     :type factor:       float
     :param app:         Application reference
+    :param tolerance:   maximum distance between a path curve and its polyline; not used if None
+    :type tolerance:    float | None
 
     :return:            List of Shapely geometry
     :rtype:             list
@@ -453,7 +498,8 @@ def getsvggeo(node, object_type, root=None, units='MM', res=64, factor=1.0, app=
     # Recurse
     if len(node) > 0:
         for child in node:
-            subgeo = getsvggeo(child, object_type, root=root, units=units, res=res, factor=factor, app=app)
+            subgeo = getsvggeo(child, object_type, root=root, units=units, res=res, factor=factor, app=app,
+                               tolerance=tolerance)
             if subgeo is not None:
                 if subgeo == 'fail':
                     return
@@ -463,7 +509,7 @@ def getsvggeo(node, object_type, root=None, units='MM', res=64, factor=1.0, app=
     elif kind == 'path':
         # log.debug("***PATH***")
         P = parse_path(node.get('d'))
-        P = path2shapely(P, object_type, units=units, factor=factor)
+        P = path2shapely(P, object_type, res=res, units=units, factor=factor, tolerance=tolerance)
         # for path, the resulting geometry is already a list so no need to create a new one
         geo = P
 
@@ -504,7 +550,8 @@ def getsvggeo(node, object_type, root=None, units='MM', res=64, factor=1.0, app=
         href = node.attrib['href'] if 'href' in node.attrib else node.attrib['{http://www.w3.org/1999/xlink}href']
         ref = root.find(".//*[@id='%s']" % href.replace('#', ''))
         if ref is not None:
-            geo = getsvggeo(ref, object_type, root=root, units=units, res=res, factor=factor, app=app)
+            geo = getsvggeo(ref, object_type, root=root, units=units, res=res, factor=factor, app=app,
+                            tolerance=tolerance)
 
     elif kind in ['defs', 'namedview', 'format', 'type', 'title', 'desc', 'svg']:
         log.warning('SVG Element not supported: %s. Skipping to next.' % kind)
@@ -10,7 +10,9 @@ from appTool import AppTool
 from appGUI.GUIElements import VerticalScrollArea, FCLabel, FCButton, FCFrame, GLay, FCComboBox, FCCheckBox, \
     FCComboBox2, RadioSet, FCDoubleSpinner, FCSpinner, NumericalEvalTupleEntry, NumericalEvalEntry, FCTable, \
     OptionalInputSection, OptionalHideInputSection
-from appParsers.ParseExcellon import Excellon
+from appParsers.ParseExcellon import Excellon, get_drill_centers, get_slot_ends, get_slot_drills
+from appParsers.ParseGerber import place_flashes
+from appParsers.ParseGCode import GCodeParsed
 
 from matplotlib.backend_bases import KeyEvent as mpl_key_event
 
@@ -22,7 +24,8 @@ import sys
 import platform
 import re
 
-from shapely import LineString
+import shapely
+from shapely import LineString, Point
 
 import gettext
 import appTranslation as fcTranslate
@@ -1912,11 +1915,7 @@ class ToolDrilling(AppTool, Excellon):
         for tool_key, tl_dict in excellon_tools.items():
             if tool_key in selected_tools:
                 if 'drills' in tl_dict and tl_dict['drills']:
-                    for drill_pt in tl_dict['drills']:
-                        try:
-                            points[tool_key].append(drill_pt)
-                        except KeyError:
-                            points[tool_key] = [drill_pt]
+                    points[tool_key] = list(tl_dict['drills'])
 
         self.app.log.debug("Found %d TOOLS with drills." % len(points))
 
@@ -1939,11 +1938,10 @@ class ToolDrilling(AppTool, Excellon):
                             drill_overlap = overlap * slot_tool_dia
                             break
 
-                    new_drills = []
                     if 'slots' in tl_dict and tl_dict['slots']:
-                        for slot in tl_dict['slots']:
-                            new_drills += self.process_slot_as_drills(slot=slot, overlap=drill_overlap,
-                                                                      add_last_pt=should_add_last_pt)
+                        slot_ends = self.tool_slot_ends(tool_key, tl_dict)
+                        new_drills = list(shapely.points(get_slot_drills(slot_ends, overlap=drill_overlap,
+                                                                         add_last_pt=should_add_last_pt)))
                         if new_drills:
                             try:
                                 points[tool_key] += new_drills
@@ -1957,13 +1955,33 @@ class ToolDrilling(AppTool, Excellon):
         if excellon_tools is None:
             excellon_tools = self.excellon_tools
         for tool_key in points:
-            for pt in points[tool_key]:
-                for area in self.app.exc_areas.exclusion_areas_storage:
-                    pt_buf = pt.buffer(excellon_tools[tool_key]['tooldia'] / 2.0)
-                    if pt_buf.within(area['shape']) or pt_buf.intersects(area['shape']):
-                        return True
+            if not points[tool_key]:
+                continue
+            # the holes of the tool, the tool circle placed at all its drill points
+            tool_circle = Point(0, 0).buffer(excellon_tools[tool_key]['tooldia'] / 2.0)
+            holes = place_flashes(tool_circle, get_drill_centers(points[tool_key]))
+            for area in self.app.exc_areas.exclusion_areas_storage:
+                if shapely.intersects(holes, area['shape']).any():
+                    return True
         return False
 
+    def tool_slot_ends(self, tool_key, tool_dict):
+        """
+        The slot ends of a tool as a NumPy array. For the tools of the Excellon object they are those kept by the
+        object (Excellon.tool_arrays()), otherwise (e.g. the tools changed in the UI) they are made from the slots.
+
+        :param tool_key:    the tool key
+        :type tool_key:     int
+        :param tool_dict:   the tool dictionary, with the 'slots' key
+        :type tool_dict:    dict
+        :return:            the slot ends as a (M, 2, 2) array
+        :rtype:             np.ndarray
+        """
+        exc_obj = self.excellon_obj
+        if exc_obj is not None and exc_obj.tools.get(tool_key) is tool_dict and hasattr(exc_obj, 'tool_arrays'):
+            return exc_obj.tool_arrays(tool_key)[1]
+        return get_slot_ends(tool_dict['slots'])
+
     def on_generate_cnc_job(self):
         obj_name = self.ui.object_combo.currentText()
         # toolchange = self.ui.toolchange_cb.get_value()
@@ -2061,7 +2079,7 @@ class ToolDrilling(AppTool, Excellon):
         # #############################################################################################################
         used_exc_optim_type = self.app.options["excellon_optimization_type"]
         current_platform = platform.architecture()[0]
-        if current_platform != '64bit':
+        if current_platform != '64bit' and used_exc_optim_type != 'L':
             used_exc_optim_type = 'T'
 
         # #############################################################################################################
@@ -2325,7 +2343,7 @@ class ToolDrilling(AppTool, Excellon):
                         cnc_job_obj.gc_start = start_gcode
 
                     self.total_gcode += tool_gcode
-                    self.total_gcode_parsed += tool_gcode_parsed
+                    self.total_gcode_parsed = GCodeParsed.concatenate([self.total_gcode_parsed, tool_gcode_parsed])
 
             cnc_job_obj.gcode = self.total_gcode
             cnc_job_obj.source_file = self.total_gcode
@@ -13,6 +13,7 @@ from appGUI.GUIElements import VerticalScrollArea, FCLabel, FCButton, FCFrame, G
 import logging
 from copy import deepcopy
 
+import shapely
 from shapely import Polygon, MultiPolygon, Point, box
 
 import gettext
@@ -427,11 +428,11 @@ class ToolExtract(AppTool):
 
         mode = self.ui.method_radio.get_value()
         if mode == 'fixed':
-            tools = self.fixed_dia_mode(gerber_tools=fcobj.tools, sel_tools=sel_g_tools)
+            tools = self.fixed_dia_mode(gerber_obj=fcobj, sel_tools=sel_g_tools)
         elif mode == 'ring':
-            tools = self.ring_mode(gerber_tools=fcobj.tools, sel_tools=sel_g_tools)
+            tools = self.ring_mode(gerber_obj=fcobj, sel_tools=sel_g_tools)
         else:   # proportional
-            tools = self.proportional_mode(gerber_tools=fcobj.tools, sel_tools=sel_g_tools)
+            tools = self.proportional_mode(gerber_obj=fcobj, sel_tools=sel_g_tools)
 
         if not tools:
             self.app.inform.emit('[ERROR_NOTCL] %s' % _("Failed."))
@@ -453,7 +454,7 @@ class ToolExtract(AppTool):
                 self.app.log.error("Error on Extracted Excellon object creation: %s" % str(e))
                 return
 
-    def fixed_dia_mode(self, gerber_tools, sel_tools):
+    def fixed_dia_mode(self, gerber_obj, sel_tools):
         drill_dia = self.ui.dia_entry.get_value()
 
         allow_circular = self.ui.circular_cb.get_value()
@@ -469,7 +470,7 @@ class ToolExtract(AppTool):
             }
         }
 
-        for apid, apid_value in gerber_tools.items():
+        for apid, apid_value in gerber_obj.tools.items():
             if apid in sel_tools:
                 ap_type = apid_value['type']
 
@@ -490,20 +491,21 @@ class ToolExtract(AppTool):
                 elif ap_type not in ['C', 'R', 'O'] and allow_other_type is False:
                     continue
 
-                for geo_el in apid_value['geometry']:
-                    if 'follow' in geo_el and isinstance(geo_el['follow'], Point):
-                        tools[1]["drills"].append(geo_el['follow'])
-                        if 'solid_geometry' not in tools[1]:
-                            tools[1]['solid_geometry'] = [geo_el['follow']]
-                        else:
-                            tools[1]['solid_geometry'].append(geo_el['follow'])
+                # the drills are made from the flash (pad) locations of the aperture
+                drills = list(shapely.points(gerber_obj.flash_locations(apid)[0]))
+                if drills:
+                    tools[1]["drills"] += drills
+                    if 'solid_geometry' not in tools[1]:
+                        tools[1]['solid_geometry'] = list(drills)
+                    else:
+                        tools[1]['solid_geometry'] += drills
         if 'solid_geometry' not in tools[1] or not tools[1]['solid_geometry']:
             self.app.inform.emit('[WARNING_NOTCL] %s' % _("No drills extracted. Try different parameters."))
             return
 
         return tools
 
-    def ring_mode(self, gerber_tools, sel_tools):
+    def ring_mode(self, gerber_obj, sel_tools):
         circ_r_val = self.ui.circular_ring_entry.get_value()
         oblong_r_val = self.ui.oblong_ring_entry.get_value()
         square_r_val = self.ui.square_ring_entry.get_value()
@@ -519,7 +521,7 @@ class ToolExtract(AppTool):
         drills_found = set()
         tools = {}
 
-        for apid, apid_value in gerber_tools.items():
+        for apid, apid_value in gerber_obj.tools.items():
             if apid in sel_tools:
                 ap_type = apid_value['type']
 
@@ -580,21 +582,22 @@ class ToolExtract(AppTool):
                     else:
                         tool_in_drills = 1
 
-                for geo_el in apid_value['geometry']:
-                    if 'follow' in geo_el and isinstance(geo_el['follow'], Point):
-                        if tool_in_drills not in tools:
-                            tools[tool_in_drills] = {
-                                "tooldia":  dia,
-                                "drills":   [],
-                                "slots":    []
-                            }
+                # the drills are made from the flash (pad) locations of the aperture
+                drills = list(shapely.points(gerber_obj.flash_locations(apid)[0]))
+                if drills:
+                    if tool_in_drills not in tools:
+                        tools[tool_in_drills] = {
+                            "tooldia":  dia,
+                            "drills":   [],
+                            "slots":    []
+                        }
 
-                        tools[tool_in_drills]['drills'].append(geo_el['follow'])
+                    tools[tool_in_drills]['drills'] += drills
 
-                        if 'solid_geometry' not in tools[tool_in_drills]:
-                            tools[tool_in_drills]['solid_geometry'] = [geo_el['follow']]
-                        else:
-                            tools[tool_in_drills]['solid_geometry'].append(geo_el['follow'])
+                    if 'solid_geometry' not in tools[tool_in_drills]:
+                        tools[tool_in_drills]['solid_geometry'] = list(drills)
+                    else:
+                        tools[tool_in_drills]['solid_geometry'] += drills
 
                 if tool_in_drills in tools:
                     if 'solid_geometry' not in tools[tool_in_drills] or not tools[tool_in_drills]['solid_geometry']:
@@ -608,7 +611,7 @@ class ToolExtract(AppTool):
 
         return tools
 
-    def proportional_mode(self, gerber_tools, sel_tools):
+    def proportional_mode(self, gerber_obj, sel_tools):
         prop_factor = self.ui.factor_entry.get_value() / 100.0
 
         allow_circular = self.ui.circular_cb.get_value()
@@ -619,7 +622,7 @@ class ToolExtract(AppTool):
 
         tools = {}
         drills_found = set()
-        for apid, apid_value in gerber_tools.items():
+        for apid, apid_value in gerber_obj.tools.items():
             if apid in sel_tools:
                 ap_type = apid_value['type']
 
@@ -680,21 +683,22 @@ class ToolExtract(AppTool):
                     else:
                         tool_in_drills = 1
 
-                for geo_el in apid_value['geometry']:
-                    if 'follow' in geo_el and isinstance(geo_el['follow'], Point):
-                        if tool_in_drills not in tools:
-                            tools[tool_in_drills] = {
-                                "tooldia":  dia,
-                                "drills":   [],
-                                "slots":    []
-                            }
+                # the drills are made from the flash (pad) locations of the aperture
+                drills = list(shapely.points(gerber_obj.flash_locations(apid)[0]))
+                if drills:
+                    if tool_in_drills not in tools:
+                        tools[tool_in_drills] = {
+                            "tooldia":  dia,
+                            "drills":   [],
+                            "slots":    []
+                        }
 
-                        tools[tool_in_drills]['drills'].append(geo_el['follow'])
+                    tools[tool_in_drills]['drills'] += drills
 
-                        if 'solid_geometry' not in tools[tool_in_drills]:
-                            tools[tool_in_drills]['solid_geometry'] = [geo_el['follow']]
-                        else:
-                            tools[tool_in_drills]['solid_geometry'].append(geo_el['follow'])
+                    if 'solid_geometry' not in tools[tool_in_drills]:
+                        tools[tool_in_drills]['solid_geometry'] = list(drills)
+                    else:
+                        tools[tool_in_drills]['solid_geometry'] += drills
 
                 if tool_in_drills in tools:
                     if 'solid_geometry' not in tools[tool_in_drills] or not tools[tool_in_drills]['solid_geometry']:
@@ -24,6 +24,7 @@ import appTranslation as fcTranslate
 import builtins
 
 from camlib import flatten_shapely_geometry
+from appParsers.ParseGerber import place_flashes
 
 fcTranslate.apply_language('strings')
 if '_' not in builtins.__dict__:
@@ -413,7 +414,8 @@ class ToolFiducials(AppTool):
         new_apertures = deepcopy(g_obj.tools)
 
         if fid_type == 0:   # 'circular'
-            geo_list = [Point(pt).buffer(radius, self.grb_steps_per_circle) for pt in points_list]
+            # one circle, copied at all the fiducial locations
+            geo_list = list(place_flashes(Point(0, 0).buffer(radius, self.grb_steps_per_circle), points_list))
 
             aperture_found = None
             for ap_id, ap_val in g_obj.tools.items():
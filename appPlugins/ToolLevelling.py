@@ -31,6 +31,8 @@ from appGUI.PlotCanvasLegacy import ShapeCollectionLegacy
 from appEditors.appTextEditor import AppTextEditor
 
 from camlib import CNCjob
+from appParsers.ParseGCode import parsed_geometries, parsed_kinds, KIND_TRAVEL
+from appCommon.GrblSender import GrblSender, REALTIME_COMMANDS
 
 import time
 import serial
@@ -64,6 +66,10 @@ if '_' not in builtins.__dict__:
 
 log = logging.getLogger('base')
 
+# seconds to wait for the answer of the controller to a command; the homing cycle is answered when it ends
+GRBL_ANSWER_TIMEOUT = 2.0
+GRBL_HOMING_TIMEOUT = 120.0
+
 
 class ToolLevelling(AppTool, CNCjob):
     build_al_table_sig = QtCore.pyqtSignal()
@@ -117,6 +123,12 @@ class ToolLevelling(AppTool, CNCjob):
 
         self.solid_geo = None
         self.grbl_ser_port = None
+        # streams the commands to the GRBL controller, see on_grbl_connect()
+        self.grbl_sender = None
+        # the next status report is shown in the Shell
+        self.grbl_report_requested = False
+        # the jobs of send_grbl_block() whose end is shown in the Shell
+        self.grbl_block_jobs = []
 
         self.probing_shapes = None
 
@@ -227,7 +239,7 @@ class ToolLevelling(AppTool, CNCjob):
         self.ui.zero_axs_wdg.grbl_homing_button.clicked.connect(self.on_grbl_homing)
 
         # Sender
-        self.ui.grbl_report_button.clicked.connect(lambda: self.send_grbl_command(command='?'))
+        self.ui.grbl_report_button.clicked.connect(self.on_grbl_report)
         self.ui.grbl_get_param_button.clicked.connect(
             lambda: self.on_grbl_get_parameter(param=self.ui.grbl_parameter_entry.get_value()))
         self.ui.view_h_gcode_button.clicked.connect(self.on_edit_probing_gcode)
@@ -527,7 +539,8 @@ class ToolLevelling(AppTool, CNCjob):
             return 'fail'
 
         try:
-            self.solid_geo = unary_union([geo['geom'] for geo in loaded_obj.gcode_parsed if geo['kind'][0] == 'C'])
+            parsed_geo = parsed_geometries(loaded_obj.gcode_parsed)
+            self.solid_geo = unary_union(parsed_geo[(parsed_kinds(loaded_obj.gcode_parsed) & KIND_TRAVEL) == 0])
         except TypeError:
             return 'fail'
 
@@ -1228,6 +1241,7 @@ class ToolLevelling(AppTool, CNCjob):
 
         baudrate = int(self.ui.baudrates_list_combo.currentText())
 
+        self.stop_grbl_sender()
         try:
             self.grbl_ser_port = serial.serial_for_url(port_name, baudrate,
                                                        bytesize=serial.EIGHTBITS,
@@ -1254,6 +1268,13 @@ class ToolLevelling(AppTool, CNCjob):
             answer = ['ok']   # FIXME: hack for development without a GRBL controller connected
             for line in answer:
                 if 'ok' in line.lower():
+                    self.grbl_sender = GrblSender(self.grbl_ser_port)
+                    self.grbl_sender.status_report.connect(self.on_grbl_status_report)
+                    self.grbl_sender.message.connect(self.on_grbl_message)
+                    self.grbl_sender.progress.connect(self.on_grbl_progress)
+                    self.grbl_sender.finished.connect(self.on_grbl_job_finished)
+                    self.grbl_sender.start()
+
                     self.ui.com_connect_button.setStyleSheet("QPushButton {background-color: seagreen;}")
                     self.ui.com_connect_button.setText(_("Connected"))
                     self.ui.controller_reset_button.setDisabled(False)
@@ -1291,6 +1312,11 @@ class ToolLevelling(AppTool, CNCjob):
         except Exception:
             self.app.inform.emit("[ERROR_NOTCL] %s: %s" % (_("Could not connect to port"), port_name))
 
+    def stop_grbl_sender(self):
+        if self.grbl_sender is not None:
+            self.grbl_sender.stop()
+            self.grbl_sender = None
+
     def on_grbl_add_baudrate(self):
         new_bd = str(self.ui.new_baudrate_entry.get_value())
         if int(new_bd) >= 40 and new_bd not in self.ui.baudrates_list_combo.model().stringList():
@@ -1302,6 +1328,11 @@ class ToolLevelling(AppTool, CNCjob):
         self.ui.baudrates_list_combo.removeItem(current_idx)
 
     def on_grbl_wake(self):
+        # the sender reads the port in its own thread; it is stopped while the answers to the wake up are read here
+        sender = self.grbl_sender
+        if sender is not None:
+            sender.stop()
+
         # Wake up grbl
         self.grbl_ser_port.write("\r\n\r\n".encode('utf-8'))
         # Wait for GRBL controller to initialize
@@ -1310,6 +1341,8 @@ class ToolLevelling(AppTool, CNCjob):
         grbl_out = deepcopy(self.grbl_ser_port.readlines())
         self.grbl_ser_port.reset_input_buffer()
 
+        if sender is not None:
+            sender.start()
         return grbl_out
 
     def on_grbl_send_command(self):
@@ -1324,72 +1357,136 @@ class ToolLevelling(AppTool, CNCjob):
 
         self.app.worker_task.emit({'fcn': worker_task, 'params': []})
 
-    def send_grbl_command(self, command, echo=True):
+    def send_grbl_command(self, command, echo=True, timeout=GRBL_ANSWER_TIMEOUT):
         """
+        Sends a command to the GRBL controller and waits for its answer. The real-time commands ('?', '!', '~' and
+        the soft reset) are sent at once and they have no answer.
 
         :param command: GCode command
         :type command:  str
-        :param echo:    if to send a '\n' char after
+        :param echo:    if to show the command and the answer in the Shell
         :type echo:     bool
-        :return:        the text returned by the GRBL controller after each command
+        :param timeout: seconds to wait for the answer
+        :type timeout:  float
+        :return:        the text returned by the GRBL controller for the command; None if there was no answer
         :rtype:         str
         """
         cmd = command.strip()
         if echo:
             self.app.inform_shell[str, bool].emit(cmd, False)
 
-        # Send Gcode command to GRBL
-        snd = cmd + '\n'
-        self.grbl_ser_port.write(snd.encode('utf-8'))
-        grbl_out = self.grbl_ser_port.readlines()
-        if not grbl_out:
-            self.app.inform_shell[str, bool].emit('\t\t\t: No answer\n', False)
+        if self.grbl_sender is None:
+            self.app.inform.emit('[ERROR_NOTCL] %s' % _("Not connected to a GRBL controller."))
+            return ''
 
-        result = ''
-        for line in grbl_out:
-            if echo:
-                try:
-                    self.app.inform_shell.emit('\t\t\t: ' + line.decode('utf-8').strip().upper())
-                except Exception as e:
-                    self.app.log.error("CNCJobObject.send_grbl_command() --> %s" % str(e))
-            if 'ok' in line:
-                result = grbl_out
+        if cmd in REALTIME_COMMANDS:
+            self.grbl_sender.realtime(cmd)
+            return ''
+
+        job = self.grbl_sender.send(cmd, timeout)
+        result = job.text(0)
+        if not job.done or (job.aborted and not result):
+            self.app.inform_shell[str, bool].emit('\t\t\t: No answer\n', False)
+            return None
+        if echo:
+            for line in result.splitlines():
+                self.app.inform_shell.emit('\t\t\t: ' + line.upper())
 
         return result
 
     def send_grbl_block(self, command, echo=True):
-        stripped_cmd = command.strip()
+        """
+        Streams the lines of a GCode block to the GRBL controller. It does not wait for the lines to be sent;
+        the progress is shown in the status bar.
 
-        for grbl_line in stripped_cmd.split('\n'):
-            if echo:
+        :param command: GCode lines
+        :type command:  str
+        :param echo:    if to show the lines in the Shell
+        :type echo:     bool
+        :return:        the job of the lines; GrblJob.wait() waits for its end; None if not connected
+        :rtype:         appCommon.GrblSender.GrblJob
+        """
+        if self.grbl_sender is None:
+            self.app.inform.emit('[ERROR_NOTCL] %s' % _("Not connected to a GRBL controller."))
+            return None
+
+        stripped_cmd = command.strip()
+        if echo:
+            for grbl_line in stripped_cmd.split('\n'):
                 self.app.inform_shell[str, bool].emit(grbl_line, False)
 
-            # Send Gcode block to GRBL
-            snd = grbl_line + '\n'
-            self.grbl_ser_port.write(snd.encode('utf-8'))
-            grbl_out = self.grbl_ser_port.readlines()
+        job = self.grbl_sender.stream(stripped_cmd, stop_on_error=True)
+        if echo:
+            self.grbl_block_jobs.append(job)
+        return job
 
-            for line in grbl_out:
-                if echo:
-                    try:
-                        self.app.inform_shell.emit(' : ' + line.decode('utf-8').strip().upper())
-                    except Exception as e:
-                        self.app.log.error("CNCJobObject.send_grbl_block() --> %s" % str(e))
+    def on_grbl_job_finished(self, job):
+        if job not in self.grbl_block_jobs:
+            return
+        self.grbl_block_jobs.remove(job)
+
+        for index, error in job.errors:
+            self.app.inform_shell.emit('\t\t\t: %s: %s' % (job.lines[index], error.upper()))
+        if job.aborted:
+            self.app.inform.emit('[WARNING_NOTCL] %s' % _("GRBL streaming stopped."))
+        elif job.errors:
+            self.app.inform.emit('[WARNING_NOTCL] %s' % _("GRBL streaming finished with errors."))
+        else:
+            self.app.inform.emit('[success] %s' % _("GRBL streaming finished."))
+
+    def on_grbl_progress(self, acked, total):
+        self.app.inform.emit('%s: %d/%d' % (_("Sending"), acked, total))
+
+    def on_grbl_report(self):
+        if self.grbl_sender is None:
+            self.app.inform.emit('[ERROR_NOTCL] %s' % _("Not connected to a GRBL controller."))
+            return
+        self.grbl_report_requested = True
+        self.grbl_sender.request_status()
+
+    def on_grbl_status_report(self, status):
+        if not self.grbl_report_requested:
+            return
+        self.grbl_report_requested = False
+
+        self.app.ui.shell_dock.show()
+        report = ['%s: %s' % (name, ','.join(str(val) for val in value) if isinstance(value, list) else value)
+                  for name, value in status.items()]
+        self.app.inform_shell.emit('\t\t\t: ' + ' | '.join(report).upper())
+
+    def on_grbl_message(self, message):
+        self.app.inform_shell.emit('\t\t\t: ' + message.upper())
 
     def on_grbl_get_parameter(self, param):
         if '$' in param:
             param = param.replace('$', '')
 
-        snd = '$$\n'
-        self.grbl_ser_port.write(snd.encode('utf-8'))
-        grbl_out = self.grbl_ser_port.readlines()
-        for line in grbl_out:
-            decoded_line = line.decode('utf-8')
-            par = '$%s' % str(param)
-            if par in decoded_line:
-                result = float(decoded_line.rpartition('=')[2])
-                self.app.shell_message("GRBL Parameter: %s = %s" % (str(param), str(result)), show=True)
-                return result
+        if not self.grbl_sender_ready():
+            return None
+
+        result = self.read_grbl_parameter(param)
+        if result is not None:
+            self.app.shell_message("GRBL Parameter: %s = %s" % (str(param), str(result)), show=True)
+        return result
+
+    def read_grbl_parameter(self, param):
+        """
+        Reads a setting of the GRBL controller. It does not use the GUI, it can run in a worker.
+
+        :param param:   the number of the setting, without the '$'
+        :type param:    str
+        :return:        the value of the setting; None if the controller did not answer or has no such setting
+        :rtype:         float
+        """
+        job = self.grbl_sender.send('$$', GRBL_ANSWER_TIMEOUT)
+        if not job.done:
+            self.app.inform_shell[str, bool].emit('\t\t\t: No answer\n', False)
+            return None
+        for decoded_line in job.responses.get(0, []):
+            par = '$%s=' % str(param)
+            if decoded_line.startswith(par):
+                return float(decoded_line.rpartition('=')[2])
+        return None
 
     def on_grbl_jog(self, direction=None):
         if direction is None:
@@ -1415,22 +1512,27 @@ class ToolLevelling(AppTool, CNCjob):
             cmd = "$J=G91 %s Z-%s F%s" % ({'IN': 'G20', 'MM': 'G21'}[self.units], str(step), str(feedrate))
 
         if direction == 'origin':
-            cmd = "$J=G90 %s Z%s F%s" % ({'IN': 'G20', 'MM': 'G21'}[self.units], str(travelz), str(feedrate))
-            self.send_grbl_command(command=cmd, echo=False)
-            cmd = "$J=G90 %s X0.0 Y0.0 F%s" % ({'IN': 'G20', 'MM': 'G21'}[self.units], str(feedrate))
-            self.send_grbl_command(command=cmd, echo=False)
+            cmds = [
+                "$J=G90 %s Z%s F%s" % ({'IN': 'G20', 'MM': 'G21'}[self.units], str(travelz), str(feedrate)),
+                "$J=G90 %s X0.0 Y0.0 F%s" % ({'IN': 'G20', 'MM': 'G21'}[self.units], str(feedrate))
+            ]
+        else:
+            cmds = [cmd]
+
+        if not self.grbl_sender_ready():
             return
 
-        self.send_grbl_command(command=cmd, echo=False)
+        def worker_task():
+            for jog_cmd in cmds:
+                if self.send_grbl_command(command=jog_cmd, echo=False) is None:
+                    return
+
+        self.app.worker_task.emit({'fcn': worker_task, 'params': []})
 
     def on_grbl_zero(self, axis):
-        current_mode = self.on_grbl_get_parameter('10')
-        if current_mode is None:
+        if not self.grbl_sender_ready():
             return
 
-        cmd = '$10=0'
-        self.send_grbl_command(command=cmd, echo=False)
-
         if axis == 'x':
             cmd = 'G10 L2 P1 X0'
         elif axis == 'y':
@@ -1440,32 +1542,68 @@ class ToolLevelling(AppTool, CNCjob):
         else:
             # all
             cmd = 'G10 L2 P1 X0 Y0 Z0'
-        self.send_grbl_command(command=cmd, echo=False)
 
-        # restore previous mode
-        cmd = '$10=%d' % int(current_mode)
-        self.send_grbl_command(command=cmd, echo=False)
+        def worker_task():
+            current_mode = self.read_grbl_parameter('10')
+            if current_mode is None:
+                return
+
+            if self.send_grbl_command(command='$10=0', echo=False) is None:
+                return
+            self.send_grbl_command(command=cmd, echo=False)
+
+            # restore previous mode
+            self.send_grbl_command(command='$10=%d' % int(current_mode), echo=False)
+
+        self.app.worker_task.emit({'fcn': worker_task, 'params': []})
 
     def on_grbl_homing(self):
         cmd = '$H'
+        # waking up the controller stops the sender and the jobs it streams
+        if not self.grbl_sender_ready():
+            return
         self.app.inform.emit("%s" % _("GRBL is doing a home cycle."))
-        self.on_grbl_wake()
-        self.send_grbl_command(command=cmd)
+
+        def worker_task():
+            with self.app.proc_container.new('%s...' % _("Sending")):
+                self.on_grbl_wake()
+                self.send_grbl_command(command=cmd, timeout=GRBL_HOMING_TIMEOUT)
+
+        self.app.worker_task.emit({'fcn': worker_task, 'params': []})
+
+    def grbl_sender_ready(self):
+        """
+        Tells the user when the commands can not be sent now.
+
+        :return:    if a GRBL controller is connected and no job is streamed to it
+        :rtype:     bool
+        """
+        if self.grbl_sender is None:
+            self.app.inform.emit('[ERROR_NOTCL] %s' % _("Not connected to a GRBL controller."))
+            return False
+        if self.grbl_sender.busy:
+            self.app.inform.emit('[WARNING_NOTCL] %s' % _("GRBL is busy. Wait for the end of the job or reset it."))
+            return False
+        return True
 
     def on_grbl_reset(self):
-        cmd = '\x18'
+        if self.grbl_sender is None:
+            self.app.inform.emit('[ERROR_NOTCL] %s' % _("Not connected to a GRBL controller."))
+            return
+        # the streaming is stopped and the lines in the controller buffers are dropped
+        self.grbl_sender.abort()
+        self.ui.pause_resume_button.setChecked(False)
         self.app.inform.emit("%s" % _("GRBL software reset was sent."))
-        self.on_grbl_wake()
-        self.send_grbl_command(command=cmd)
 
     def on_grbl_pause_resume(self, checked):
+        if self.grbl_sender is None:
+            self.app.inform.emit('[ERROR_NOTCL] %s' % _("Not connected to a GRBL controller."))
+            return
         if checked is False:
-            cmd = '~'
-            self.send_grbl_command(command=cmd)
+            self.grbl_sender.resume()
             self.app.inform.emit("%s" % _("GRBL resumed."))
         else:
-            cmd = '!'
-            self.send_grbl_command(command=cmd)
+            self.grbl_sender.pause()
             self.app.inform.emit("%s" % _("GRBL paused."))
 
     def probing_gcode(self, storage):
@@ -1759,26 +1897,33 @@ class ToolLevelling(AppTool, CNCjob):
                 probe_fr = str(self.ui.feedrate_probe_entry.get_value())
                 pr_depth = str(self.ui.pdepth_entry.get_value())
 
-                cmd = 'G21\n'
-                self.send_grbl_command(command=cmd)
-                cmd = 'G90\n'
-                self.send_grbl_command(command=cmd)
+                if self.grbl_sender is None:
+                    self.app.inform.emit('[ERROR_NOTCL] %s' % _("Not connected to a GRBL controller."))
+                    return
 
+                # the probing is streamed as one job; the controller answers each probing with its result
+                commands = ['G21', 'G90']
                 for pt_key in self.al_voronoi_geo_storage:
                     x = str(self.al_voronoi_geo_storage[pt_key]['point'].x)
                     y = str(self.al_voronoi_geo_storage[pt_key]['point'].y)
 
-                    cmd = 'G0 Z%s\n' % pr_travelz
-                    self.send_grbl_command(command=cmd)
-                    cmd = 'G0 X%s Y%s\n' % (x, y)
-                    self.send_grbl_command(command=cmd)
-                    cmd = 'G38.2 Z%s F%s' % (pr_depth, probe_fr)
-                    output = self.send_grbl_command(command=cmd)
-
-                    self.grbl_probe_result += output + '\n'
+                    commands.append('G0 Z%s' % pr_travelz)
+                    commands.append('G0 X%s Y%s' % (x, y))
+                    commands.append('G38.2 Z%s F%s' % (pr_depth, probe_fr))
+                commands.append('M2')
+
+                job = self.grbl_sender.stream(commands, stop_on_error=True)
+                job.wait()
+                for index, line in enumerate(job.lines):
+                    if line.startswith('G38.2') and index < job.acked:
+                        self.grbl_probe_result += job.text(index) + '\n'
+
+                if job.aborted or job.errors:
+                    for index, error in job.errors:
+                        self.app.inform_shell.emit('\t\t\t: %s: %s' % (job.lines[index], error.upper()))
+                    self.app.inform.emit('[ERROR_NOTCL] %s' % _("The probing was not finished."))
+                    return
 
-                cmd = 'M2\n'
-                self.send_grbl_command(command=cmd)
                 self.app.inform.emit('%s' % _("Finished probing. Doing the autolevelling."))
 
                 # apply autolevelling here
@@ -41,6 +41,9 @@ class NonCopperClear(AppTool, Gerber):
 
     optimal_found_sig = QtCore.pyqtSignal(float)
 
+    # the clearing methods by their index in the UI, as named in camlib.CLEAR_METHODS
+    ncc_methods = {0: 'standard', 1: 'seed', 2: 'lines', 3: 'combo'}
+
     def __init__(self, app):
         self.app = app
         self.decimals = self.app.decimals
@@ -2236,6 +2239,46 @@ class NonCopperClear(AppTool, Gerber):
             self.app.inform_shell.emit('%s %s' % (_('Polygon could not be cleared. Location:'), str(coords)))
             return None
 
+    def clear_polygon_list(self, polygons, tooldia, ncc_method, ncc_overlap, ncc_connect, ncc_contour, prog_plot,
+                           simplify_tol=0.0, run_threaded=True, progress=None):
+        """
+        Clears the polygons. If it is set in Preferences, and the shapes are not plotted progressively, the polygons
+        are cleared in parallel, in the processes of the App.pool. Else they are cleared one after another.
+
+        :param polygons:        list of Polygon to be cleared
+        :param progress:        callable, called with the number of polygons done each time a polygon is done
+        :return:                for each polygon, in the same order, the list of the toolpaths or None when the
+                                polygon could not be cleared
+        :rtype:                 list
+        """
+        if self.app.options["tools_ncc_parallel"] and self.app.options["global_process_number"] > 1 and \
+                not prog_plot and len(polygons) > 1:
+            return self.clear_polygons_parallel(polygons, tooldia, method=self.ncc_methods[ncc_method],
+                                                steps_per_circle=self.circle_steps, overlap=ncc_overlap,
+                                                connect=ncc_connect, contour=ncc_contour, simplify_tol=simplify_tol,
+                                                progress=progress)
+
+        results = []
+        for pol in polygons:
+            # provide the app with a way to process the GUI events when in a blocking loop
+            if not run_threaded:
+                QtWidgets.QApplication.processEvents()
+
+            if self.app.abort_flag:
+                # graceful abort requested by the user
+                raise grace
+
+            res = self.clear_polygon_worker(pol=pol, tooldia=tooldia, ncc_method=ncc_method, ncc_overlap=ncc_overlap,
+                                            ncc_connect=ncc_connect, ncc_contour=ncc_contour,
+                                            simplify_tol=simplify_tol, prog_plot=prog_plot)
+            if res == "fail":
+                raise grace
+            results.append(res)
+
+            if progress is not None:
+                progress(len(results))
+        return results
+
     def ncc_handler(self, ncc_obj, ncctd_list, isotd_list, sel_obj=None, outname=None, order=None,
                     tools_storage=None, run_threaded=True):
         """
@@ -2407,7 +2450,7 @@ class NonCopperClear(AppTool, Gerber):
                 # Copper-clear the Polygons in the non-copper-area
                 # Iterate over them
                 # ----------------------------------------------------
-                pol_nr = 0
+                polygons = []
                 for p in tool_empty_area:
                     # provide the app with a way to process the GUI events when in a blocking loop
                     if not run_threaded:
@@ -2423,38 +2466,39 @@ class NonCopperClear(AppTool, Gerber):
                     p = p.buffer(0.0000001)
                     p = flatten_shapely_geometry(p, simplify_tolerance=simplification_value)
 
-                    poly_failed = 0
                     for pol in p:
-                        # provide the app with a way to process the GUI events when in a blocking loop
-                        QtWidgets.QApplication.processEvents()
-
                         if pol is not None and pol.is_valid and isinstance(pol, Polygon):
-                            # ----------------------------------------------------
-                            # This is where copper clearing is happening
-                            # ----------------------------------------------------
-                            res = self.clear_polygon_worker(pol=pol, tooldia=tool,
-                                                            ncc_method=ncc_method,
-                                                            ncc_overlap=ncc_overlap,
-                                                            ncc_connect=ncc_connect,
-                                                            ncc_contour=ncc_contour,
-                                                            simplify_tol=simplification_value,
-                                                            prog_plot=prog_plot)
-                            if res is not None:
-                                cleared_geo += res
-                            else:
-                                poly_failed += 1
+                            polygons.append(pol)
                         else:
                             self.app.log.warning(
                                 "Expected geo is a Polygon. Instead got a %s" % str(type(pol)))
 
-                        pol_nr += 1
-                        disp_number = int(np.interp(pol_nr, [0, geo_len], [0, 100]))
-                        if old_disp_number < disp_number <= 100:
-                            self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                            old_disp_number = disp_number
+                geo_len = len(polygons)
 
-                    if poly_failed > 0:
-                        app_obj.poly_not_cleared = True
+                def on_polygon_cleared(pol_nr):
+                    nonlocal old_disp_number
+                    disp_number = int(np.interp(pol_nr, [0, geo_len], [0, 100]))
+                    if old_disp_number < disp_number <= 100:
+                        self.app.proc_container.update_view_text(' %d%%' % disp_number)
+                        old_disp_number = disp_number
+
+                # ----------------------------------------------------
+                # This is where copper clearing is happening
+                # ----------------------------------------------------
+                results = self.clear_polygon_list(polygons, tooldia=tool, ncc_method=ncc_method,
+                                                  ncc_overlap=ncc_overlap, ncc_connect=ncc_connect,
+                                                  ncc_contour=ncc_contour, simplify_tol=simplification_value,
+                                                  prog_plot=prog_plot, run_threaded=run_threaded,
+                                                  progress=on_polygon_cleared)
+                poly_failed = 0
+                for res in results:
+                    if res is not None:
+                        cleared_geo += res
+                    else:
+                        poly_failed += 1
+
+                if poly_failed > 0:
+                    app_obj.poly_not_cleared = True
 
                 # ---------------------------------------------------------
                 # Debug message regarding how many points are in the result
@@ -2668,8 +2712,7 @@ class NonCopperClear(AppTool, Gerber):
                     tool_empty_area = flatten_shapely_geometry(area.geoms)
 
                 if tool_empty_area:
-                    poly_failed = 0
-                    pol_nr = 0
+                    polygons = []
                     for p in tool_empty_area:
                         # provide the app with a way to process the GUI events when in a blocking loop
                         if not run_threaded:
@@ -2680,9 +2723,6 @@ class NonCopperClear(AppTool, Gerber):
                             raise grace
 
                         if p is not None and p.is_valid and not p.is_empty:
-                            # provide the app with a way to process the GUI events when in a blocking loop
-                            QtWidgets.QApplication.processEvents()
-
                             # speedup the clearing by not trying to clear polygons that is obvious they can't be
                             # cleared with the current tool. this tremendously reduce the clearing time
                             check_dist = -tool / 2
@@ -2701,34 +2741,35 @@ class NonCopperClear(AppTool, Gerber):
                             #                              update=True, layer=0, tolerance=None)
                             #     # -------------------------------------------------------
 
-                            # actual copper clearing is done here
                             if isinstance(p, Polygon):
-                                res = self.clear_polygon_worker(pol=p, tooldia=tool,
-                                                                ncc_method=ncc_method,
-                                                                ncc_overlap=ncc_overlap,
-                                                                ncc_connect=ncc_connect,
-                                                                ncc_contour=ncc_contour,
-                                                                simplify_tol=simplification_value,
-                                                                prog_plot=prog_plot)
-
-                                if res is not None:
-                                    cleared_geo += res
-                                else:
-                                    poly_failed += 1
+                                polygons.append(p)
                             else:
                                 self.app.log.warning("Expected geo is a Polygon. Instead got a %s" % str(type(p)))
 
-                            if poly_failed > 0:
-                                app_obj.poly_not_cleared = True
+                    geo_len = len(polygons)
 
-                            pol_nr += 1
-                            disp_number = int(np.interp(pol_nr, [0, geo_len], [0, 100]))
-                            # log.debug("Polygons cleared: %d" % pol_nr)
+                    def on_polygon_cleared(pol_nr):
+                        nonlocal old_disp_number
+                        disp_number = int(np.interp(pol_nr, [0, geo_len], [0, 100]))
+                        if old_disp_number < disp_number <= 100:
+                            self.app.proc_container.update_view_text(' %d%%' % disp_number)
+                            old_disp_number = disp_number
 
-                            if old_disp_number < disp_number <= 100:
-                                self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                                old_disp_number = disp_number
-                                # log.debug("Polygons cleared: %d. Percentage done: %d%%" % (pol_nr, disp_number))
+                    # actual copper clearing is done here
+                    results = self.clear_polygon_list(polygons, tooldia=tool, ncc_method=ncc_method,
+                                                      ncc_overlap=ncc_overlap, ncc_connect=ncc_connect,
+                                                      ncc_contour=ncc_contour, simplify_tol=simplification_value,
+                                                      prog_plot=prog_plot, run_threaded=run_threaded,
+                                                      progress=on_polygon_cleared)
+                    poly_failed = 0
+                    for res in results:
+                        if res is not None:
+                            cleared_geo += res
+                        else:
+                            poly_failed += 1
+
+                    if poly_failed > 0:
+                        app_obj.poly_not_cleared = True
 
                     if self.app.abort_flag:
                         raise grace     # graceful abort requested by the user
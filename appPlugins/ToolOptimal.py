@@ -15,7 +15,8 @@ import logging
 import numpy as np
 
 from shapely import MultiPolygon
-from shapely.ops import nearest_points
+
+from appCommon.Clearance import nearest_pairs, pair_clearances
 
 import gettext
 import appTranslation as fcTranslate
@@ -262,28 +263,29 @@ class ToolOptimal(AppTool):
                                           "There are no distances between geometry elements to be found."))
                     return 'fail'
 
-                geo_len = (geo_len * (geo_len - 1)) / 2
+                # only the pairs made by each element with its nearest neighbours are measured (and all the pairs
+                # that are at the minimum distance)
+                idx_1, idx_2 = nearest_pairs(total_geo, tolerance=10 ** -plugin_instance.decimals)
+                geo_len = len(idx_1)
 
                 app_obj.inform.emit(
                     '%s: %s' % (_("Optimal Tool. Finding the distances between each two elements. Iterations"),
                                 str(geo_len)))
 
                 plugin_instance.min_dict = {}
-                idx = 1
-                for geo in total_geo:
-                    for s_geo in total_geo[idx:]:
-                        if app_obj.abort_flag:
-                            # graceful abort requested by the user
-                            raise grace
-
-                        # minimize the number of distances by not taking into considerations those that are too small
-                        dist = geo.distance(s_geo)
+                chunk_size = 10000
+                for start in range(0, geo_len, chunk_size):
+                    if app_obj.abort_flag:
+                        # graceful abort requested by the user
+                        raise grace
+
+                    chunk = pair_clearances(total_geo, total_geo, idx_1[start:start + chunk_size],
+                                            idx_2[start:start + chunk_size], midpoint=False)
+                    for dist, (loc_1, loc_2) in chunk:
                         dist = app_obj.dec_format(dist, plugin_instance.decimals)
-                        loc_1, loc_2 = nearest_points(geo, s_geo)
-
                         proc_loc = (
-                            (app_obj.dec_format(loc_1.x, self.decimals), app_obj.dec_format(loc_1.y, self.decimals)),
-                            (app_obj.dec_format(loc_2.x, self.decimals), app_obj.dec_format(loc_2.y, self.decimals))
+                            (app_obj.dec_format(loc_1[0], self.decimals), app_obj.dec_format(loc_1[1], self.decimals)),
+                            (app_obj.dec_format(loc_2[0], self.decimals), app_obj.dec_format(loc_2[1], self.decimals))
                         )
 
                         if dist in plugin_instance.min_dict:
@@ -291,13 +293,12 @@ class ToolOptimal(AppTool):
                         else:
                             plugin_instance.min_dict[dist] = [proc_loc]
 
-                        pol_nr += 1
-                        disp_number = int(np.interp(pol_nr, [0, geo_len], [0, 100]))
+                    pol_nr += len(chunk)
+                    disp_number = int(np.interp(pol_nr, [0, geo_len], [0, 100]))
 
-                        if old_disp_number < disp_number <= 100:
-                            app_obj.proc_container.update_view_text(' %d%%' % disp_number)
-                            old_disp_number = disp_number
-                    idx += 1
+                    if old_disp_number < disp_number <= 100:
+                        app_obj.proc_container.update_view_text(' %d%%' % disp_number)
+                        old_disp_number = disp_number
 
                 app_obj.inform.emit(_("Optimal Tool. Finding the minimum distance."))
 
@@ -68,7 +68,8 @@ class ToolPDF(AppTool):
 
         self.parser = PdfParser(units=self.app.app_units,
                                 resolution=self.app.options["gerber_circle_steps"],
-                                abort=self.app.abort_flag)
+                                abort=self.app.abort_flag,
+                                tolerance=float(self.app.options["global_tolerance"]))
 
     def run(self, toggle=True):
         self.app.defaults.report_usage("ToolPDF()")
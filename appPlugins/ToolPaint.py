@@ -42,6 +42,9 @@ log = logging.getLogger('base')
 
 class ToolPaint(AppTool, Gerber):
 
+    # the painting methods by their index in the UI, as named in camlib.CLEAR_METHODS; "Laser_lines" is not there
+    paint_methods = {0: 'standard', 1: 'seed', 2: 'lines', 4: 'combo'}
+
     def __init__(self, app):
         self.app = app
         self.decimals = self.app.decimals
@@ -1850,6 +1853,43 @@ class ToolPaint(AppTool, Gerber):
             self.app.inform.emit('[ERROR_NOTCL] %s' % _('Geometry could not be painted completely'))
             return None
 
+    def paint_polygon_list(self, polygons, tooldiameter, paint_method, over, conn, cont, prog_plot, obj,
+                           progress=None):
+        """
+        Paints the polygons. If it is set in Preferences, and the shapes are not plotted progressively, the polygons
+        are painted in parallel, in the processes of the App.pool. Else, and always for the "Laser_lines" method that
+        needs the painted object, they are painted one after another.
+
+        :param polygons:        list of Polygon to be painted
+        :param progress:        callable, called with the number of polygons done each time a polygon is done
+        :return:                for each polygon, in the same order, the list of the toolpaths or None when the
+                                polygon could not be painted
+        :rtype:                 list
+        """
+        if self.app.options["tools_paint_parallel"] and self.app.options["global_process_number"] > 1 and \
+                not prog_plot and len(polygons) > 1 and paint_method in self.paint_methods:
+            return self.clear_polygons_parallel(polygons, tooldiameter, method=self.paint_methods[paint_method],
+                                                steps_per_circle=self.circle_steps, overlap=over, connect=conn,
+                                                contour=cont, progress=progress)
+
+        results = []
+        for pp in polygons:
+            # provide the app with a way to process the GUI events when in a blocking loop
+            QtWidgets.QApplication.processEvents()
+            if self.app.abort_flag:
+                # graceful abort requested by the user
+                raise grace
+
+            geo_res = self.paint_polygon_worker(pp, tooldiameter=tooldiameter, over=over, conn=conn, cont=cont,
+                                                paint_method=paint_method, obj=obj, prog_plot=prog_plot)
+            if geo_res == "fail":
+                raise grace
+            results.append(list(geo_res.get_objects()) if geo_res else None)
+
+            if progress is not None:
+                progress(len(results))
+        return results
+
     def paint_geo(self, obj, geometry, tooldia=None, order=None, method=None, outname=None,
                   tools_storage=None, plot=True, rest=None, run_threaded=True):
         """
@@ -1964,42 +2004,32 @@ class ToolPaint(AppTool, Gerber):
 
                 self.app.log.warning("Total number of polygons to be cleared. %s" % str(geo_len))
 
-                pol_nr = 0
+                def on_polygon_painted(pol_nr):
+                    nonlocal old_disp_number
+                    disp_number = int(np.interp(pol_nr, [0, geo_len], [0, 100]))
+                    if old_disp_number < disp_number <= 100:
+                        self.app.proc_container.update_view_text(' %d%%' % disp_number)
+                        old_disp_number = disp_number
 
                 # -----------------------------
                 # effective polygon clearing job
                 # -----------------------------
                 try:
-                    cp_list = []
-                    for pp in poly_buf:
-                        # provide the app with a way to process the GUI events when in a blocking loop
-                        QtWidgets.QApplication.processEvents()
-                        if self.app.abort_flag:
-                            # graceful abort requested by the user
-                            raise grace
-                        geo_res = self.paint_polygon_worker(pp, tooldiameter=tool_dia, over=over, conn=conn,
-                                                            cont=cont, paint_method=paint_method, obj=obj,
-                                                            prog_plot=prog_plot)
-                        if geo_res:
-                            cp_list.append(geo_res)
-                        pol_nr += 1
-                        disp_number = int(np.interp(pol_nr, [0, geo_len], [0, 100]))
-                        # log.debug("Polygons cleared: %d" % pol_nr)
-
-                        if old_disp_number < disp_number <= 100:
-                            self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                            old_disp_number = disp_number
+                    cp_list = self.paint_polygon_list(poly_buf, tooldiameter=tool_dia, over=over, conn=conn,
+                                                      cont=cont, paint_method=paint_method, obj=obj,
+                                                      prog_plot=prog_plot, progress=on_polygon_painted)
 
                     total_geometry = []
-                    if cp_list:
-                        for cp in cp_list:
-                            if simplification_value > 0.0:
-                                total_geometry += [x.simplify(simplification_value) for x in cp.get_objects()]
-                            else:
-                                total_geometry += [x for x in cp.get_objects()]
+                    for geo_elems in cp_list:
+                        if not geo_elems:
+                            continue
+                        if simplification_value > 0.0:
+                            total_geometry += [x.simplify(simplification_value) for x in geo_elems]
+                        else:
+                            total_geometry += geo_elems
 
-                        # clean the geometry
-                        total_geometry = [g for g in total_geometry if g and not g.is_empty]
+                    # clean the geometry
+                    total_geometry = [g for g in total_geometry if g and not g.is_empty]
                 except grace:
                     return "fail"
                 except Exception as e:
@@ -2128,38 +2158,44 @@ class ToolPaint(AppTool, Gerber):
                 conn = tools_storage[current_uid]['data']['tools_paint_connect']
                 cont = tools_storage[current_uid]['data']['tools_paint_contour']
 
-                pol_nr = 0
-
                 # store here the parts of polygons that could not be cleared; actually those are parts of polygons
                 rest_list = []
 
+                def on_polygon_painted(pol_nr):
+                    nonlocal old_disp_number
+                    disp_number = int(np.interp(pol_nr, [0, geo_len], [0, 100]))
+                    if old_disp_number < disp_number <= 100:
+                        self.app.proc_container.update_view_text(' %d%%' % disp_number)
+                        old_disp_number = disp_number
+
                 # -----------------------------
                 # effective polygon clearing job
                 # -----------------------------
                 try:
-                    cleared_geo = []
+                    # speedup the clearing by not trying to clear polygons that is clear they can't be
+                    # cleared with the current tool. this tremendously reduce the clearing time
+                    check_dist = -tool_dia / 2.0
+                    polygons = []
                     for pp in poly_buf:
-                        # provide the app with a way to process the GUI events when in a blocking loop
-                        QtWidgets.QApplication.processEvents()
                         if self.app.abort_flag:
                             # graceful abort requested by the user
                             raise grace
 
-                        # speedup the clearing by not trying to clear polygons that is clear they can't be
-                        # cleared with the current tool. this tremendously reduce the clearing time
-                        check_dist = -tool_dia / 2.0
                         check_buff = pp.buffer(check_dist)
-                        if not check_buff or check_buff.is_empty:
-                            continue
+                        if check_buff and not check_buff.is_empty:
+                            polygons.append(pp)
 
-                        geo_res = self.paint_polygon_worker(pp, tooldiameter=tool_dia, over=over, conn=conn,
-                                                            cont=cont, paint_method=paint_method, obj=obj,
-                                                            prog_plot=prog_plot)
+                    cp_list = self.paint_polygon_list(polygons, tooldiameter=tool_dia, over=over, conn=conn,
+                                                      cont=cont, paint_method=paint_method, obj=obj,
+                                                      prog_plot=prog_plot, progress=on_polygon_painted)
 
+                    cleared_geo = []
+                    for pp, geo_res in zip(polygons, cp_list):
+                        geo_res = geo_res if geo_res else []
                         if simplification_value > 0.0:
-                            geo_elems = [x.simplify(simplification_value) for x in geo_res.get_objects()]
+                            geo_elems = [x.simplify(simplification_value) for x in geo_res]
                         else:
-                            geo_elems = [x for x in geo_res.get_objects()]
+                            geo_elems = geo_res
 
                         # See if the polygon was completely cleared
                         pp_cleared = unary_union(geo_elems).buffer(tool_dia / 2.0)
@@ -2170,16 +2206,7 @@ class ToolPaint(AppTool, Gerber):
                                 if r.is_valid and not r.is_empty:
                                     rest_list.append(r)
 
-                        if geo_res:
-                            cleared_geo += geo_elems
-
-                        pol_nr += 1
-                        disp_number = int(np.interp(pol_nr, [0, geo_len], [0, 100]))
-                        # log.debug("Polygons cleared: %d" % pol_nr)
-
-                        if old_disp_number < disp_number <= 100:
-                            self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                            old_disp_number = disp_number
+                        cleared_geo += geo_elems
                 except grace:
                     return "fail"
                 except Exception as e:
@@ -2741,7 +2768,7 @@ class ToolPaint(AppTool, Gerber):
     @staticmethod
     def paint_bounds(geometry):
         def bounds_rec(o):
-            if type(o) is list:
+            if isinstance(o, list):
                 minx = Inf
                 miny = Inf
                 maxx = -Inf
@@ -511,7 +511,7 @@ class Panelize(AppTool):
                     currenty = 0.0
 
                     def translate_recursion(geom):
-                        if type(geom) == list:
+                        if isinstance(geom, list):
                             geoms = []
                             for local_geom in geom:
                                 res_geo = translate_recursion(local_geom)
@@ -825,7 +825,7 @@ class Panelize(AppTool):
                     currenty = 0.0
 
                     def translate_recursion(geom):
-                        if type(geom) == list:
+                        if isinstance(geom, list):
                             geoms = []
                             for local_geom in geom:
                                 res_geo = translate_recursion(local_geom)
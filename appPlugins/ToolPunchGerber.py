@@ -22,7 +22,7 @@ import gettext
 import appTranslation as fcTranslate
 import builtins
 
-from appParsers.ParseGerber import Gerber
+from appParsers.ParseGerber import Gerber, place_flashes
 from camlib import Geometry
 
 fcTranslate.apply_language('strings')
@@ -832,6 +832,23 @@ class ToolPunchGerber(AppTool, Gerber):
 
         self.app.app_obj.new_object('gerber', outname, init_func, autoselected=False)
 
+    @staticmethod
+    def punch_flashes(grb_obj, apid, dia):
+        """
+        Circular holes in all the pads (flashes) of an aperture, made in one pass from the flash locations.
+
+        :param grb_obj:     the Gerber object
+        :type grb_obj:      appObjects.GerberObject.GerberObject
+        :param apid:        the aperture ID
+        :type apid:         int
+        :param dia:         the hole diameter
+        :type dia:          float
+        :return:            the holes
+        :rtype:             list
+        """
+        locations, __ = grb_obj.flash_locations(apid)
+        return list(place_flashes(Point(0, 0).buffer(dia / 2), locations))
+
     def on_fixed_method(self, grb_obj, outname):
         punch_size = float(self.ui.dia_entry.get_value())
         if punch_size == 0.0:
@@ -853,54 +870,33 @@ class ToolPunchGerber(AppTool, Gerber):
         punching_geo = []
         for apid in grb_obj.tools:
             if apid in sel_apid:
+                # the punch has to fit in the smallest dimension of the aperture
                 if grb_obj.tools[apid]['type'] == 'C' and self.ui.circular_cb.get_value():
-                    for elem in grb_obj.tools[apid]['geometry']:
-                        if 'follow' in elem:
-                            if isinstance(elem['follow'], Point):
-                                if punch_size >= float(grb_obj.tools[apid]['size']):
-                                    self.app.inform.emit('[ERROR_NOTCL] %s' % fail_msg)
-                                    return 'fail'
-                                punching_geo.append(elem['follow'].buffer(punch_size / 2))
+                    ap_size = float(grb_obj.tools[apid]['size'])
                 elif grb_obj.tools[apid]['type'] == 'R':
 
                     if round(float(grb_obj.tools[apid]['width']), self.decimals) == \
                             round(float(grb_obj.tools[apid]['height']), self.decimals) and \
                             self.ui.square_cb.get_value():
-                        for elem in grb_obj.tools[apid]['geometry']:
-                            if 'follow' in elem:
-                                if isinstance(elem['follow'], Point):
-                                    if punch_size >= float(grb_obj.tools[apid]['width']) or \
-                                            punch_size >= float(grb_obj.tools[apid]['height']):
-                                        self.app.inform.emit('[ERROR_NOTCL] %s' % fail_msg)
-                                        return 'fail'
-                                    punching_geo.append(elem['follow'].buffer(punch_size / 2))
+                        ap_size = min(float(grb_obj.tools[apid]['width']), float(grb_obj.tools[apid]['height']))
                     elif round(float(grb_obj.tools[apid]['width']), self.decimals) != \
                             round(float(grb_obj.tools[apid]['height']), self.decimals) and \
                             self.ui.rectangular_cb.get_value():
-                        for elem in grb_obj.tools[apid]['geometry']:
-                            if 'follow' in elem:
-                                if isinstance(elem['follow'], Point):
-                                    if punch_size >= float(grb_obj.tools[apid]['width']) or \
-                                            punch_size >= float(grb_obj.tools[apid]['height']):
-                                        self.app.inform.emit('[ERROR_NOTCL] %s' % fail_msg)
-                                        return 'fail'
-                                    punching_geo.append(elem['follow'].buffer(punch_size / 2))
+                        ap_size = min(float(grb_obj.tools[apid]['width']), float(grb_obj.tools[apid]['height']))
+                    else:
+                        continue
                 elif grb_obj.tools[apid]['type'] == 'O' and self.ui.oblong_cb.get_value():
-                    for elem in grb_obj.tools[apid]['geometry']:
-                        if 'follow' in elem:
-                            if isinstance(elem['follow'], Point):
-                                if punch_size >= float(grb_obj.tools[apid]['size']):
-                                    self.app.inform.emit('[ERROR_NOTCL] %s' % fail_msg)
-                                    return 'fail'
-                                punching_geo.append(elem['follow'].buffer(punch_size / 2))
+                    ap_size = float(grb_obj.tools[apid]['size'])
                 elif grb_obj.tools[apid]['type'] not in ['C', 'R', 'O'] and self.ui.other_cb.get_value():
-                    for elem in grb_obj.tools[apid]['geometry']:
-                        if 'follow' in elem:
-                            if isinstance(elem['follow'], Point):
-                                if punch_size >= float(grb_obj.tools[apid]['size']):
-                                    self.app.inform.emit('[ERROR_NOTCL] %s' % fail_msg)
-                                    return 'fail'
-                                punching_geo.append(elem['follow'].buffer(punch_size / 2))
+                    ap_size = float(grb_obj.tools[apid].get('size', 0.0))
+                else:
+                    continue
+
+                holes = self.punch_flashes(grb_obj, apid, punch_size)
+                if holes and punch_size >= ap_size:
+                    self.app.inform.emit('[ERROR_NOTCL] %s' % fail_msg)
+                    return 'fail'
+                punching_geo += holes
 
         punching_geo = MultiPolygon(punching_geo)
         if isinstance(grb_obj.solid_geometry, list):
@@ -1100,9 +1096,7 @@ class ToolPunchGerber(AppTool, Gerber):
             if apid in sel_apid:
                 if ap_type == 'C' and self.ui.circular_cb.get_value():
                     dia = float(apid_value['size']) - (2 * circ_r_val)
-                    for elem in apid_value['geometry']:
-                        if 'follow' in elem and isinstance(elem['follow'], Point):
-                            punching_geo.append(elem['follow'].buffer(dia / 2))
+                    punching_geo = self.punch_flashes(grb_obj, apid, dia)
                 elif ap_type == 'O' and self.ui.oblong_cb.get_value():
                     width = float(apid_value['width'])
                     height = float(apid_value['height'])
@@ -1112,10 +1106,7 @@ class ToolPunchGerber(AppTool, Gerber):
                     else:
                         dia = float(apid_value['width']) - (2 * oblong_r_val)
 
-                    for elem in grb_obj.tools[apid]['geometry']:
-                        if 'follow' in elem:
-                            if isinstance(elem['follow'], Point):
-                                punching_geo.append(elem['follow'].buffer(dia / 2))
+                    punching_geo = self.punch_flashes(grb_obj, apid, dia)
                 elif ap_type == 'R':
                     width = float(apid_value['width'])
                     height = float(apid_value['height'])
@@ -1125,20 +1116,14 @@ class ToolPunchGerber(AppTool, Gerber):
                         if self.ui.square_cb.get_value():
                             dia = float(apid_value['height']) - (2 * square_r_val)
 
-                            for elem in grb_obj.tools[apid]['geometry']:
-                                if 'follow' in elem:
-                                    if isinstance(elem['follow'], Point):
-                                        punching_geo.append(elem['follow'].buffer(dia / 2))
+                            punching_geo = self.punch_flashes(grb_obj, apid, dia)
                     elif self.ui.rectangular_cb.get_value():
                         if width > height:
                             dia = float(apid_value['height']) - (2 * rect_r_val)
                         else:
                             dia = float(apid_value['width']) - (2 * rect_r_val)
 
-                        for elem in grb_obj.tools[apid]['geometry']:
-                            if 'follow' in elem:
-                                if isinstance(elem['follow'], Point):
-                                    punching_geo.append(elem['follow'].buffer(dia / 2))
+                        punching_geo = self.punch_flashes(grb_obj, apid, dia)
                 elif self.ui.other_cb.get_value():
                     try:
                         dia = float(apid_value['size']) - (2 * other_r_val)
@@ -1153,10 +1138,7 @@ class ToolPunchGerber(AppTool, Gerber):
                             else:
                                 dia = dy - (2 * other_r_val)
 
-                    for elem in grb_obj.tools[apid]['geometry']:
-                        if 'follow' in elem:
-                            if isinstance(elem['follow'], Point):
-                                punching_geo.append(elem['follow'].buffer(dia / 2))
+                    punching_geo = self.punch_flashes(grb_obj, apid, dia)
 
             # if dia is None then none of the above applied, so we skip the following
             if dia is None:
@@ -1384,9 +1366,7 @@ class ToolPunchGerber(AppTool, Gerber):
             if apid in sel_apid:
                 if ap_type == 'C' and self.ui.circular_cb.get_value():
                     dia = float(apid_value['size']) * prop_factor
-                    for elem in apid_value['geometry']:
-                        if 'follow' in elem and isinstance(elem['follow'], Point):
-                            punching_geo.append(elem['follow'].buffer(dia / 2))
+                    punching_geo = self.punch_flashes(grb_obj, apid, dia)
                 elif ap_type == 'O' and self.ui.oblong_cb.get_value():
                     width = float(apid_value['width'])
                     height = float(apid_value['height'])
@@ -1396,10 +1376,7 @@ class ToolPunchGerber(AppTool, Gerber):
                     else:
                         dia = float(apid_value['width']) * prop_factor
 
-                    for elem in grb_obj.tools[apid]['geometry']:
-                        if 'follow' in elem:
-                            if isinstance(elem['follow'], Point):
-                                punching_geo.append(elem['follow'].buffer(dia / 2))
+                    punching_geo = self.punch_flashes(grb_obj, apid, dia)
                 elif ap_type == 'R':
                     width = float(apid_value['width'])
                     height = float(apid_value['height'])
@@ -1409,20 +1386,14 @@ class ToolPunchGerber(AppTool, Gerber):
                         if self.ui.square_cb.get_value():
                             dia = float(apid_value['height']) * prop_factor
 
-                            for elem in grb_obj.tools[apid]['geometry']:
-                                if 'follow' in elem:
-                                    if isinstance(elem['follow'], Point):
-                                        punching_geo.append(elem['follow'].buffer(dia / 2))
+                            punching_geo = self.punch_flashes(grb_obj, apid, dia)
                     elif self.ui.rectangular_cb.get_value():
                         if width > height:
                             dia = float(apid_value['height']) * prop_factor
                         else:
                             dia = float(apid_value['width']) * prop_factor
 
-                        for elem in grb_obj.tools[apid]['geometry']:
-                            if 'follow' in elem:
-                                if isinstance(elem['follow'], Point):
-                                    punching_geo.append(elem['follow'].buffer(dia / 2))
+                        punching_geo = self.punch_flashes(grb_obj, apid, dia)
                 elif self.ui.other_cb.get_value():
                     try:
                         dia = float(apid_value['size']) * prop_factor
@@ -1437,10 +1408,7 @@ class ToolPunchGerber(AppTool, Gerber):
                             else:
                                 dia = dy * prop_factor
 
-                    for elem in grb_obj.tools[apid]['geometry']:
-                        if 'follow' in elem:
-                            if isinstance(elem['follow'], Point):
-                                punching_geo.append(elem['follow'].buffer(dia / 2))
+                    punching_geo = self.punch_flashes(grb_obj, apid, dia)
 
             # if dia is None then none of the above applied, so we skip the following
             if dia is None:
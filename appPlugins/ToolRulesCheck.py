@@ -14,9 +14,12 @@ from appObjects import GerberObject
 import logging
 from copy import deepcopy
 
+import shapely
 from shapely import Polygon, MultiPolygon
 from shapely.ops import nearest_points
 
+from appCommon.Clearance import candidate_pairs, pair_clearances, clearance_chunks, clearance_process
+
 import gettext
 import appTranslation as fcTranslate
 import builtins
@@ -262,17 +265,10 @@ class RulesCheck(AppTool):
         return rule_title, violations
 
     @staticmethod
-    def check_gerber_clearance(gerber_list: list[GerberObject], size, rule):
+    def check_gerber_clearance(gerber_list: list[GerberObject], size, rule, pool=None):
         # log.debug("RulesCheck.check_gerber_clearance()")
         rule_title = rule
 
-        violations = []
-        obj_violations = {}
-        obj_violations.update({
-            'name': '',
-            'points': list()
-        })
-
         if len(gerber_list) == 2:
             gerber_1 = gerber_list[0]
             # added it, so I won't have errors of using before declaring
@@ -311,48 +307,8 @@ class RulesCheck(AppTool):
                     if 'solid' in geo_el and geo_el['solid'] is not None:
                         total_geo_grb_3.append(geo_el['solid'])
 
-        total_geo_grb_1 = MultiPolygon(total_geo_grb_1)
-        total_geo_grb_1 = total_geo_grb_1.buffer(0)
-
-        total_geo_grb_3 = MultiPolygon(total_geo_grb_3)
-        total_geo_grb_3 = total_geo_grb_3.buffer(0)
-
-        if isinstance(total_geo_grb_1, Polygon):
-            len_1 = 1
-            total_geo_grb_1 = [total_geo_grb_1]
-        else:
-            len_1 = len(total_geo_grb_1)
-
-        if isinstance(total_geo_grb_3, Polygon):
-            len_3 = 1
-            total_geo_grb_3 = [total_geo_grb_3]
-        else:
-            len_3 = len(total_geo_grb_3)
-
-        iterations = len_1 * len_3
-        # log.debug("RulesCheck.check_gerber_clearance(). Iterations: %s" % str(iterations))
-
-        min_dict = {}
-        for geo in total_geo_grb_1:
-            for s_geo in total_geo_grb_3:
-                # minimize the number of distances by not taking into considerations those that are too small
-                dist = geo.distance(s_geo)
-                if float(dist) < float(size):
-                    loc_1, loc_2 = nearest_points(geo, s_geo)
-
-                    dx = loc_1.x - loc_2.x
-                    dy = loc_1.y - loc_2.y
-                    loc = min(loc_1.x, loc_2.x) + (abs(dx) / 2), min(loc_1.y, loc_2.y) + (abs(dy) / 2)
-
-                    if dist in min_dict:
-                        min_dict[dist].append(loc)
-                    else:
-                        min_dict[dist] = [loc]
-
-        points_list = set()
-        for dist in min_dict.keys():
-            for location in min_dict[dist]:
-                points_list.add(location)
+        total_geo_grb_1 = shapely.get_parts(MultiPolygon(total_geo_grb_1).buffer(0))
+        total_geo_grb_3 = shapely.get_parts(MultiPolygon(total_geo_grb_3).buffer(0))
 
         name_list = []
         if gerber_1:
@@ -362,11 +318,7 @@ class RulesCheck(AppTool):
         if gerber_3:
             name_list.append(gerber_3['name'])
 
-        obj_violations['name'] = name_list
-        obj_violations['points'] = list(points_list)
-        violations.append(deepcopy(obj_violations))
-
-        return rule_title, violations
+        return ClearanceCheck(rule_title, name_list, total_geo_grb_1, total_geo_grb_3, size, pool=pool)
 
     @staticmethod
     def check_holes_size(elements, size):
@@ -396,17 +348,10 @@ class RulesCheck(AppTool):
         return rule, violations
 
     @staticmethod
-    def check_holes_clearance(elements, size):
+    def check_holes_clearance(elements, size, pool=None):
         # log.debug("RulesCheck.check_holes_clearance()")
         rule = _("Hole to Hole Clearance")
 
-        violations = []
-        obj_violations = {}
-        obj_violations.update({
-            'name': '',
-            'points': list()
-        })
-
         total_geo = []
         for elem in elements:
             for tool in elem['tools']:
@@ -415,40 +360,11 @@ class RulesCheck(AppTool):
                     for geo in geometry:
                         total_geo.append(geo)
 
-        min_dict = {}
-        idx = 1
-        for geo in total_geo:
-            for s_geo in total_geo[idx:]:
-
-                # minimize the number of distances by not taking into considerations those that are too small
-                dist = geo.distance(s_geo)
-                loc_1, loc_2 = nearest_points(geo, s_geo)
-
-                dx = loc_1.x - loc_2.x
-                dy = loc_1.y - loc_2.y
-                loc = min(loc_1.x, loc_2.x) + (abs(dx) / 2), min(loc_1.y, loc_2.y) + (abs(dy) / 2)
-
-                if dist in min_dict:
-                    min_dict[dist].append(loc)
-                else:
-                    min_dict[dist] = [loc]
-            idx += 1
-
-        points_list = set()
-        for dist in min_dict.keys():
-            if float(dist) < size:
-                for location in min_dict[dist]:
-                    points_list.add(location)
-
         name_list = []
         for elem in elements:
             name_list.append(elem['name'])
 
-        obj_violations['name'] = name_list
-        obj_violations['points'] = list(points_list)
-        violations.append(deepcopy(obj_violations))
-
-        return rule, violations
+        return ClearanceCheck(rule, name_list, total_geo, None, size, pool=pool)
 
     @staticmethod
     def check_traces_size(elements, size):
@@ -769,10 +685,10 @@ class RulesCheck(AppTool):
                         _("Outline Gerber object presence is mandatory for this rule but it is not selected.")))
                     return
 
-                self.results.append(self.pool.apply_async(self.check_gerber_clearance,
-                                                          args=(objs,
+                self.results.append(self.check_gerber_clearance(objs,
                                                                 copper_outline_clearance,
-                                                                _("Copper to Outline clearance"))))
+                                                                _("Copper to Outline clearance"),
+                                                                pool=self.pool))
 
             # RULE: Check Silk to Silk Clearance
             if self.ui.clearance_silk2silk_cb.get_value():
@@ -867,16 +783,16 @@ class RulesCheck(AppTool):
 
                 if top_ss is True and top_sm is True:
                     objs = [silk_t_dict, sm_t_dict]
-                    self.results.append(self.pool.apply_async(self.check_gerber_clearance,
-                                                              args=(objs,
+                    self.results.append(self.check_gerber_clearance(objs,
                                                                     silk_sm_clearance,
-                                                                    _("TOP -> Silk to Solder Mask Clearance"))))
+                                                                    _("TOP -> Silk to Solder Mask Clearance"),
+                                                                    pool=self.pool))
                 elif bottom_ss is True and bottom_sm is True:
                     objs = [silk_b_dict, sm_b_dict]
-                    self.results.append(self.pool.apply_async(self.check_gerber_clearance,
-                                                              args=(objs,
+                    self.results.append(self.check_gerber_clearance(objs,
                                                                     silk_sm_clearance,
-                                                                    _("BOTTOM -> Silk to Solder Mask Clearance"))))
+                                                                    _("BOTTOM -> Silk to Solder Mask Clearance"),
+                                                                    pool=self.pool))
                 else:
                     app_obj.inform.emit('[ERROR_NOTCL] %s. %s' % (
                         _("Silk to Solder Mask Clearance"),
@@ -933,10 +849,10 @@ class RulesCheck(AppTool):
                         _("Outline Gerber object presence is mandatory for this rule but it is not selected.")))
                     return
 
-                self.results.append(self.pool.apply_async(self.check_gerber_clearance,
-                                                          args=(objs,
+                self.results.append(self.check_gerber_clearance(objs,
                                                                 copper_outline_clearance,
-                                                                _("Silk to Outline Clearance"))))
+                                                                _("Silk to Outline Clearance"),
+                                                                pool=self.pool))
 
             # RULE: Check Minimum Solder Mask Sliver
             if self.ui.clearance_silk2silk_cb.get_value():
@@ -1063,7 +979,7 @@ class RulesCheck(AppTool):
                     exc_list.append(elem_dict)
 
                 hole_clearance = float(self.ui.clearance_d2d_entry.get_value())
-                self.results.append(self.pool.apply_async(self.check_holes_clearance, args=(exc_list, hole_clearance)))
+                self.results.append(self.check_holes_clearance(exc_list, hole_clearance, pool=self.pool))
 
             # RULE: Check Holes Size
             if self.ui.drill_size_cb.get_value():
@@ -1170,6 +1086,58 @@ class RulesCheck(AppTool):
         pass
 
 
+class ClearanceCheck:
+    """
+    The result of a clearance rule. Only the pairs of features that are found close (with an STRtree) are measured,
+    in chunks that are sent to the App.pool. Like the AsyncResult of the other rules, get() waits for the chunks and
+    returns the (rule title, violations) tuple.
+    """
+
+    def __init__(self, rule_title, name_list, geoms_1, geoms_2, size, pool=None):
+        """
+
+        :param rule_title:  the name of the rule
+        :type rule_title:   str
+        :param name_list:   the names of the checked objects
+        :type name_list:    list
+        :param geoms_1:     the first set of features
+        :type geoms_1:      list | np.ndarray
+        :param geoms_2:     the second set of features; None to check the features of the first set between them
+        :type geoms_2:      list | np.ndarray | None
+        :param size:        the clearance; the pairs of features that are closer are violations
+        :type size:         float
+        :param pool:        the App.pool; if None the distances are computed in the current process
+        """
+        self.rule_title = rule_title
+        self.name_list = name_list
+
+        size = float(size)
+        idx_1, idx_2 = candidate_pairs(geoms_1, geoms_2, distance=size)
+        if geoms_2 is None:
+            geoms_2 = geoms_1
+
+        if pool is None:
+            self.chunks = [pair_clearances(geoms_1, geoms_2, idx_1, idx_2, distance=size)]
+        else:
+            self.chunks = [
+                pool.apply_async(clearance_process, args=(wkb_1, wkb_2, c_idx_1, c_idx_2, size))
+                for wkb_1, wkb_2, c_idx_1, c_idx_2 in clearance_chunks(geoms_1, geoms_2, idx_1, idx_2)
+            ]
+
+    def get(self):
+        points_list = set()
+        for chunk in self.chunks:
+            chunk_result = chunk if isinstance(chunk, list) else chunk.get()
+            for __, location in chunk_result:
+                points_list.add(location)
+
+        obj_violations = {
+            'name': self.name_list,
+            'points': list(points_list)
+        }
+        return self.rule_title, [obj_violations]
+
+
 class RulesUI:
     
     pluginName = _("Check Rules")
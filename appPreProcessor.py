@@ -74,6 +74,63 @@ class PreProc(object, metaclass=ABCPreProcRegister):
     def spindle_stop_code(self, p):
         pass
 
+    # ###############################################################################################################
+    # Bulk emitters. They receive a parameter snapshot (made once per path by CNCjob.doformat_linear() and once per
+    # batch of holes by CNCjob.doformat_points()) and the coordinates of many points and return a list of G-Code
+    # lines, one for each point.
+    # The default implementation calls the per-point method so custom preprocessors work without changes; the
+    # preprocessors where the motion lines are made out of the coordinates alone can override them with a fast path.
+    # ###############################################################################################################
+    def linear_code_bulk(self, p, xs, ys):
+        return self.call_per_point(self.linear_code, p, xs, ys)
+
+    def rapid_code_bulk(self, p, xs, ys):
+        return self.call_per_point(self.rapid_code, p, xs, ys)
+
+    @staticmethod
+    def call_per_point(fun, p, xs, ys):
+        lines = []
+        for x, y in zip(xs, ys):
+            p['x'] = x
+            p['y'] = y
+            lines.append(fun(p))
+        return lines
+
+    @staticmethod
+    def bed_positions(p, xs, ys):
+        """
+        Vectorized version of the position_code() bed compensation (offset and skew).
+
+        :param p:   parameter snapshot
+        :param xs:  X coordinates
+        :type xs:   numpy.ndarray
+        :param ys:  Y coordinates
+        :type ys:   numpy.ndarray
+        :return:    the compensated X and Y coordinates as lists
+        :rtype:     tuple
+        """
+        if p._bed_skew_x == 0:
+            x_pos = xs + p._bed_offset_x
+        else:
+            x_pos = (xs + p._bed_offset_x) + ((ys / p._bed_limit_y) * p._bed_skew_x)
+
+        if p._bed_skew_y == 0:
+            y_pos = ys + p._bed_offset_y
+        else:
+            y_pos = (ys + p._bed_offset_y) + ((xs / p._bed_limit_x) * p._bed_skew_y)
+
+        return x_pos.tolist(), y_pos.tolist()
+
+    def format_positions(self, p, prefix, xs, ys, suffix=''):
+        """
+        Makes the lines '<prefix>X<x> Y<y><suffix>' for all the points, using the preprocessor coordinate_format.
+        """
+        line_format = prefix.replace('%', '%%') + 'X' + self.coordinate_format + ' Y' + self.coordinate_format + \
+            suffix.replace('%', '%%')
+        decimals = p.coords_decimals
+        x_pos, y_pos = self.bed_positions(p, xs, ys)
+        return [line_format % (decimals, x, decimals, y) for x, y in zip(x_pos, y_pos)]
+
 
 class AppPreProcTools(object, metaclass=ABCPreProcRegister):
     @abstractmethod
@@ -6,7 +6,6 @@
 # MIT Licence                                                 #
 # ########################################################## ##
 import shapely
-from PyQt6 import QtWidgets
 
 from appCommon.Common import GracefulException as grace
 
@@ -15,6 +14,10 @@ from appCommon.Common import GracefulException as grace
 
 from appParsers.ParseSVG import svgparselength, svgparse_viewbox, getsvggeo, getsvgtext
 from appParsers.ParseDXF import getdxfgeo
+from appCommon.PathOrdering import local_search_order, HAS_SCIPY
+from appCommon.GeometryArray import GeometryArray, GeometryAttribute
+from appParsers.ParseGCode import GCodeParser, GCodeParsed, DrillIndex, gcode_dialect, parsed_geometries, \
+    parsed_kinds, KIND_TRAVEL, affine_matrix_translate, affine_matrix_scale, affine_matrix_rotate, affine_matrix_skew
 
 from numpy.linalg import solve
 
@@ -67,6 +70,9 @@ if platform.architecture()[0] == '64bit':
     except ModuleNotFoundError:
         HAS_ORTOOLS = False
 
+if HAS_SCIPY:
+    from scipy.spatial import cKDTree
+
 fcTranslate.apply_language('strings')
 
 log = logging.getLogger('base2')
@@ -539,6 +545,12 @@ class Geometry(object):
         # "geo_steps_per_circle": 128
     }
 
+    # attributes that hold the geometry changed by apply_affine()
+    affine_attrs = ['solid_geometry', 'tools']
+
+    # the lists set as solid_geometry are stored as GeometryArray (cached bounds, STRtree, vectorized operations)
+    solid_geometry = GeometryAttribute()
+
     def __init__(self, geo_steps_per_circle=None):
         # Units (in or mm)
         self.units = self.app.app_units
@@ -654,7 +666,7 @@ class Geometry(object):
             return "fail"
 
         # add to the solid_geometry
-        if type(self.solid_geometry) is list:
+        if isinstance(self.solid_geometry, list):
             self.solid_geometry.append(new_poly)
         else:
             try:
@@ -695,7 +707,7 @@ class Geometry(object):
             return "fail"
 
         # add to the solid_geometry
-        if type(self.solid_geometry) is list:
+        if isinstance(self.solid_geometry, list):
             self.solid_geometry.append(new_line)
         else:
             try:
@@ -814,6 +826,9 @@ class Geometry(object):
                 working_geo = self.tools[tool]['solid_geometry']
                 if not working_geo:
                     continue
+                # the bounds of a GeometryArray are kept until the geometry changes
+                if isinstance(working_geo, list) and not isinstance(working_geo, GeometryArray):
+                    working_geo = self.tools[tool]['solid_geometry'] = GeometryArray(working_geo)
 
                 if flatten:
                     self.flatten(geometry=working_geo, reset=True)
@@ -839,6 +854,9 @@ class Geometry(object):
                 self.flatten(reset=True)
                 self.solid_geometry = self.flat_geometry
 
+            if isinstance(self.solid_geometry, GeometryArray):
+                return self.solid_geometry.bounds
+
             bounds_coords = bounds_rec(self.solid_geometry)
             return bounds_coords
 
@@ -901,6 +919,10 @@ class Geometry(object):
         if geoset is None:
             geoset = self.solid_geometry
 
+        # only the geometry whose bounding box has the point is tested
+        if isinstance(geoset, GeometryArray):
+            geoset = geoset.query(Point(point)).tolist()
+
         try:  # Iterable
             for sub_geo in geoset:
                 p = self.find_polygon(point, geoset=sub_geo)
@@ -975,6 +997,10 @@ class Geometry(object):
         if reset:
             self.flat_geometry = []
 
+        if isinstance(geometry, GeometryArray) and not pathonly:
+            self.flat_geometry += geometry.parts(['MultiPolygon', 'MultiLineString']).tolist()
+            return self.flat_geometry
+
         # ## If iterable, expand recursively.
         try:
             work_geo = geometry.geoms if isinstance(geometry, (MultiPolygon, MultiLineString)) else geometry
@@ -1219,12 +1245,14 @@ class Geometry(object):
 
         units = self.app.app_units if units is None else units
         res = self.app.options['geometry_circle_steps']
+        tol = float(self.app.options['global_tolerance'])
         factor = svgparse_viewbox(svg_root)
 
         if svg_units == 'cm':
             factor *= 10
 
-        geos = getsvggeo(svg_root, object_type, units=units, res=res, factor=factor, app=self.app)
+        geos = getsvggeo(svg_root, object_type, units=units, res=res, factor=factor, app=self.app,
+                         tolerance=tol)
         if geos is None:
             return 'fail'
 
@@ -1263,8 +1291,8 @@ class Geometry(object):
         if self.solid_geometry is None:
             self.solid_geometry = []
 
-        if type(self.solid_geometry) is list:
-            if type(geos) is list:
+        if isinstance(self.solid_geometry, list):
+            if isinstance(geos, list):
                 self.solid_geometry += geos
             else:
                 self.solid_geometry.append(geos)
@@ -1323,7 +1351,8 @@ class Geometry(object):
 
         # Parse into list of shapely objects
         dxf = ezdxf.readfile(filename)
-        geos = getdxfgeo(dxf)
+        geos = getdxfgeo(dxf, steps_per_circle=int(self.app.options['geometry_circle_steps']),
+                         tolerance=float(self.app.options['global_tolerance']))
 
         # trying to optimize the resulting geometry by merging contiguous lines
         geos = list(self.flatten_list(geos))
@@ -1349,8 +1378,8 @@ class Geometry(object):
         if self.solid_geometry is None:
             self.solid_geometry = []
 
-        if type(self.solid_geometry) is list:
-            if type(geos) is list:
+        if isinstance(self.solid_geometry, list):
+            if isinstance(geos, list):
                 self.solid_geometry += geos
             else:
                 self.solid_geometry.append(geos)
@@ -1431,7 +1460,7 @@ class Geometry(object):
         def get_pts(o):
             return [o.coords[0], o.coords[-1]]
 
-        geoms = AppRTreeStorage()
+        geoms = EndpointStorage()
         geoms.get_points = get_pts
 
         # Can only result in a Polygon or MultiPolygon
@@ -1449,8 +1478,6 @@ class Geometry(object):
                 if self.app.abort_flag:
                     # graceful abort requested by the user
                     raise grace
-                # provide the app with a way to process the GUI events when in a blocking loop
-                QtWidgets.QApplication.processEvents()
 
                 cl_pol = cl_pol.buffer(-tooldia * (1 - overlap), int(steps_per_circle))
                 cl_pol_list = flatten_shapely_geometry(cl_pol)
@@ -1540,7 +1567,7 @@ class Geometry(object):
         :param contour:             Cut contour inside the polygon.
         :param prog_plot:           boolean; if True use the progressive plotting
         :return:                    List of toolpaths covering polygon.
-        :rtype:                     AppRTreeStorage | None
+        :rtype:                     EndpointStorage | None
         """
 
         # log.debug("camlib.clear_polygon_seed()")
@@ -1553,7 +1580,7 @@ class Geometry(object):
         def get_pts(o):
             return [o.coords[0], o.coords[-1]]
 
-        geom_elems = AppRTreeStorage()
+        geom_elems = EndpointStorage()
         geom_elems.get_points = get_pts
 
         # Path margin
@@ -1575,9 +1602,6 @@ class Geometry(object):
                 # graceful abort requested by the user
                 raise grace
 
-            # provide the app with a way to process the GUI events when in a blocking loop
-            QtWidgets.QApplication.processEvents()
-
             path = Point(seedpoint).buffer(radius, int(steps_per_circle)).exterior
             path = path.simplify(simplify_tol)
             path = path.intersection(path_margin)
@@ -1663,7 +1687,7 @@ class Geometry(object):
         def get_pts(o):
             return [o.coords[0], o.coords[-1]]
 
-        geoms = AppRTreeStorage()
+        geoms = EndpointStorage()
         geoms.get_points = get_pts
 
         lines_trimmed = []
@@ -1688,9 +1712,6 @@ class Geometry(object):
                         # graceful abort requested by the user
                         raise grace
 
-                    # provide the app with a way to process the GUI events when in a blocking loop
-                    QtWidgets.QApplication.processEvents()
-
                     line = LineString([(left, y), (right, y)])
                     line = line.intersection(margin_poly)
                     line = flatten_shapely_geometry(line, simplify_tolerance=simplify_tol)
@@ -1722,9 +1743,6 @@ class Geometry(object):
                         # graceful abort requested by the user
                         raise grace
 
-                    # provide the app with a way to process the GUI events when in a blocking loop
-                    QtWidgets.QApplication.processEvents()
-
                     line = LineString([(x, top), (x, bot)])
                     line = line.intersection(margin_poly)
                     line = flatten_shapely_geometry(line, simplify_tolerance=simplify_tol)
@@ -1848,7 +1866,7 @@ class Geometry(object):
 
             return [extended_point1, extended_point2]
 
-        geoms = AppRTreeStorage()
+        geoms = EndpointStorage()
         geoms.get_points = get_pts
 
         lines_trimmed = []
@@ -1907,9 +1925,6 @@ class Geometry(object):
                     # graceful abort requested by the user
                     raise grace
 
-                # provide the app with a way to process the GUI events when in a blocking loop
-                QtWidgets.QApplication.processEvents()
-
                 new_line = prepared_line.parallel_offset(distance=delta, side='left', resolution=int(steps_per_circle))
                 new_line = new_line.intersection(margin_poly)
                 lines_trimmed.append(new_line) if not new_line.is_empty else None
@@ -2043,6 +2058,64 @@ class Geometry(object):
         """
         return
 
+    def clear_polygons_parallel(self, polygons, tooldia, method, steps_per_circle, overlap=0.15, connect=True,
+                                contour=True, simplify_tol=0.0, progress=None):
+        """
+        Clears the polygons in the processes of the App.pool, one polygon per task. The polygons are sent to the
+        processes and the toolpaths come back as WKB. Only a few tasks per process are queued at a time, so the
+        abort is handled quickly: the results of the tasks still running are dropped.
+
+        :param polygons:            list of Polygon to be cleared
+        :param tooldia:             Diameter of the tool
+        :param method:              the clearing method: 'standard', 'seed', 'lines' or 'combo'
+        :param steps_per_circle:    how many linear segments to use to approximate a circle
+        :param overlap:             Tool fraction overlap between passes
+        :param connect:             Connect disjoint segment to minimize tool lifts
+        :param contour:             Cut contour inside the polygon
+        :param simplify_tol:        if more than zero, the toolpaths are simplified with this tolerance
+        :param progress:            callable, called with the number of polygons done each time a polygon is done
+        :return:                    for each polygon, in the same order, the list of the toolpaths or None when
+                                    the polygon could not be cleared
+        :rtype:                     list
+        """
+        polygons_wkb = shapely.to_wkb(np.array(polygons, dtype=object))
+        max_queued = 4 * max(1, int(self.app.options["global_process_number"]))
+
+        results = [None] * len(polygons)
+        queued = {}
+        next_idx = 0
+        done = 0
+        while done < len(polygons):
+            if self.app.abort_flag:
+                # graceful abort requested by the user
+                raise grace
+
+            while next_idx < len(polygons) and len(queued) < max_queued:
+                queued[next_idx] = self.app.pool.apply_async(
+                    clear_polygon_process,
+                    args=(polygons_wkb[next_idx], tooldia, method, steps_per_circle, overlap, connect, contour,
+                          simplify_tol))
+                next_idx += 1
+
+            finished = [idx for idx, res in queued.items() if res.ready()]
+            if not finished:
+                queued[min(queued)].wait(0.1)
+                continue
+
+            for idx in finished:
+                try:
+                    paths_wkb = queued.pop(idx).get()
+                except Exception as err:
+                    self.app.log.error("camlib.Geometry.clear_polygons_parallel() --> %s" % str(err))
+                    paths_wkb = None
+                if paths_wkb is not None:
+                    results[idx] = list(shapely.from_wkb(paths_wkb))
+                done += 1
+                if progress is not None:
+                    progress(done)
+
+        return results
+
     @staticmethod
     def paint_connect(storage, boundary, tooldia, steps_per_circle, max_walk=None):
         """
@@ -2050,7 +2123,7 @@ class Geometry(object):
         within the paint area. This avoids unnecessary tool lifting.
 
         :param storage: Geometry to be optimized.
-        :type storage: AppRTreeStorage
+        :type storage: EndpointStorage
         :param boundary: Polygon defining the limits of the paintable area.
         :type boundary: Polygon
         :param tooldia: Tool diameter.
@@ -2059,7 +2132,7 @@ class Geometry(object):
         :param max_walk: Maximum allowable distance without lifting tool.
         :type max_walk: float or None
         :return: Optimized geometry.
-        :rtype: AppRTreeStorage
+        :rtype: EndpointStorage
         """
 
         # If max_walk is not specified, the maximum allowed is
@@ -2072,7 +2145,7 @@ class Geometry(object):
         def get_pts(o):
             return [o.coords[0], o.coords[-1]]
 
-        # storage = AppRTreeStorage()
+        # storage = EndpointStorage()
         # storage.get_points = get_pts
         #
         # for shape in geolist:
@@ -2084,7 +2157,7 @@ class Geometry(object):
 
         # ## Iterate over geometry paths getting the nearest each time.
         # optimized_paths = []
-        optimized_paths = AppRTreeStorage()
+        optimized_paths = EndpointStorage()
         optimized_paths.get_points = get_pts
         path_count = 0
         current_pt = (0, 0)
@@ -2163,7 +2236,7 @@ class Geometry(object):
         :rtype storage:     FlatCAMRTreeStorage
         :param origin:      tuple; point from which to calculate the nearest point
         :return:            Simplified storage.
-        :rtype:             AppRTreeStorage
+        :rtype:             EndpointStorage
         """
 
         # log.debug("path_connect()")
@@ -2184,7 +2257,7 @@ class Geometry(object):
         pt, geo = storage.nearest(origin)
         storage.remove(geo)
         # optimized_geometry = [geo]
-        optimized_geometry = AppRTreeStorage()
+        optimized_geometry = EndpointStorage()
         optimized_geometry.get_points = get_pts
         # optimized_geometry.insert(geo)
         try:
@@ -2432,6 +2505,38 @@ class Geometry(object):
         svg_elem = geom.svg(scale_factor=scale_stroke_factor)
         return svg_elem
 
+    def transform(self, matrix, size_factor=1.0):
+        """
+        Transforms the object's geometry with an affine matrix. The app objects override this method to compose
+        the transformations and apply them only when the geometry is used.
+
+        :param matrix:      3x3 affine matrix
+        :type matrix:       np.ndarray
+        :param size_factor: factor for the sizes of the tools (apertures), when they are scaled with the geometry
+        :type size_factor:  float
+        :return:            None
+        """
+        self.apply_affine(matrix, size_factor=size_factor)
+
+    def apply_affine(self, matrix, size_factor=1.0):
+        """
+        Transforms, in one vectorized pass, the geometry held by the attributes in ``self.affine_attrs``.
+
+        :param matrix:      3x3 affine matrix
+        :type matrix:       np.ndarray
+        :param size_factor: factor for the sizes of the tools; not used by the geometry objects
+        :type size_factor:  float
+        :return:            None
+        """
+        tools = self.tools if getattr(self, 'multigeo', False) is True and self.tools else {}
+        tool_keys = list(tools)
+        transformed = affine_transform_geometry(
+            [self.solid_geometry, [tools[tool]['solid_geometry'] for tool in tool_keys]], matrix)
+
+        self.solid_geometry = transformed[0]
+        for tool, tool_geo in zip(tool_keys, transformed[1]):
+            tools[tool]['solid_geometry'] = tool_geo
+
     def mirror(self, axis, point):
         """
         Mirrors the object around a specified axis passign through
@@ -2445,57 +2550,14 @@ class Geometry(object):
         """
         self.app.log.debug("camlib.Geometry.mirror()")
 
-        px, py = point
         xscale, yscale = {"X": (1.0, -1.0), "Y": (-1.0, 1.0)}[axis]
 
-        def mirror_geom(obj):
-            if type(obj) is list:
-                new_obj = []
-                for g in obj:
-                    new_obj.append(mirror_geom(g))
-                return new_obj
-            else:
-                try:
-                    self.el_count += 1
-                    disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
-                    if self.old_disp_number < disp_number <= 100:
-                        self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                        self.old_disp_number = disp_number
-
-                    return affinity.scale(obj, xscale, yscale, origin=(px, py))
-                except AttributeError:
-                    return obj
-
         try:
-            if self.multigeo is True:
-                for tool in self.tools:
-                    # variables to display the percentage of work done
-                    self.geo_len = 0
-                    try:
-                        self.geo_len = len(self.tools[tool]['solid_geometry'])
-                    except TypeError:
-                        self.geo_len = 1
-                    self.old_disp_number = 0
-                    self.el_count = 0
-
-                    self.tools[tool]['solid_geometry'] = mirror_geom(self.tools[tool]['solid_geometry'])
-            else:
-                # variables to display the percentage of work done
-                self.geo_len = 0
-                try:
-                    self.geo_len = len(self.solid_geometry)
-                except TypeError:
-                    self.geo_len = 1
-                self.old_disp_number = 0
-                self.el_count = 0
-
-                self.solid_geometry = mirror_geom(self.solid_geometry)
+            self.transform(scale_matrix(xscale, yscale, origin=point))
             self.app.inform.emit('[success] %s...' % _('Object was mirrored'))
         except AttributeError:
             self.app.inform.emit('[ERROR_NOTCL] %s %s' % (_("Failed."), _("No object is selected.")))
 
-        self.app.proc_container.new_text = ''
-
     def rotate(self, angle, point):
         """
         Rotate an object by an angle (in degrees) around the provided coordinates.
@@ -2505,70 +2567,18 @@ class Geometry(object):
         counter-clockwise and negative are clockwise rotations.
 
         :param point:
-        The point of origin can be a keyword 'center' for the bounding box
-        center (default), 'centroid' for the geometry's centroid, a Point object
-        or a coordinate tuple (x0, y0).
+        The point of origin, a coordinate tuple (x0, y0).
 
         See shapely manual for more information: http://toblerity.org/shapely/manual.html#affine-transformations
         """
         self.app.log.debug("camlib.Geometry.rotate()")
 
-        px, py = point
-
-        def rotate_geom(obj):
-            try:
-                new_obj = []
-                for g in obj:
-                    new_obj.append(rotate_geom(g))
-                return new_obj
-            except TypeError:
-                try:
-                    self.el_count += 1
-                    disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
-                    if self.old_disp_number < disp_number <= 100:
-                        self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                        self.old_disp_number = disp_number
-
-                    return affinity.rotate(obj, angle, origin=(px, py))
-                except AttributeError:
-                    return obj
-
         try:
-            if self.multigeo is True:
-                for tool in self.tools:
-                    # variables to display the percentage of work done
-                    self.geo_len = 0
-                    try:
-                        work_geo = self.tools[tool]['solid_geometry']
-                        self.geo_len = len(
-                            work_geo.geoms if isinstance(work_geo, (MultiPolygon, MultiLineString)) else work_geo
-                        )
-                    except TypeError:
-                        self.geo_len = 1
-                    self.old_disp_number = 0
-                    self.el_count = 0
-
-                    self.tools[tool]['solid_geometry'] = rotate_geom(self.tools[tool]['solid_geometry'])
-            else:
-                # variables to display the percentage of work done
-                self.geo_len = 0
-                try:
-                    work_geo = self.solid_geometry
-                    self.geo_len = len(
-                        work_geo.geoms if isinstance(work_geo, (MultiPolygon, MultiLineString)) else work_geo
-                    )
-                except TypeError:
-                    self.geo_len = 1
-                self.old_disp_number = 0
-                self.el_count = 0
-
-                self.solid_geometry = rotate_geom(self.solid_geometry)
+            self.transform(rotation_matrix(angle, origin=point))
             self.app.inform.emit('[success] %s...' % _('Object was rotated'))
         except AttributeError:
             self.app.inform.emit('[ERROR_NOTCL] %s %s' % (_("Failed."), _("No object is selected.")))
 
-        self.app.proc_container.new_text = ''
-
     def skew(self, angle_x, angle_y, point):
         """
         Shear/Skew the geometries of an object by angles along x and y dimensions.
@@ -2587,63 +2597,12 @@ class Geometry(object):
         """
         self.app.log.debug("camlib.Geometry.skew()")
 
-        px, py = point
-
-        def skew_geom(obj):
-            try:
-                new_obj = []
-                for g in obj:
-                    new_obj.append(skew_geom(g))
-                return new_obj
-            except TypeError:
-                try:
-                    self.el_count += 1
-                    disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
-                    if self.old_disp_number < disp_number <= 100:
-                        self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                        self.old_disp_number = disp_number
-
-                    return affinity.skew(obj, angle_x, angle_y, origin=(px, py))
-                except AttributeError:
-                    return obj
-
         try:
-            if self.multigeo is True:
-                for tool in self.tools:
-                    # variables to display the percentage of work done
-                    self.geo_len = 0
-                    try:
-                        self.geo_len = len(self.tools[tool]['solid_geometry'])
-                    except TypeError:
-                        self.geo_len = 1
-                    self.old_disp_number = 0
-                    self.el_count = 0
-
-                    self.tools[tool]['solid_geometry'] = skew_geom(self.tools[tool]['solid_geometry'])
-            else:
-                # variables to display the percentage of work done
-                self.geo_len = 0
-                try:
-                    self.geo_len = len(self.solid_geometry)
-                except TypeError:
-                    self.geo_len = 1
-                self.old_disp_number = 0
-                self.el_count = 0
-
-                self.solid_geometry = skew_geom(self.solid_geometry)
+            self.transform(skew_matrix(angle_x, angle_y, origin=point))
             self.app.inform.emit('[success] %s...' % _('Object was skewed'))
         except AttributeError:
             self.app.inform.emit('[ERROR_NOTCL] %s %s' % (_("Failed."), _("No object is selected.")))
 
-        self.app.proc_container.new_text = ''
-
-        # if type(self.solid_geometry) == list:
-        #     self.solid_geometry = [affinity.skew(g, angle_x, angle_y, origin=(px, py))
-        #                            for g in self.solid_geometry]
-        # else:
-        #     self.solid_geometry = affinity.skew(self.solid_geometry, angle_x, angle_y,
-        #                                         origin=(px, py))
-
     def buffer(self, distance, join, factor, only_exterior=False, muted=False):
         """
 
@@ -2711,19 +2670,277 @@ class Geometry(object):
             self.app.inform.emit('[ERROR_NOTCL] %s %s' % (_("Failed."), _("No object is selected.")))
 
 
+class PoolProcessApp(object):
+    """
+    Takes the place of the App for the Geometry methods run in a process of the App.pool, where there is no GUI.
+    The messages are dropped and the abort is handled in the main process.
+    """
+
+    class NoGUI(object):
+        @staticmethod
+        def emit(*args):
+            pass
+
+        @staticmethod
+        def update_view_text(*args, **kwargs):
+            pass
+
+    abort_flag = False
+    log = log
+    inform = inform_no_echo = inform_shell = proc_container = NoGUI()
+
+
+# the Geometry clearing methods by name; 'combo' tries them in turn until one of them clears the polygon
+CLEAR_METHODS = {
+    'standard': ('clear_polygon_shrink', ),
+    'seed': ('clear_polygon_seed', ),
+    'lines': ('clear_polygon_lines', ),
+    'combo': ('clear_polygon_lines', 'clear_polygon_seed', 'clear_polygon_shrink')
+}
+
+
+def clear_polygon_process(polygon_wkb, tooldia, method, steps_per_circle, overlap, connect, contour, simplify_tol):
+    """
+    Clears a polygon. Made to run in a process of the App.pool (see Geometry.clear_polygons_parallel()).
+
+    :return:    the toolpaths as WKB or None if the polygon could not be cleared
+    :rtype:     np.ndarray | None
+    """
+    geo = Geometry.__new__(Geometry)
+    geo.app = PoolProcessApp()
+    polygon = shapely.from_wkb(polygon_wkb)
+
+    cp = None
+    for clear_method in CLEAR_METHODS[method]:
+        try:
+            cp = getattr(geo, clear_method)(polygon, tooldia, steps_per_circle=steps_per_circle, overlap=overlap,
+                                            contour=contour, connect=connect, prog_plot=False)
+        except Exception as err:
+            log.error("camlib.clear_polygon_process() %s --> %s" % (clear_method, str(err)))
+            cp = None
+        if cp and cp.objects:
+            break
+
+    if not cp or not cp.objects:
+        return None
+
+    paths = list(cp.get_objects())
+    if simplify_tol > 0.0:
+        paths = [x.simplify(simplify_tol) for x in paths]
+    return shapely.to_wkb(np.array(paths, dtype=object))
+
+
+def union_process(geometry_wkb):
+    """
+    Union of a batch of polygons. Made to run in a process of the App.pool (see TiledUnion).
+
+    :param geometry_wkb:    the polygons as WKB
+    :type geometry_wkb:     list
+    :return:                the union as WKB
+    :rtype:                 bytes
+    """
+    return shapely.to_wkb(unary_union(shapely.from_wkb(geometry_wkb)))
+
+
+class TiledUnion:
+    """
+    Union of many polygons, done while the polygons are added instead of all at once at the end.
+
+    Each polygon is stored in the square tile where the center of its bounding box falls. When batch_size polygons
+    gather in a tile they are joined (in the App.pool if one is given) and their union is merged with the previous
+    union of the tile. In the end the unions of the tiles are stitched together. The peak memory of the union is
+    given by the size of a batch and not by the number of polygons, and the tiles of a big file can be joined in
+    parallel.
+
+    It can be used instead of a list (it has append() and len()) to gather the polygons of a Gerber polarity layer.
+    """
+
+    def __init__(self, tile_size, batch_size=2000, pool=None):
+        """
+
+        :param tile_size:   the side of a tile, in the units of the polygons
+        :type tile_size:    float
+        :param batch_size:  the number of polygons that are gathered in a tile before they are joined
+        :type batch_size:   int
+        :param pool:        a multiprocessing Pool (the App.pool) where the batches are joined; None to join the
+                            batches in the current process
+        """
+        self.tile_size = float(tile_size)
+        self.batch_size = batch_size
+        self.pool = pool
+
+        # tile key -> polygons not joined yet
+        self.pending = {}
+        # tile key -> list of the unions of the batches; an item is a geometry or the AsyncResult of the pool
+        self.tiles = {}
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, geo):
+        min_x, min_y, max_x, max_y = geo.bounds
+        key = (int((min_x + max_x) / 2 // self.tile_size), int((min_y + max_y) / 2 // self.tile_size))
+
+        try:
+            batch = self.pending[key]
+        except KeyError:
+            batch = self.pending[key] = []
+        batch.append(geo)
+        self.count += 1
+
+        if len(batch) >= self.batch_size:
+            self.join_batch(key)
+
+    def join_batch(self, key):
+        batch = self.pending.pop(key)
+        unions = self.tiles.setdefault(key, [])
+        if self.pool is not None:
+            unions.append(self.pool.apply_async(union_process, args=(shapely.to_wkb(batch).tolist(), )))
+        else:
+            unions.append(unary_union(batch))
+
+        # do not keep many unions of the same tile: they are what the memory is used for
+        if len(unions) > 4:
+            self.tiles[key] = [unary_union(self.get_unions(key))]
+
+    def get_unions(self, key):
+        unions = []
+        for item in self.tiles.pop(key, []):
+            if isinstance(item, BaseGeometry):
+                unions.append(item)
+            else:
+                unions.append(shapely.from_wkb(item.get()))
+        return unions
+
+    def result(self):
+        """
+        Joins the polygons left in the tiles and stitches the tiles together.
+
+        :return:    the union of all the polygons
+        :rtype:     BaseGeometry
+        """
+        for key in list(self.pending.keys()):
+            self.join_batch(key)
+
+        tile_unions = []
+        for key in list(self.tiles.keys()):
+            unions = self.get_unions(key)
+            tile_unions.append(unions[0] if len(unions) == 1 else unary_union(unions))
+
+        self.count = 0
+        return unary_union(tile_unions)
+
+
 class AttrDict(dict):
     def __init__(self, *args, **kwargs):
         super(AttrDict, self).__init__(*args, **kwargs)
         self.__dict__ = self
 
 
+class GCodeWriter:
+    """
+    Accumulates G-Code in chunks instead of building one ever-growing string.
+
+    The written G-Code is buffered and, each time more than chunk_size characters are buffered, the buffer is joined
+    and pushed to the sink (anything with a write(str) method: an open file, a socket.makefile('w'), a pipe) and/or
+    appended to the kept text. Without a sink only the text is kept and getvalue() returns it. With a sink the
+    memory used while generating stays bounded; set keep=True to also keep the text (e.g. when the GUI needs
+    self.gcode while the G-Code is streamed to a file).
+
+    Only the export of a CNCJob object (CNCJobObject.export_gcode()) streams into a file. The generation
+    (excellon_tool_gcode_gen(), geometry_tool_gcode_gen(), tcl_gcode_from_excellon_by_tool()) keeps the text: the
+    CNCJob object holds the G-Code of each tool, to parse it for the plot and to export it later.
+    """
+
+    def __init__(self, sink=None, chunk_size=1 << 20, keep=None):
+        """
+
+        :param sink:        where to stream the G-Code; None to keep it in memory only
+        :type sink:         object
+        :param chunk_size:  number of buffered characters after which the buffer is flushed into the sink
+        :type chunk_size:   int
+        :param keep:        keep the G-Code in memory, too. By default, is True only when there is no sink
+        :type keep:         bool
+        """
+        self.sink = sink
+        self.chunk_size = chunk_size
+        self.keep = sink is None if keep is None else keep
+
+        # chunks not yet pushed in the sink or added to the kept text
+        self._buffer = []
+        self._buffered = 0
+        # the kept text. It is one string grown in place, so the G-Code is never held twice (as a list of chunks
+        # and as the joined string)
+        self._kept = ''
+        # total number of written characters
+        self.length = 0
+
+    def write(self, text):
+        if not text:
+            return
+        self.length += len(text)
+        if len(text) >= self.chunk_size:
+            # a big text (e.g. the whole G-Code of a tool) is not copied into the buffer but pushed as it is
+            self.flush()
+            self._push(text)
+            return
+        self._buffer.append(text)
+        self._buffered += len(text)
+        if self._buffered >= self.chunk_size:
+            self.flush()
+
+    def writelines(self, lines):
+        for text in lines:
+            self.write(text)
+
+    def flush(self):
+        if not self._buffer:
+            return
+        chunk = ''.join(self._buffer)
+        self._buffer = []
+        self._buffered = 0
+        self._push(chunk)
+
+    def _push(self, chunk):
+        if self.sink is not None:
+            self.sink.write(chunk)
+        if self.keep:
+            # the kept string is detached from the object so the concatenation can extend it in place instead of
+            # copying it
+            kept = self._kept
+            self._kept = ''
+            kept += chunk
+            self._kept = kept
+
+    def close(self):
+        self.flush()
+
+    def getvalue(self):
+        """
+        :return:    the kept G-Code. Empty string if the G-Code is only streamed into the sink.
+        :rtype:     str
+        """
+        self.flush()
+        return self._kept
+
+    def __len__(self):
+        return self.length
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
 class CNCjob(Geometry):
     """
     Represents work to be done by a CNC machine.
 
     *ATTRIBUTES*
 
-    * ``gcode_parsed`` (list): Each is a dictionary:
+    * ``gcode_parsed`` (GCodeParsed or list): Behaves as a list where each item is a dictionary:
 
     =====================  =========================================
     Key                    Value
@@ -2945,6 +3162,105 @@ class CNCjob(Geometry):
             self.app.log.error('Exception occurred within a preprocessor: ' + traceback.format_exc())
             return ''
 
+    def doformat_linear(self, fun_bulk, points, **kwargs):
+        """
+        Bulk version of doformat() for a motion through many points, e.g. doformat(p.linear_code, x=x, y=y) for
+        each point. The parameters snapshot (the attributes of the current class updated with the kwargs) is made
+        only once and the preprocessor emits the lines for all the points at once.
+
+        :param fun_bulk:    One of the bulk methods of the preprocessor: linear_code_bulk or rapid_code_bulk
+        :type fun_bulk:     class 'function'
+        :param points:      sequence of points; only the X and Y coordinates are used
+        :type points:       list
+        :param kwargs:      keyword args which will update attributes of the current class
+        :type kwargs:       dict
+        :return:            Gcode lines, each one ended by a newline
+        :rtype:             str
+        """
+        if len(points) == 0:
+            return ''
+
+        if self.app.abort_flag:
+            # graceful abort requested by the user
+            raise grace
+
+        attributes = AttrDict()
+        attributes.update(self.postdata)
+        attributes.update(kwargs)
+
+        coords = np.asarray(points, dtype=float)
+        try:
+            lines = fun_bulk(attributes, coords[:, 0], coords[:, 1])
+        except Exception:
+            self.app.log.error('Exception occurred within a preprocessor: ' + traceback.format_exc())
+            return ''
+        return '\n'.join(lines) + '\n'
+
+    def doformat_points(self, codes, points):
+        """
+        Bulk version of doformat() for the same moves made at many points, e.g. the drilling of the holes: for each
+        point, the lines of each code, in order. The parameters snapshot (the attributes of the current class) is made
+        only once and each code is emitted for all the points at once; the rapid and linear moves go through the bulk
+        methods of the preprocessor.
+
+        :param codes:   sequence of (preprocessor method, dict of parameters); the parameters update the snapshot
+                        before the lines of the method are made, e.g. [(p.rapid_code, {}), (p.down_code, {'z_cut': -1})]
+        :type codes:    list
+        :param points:  sequence of points; only the X and Y coordinates are used
+        :type points:   list
+        :return:        Gcode lines, each one ended by a newline
+        :rtype:         str
+        """
+        if len(points) == 0 or not codes:
+            return ''
+
+        if self.app.abort_flag:
+            # graceful abort requested by the user
+            raise grace
+
+        attributes = AttrDict()
+        attributes.update(self.postdata)
+
+        coords = np.asarray(points, dtype=float)
+        xs, ys = coords[:, 0], coords[:, 1]
+        columns = []
+        try:
+            for fun, params in codes:
+                attributes.update(params)
+                pp = fun.__self__
+                if fun == pp.rapid_code:
+                    columns.append(pp.rapid_code_bulk(attributes, xs, ys))
+                elif fun == pp.linear_code:
+                    columns.append(pp.linear_code_bulk(attributes, xs, ys))
+                else:
+                    columns.append(pp.call_per_point(fun, attributes, xs.tolist(), ys.tolist()))
+        except Exception:
+            self.app.log.error('Exception occurred within a preprocessor: ' + traceback.format_exc())
+            return ''
+        return ''.join(line + '\n' for point_lines in zip(*columns) for line in point_lines)
+
+    @staticmethod
+    def drill_codes(p, depths, up_to_zero):
+        """
+        The moves that drill a hole, for doformat_points(): for each depth a plunge, a move up to the top of the
+        material (if up_to_zero) and a lift to the travel Z.
+
+        :param p:           the Excellon preprocessor
+        :param depths:      the depths of the passes, see calculate_depths()
+        :type depths:       list
+        :param up_to_zero:  if the tool is first raised to the top of the material and then to the travel Z
+        :type up_to_zero:   bool
+        :return:            sequence of (preprocessor method, dict of parameters)
+        :rtype:             list
+        """
+        codes = []
+        for depth in depths:
+            codes.append((p.down_code, {'z_cut': depth}))
+            if up_to_zero:
+                codes.append((p.up_to_zero_code, {}))
+            codes.append((p.lift_code, {}))
+        return codes
+
     def parse_custom_toolchange_code(self, data):
         """
         Will parse a text and get a toolchange sequence in text format suitable to be included in a Gcode file.
@@ -3131,10 +3447,42 @@ class CNCjob(Geometry):
         return optimized_path
         # ############################################# ##
 
-    @staticmethod
-    def optimized_travelling_salesman(points, start=None):
+    def optimized_local_search(self, locations, start_pt=None, opt_time=0):
         """
-        As solving the problem in the brute force way is too slow,
+        A nearest neighbour path (made with a KD-tree) improved with 2-Opt and Or-Opt moves for at most opt_time
+        seconds. Only the moves toward the nearest neighbours of each location are checked, so it works on many
+        thousands of locations, where the OR-Tools distance matrix is too big.
+
+        :param locations:   List of tuples with x, y coordinates
+        :type locations:    list
+        :param start_pt:    a tuple with the x,y coordinates from where the travel starts
+        :type start_pt:     tuple
+        :param opt_time:    the maximum time spent in improving the path, in seconds. If 0, then 3 seconds are used
+        :type opt_time:     float
+        :return:            List of indexes in the locations list, in the optimized order
+        :rtype:             list
+        """
+        if not locations:
+            self.app.log.warning('2-Opt - Specify an instance greater than 0.')
+            return []
+
+        def abort_check():
+            if self.app.abort_flag:
+                # graceful abort requested by the user
+                raise grace
+
+        if start_pt is not None and None in start_pt:
+            start_pt = None
+        time_budget = float(opt_time) if float(opt_time) != 0 else 3
+        optimized_path, total_distance = local_search_order(locations, start=start_pt, time_budget=time_budget,
+                                                            abort_check=abort_check)
+        self.app.log.info("2-Opt - Total distance: %s" % str(total_distance))
+        return optimized_path
+
+    @staticmethod
+    def optimized_travelling_salesman(points, start=None):
+        """
+        As solving the problem in the brute force way is too slow,
         this function implements a simple heuristic: always
         go to the nearest city.
 
@@ -3178,7 +3526,7 @@ class CNCjob(Geometry):
             return [o.coords[0], o.coords[-1]]
 
         # Create the indexed storage.
-        storage = AppRTreeStorage()
+        storage = EndpointStorage()
         storage.get_points = get_pts
 
         # Store the geometry
@@ -3222,7 +3570,7 @@ class CNCjob(Geometry):
             return [(o.x, o.y)]
 
         # Create the indexed storage.
-        storage = AppRTreeStorage()
+        storage = EndpointStorage()
         storage.get_points = get_pts
 
         # Store the geometry
@@ -3299,15 +3647,16 @@ class CNCjob(Geometry):
         return depths
 
     def excellon_tool_gcode_gen(self, tool, points, tools, first_pt, is_first=False, is_last=False, opt_type='T',
-                                toolchange=False):
+                                toolchange=False, writer=None):
         """
         Used in Tool Drilling
 
         Creates Gcode for this object from an Excellon object
         for the specified tools.
 
-
-
+        :param writer:      a GCodeWriter where the tool GCode is written as it is generated. If it streams into a
+                            sink and does not keep the GCode, the returned tool_gcode is an empty string
+        :type writer:       GCodeWriter
         :return:            A tuple made from tool_gcode,  another tuple holding the coordinates of the last point
                             and the start gcode
         :rtype:             tuple
@@ -3323,7 +3672,7 @@ class CNCjob(Geometry):
         self.exc_tools = deepcopy(tools)
         self.tool = str(tool)
 
-        t_gcode = ''
+        t_gcode = GCodeWriter() if writer is None else writer
 
         # holds the temporary coordinates of the processed drill point
         locx, locy = first_pt
@@ -3337,6 +3686,8 @@ class CNCjob(Geometry):
         if not HAS_ORTOOLS:
             if opt_type in ['M', 'B']:
                 opt_type = 'R'
+        if not HAS_SCIPY and opt_type == 'L':
+            opt_type = 'R'
 
         if opt_type == 'M':
             self.app.log.debug("Using OR-Tools Metaheuristic Guided Local Search drill path optimization.")
@@ -3346,6 +3697,8 @@ class CNCjob(Geometry):
             self.app.log.debug("Using Travelling Salesman drill path optimization.")
         elif opt_type == 'R':
             self.app.log.debug("Using RTree path optimization.")
+        elif opt_type == 'L':
+            self.app.log.debug("Using 2-Opt drill path optimization.")
         else:
             self.app.log.debug("Using no path optimization.")
 
@@ -3477,6 +3830,13 @@ class CNCjob(Geometry):
             optimized_path = self.exc_optimized_rtree(points)
             if optimized_path == 'fail':
                 return 'fail'
+        elif opt_type == 'L':
+            locations = self.create_tool_data_array(points=points)
+            # if there are no locations then go to the next tool
+            if not locations:
+                return 'fail'
+            opt_time = self.app.options["excellon_search_time"]
+            optimized_path = self.optimized_local_search(locations=locations, start_pt=first_pt, opt_time=opt_time)
         else:
             # it's actually not optimized path but here we build a list of (x,y) coordinates
             # out of the tool's drills
@@ -3504,20 +3864,20 @@ class CNCjob(Geometry):
             # t_gcode += start_gcode
 
         # do the ToolChange event
-        t_gcode += self.doformat(p.z_feedrate_code)
+        t_gcode.write(self.doformat(p.z_feedrate_code))
         if toolchange:
-            t_gcode += self.doformat(p.toolchange_code, toolchangexy=(temp_locx, temp_locy))
-            t_gcode += self.doformat(p.z_feedrate_code)
+            t_gcode.write(self.doformat(p.toolchange_code, toolchangexy=(temp_locx, temp_locy)))
+            t_gcode.write(self.doformat(p.z_feedrate_code))
         else:
             if self.startz is None or 'laser' in self.pp_excellon_name.lower():
-                t_gcode += self.doformat(p.lift_code)
-            t_gcode += self.doformat(p.startz_code)
+                t_gcode.write(self.doformat(p.lift_code))
+            t_gcode.write(self.doformat(p.startz_code))
 
         # Spindle start
-        t_gcode += self.doformat(p.spindle_code)
+        t_gcode.write(self.doformat(p.spindle_code))
         # Dwell time
         if self.dwell is True:
-            t_gcode += self.doformat(p.dwell_code)
+            t_gcode.write(self.doformat(p.dwell_code))
 
         current_tooldia = self.app.dec_format(float(tools[tool]["tooldia"]), self.decimals)
         self.app.inform.emit(
@@ -3545,6 +3905,16 @@ class CNCjob(Geometry):
             old_disp_number = 0
             self.app.log.warning("Number of drills for which to generate GCode: %s" % str(geo_len))
 
+            start_distance = self.measured_distance
+
+            # test if the self.z_cut >= 0, in that case we do not use the up_to_zero feature
+            cancel_up2zero = False
+            if self.z_cut >= 0:
+                cancel_up2zero = True
+            drill_codes = self.drill_codes(p, depths_list, self.f_retract is False and cancel_up2zero is False)
+            # the holes reached with one rapid move are drilled together, see doformat_points()
+            drills = []
+
             loc_nr = 0
             for point in optimized_path:
                 if self.app.abort_flag:
@@ -3565,58 +3935,55 @@ class CNCjob(Geometry):
                 travels = self.app.exc_areas.travel_coordinates(start_point=(temp_locx, temp_locy),
                                                                 end_point=(locx, locy),
                                                                 tooldia=current_tooldia)
-                prev_z = None
-                for travel in travels:
-                    locx = travel[1][0]
-                    locy = travel[1][1]
-
-                    if travel[0] is not None:
-                        # move to next point
-                        t_gcode += self.doformat(p.rapid_code, x=locx, y=locy)
+                if len(travels) == 1 and travels[0][0] is None:
+                    locx, locy = travels[0][1]
+                    drills.append((locx, locy))
+                else:
+                    # the holes before the detour around the Exclusion areas are drilled first
+                    t_gcode.write(self.doformat_points([(p.rapid_code, {})] + drill_codes, drills))
+                    drills = []
 
-                        # raise to safe Z (travel[0]) each time because safe Z may be different
-                        self.z_move = travel[0]
-                        t_gcode += self.doformat(p.lift_code, x=locx, y=locy)
+                    prev_z = None
+                    for travel in travels:
+                        locx = travel[1][0]
+                        locy = travel[1][1]
 
-                        # restore z_move
-                        self.z_move = tool_dict['tools_drill_travelz']
-                    else:
-                        if prev_z is not None:
+                        if travel[0] is not None:
                             # move to next point
-                            t_gcode += self.doformat(p.rapid_code, x=locx, y=locy)
+                            t_gcode.write(self.doformat(p.rapid_code, x=locx, y=locy))
 
-                            # we assume that previously the z_move was altered therefore raise to
-                            # the travel_z (z_move)
+                            # raise to safe Z (travel[0]) each time because safe Z may be different
+                            self.z_move = travel[0]
+                            t_gcode.write(self.doformat(p.lift_code, x=locx, y=locy))
+
+                            # restore z_move
                             self.z_move = tool_dict['tools_drill_travelz']
-                            t_gcode += self.doformat(p.lift_code, x=locx, y=locy)
                         else:
-                            # move to next point
-                            t_gcode += self.doformat(p.rapid_code, x=locx, y=locy)
+                            if prev_z is not None:
+                                # move to next point
+                                t_gcode.write(self.doformat(p.rapid_code, x=locx, y=locy))
 
-                    # store prev_z
-                    prev_z = travel[0]
+                                # we assume that previously the z_move was altered therefore raise to
+                                # the travel_z (z_move)
+                                self.z_move = tool_dict['tools_drill_travelz']
+                                t_gcode.write(self.doformat(p.lift_code, x=locx, y=locy))
+                            else:
+                                # move to next point
+                                t_gcode.write(self.doformat(p.rapid_code, x=locx, y=locy))
 
-                # t_gcode += self.doformat(p.rapid_code, x=locx, y=locy)
+                        # store prev_z
+                        prev_z = travel[0]
 
-                # test if the self.z_cut >= 0, in that case we do not use the up_to_zero feature
-                cancel_up2zero = False
-                if self.z_cut >= 0:
-                    cancel_up2zero = True
+                    t_gcode.write(self.doformat_points(drill_codes, [(locx, locy)]))
 
                 for depth in depths_list:
-                    self.z_cut = depth
-
-                    t_gcode += self.doformat(p.down_code, x=locx, y=locy)
-                    self.measured_down_distance += abs(self.z_cut) + abs(self.z_move)
+                    self.measured_down_distance += abs(depth) + abs(self.z_move)
 
                     if self.f_retract is False and cancel_up2zero is False:
-                        t_gcode += self.doformat(p.up_to_zero_code, x=locx, y=locy)
-                        self.measured_up_to_zero_distance += abs(self.z_cut)
+                        self.measured_up_to_zero_distance += abs(depth)
                         self.measured_lift_distance += abs(self.z_move)
                     else:
-                        self.measured_lift_distance += abs(self.z_cut) + abs(self.z_move)
-
-                    t_gcode += self.doformat(p.lift_code, x=locx, y=locy)
+                        self.measured_lift_distance += abs(depth) + abs(self.z_move)
 
                 # if self.multidepth and abs(self.z_cut) > abs(self.z_depthpercut):
                 #     doc = deepcopy(self.z_cut)
@@ -3667,23 +4034,28 @@ class CNCjob(Geometry):
                 if old_disp_number < disp_number <= 100:
                     self.app.proc_container.update_view_text(' %d%%' % disp_number)
                     old_disp_number = disp_number
+
+            t_gcode.write(self.doformat_points([(p.rapid_code, {})] + drill_codes, drills))
+
+            self.app.log.debug("The travel distance for tool %s with the '%s' optimization is: %s" %
+                               (str(tool), str(opt_type), str(self.measured_distance - start_distance)))
         else:
             self.app.inform.emit('[ERROR_NOTCL] %s...' % _('G91 coordinates not implemented'))
             return 'fail'
         self.z_cut = deepcopy(old_zcut)
 
         if is_last:
-            t_gcode += self.doformat(p.spindle_stop_code)
+            t_gcode.write(self.doformat(p.spindle_stop_code))
             # Move to End position
-            t_gcode += self.doformat(p.end_code, x=0, y=0)
+            t_gcode.write(self.doformat(p.end_code, x=0, y=0))
 
         self.app.inform.emit('%s %s' % (_("Finished G-Code generation for tool:"), str(tool)))
 
-        return t_gcode, (locx, locy), start_gcode
+        return t_gcode.getvalue(), (locx, locy), start_gcode
 
     # used in Geometry (and in Tool Milling)
     def geometry_tool_gcode_gen(self, tool, tools, first_pt, last_pt, tolerance, is_first=False, is_last=False,
-                                toolchange=False, use_ui=True):
+                                toolchange=False, use_ui=True, writer=None):
         """
         Algorithm to generate GCode from multitool Geometry.
 
@@ -3706,13 +4078,16 @@ class CNCjob(Geometry):
         :type toolchange:   bool
         :param use_ui:      if the method is called from the GUI
         :type use_ui:       bool
+        :param writer:      a GCodeWriter where the GCode is written as it is generated, path by path. If it streams
+                            into a sink and does not keep the GCode, the returned GCode is an empty string
+        :type writer:       GCodeWriter
         :return:            GCode
         :rtype:             str
         """
 
         self.app.log.debug("camlib.CNCJob.geometry_tool_gcode_gen() -> Generating GCode for tool: %s" % str(tool))
 
-        t_gcode = ''
+        t_gcode = GCodeWriter() if writer is None else writer
         temp_solid_geometry = []
 
         # The Geometry from which we create GCode
@@ -3730,9 +4105,11 @@ class CNCjob(Geometry):
         self.use_ui = use_ui
         self.tolerance = tolerance
 
-        # Optimization type. Can be: 'M', 'B', 'T', 'R', 'No'
+        # Optimization type. Can be: 'M', 'B', 'T', 'R', 'L', 'No'
         opt_type = tool_dict['tools_mill_optimization_type']
-        if not HAS_ORTOOLS:
+        if not HAS_ORTOOLS and opt_type in ['M', 'B']:
+            opt_type = 'R'
+        if not HAS_SCIPY and opt_type == 'L':
             opt_type = 'R'
 
         opt_time = tool_dict['tools_mill_search_time'] if 'tools_mill_search_time' in tool_dict else 1.0
@@ -3745,6 +4122,8 @@ class CNCjob(Geometry):
             self.app.log.debug("Using Travelling Salesman path optimization.")
         elif opt_type == 'R':
             self.app.log.debug("Using RTree path optimization.")
+        elif opt_type == 'L':
+            self.app.log.debug("Using 2-Opt path optimization.")
         else:
             self.app.log.debug("Using no path optimization.")
 
@@ -3970,6 +4349,13 @@ class CNCjob(Geometry):
             optimized_path = self.geo_optimized_rtree(temp_solid_geometry)
             if optimized_path == 'fail':
                 return 'fail'
+        elif opt_type == 'L':
+            # if there are no locations then go to the next tool
+            if not locations:
+                return 'fail'
+            optimized_locations = self.optimized_local_search(locations=locations, start_pt=first_pt,
+                                                              opt_time=opt_time)
+            optimized_path = [(locations[loc], geo_storage[locations[loc]]) for loc in optimized_locations]
         elif opt_type == 'N':
             optimized_path = [(k , v) for k, v in geo_storage.items()]
             if not optimized_path:
@@ -4018,26 +4404,26 @@ class CNCjob(Geometry):
             # t_gcode += start_gcode
 
         # ToolChange code
-        t_gcode += self.doformat(p.feedrate_code)  # sets the feed rate
+        t_gcode.write(self.doformat(p.feedrate_code))  # sets the feed rate
         if toolchange:
-            t_gcode += self.doformat(p.toolchange_code)
+            t_gcode.write(self.doformat(p.toolchange_code))
         else:
             if self.startz is None or 'laser' in self.pp_geometry_name.lower():
-                t_gcode += self.doformat(p.lift_code, x=0, y=0)
-            t_gcode += self.doformat(p.startz_code, x=0, y=0)
+                t_gcode.write(self.doformat(p.lift_code, x=0, y=0))
+            t_gcode.write(self.doformat(p.startz_code, x=0, y=0))
 
         # Spindle start
         if 'laser' not in self.pp_geometry_name.lower():
-            t_gcode += self.doformat(p.spindle_code)
+            t_gcode.write(self.doformat(p.spindle_code))
         else:
             # for laser this will disable the laser
-            t_gcode += self.doformat(p.lift_code, x=self.oldx, y=self.oldy)  # Move (up) to travel height
+            t_gcode.write(self.doformat(p.lift_code, x=self.oldx, y=self.oldy))  # Move (up) to travel height
         # Dwell time
         if self.dwell:
-            t_gcode += self.doformat(p.dwell_code)
+            t_gcode.write(self.doformat(p.dwell_code))
 
         # Feed rate set
-        t_gcode += self.doformat(p.feedrate_code)
+        t_gcode.write(self.doformat(p.feedrate_code))
 
         # Iterate over geometry paths getting the nearest each time.
         path_count = 0
@@ -4065,9 +4451,9 @@ class CNCjob(Geometry):
                 # calculate the cut distance
                 total_cut = total_cut + geo.length
 
-                t_gcode += self.create_gcode_single_pass(geo, current_tooldia, self.extracut,
-                                                         self.extracut_length, self.tolerance,
-                                                         z_move=self.z_move, old_point=current_pt)
+                t_gcode.write(self.create_gcode_single_pass(geo, current_tooldia, self.extracut,
+                                                            self.extracut_length, self.tolerance,
+                                                            z_move=self.z_move, old_point=current_pt))
 
             # --------- Multi-pass ---------
             else:
@@ -4084,7 +4470,7 @@ class CNCjob(Geometry):
                 gc, geo = self.create_gcode_multi_pass(geo, current_tooldia, self.extracut,
                                                        self.extracut_length, self.tolerance,
                                                        z_move=self.z_move, postproc=p, old_point=current_pt)
-                t_gcode += gc
+                t_gcode.write(gc)
 
             # calculate the total distance
             total_travel = total_travel + abs(distance(pt1=current_pt, pt2=pt))
@@ -4097,6 +4483,9 @@ class CNCjob(Geometry):
 
         self.app.log.debug("Finished G-Code... %s paths traced." % path_count)
 
+        self.app.log.debug("The travel distance for tool %s with the '%s' optimization is: %s" %
+                           (str(tool), str(opt_type), str(total_travel)))
+
         # add move to end position
         total_travel += abs(distance_euclidian(current_pt[0], current_pt[1], 0, 0))
         self.travel_distance += total_travel + total_cut
@@ -4105,11 +4494,11 @@ class CNCjob(Geometry):
         # Finish
         if is_last:
             if 'laser' not in self.pp_geometry_name.lower():
-                t_gcode += self.doformat(p.spindle_stop_code)
-                t_gcode += self.doformat(p.lift_code, x=current_pt[0], y=current_pt[1])
+                t_gcode.write(self.doformat(p.spindle_stop_code))
+                t_gcode.write(self.doformat(p.lift_code, x=current_pt[0], y=current_pt[1]))
             else:
-                t_gcode += self.doformat(p.lift_code, x=current_pt[0], y=current_pt[1])
-                t_gcode += self.doformat(p.spindle_stop_code)
+                t_gcode.write(self.doformat(p.lift_code, x=current_pt[0], y=current_pt[1]))
+                t_gcode.write(self.doformat(p.spindle_stop_code))
 
             if isinstance(self.xy_end, (tuple, list)):
                 endx = self.xy_end[0]
@@ -4122,12 +4511,12 @@ class CNCjob(Geometry):
                     endx = 0.0
                     endy = 0.0
 
-            t_gcode += self.doformat(p.end_code, x=endx, y=endy)
+            t_gcode.write(self.doformat(p.end_code, x=endx, y=endy))
             self.app.inform.emit(
                 '%s... %s %s.' % (_("Finished G-Code generation"), str(path_count), _("paths traced"))
             )
 
-        self.gcode = t_gcode
+        self.gcode = t_gcode.getvalue()
         return self.gcode, start_gcode
 
     def tcl_gcode_from_excellon_by_tool(self, exobj, tools="all", order='fwd', is_first=False):
@@ -4312,7 +4701,7 @@ class CNCjob(Geometry):
         # Initialization
         # #############################################################################################################
         # #############################################################################################################
-        gcode = ''
+        gcode = GCodeWriter()
         start_gcode = ''
         if is_first:
             start_gcode = self.doformat(p.start_code)
@@ -4362,7 +4751,9 @@ class CNCjob(Geometry):
         else:
             used_excellon_optimization_type = 'R'
 
-        if not HAS_ORTOOLS:
+        if not HAS_ORTOOLS and used_excellon_optimization_type in ['M', 'B']:
+            used_excellon_optimization_type = 'R'
+        if not HAS_SCIPY and used_excellon_optimization_type == 'L':
             used_excellon_optimization_type = 'R'
 
         # #############################################################################################################
@@ -4378,13 +4769,15 @@ class CNCjob(Geometry):
             self.app.log.debug("Using Travelling Salesman drill path optimization.")
         elif used_excellon_optimization_type == 'R':
             self.app.log.debug("Using RTree drill path optimization.")
+        elif used_excellon_optimization_type == 'L':
+            self.app.log.debug("Using 2-Opt drill path optimization.")
         else:
             self.app.log.debug("Using no path optimization.")
 
         if self.toolchange is True:
             tool = tools[0]
             for tool in tools:
-                tool_gcode = ''
+                tool_gcode = []
 
                 # check if it has drills
                 if not self.exc_tools[tool]['drills']:
@@ -4428,6 +4821,15 @@ class CNCjob(Geometry):
                     optimized_path = self.exc_optimized_rtree(points[tool])
                     if optimized_path == 'fail':
                         return 'fail'
+                elif used_excellon_optimization_type == 'L':
+                    if tool in points:
+                        locations = self.create_tool_data_array(points=points[tool])
+                    # if there are no locations then go to the next tool
+                    if not locations:
+                        continue
+                    opt_time = self.app.options["excellon_search_time"]
+                    optimized_path = self.optimized_local_search(locations=locations, start_pt=(self.oldx, self.oldy),
+                                                                 opt_time=opt_time)
                 else:
                     # it's actually not optimized path but here we build a list of (x,y) coordinates
                     # out of the tool's drills
@@ -4450,19 +4852,19 @@ class CNCjob(Geometry):
 
                 # Tool change sequence (optional)
                 if self.toolchange:
-                    tool_gcode += self.doformat(p.toolchange_code, toolchangexy=(self.oldx, self.oldy))
+                    tool_gcode.append(self.doformat(p.toolchange_code, toolchangexy=(self.oldx, self.oldy)))
 
-                tool_gcode += self.doformat(p.z_feedrate_code)
+                tool_gcode.append(self.doformat(p.z_feedrate_code))
 
                 if 'laser' not in self.pp_excellon_name.lower():
                     # Spindle start
-                    tool_gcode += self.doformat(p.spindle_code)
+                    tool_gcode.append(self.doformat(p.spindle_code))
                     # Dwell time
                     if self.dwell is True:
-                        tool_gcode += self.doformat(p.dwell_code)
+                        tool_gcode.append(self.doformat(p.dwell_code))
                 else:
                     # Spindle stop
-                    tool_gcode += self.doformat(p.lift_code, x=self.oldx, y=self.oldy)  # Move (up) to travel height
+                    tool_gcode.append(self.doformat(p.lift_code, x=self.oldx, y=self.oldy))  # Move (up) to travel height
 
                 current_tooldia = float('%.*f' % (self.decimals, float(self.exc_tools[tool]["tooldia"])))
 
@@ -4493,6 +4895,10 @@ class CNCjob(Geometry):
                     old_disp_number = 0
                     self.app.log.warning("Number of drills for which to generate GCode: %s" % str(geo_len))
 
+                    drill_codes = self.drill_codes(p, depths_list, self.f_retract is False)
+                    # the holes reached with one rapid move are drilled together, see doformat_points()
+                    drills = []
+
                     loc_nr = 0
                     for point in optimized_path:
                         if self.app.abort_flag:
@@ -4512,52 +4918,55 @@ class CNCjob(Geometry):
                         travels = self.app.exc_areas.travel_coordinates(start_point=(self.oldx, self.oldy),
                                                                         end_point=(locx, locy),
                                                                         tooldia=current_tooldia)
-                        prev_z = None
-                        for travel in travels:
-                            locx = travel[1][0]
-                            locy = travel[1][1]
-
-                            if travel[0] is not None:
-                                # move to next point
-                                tool_gcode += self.doformat(p.rapid_code, x=locx, y=locy)
+                        if len(travels) == 1 and travels[0][0] is None:
+                            locx, locy = travels[0][1]
+                            drills.append((locx, locy))
+                        else:
+                            # the holes before the detour around the Exclusion areas are drilled first
+                            tool_gcode.append(self.doformat_points([(p.rapid_code, {})] + drill_codes, drills))
+                            drills = []
 
-                                # raise to safe Z (travel[0]) each time because safe Z may be different
-                                self.z_move = travel[0]
-                                tool_gcode += self.doformat(p.lift_code, x=locx, y=locy)
+                            prev_z = None
+                            for travel in travels:
+                                locx = travel[1][0]
+                                locy = travel[1][1]
 
-                                # restore z_move
-                                self.z_move = self.exc_tools[tool]['data']['tools_drill_travelz']
-                            else:
-                                if prev_z is not None:
+                                if travel[0] is not None:
                                     # move to next point
-                                    tool_gcode += self.doformat(p.rapid_code, x=locx, y=locy)
+                                    tool_gcode.append(self.doformat(p.rapid_code, x=locx, y=locy))
 
-                                    # we assume that previously the z_move was altered therefore raise to
-                                    # the travel_z (z_move)
+                                    # raise to safe Z (travel[0]) each time because safe Z may be different
+                                    self.z_move = travel[0]
+                                    tool_gcode.append(self.doformat(p.lift_code, x=locx, y=locy))
+
+                                    # restore z_move
                                     self.z_move = self.exc_tools[tool]['data']['tools_drill_travelz']
-                                    tool_gcode += self.doformat(p.lift_code, x=locx, y=locy)
                                 else:
-                                    # move to next point
-                                    tool_gcode += self.doformat(p.rapid_code, x=locx, y=locy)
+                                    if prev_z is not None:
+                                        # move to next point
+                                        tool_gcode.append(self.doformat(p.rapid_code, x=locx, y=locy))
 
-                            # store prev_z
-                            prev_z = travel[0]
+                                        # we assume that previously the z_move was altered therefore raise to
+                                        # the travel_z (z_move)
+                                        self.z_move = self.exc_tools[tool]['data']['tools_drill_travelz']
+                                        tool_gcode.append(self.doformat(p.lift_code, x=locx, y=locy))
+                                    else:
+                                        # move to next point
+                                        tool_gcode.append(self.doformat(p.rapid_code, x=locx, y=locy))
 
-                        # gcode += self.doformat(p.rapid_code, x=locx, y=locy)
-                        for depth in depths_list:
-                            self.z_cut = depth
+                                # store prev_z
+                                prev_z = travel[0]
 
-                            tool_gcode += self.doformat(p.down_code, x=locx, y=locy)
-                            measured_down_distance += abs(self.z_cut) + abs(self.z_move)
+                            tool_gcode.append(self.doformat_points(drill_codes, [(locx, locy)]))
+
+                        for depth in depths_list:
+                            measured_down_distance += abs(depth) + abs(self.z_move)
 
                             if self.f_retract is False:
-                                tool_gcode += self.doformat(p.up_to_zero_code, x=locx, y=locy)
-                                measured_up_to_zero_distance += abs(self.z_cut)
+                                measured_up_to_zero_distance += abs(depth)
                                 measured_lift_distance += abs(self.z_move)
                             else:
-                                measured_lift_distance += abs(self.z_cut) + abs(self.z_move)
-
-                            tool_gcode += self.doformat(p.lift_code, x=locx, y=locy)
+                                measured_lift_distance += abs(depth) + abs(self.z_move)
 
                         # if self.multidepth and abs(self.z_cut) > abs(self.z_depthpercut):
                         #     doc = deepcopy(self.z_cut)
@@ -4604,9 +5013,12 @@ class CNCjob(Geometry):
                             self.app.proc_container.update_view_text(' %d%%' % disp_number)
                             old_disp_number = disp_number
 
+                    tool_gcode.append(self.doformat_points([(p.rapid_code, {})] + drill_codes, drills))
+
                     self.tools[tool]['last_point'] = (locx, locy)
+                    tool_gcode = ''.join(tool_gcode)
                     self.tools[tool]['gcode'] = tool_gcode
-                    gcode += tool_gcode
+                    gcode.write(tool_gcode)
                 else:
                     self.app.inform.emit('[ERROR_NOTCL] %s...' % _('G91 coordinates not implemented'))
                     return 'fail'
@@ -4636,7 +5048,7 @@ class CNCjob(Geometry):
             self.tooldia = self.exc_tools[one_tool]["tooldia"]
             self.postdata['toolC'] = self.tooldia
 
-            gcode += self.doformat(p.z_feedrate_code)
+            gcode.write(self.doformat(p.z_feedrate_code))
             old_zcut = deepcopy(self.z_cut)
 
             # #########################################################################################################
@@ -4667,6 +5079,15 @@ class CNCjob(Geometry):
                 optimized_path = self.optimized_travelling_salesman(altPoints)
             elif used_excellon_optimization_type == 'R':
                 optimized_path = self.exc_optimized_rtree(all_points)
+            elif used_excellon_optimization_type == 'L':
+                if all_points:
+                    locations = self.create_tool_data_array(points=all_points)
+                # if there are no locations then go to the next tool
+                if not locations:
+                    return 'fail'
+                opt_time = self.app.options["excellon_search_time"]
+                optimized_path = self.optimized_local_search(locations=locations, start_pt=(self.oldx, self.oldy),
+                                                             opt_time=opt_time)
             else:
                 # it's actually not optimized path but here we build a list of (x,y) coordinates
                 # out of the tool's drills
@@ -4689,13 +5110,13 @@ class CNCjob(Geometry):
 
             if 'laser' not in self.pp_excellon_name.lower():
                 # Spindle start
-                gcode += self.doformat(p.spindle_code)
+                gcode.write(self.doformat(p.spindle_code))
                 # Dwell time
                 if self.dwell is True:
-                    gcode += self.doformat(p.dwell_code)
+                    gcode.write(self.doformat(p.dwell_code))
             else:
                 # Spindle stop
-                gcode += self.doformat(p.lift_code, x=self.oldx, y=self.oldy)  # Move (up) to travel height
+                gcode.write(self.doformat(p.lift_code, x=self.oldx, y=self.oldy))  # Move (up) to travel height
 
             current_tooldia = float('%.*f' % (self.decimals, float(self.exc_tools[one_tool]["tooldia"])))
 
@@ -4726,6 +5147,10 @@ class CNCjob(Geometry):
                 old_disp_number = 0
                 self.app.log.warning("Number of drills for which to generate GCode: %s" % str(geo_len))
 
+                drill_codes = self.drill_codes(p, depths_list, self.f_retract is False)
+                # the holes reached with one rapid move are drilled together, see doformat_points()
+                drills = []
+
                 loc_nr = 0
                 for point in optimized_path:
                     if self.app.abort_flag:
@@ -4745,53 +5170,55 @@ class CNCjob(Geometry):
                     travels = self.app.exc_areas.travel_coordinates(start_point=(self.oldx, self.oldy),
                                                                     end_point=(locx, locy),
                                                                     tooldia=current_tooldia)
-                    prev_z = None
-                    for travel in travels:
-                        locx = travel[1][0]
-                        locy = travel[1][1]
-
-                        if travel[0] is not None:
-                            # move to next point
-                            gcode += self.doformat(p.rapid_code, x=locx, y=locy)
+                    if len(travels) == 1 and travels[0][0] is None:
+                        locx, locy = travels[0][1]
+                        drills.append((locx, locy))
+                    else:
+                        # the holes before the detour around the Exclusion areas are drilled first
+                        gcode.write(self.doformat_points([(p.rapid_code, {})] + drill_codes, drills))
+                        drills = []
 
-                            # raise to safe Z (travel[0]) each time because safe Z may be different
-                            self.z_move = travel[0]
-                            gcode += self.doformat(p.lift_code, x=locx, y=locy)
+                        prev_z = None
+                        for travel in travels:
+                            locx = travel[1][0]
+                            locy = travel[1][1]
 
-                            # restore z_move
-                            self.z_move = self.exc_tools[one_tool]['data']['tools_drill_travelz']
-                        else:
-                            if prev_z is not None:
+                            if travel[0] is not None:
                                 # move to next point
-                                gcode += self.doformat(p.rapid_code, x=locx, y=locy)
+                                gcode.write(self.doformat(p.rapid_code, x=locx, y=locy))
 
-                                # we assume that previously the z_move was altered therefore raise to
-                                # the travel_z (z_move)
+                                # raise to safe Z (travel[0]) each time because safe Z may be different
+                                self.z_move = travel[0]
+                                gcode.write(self.doformat(p.lift_code, x=locx, y=locy))
+
+                                # restore z_move
                                 self.z_move = self.exc_tools[one_tool]['data']['tools_drill_travelz']
-                                gcode += self.doformat(p.lift_code, x=locx, y=locy)
                             else:
-                                # move to next point
-                                gcode += self.doformat(p.rapid_code, x=locx, y=locy)
+                                if prev_z is not None:
+                                    # move to next point
+                                    gcode.write(self.doformat(p.rapid_code, x=locx, y=locy))
 
-                        # store prev_z
-                        prev_z = travel[0]
+                                    # we assume that previously the z_move was altered therefore raise to
+                                    # the travel_z (z_move)
+                                    self.z_move = self.exc_tools[one_tool]['data']['tools_drill_travelz']
+                                    gcode.write(self.doformat(p.lift_code, x=locx, y=locy))
+                                else:
+                                    # move to next point
+                                    gcode.write(self.doformat(p.rapid_code, x=locx, y=locy))
 
-                    # gcode += self.doformat(p.rapid_code, x=locx, y=locy)
+                            # store prev_z
+                            prev_z = travel[0]
 
-                    for depth in depths_list:
-                        self.z_cut = depth
+                        gcode.write(self.doformat_points(drill_codes, [(locx, locy)]))
 
-                        gcode += self.doformat(p.down_code, x=locx, y=locy)
-                        measured_down_distance += abs(self.z_cut) + abs(self.z_move)
+                    for depth in depths_list:
+                        measured_down_distance += abs(depth) + abs(self.z_move)
 
                         if self.f_retract is False:
-                            gcode += self.doformat(p.up_to_zero_code, x=locx, y=locy)
-                            measured_up_to_zero_distance += abs(self.z_cut)
+                            measured_up_to_zero_distance += abs(depth)
                             measured_lift_distance += abs(self.z_move)
                         else:
-                            measured_lift_distance += abs(self.z_cut) + abs(self.z_move)
-
-                        gcode += self.doformat(p.lift_code, x=locx, y=locy)
+                            measured_lift_distance += abs(depth) + abs(self.z_move)
 
                     # if self.multidepth and abs(self.z_cut) > abs(self.z_depthpercut):
                     #     doc = deepcopy(self.z_cut)
@@ -4838,15 +5265,17 @@ class CNCjob(Geometry):
                     if old_disp_number < disp_number <= 100:
                         self.app.proc_container.update_view_text(' %d%%' % disp_number)
                         old_disp_number = disp_number
+
+                gcode.write(self.doformat_points([(p.rapid_code, {})] + drill_codes, drills))
             else:
                 self.app.inform.emit('[ERROR_NOTCL] %s...' % _('G91 coordinates not implemented'))
                 return 'fail'
             self.z_cut = deepcopy(old_zcut)
             try:
-                self.tools[one_tool]['gcode'] = gcode
+                self.tools[one_tool]['gcode'] = gcode.getvalue()
             except KeyError:
                 # just a hack because I am lazy and I don't want to fix the Tcl command drillcncjob which needs this
-                self.tools[str(one_tool)]['gcode'] = gcode
+                self.tools[str(one_tool)]['gcode'] = gcode.getvalue()
 
             # add the end_gcode
             end_gcode = self.doformat(p.spindle_stop_code)
@@ -4867,12 +5296,14 @@ class CNCjob(Geometry):
                 "The total travel distance with Travelling Salesman Algorithm is: %s" % str(measured_distance))
         elif used_excellon_optimization_type == 'R':
             self.app.log.debug("The total travel distance with Rtree Algorithm is: %s" % str(measured_distance))
+        elif used_excellon_optimization_type == 'L':
+            self.app.log.debug("The total travel distance with 2-Opt Algorithm is: %s" % str(measured_distance))
         else:
             self.app.log.debug("The total travel distance with with no optimization is: %s" % str(measured_distance))
 
-        gcode += self.doformat(p.spindle_stop_code)
+        gcode.write(self.doformat(p.spindle_stop_code))
         # Move to End position
-        gcode += self.doformat(p.end_code, x=0, y=0)
+        gcode.write(self.doformat(p.end_code, x=0, y=0))
 
         # #############################################################################################################
         # ############################# Calculate DISTANCE and ESTIMATED TIME #########################################
@@ -4894,10 +5325,10 @@ class CNCjob(Geometry):
         # #############################################################################################################
         # ############################# Store the GCODE for further usage ############################################
         # #############################################################################################################
-        self.gcode = gcode
+        self.gcode = gcode.getvalue()
 
         self.app.inform.emit('%s ...' % _("Finished G-Code generation"))
-        return gcode, start_gcode
+        return self.gcode, start_gcode
 
     # no longer used
     def generate_from_multitool_geometry(self, geometry, append=True, tooldia=None, offset=0.0, tolerance=0, z_cut=1.0,
@@ -5075,7 +5506,7 @@ class CNCjob(Geometry):
             return [o.coords[0], o.coords[-1]]
 
         # Create the indexed storage.
-        storage = AppRTreeStorage()
+        storage = EndpointStorage()
         storage.get_points = get_pts
 
         # Store the geometry
@@ -5505,7 +5936,9 @@ class CNCjob(Geometry):
         # ############ Create the data. ###########################################################################
         # #########################################################################################################
         opt_type = self.app.options["tools_mill_optimization_type"]
-        if not HAS_ORTOOLS:
+        if not HAS_ORTOOLS and opt_type in ['M', 'B']:
+            opt_type = 'R'
+        if not HAS_SCIPY and opt_type == 'L':
             opt_type = 'R'
 
         opt_time = int(self.app.options['tools_mill_search_time'])
@@ -5518,6 +5951,8 @@ class CNCjob(Geometry):
             self.app.log.debug("Using Travelling Salesman path optimization.")
         elif opt_type == 'R':
             self.app.log.debug("Using RTree path optimization.")
+        elif opt_type == 'L':
+            self.app.log.debug("Using 2-Opt path optimization.")
         else:
             self.app.log.debug("Using no path optimization.")
 
@@ -5555,6 +5990,13 @@ class CNCjob(Geometry):
             optimized_path = self.geo_optimized_rtree(temp_solid_geometry)
             if optimized_path == 'fail':
                 return 'fail'
+        elif opt_type == 'L':
+            # if there are no locations then go to the next tool
+            if not locations:
+                return 'fail'
+            optimized_locations = self.optimized_local_search(locations=locations, start_pt=(self.oldx, self.oldy),
+                                                              opt_time=opt_time)
+            optimized_path = [(locations[loc], geo_storage[locations[loc]]) for loc in optimized_locations]
         elif opt_type == 'N':
             optimized_path = [(k, v) for k, v in geo_storage.items()]
             if not optimized_path:
@@ -5770,7 +6212,7 @@ class CNCjob(Geometry):
         self.app.log.debug("%d paths" % len(flat_geometry))
 
         # Create the indexed storage.
-        storage = AppRTreeStorage()
+        storage = EndpointStorage()
         storage.get_points = get_pts
 
         # Store the geometry
@@ -5973,7 +6415,7 @@ class CNCjob(Geometry):
         """
         p = postproc
 
-        gcode_multi_pass = ''
+        gcode_multi_pass = []
 
         if isinstance(self.z_cut, Decimal):
             z_cut = self.z_cut
@@ -6000,16 +6442,16 @@ class CNCjob(Geometry):
             # is inconsequential.
             if isinstance(geometry, LineString) or isinstance(geometry, LinearRing):
                 if extracut is False or not geometry.is_ring:
-                    gcode_multi_pass += self.linear2gcode(geometry, cdia, tolerance=tolerance, z_cut=depth, up=False,
-                                                          z_move=z_move, old_point=old_point)
+                    gcode_multi_pass.append(self.linear2gcode(geometry, cdia, tolerance=tolerance, z_cut=depth,
+                                                              up=False, z_move=z_move, old_point=old_point))
                 else:
-                    gcode_multi_pass += self.linear2gcode_extra(geometry, cdia, extracut_length, tolerance=tolerance,
-                                                                z_move=z_move, z_cut=depth, up=False,
-                                                                old_point=old_point)
+                    gcode_multi_pass.append(self.linear2gcode_extra(geometry, cdia, extracut_length,
+                                                                    tolerance=tolerance, z_move=z_move, z_cut=depth,
+                                                                    up=False, old_point=old_point))
 
             # Ignore multi-pass for points.
             elif isinstance(geometry, Point):
-                gcode_multi_pass += self.point2gcode(geometry, cdia, z_move=z_move, old_point=old_point)
+                gcode_multi_pass.append(self.point2gcode(geometry, cdia, z_move=z_move, old_point=old_point))
                 break  # Ignoring ...
             else:
                 self.app.log.warning("G-code generation not implemented for %s" % (str(type(geometry))))
@@ -6025,91 +6467,8 @@ class CNCjob(Geometry):
                 geometry = LineString(list(geometry.coords)[::-1])
 
         # Lift the tool
-        gcode_multi_pass += self.doformat(p.lift_code, x=old_point[0], y=old_point[1])
-        return gcode_multi_pass, geometry
-
-    def codes_split(self, gline):
-        """
-        Parses a line of G-Code such as "G01 X1234 Y987" into
-        a dictionary: {'G': 1.0, 'X': 1234.0, 'Y': 987.0}
-
-        :param gline:       G-Code line string
-        :type gline:        str
-        :return:            Dictionary with parsed line.
-        :rtype:             dict
-        """
-
-        command = {}
-
-        if 'Roland' in self.pp_excellon_name or 'Roland' in self.pp_geometry_name:
-            match_z = re.search(r"^Z(\s*-?\d+\.\d+?),(\s*\s*-?\d+\.\d+?),(\s*\s*-?\d+\.\d+?)*;$", gline)
-            if match_z:
-                command['G'] = 0
-                command['X'] = float(match_z.group(1).replace(" ", "")) * 0.01
-                command['Y'] = float(match_z.group(2).replace(" ", "")) * 0.01
-                command['Z'] = float(match_z.group(3).replace(" ", "")) * 0.025
-
-        elif 'hpgl' in self.pp_excellon_name or 'hpgl' in self.pp_geometry_name:
-            match_pa = re.search(r"^PA(\s*-?\d+\.\d+?),(\s*\s*-?\d+\.\d+?)*;$", gline)
-            if match_pa:
-                command['G'] = 0
-                command['X'] = float(match_pa.group(1).replace(" ", "")) / 40
-                command['Y'] = float(match_pa.group(2).replace(" ", "")) / 40
-            match_pen = re.search(r"^(P[U|D])", gline)
-            if match_pen:
-                if match_pen.group(1) == 'PU':
-                    # the value does not matter, only that it is positive so the gcode_parse() know it is > 0,
-                    # therefore the move is of kind T (travel)
-                    command['Z'] = 1
-                else:
-                    command['Z'] = 0
-            match_toolchange = re.search(r"^SP\d*", gline)
-            if match_toolchange:
-                command['Z'] = 1
-
-        elif 'laser' in self.pp_excellon_name.lower() or 'laser' in self.pp_geometry_name.lower() or \
-                (self.pp_solderpaste_name is not None and 'paste' in self.pp_solderpaste_name.lower()):
-            match_lsr = re.search(r"X([+-]?\d+.[+-]?\d+)\s*Y([+-]?\d+.[+-]?\d+)", gline)
-            if match_lsr:
-                command['X'] = float(match_lsr.group(1).replace(" ", ""))
-                command['Y'] = float(match_lsr.group(2).replace(" ", ""))
-
-            match_lsr_pos = re.search(r"^(M0?[3-5])", gline)
-            if match_lsr_pos:
-                if 'M05' in match_lsr_pos.group(1) or 'M5' in match_lsr_pos.group(1):
-                    # the value does not matter, only that it is positive so the gcode_parse() know it is > 0,
-                    # therefore the move is of kind T (travel)
-                    command['Z'] = 1
-                else:
-                    command['Z'] = 0
-
-            match_lsr_pos_2 = re.search(r"^(M10[6|7])", gline)
-            if match_lsr_pos_2:
-                if 'M107' in match_lsr_pos_2.group(1):
-                    command['Z'] = 1
-                else:
-                    command['Z'] = 0
-
-            match_lsr_pos_3 = re.search(r"^.*(laser OFF).*", gline)
-            if match_lsr_pos_3:
-                if 'laser OFF' in match_lsr_pos_3.group(1):
-                    command['Z'] = 1
-                else:
-                    command['Z'] = 0
-
-        elif self.pp_solderpaste_name is not None:
-            if 'Paste' in self.pp_solderpaste_name:
-                match_paste = re.search(r"X([\+-]?\d+.[\+-]?\d+)\s*Y([\+-]?\d+.[\+-]?\d+)", gline)
-                if match_paste:
-                    command['X'] = float(match_paste.group(1).replace(" ", ""))
-                    command['Y'] = float(match_paste.group(2).replace(" ", ""))
-        else:
-            match = re.search(r'^\s*([A-Z])\s*([\+\-\.\d\s]+)', gline)
-            while match:
-                command[match.group(1)] = float(match.group(2).replace(" ", ""))
-                gline = gline[match.end():]
-                match = re.search(r'^\s*([A-Z])\s*([\+\-\.\d\s]+)', gline)
-        return command
+        gcode_multi_pass.append(self.doformat(p.lift_code, x=old_point[0], y=old_point[1]))
+        return ''.join(gcode_multi_pass), geometry
 
     def gcode_parse(self, force_parsing=None, tool_data=None):
         """
@@ -6117,29 +6476,23 @@ class CNCjob(Geometry):
         single-segment LineString's and "kind" indicating cut or travel,
         fast or feedrate speed.
 
-        Will return a list of dict in the format:
+        The whole G-Code is parsed at once (see appParsers.ParseGCode.GCodeParser) into coordinate arrays.
+        Will return a GCodeParsed object which behaves as a list of dict in the format:
         {
             "geom": LineString(path),
             "kind": kind
         }
         where kind can be either ["C", "F"]  # T=travel, C=cut, F=fast, S=slow
+        The dictionaries are created only when they are accessed.
 
         :param force_parsing:
         :type force_parsing:
         :param tool_data:       when dealing with multi tool objects we need the tool data
         :type tool_data:        dict
         :return:
-        :rtype:                 list
+        :rtype:                 GCodeParsed | str
         """
 
-        kind = ["C", "F"]  # T=travel, C=cut, F=fast, S=slow
-
-        # Results go here
-        geometry = []
-
-        # Last known instruction
-        current = {'X': 0.0, 'Y': 0.0, 'Z': 0.0, 'G': 0}
-
         if tool_data is None:
             toolchange_xy_mill = self.app.options["tools_mill_toolchangexy"]
             toolchange_xy_drill = self.app.options["tools_drill_toolchangexy"]
@@ -6179,136 +6532,61 @@ class CNCjob(Geometry):
                     if len(pos_xy) != 2:
                         pos_xy = (0, 0)
 
-        path = [pos_xy]
-        # path = [(0, 0)]
-
-        gcode_lines_list = self.gcode.splitlines()
-        self.app.inform.emit('%s: %d' % (_("Parsing GCode file. Number of lines"), len(gcode_lines_list)))
-
-        # Process every instruction
-        for line in gcode_lines_list:
-            if force_parsing is False or force_parsing is None:
-                if '%MO' in line or '%' in line or 'MOIN' in line or 'MOMM' in line:
-                    return "fail"
-
-            gobj = self.codes_split(line)
-
-            # ## Units
-            if 'G' in gobj and (gobj['G'] == 20.0 or gobj['G'] == 21.0):
-                self.units = {20.0: "IN", 21.0: "MM"}[gobj['G']]
-                continue
-
-            # TODO take into consideration the tools and update the travel line thickness
-            if 'T' in gobj:
-                pass
-
-            # ## Changing height
-            if 'Z' in gobj:
-                if 'Roland' in self.pp_excellon_name or 'Roland' in self.pp_geometry_name:
-                    pass
-                elif 'hpgl' in self.pp_excellon_name or 'hpgl' in self.pp_geometry_name:
-                    pass
-                elif 'laser' in self.pp_excellon_name or 'laser' in self.pp_geometry_name:
-                    pass
-                elif ('X' in gobj or 'Y' in gobj) and gobj['Z'] != current['Z']:
-                    if self.pp_geometry_name == 'Line_xyz' or self.pp_excellon_name == 'Line_xyz':
-                        pass
-                    else:
-                        self.app.log.warning("Non-orthogonal motion: From %s" % str(current))
-                        self.app.log.warning("  To: %s" % str(gobj))
-
-                current['Z'] = gobj['Z']
-                # Store the path into geometry and reset path
-                if len(path) > 1:
-                    geometry.append({"geom": LineString(path),
-                                     "kind": kind})
-                    path = [path[-1]]  # Start with the last point of last path.
-
-                # create the geometry for the holes created when drilling Excellon drills
-                if self.obj_options['type'].lower() == 'excellon':
-                    if current['Z'] < 0:
-                        current_drill_point_coords = (
-                            float('%.*f' % (self.decimals, current['X'])),
-                            float('%.*f' % (self.decimals, current['Y']))
-                        )
-
-                        # find the drill diameter knowing the drill coordinates
-                        break_loop = False
-                        for tool, tool_dict in self.exc_tools.items():
-                            if 'drills' in tool_dict:
-                                for drill_pt in tool_dict['drills']:
-                                    point_in_dict_coords = (
-                                        float('%.*f' % (self.decimals, drill_pt.x)),
-                                        float('%.*f' % (self.decimals, drill_pt.y))
-                                    )
-                                    if point_in_dict_coords == current_drill_point_coords:
-                                        dia = self.exc_tools[tool]['tooldia']
-                                        kind = ['C', 'F']
-                                        geometry.append(
-                                            {
-                                                "geom": Point(current_drill_point_coords).buffer(dia / 2.0).exterior,
-                                                "kind": kind
-                                            }
-                                        )
-                                        break_loop = True
-                                        break
-                                if break_loop:
-                                    break
-
-            if 'G' in gobj:
-                current['G'] = int(gobj['G'])
-
-            if 'X' in gobj or 'Y' in gobj:
-                if 'X' in gobj:
-                    x = gobj['X']
-                    # current['X'] = x
-                else:
-                    x = current['X']
-
-                if 'Y' in gobj:
-                    y = gobj['Y']
-                else:
-                    y = current['Y']
-
-                kind = ["C", "F"]  # T=travel, C=cut, F=fast, S=slow
+        if self.obj_options['type'].lower() == 'excellon':
+            drill_lookup = self.find_drill_dia
+        else:
+            drill_lookup = None
+
+        parser = GCodeParser(
+            dialect=gcode_dialect(self.pp_excellon_name, self.pp_geometry_name, self.pp_solderpaste_name),
+            steps_per_circle=self.steps_per_circle,
+            start_xy=pos_xy,
+            drill_lookup=drill_lookup,
+            warn_non_orthogonal=not (self.pp_geometry_name == 'Line_xyz' or self.pp_excellon_name == 'Line_xyz')
+        )
 
-                if current['Z'] > 0:
-                    kind[0] = 'T'
-                if current['G'] > 0:
-                    kind[1] = 'S'
+        self.app.inform.emit('%s: %d' % (_("Parsing GCode file. Number of lines"), self.gcode.count('\n') + 1))
+        geometry = parser.parse(self.gcode, force_parsing=force_parsing)
+        if geometry == "fail":
+            return "fail"
 
-                if current['G'] in [0, 1]:  # line
-                    path.append((x, y))
+        if parser.units is not None:
+            self.units = parser.units
 
-                arcdir = [None, None, "cw", "ccw"]
-                if current['G'] in [2, 3]:  # arc
-                    center = [gobj['I'] + current['X'], gobj['J'] + current['Y']]
-                    radius = np.sqrt(gobj['I'] ** 2 + gobj['J'] ** 2)
-                    start = np.arctan2(-gobj['J'], -gobj['I'])
-                    stop = np.arctan2(-center[1] + y, -center[0] + x)
-                    path += arc(center, radius, start, stop, arcdir[current['G']], int(self.steps_per_circle))
+        self.gcode_parsed = geometry
+        return geometry
 
-                current['X'] = x
-                current['Y'] = y
+    @property
+    def drill_index(self):
+        """
+        Index from the drill coordinates to the tool diameter, made from self.exc_tools. It is built once and
+        rebuilt only if self.exc_tools is replaced or the number of drills change.
 
-            # Update current instruction
-            for code in gobj:
-                current[code] = gobj[code]
+        :return:    the drill index
+        :rtype:     DrillIndex
+        """
+        signature = (
+            id(self.exc_tools),
+            self.decimals,
+            sum(len(tool_dict.get('drills') or ()) for tool_dict in self.exc_tools.values())
+        )
+        if getattr(self, '_drill_index', None) is None or self._drill_index_signature != signature:
+            self._drill_index = DrillIndex(self.exc_tools, self.decimals)
+            self._drill_index_signature = signature
+        return self._drill_index
 
-        self.app.inform.emit('%s...' % _("Creating Geometry from the parsed GCode file. "))
-        # There might not be a change in height at the
-        # end, therefore, see here too if there is
-        # a final path.
-        if len(path) > 1:
-            geometry.append(
-                {
-                    "geom": LineString(path),
-                    "kind": kind
-                }
-            )
+    def find_drill_dia(self, x, y):
+        """
+        Find the drill diameter knowing the drill coordinates. Used when parsing the GCode of Excellon objects.
 
-        self.gcode_parsed = geometry
-        return geometry
+        :param x:   X coordinate of the drill
+        :type x:    float
+        :param y:   Y coordinate of the drill
+        :type y:    float
+        :return:    the diameter of the tool that has a drill in the given location or None
+        :rtype:     float | None
+        """
+        return self.drill_index.lookup(x, y)
 
     def excellon_tool_gcode_parse(self, dia, gcode, start_pt=(0, 0), force_parsing=None):
         """
@@ -6316,7 +6594,7 @@ class CNCjob(Geometry):
         single-segment LineString's and "kind" indicating cut or travel,
         fast or feedrate speed.
 
-        Will return the Geometry as a list of dict in the format:
+        Will return the Geometry as a GCodeParsed object which behaves as a list of dict in the format:
         {
             "geom": LineString(path),
             "kind": kind
@@ -6332,125 +6610,32 @@ class CNCjob(Geometry):
         :param force_parsing:
         :type force_parsing:    bool
         :return:                Geometry as a list of dictionaries
-        :rtype:                 list
+        :rtype:                 GCodeParsed | str
         """
 
-        kind = ["C", "F"]  # T=travel, C=cut, F=fast, S=slow
-
-        # Results go here
-        geometry = []
-
-        # Last known instruction
-        current = {'X': 0.0, 'Y': 0.0, 'Z': 0.0, 'G': 0}
-
-        # Current path: temporary storage until tool is
-        # lifted or lowered.
-        pos_xy = start_pt
-
-        path = [pos_xy]
-        # path = [(0, 0)]
+        # the G-Code is for a single tool so the drill holes size is known and there is no need for a lookup
+        parser = GCodeParser(
+            dialect=gcode_dialect(self.pp_excellon_name, self.pp_geometry_name, self.pp_solderpaste_name),
+            steps_per_circle=self.steps_per_circle,
+            start_xy=start_pt,
+            drill_lookup=lambda x, y: dia,
+            warn_non_orthogonal=not (self.pp_geometry_name == 'Line_xyz' or self.pp_excellon_name == 'Line_xyz')
+        )
 
-        gcode_lines_list = gcode.splitlines()
         self.app.inform.emit(
             '%s: %s. %s: %d' % (_("Parsing GCode file for tool diameter"),
                                 str(dia), _("Number of lines"),
-                                len(gcode_lines_list))
+                                gcode.count('\n') + 1)
         )
 
-        # Process every instruction
-        for line in gcode_lines_list:
-            if force_parsing is False or force_parsing is None:
-                if '%MO' in line or '%' in line or 'MOIN' in line or 'MOMM' in line:
-                    return "fail"
-
-            gobj = self.codes_split(line)
-
-            # ## Units
-            if 'G' in gobj and (gobj['G'] == 20.0 or gobj['G'] == 21.0):
-                self.units = {20.0: "IN", 21.0: "MM"}[gobj['G']]
-                continue
-
-            # TODO take into consideration the tools and update the travel line thickness
-            if 'T' in gobj:
-                pass
-
-            # ## Changing height
-            if 'Z' in gobj:
-                if 'Roland' in self.pp_excellon_name or 'Roland' in self.pp_geometry_name:
-                    pass
-                elif 'hpgl' in self.pp_excellon_name or 'hpgl' in self.pp_geometry_name:
-                    pass
-                elif 'laser' in self.pp_excellon_name or 'laser' in self.pp_geometry_name:
-                    pass
-                elif ('X' in gobj or 'Y' in gobj) and gobj['Z'] != current['Z']:
-                    if self.pp_geometry_name == 'Line_xyz' or self.pp_excellon_name == 'Line_xyz':
-                        pass
-                    else:
-                        self.app.log.warning("Non-orthogonal motion: From %s" % str(current))
-                        self.app.log.warning("  To: %s" % str(gobj))
-
-                current['Z'] = gobj['Z']
-                # Store the path into geometry and reset path
-                if len(path) > 1:
-                    geometry.append({"geom": LineString(path),
-                                     "kind": kind})
-                    path = [path[-1]]  # Start with the last point of last path.
-
-                # create the geometry for the holes created when drilling Excellon drills
-                if current['Z'] < 0:
-                    current_drill_point_coords = (
-                        float('%.*f' % (self.decimals, current['X'])),
-                        float('%.*f' % (self.decimals, current['Y']))
-                    )
-
-                    kind = ['C', 'F']
-                    geometry.append(
-                        {
-                            "geom": Point(current_drill_point_coords).buffer(dia/2.0).exterior,
-                            "kind": kind
-                        }
-                    )
-
-            if 'G' in gobj:
-                current['G'] = int(gobj['G'])
-
-            if 'X' in gobj or 'Y' in gobj:
-                x = gobj['X'] if 'X' in gobj else current['X']
-                y = gobj['Y'] if 'Y' in gobj else current['Y']
-
-                kind = ["C", "F"]  # T=travel, C=cut, F=fast, S=slow
-
-                if current['Z'] > 0:
-                    kind[0] = 'T'
-                if current['G'] > 0:
-                    kind[1] = 'S'
-                if current['G'] in [0, 1]:  # line
-                    path.append((x, y))
-
-                arcdir = [None, None, "cw", "ccw"]
-                if current['G'] in [2, 3]:  # arc
-                    center = [gobj['I'] + current['X'], gobj['J'] + current['Y']]
-                    radius = np.sqrt(gobj['I'] ** 2 + gobj['J'] ** 2)
-                    start = np.arctan2(-gobj['J'], -gobj['I'])
-                    stop = np.arctan2(-center[1] + y, -center[0] + x)
-                    path += arc(center, radius, start, stop, arcdir[current['G']], int(self.steps_per_circle))
-
-                current['X'] = x
-                current['Y'] = y
+        geometry = parser.parse(gcode, force_parsing=force_parsing)
+        if geometry == "fail":
+            return "fail"
 
-            # Update current instruction
-            for code in gobj:
-                current[code] = gobj[code]
+        if parser.units is not None:
+            self.units = parser.units
 
         self.app.inform.emit('%s: %s' % (_("Creating Geometry from the parsed GCode file for tool diameter"), str(dia)))
-        # There might not be a change in height at the end, therefore, see here too if there is a final path.
-        if len(path) > 1:
-            geometry.append(
-                {
-                    "geom": LineString(path),
-                    "kind": kind
-                }
-            )
         return geometry
 
     # def plot(self, tooldia=None, dpi=75, margin=0.1,
@@ -6533,83 +6718,79 @@ class CNCjob(Geometry):
         if isinstance(tooldia, list):
             tooldia = tooldia[0] if tooldia[0] is not None else self.tooldia
 
+        # work on the geometry arrays so the parsed G-Code does not have to be materialized as dictionaries
+        geoms = parsed_geometries(gcode_parsed)
+        is_travel = (parsed_kinds(gcode_parsed) & KIND_TRAVEL) != 0
+
+        is_present = ~(shapely.is_missing(geoms) | shapely.is_empty(geoms))
+
+        if kind == 'travel':
+            selected = is_travel & is_present
+        elif kind == 'cut':
+            selected = ~is_travel & is_present
+        else:
+            selected = is_present
+
         if tooldia == 0:
-            for geo in gcode_parsed:
-                if not geo:
-                    continue
-                if kind == 'all':
-                    obj.add_shape(shape=geo['geom'], color=color[geo['kind'][0]][1], visible=visible)
-                elif kind == 'travel':
-                    if geo['kind'][0] == 'T':
-                        obj.add_shape(shape=geo['geom'], color=color['T'][1], visible=visible)
-                elif kind == 'cut':
-                    if geo['kind'][0] == 'C':
-                        obj.add_shape(shape=geo['geom'], color=color['C'][1], visible=visible)
+            obj.add_shapes(shapes=list(geoms[selected]),
+                           color=[color['T' if travel else 'C'][1] for travel in is_travel[selected]],
+                           visible=visible)
         else:
             path_num = 0
 
             self.coordinates_type = self.app.options["cncjob_coords_type"]
             if self.coordinates_type == "G90":
                 # For Absolute coordinates type G90
-                for geo in gcode_parsed:
-                    if not geo:
-                        continue
-
-                    if geo['kind'][0] == 'T':
-                        start_position = geo['geom'].coords[0]
-
-                        if tooldia not in obj.annotations_dict:
-                            obj.annotations_dict[tooldia] = {
-                                'pos': [],
-                                'text': []
-                            }
-                        if start_position not in obj.annotations_dict[tooldia]['pos']:
-                            path_num += 1
-                            obj.annotations_dict[tooldia]['pos'].append(start_position)
-                            obj.annotations_dict[tooldia]['text'].append(str(path_num))
-
-                        end_position = geo['geom'].coords[-1]
-
-                        if tooldia not in obj.annotations_dict:
-                            obj.annotations_dict[tooldia] = {
-                                'pos': [],
-                                'text': []
-                            }
-                        if end_position not in obj.annotations_dict[tooldia]['pos']:
-                            path_num += 1
-                            obj.annotations_dict[tooldia]['pos'].append(end_position)
-                            obj.annotations_dict[tooldia]['text'].append(str(path_num))
-
-                    # plot the geometry of Excellon objects
-                    if self.obj_options['type'].lower() == 'excellon':
+                travel_geoms = geoms[is_travel & is_present]
+                if travel_geoms.size:
+                    if tooldia not in obj.annotations_dict:
+                        obj.annotations_dict[tooldia] = {
+                            'pos': [],
+                            'text': []
+                        }
+                    annotations = obj.annotations_dict[tooldia]
+                    annotated = set(annotations['pos'])
+                    for geo in travel_geoms:
+                        for position in (geo.coords[0], geo.coords[-1]):
+                            if position not in annotated:
+                                path_num += 1
+                                annotated.add(position)
+                                annotations['pos'].append(position)
+                                annotations['text'].append(str(path_num))
+
+                plot_geoms = geoms[selected]
+                plot_travel = is_travel[selected]
+
+                # plot the geometry of Excellon objects
+                if self.obj_options['type'].lower() == 'excellon':
+                    polys = []
+                    for geo, travel in zip(plot_geoms, plot_travel):
                         try:
                             # if the geos are travel lines
-                            if geo['kind'][0] == 'T':
-                                poly = geo['geom'].buffer((tooldia / 1.99999999), self.steps_per_circle)
+                            if travel:
+                                poly = geo.buffer((tooldia / 1.99999999), self.steps_per_circle)
                             else:
-                                poly = Polygon(geo['geom'])
+                                poly = Polygon(geo)
 
                             poly = poly.simplify(tool_tolerance)
                         except Exception:
                             # deal here with unexpected plot errors due of LineStrings not valid
-                            continue
-                    else:
-                        # plot the geometry of any objects other than Excellon
-                        poly = geo['geom'].buffer((tooldia / 1.99999999), self.steps_per_circle)
-                        poly = poly.simplify(tool_tolerance)
-
-                    # Plotting the shapes
-                    if kind == 'all':
-                        obj.add_shape(shape=poly, color=color[geo['kind'][0]][1], face_color=color[geo['kind'][0]][0],
-                                      visible=visible, layer=1 if geo['kind'][0] == 'C' else 2)
-                    elif kind == 'travel':
-                        if geo['kind'][0] == 'T':
-                            obj.add_shape(shape=poly, color=color['T'][1], face_color=color['T'][0],
-                                          visible=visible, layer=2)
-                    elif kind == 'cut':
-                        if geo['kind'][0] == 'C':
-                            obj.add_shape(shape=poly, color=color['C'][1], face_color=color['C'][0],
-                                          visible=visible, layer=1)
+                            poly = None
+                        polys.append(poly)
+                else:
+                    # plot the geometry of any objects other than Excellon
+                    polys = shapely.buffer(plot_geoms, (tooldia / 1.99999999), quad_segs=int(self.steps_per_circle))
+                    polys = shapely.simplify(polys, tool_tolerance)
+
+                # Plotting the shapes, all the travel shapes at once and all the cut shapes at once; the drill holes
+                # of the Excellon objects are drawn as copies of one hole for each tool
+                add_shapes = obj.add_instanced_shapes if self.obj_options['type'].lower() == 'excellon' else \
+                    obj.add_shapes
+                for k, layer, keep in (('T', 2, plot_travel), ('C', 1, ~plot_travel)):
+                    shapes = [poly for poly, selected_poly in zip(polys, keep) if selected_poly and poly is not None]
+                    if shapes:
+                        add_shapes(shapes=shapes, color=color[k][1], face_color=color[k][0],
+                                   visible=visible, layer=layer)
             else:
                 self.app.inform.emit('[ERROR_NOTCL] %s...' % _('G91 coordinates not implemented'))
                 return 'fail'
@@ -6689,7 +6870,7 @@ class CNCjob(Geometry):
         # self.solid_geometry = unary_union([geo['geom'] for geo in self.gcode_parsed])
 
         # This is much faster but not so nice to look at as you can see different segments of the geometry
-        self.solid_geometry = [geo['geom'] for geo in self.gcode_parsed]
+        self.solid_geometry = list(parsed_geometries(self.gcode_parsed))
 
         return self.solid_geometry
 
@@ -6808,7 +6989,7 @@ class CNCjob(Geometry):
         else:
             target_linear = linear
 
-        gcode = ""
+        gcode = []
 
         # path = list(target_linear.coords)
         path = self.segment(target_linear.coords)
@@ -6838,26 +7019,26 @@ class CNCjob(Geometry):
 
                 if travel[0] is not None:
                     # move to next point
-                    gcode += self.doformat(p.rapid_code, x=locx, y=locy)
+                    gcode.append(self.doformat(p.rapid_code, x=locx, y=locy))
 
                     # raise to safe Z (travel[0]) each time because safe Z may be different
                     self.z_move = travel[0]
-                    gcode += self.doformat(p.lift_code, x=locx, y=locy)
+                    gcode.append(self.doformat(p.lift_code, x=locx, y=locy))
 
                     # restore z_move
                     self.z_move = z_move
                 else:
                     if prev_z is not None:
                         # move to next point
-                        gcode += self.doformat(p.rapid_code, x=locx, y=locy)
+                        gcode.append(self.doformat(p.rapid_code, x=locx, y=locy))
 
                         # we assume that previously the z_move was altered therefore raise to
                         # the travel_z (z_move)
                         self.z_move = z_move
-                        gcode += self.doformat(p.lift_code, x=locx, y=locy)
+                        gcode.append(self.doformat(p.lift_code, x=locx, y=locy))
                     else:
                         # move to next point
-                        gcode += self.doformat(p.rapid_code, x=locx, y=locy)
+                        gcode.append(self.doformat(p.rapid_code, x=locx, y=locy))
 
                 # store prev_z
                 prev_z = travel[0]
@@ -6867,39 +7048,28 @@ class CNCjob(Geometry):
         # Move down to cutting depth
         if down:
             # Different feedrate for vertical cut?
-            gcode += self.doformat(p.z_feedrate_code)
+            gcode.append(self.doformat(p.z_feedrate_code))
             # gcode += self.doformat(p.feedrate_code)
-            gcode += self.doformat(p.down_code, x=first_x, y=first_y, z_cut=z_cut)
-            gcode += self.doformat(p.feedrate_code, feedrate=feedrate)
+            gcode.append(self.doformat(p.down_code, x=first_x, y=first_y, z_cut=z_cut))
+            gcode.append(self.doformat(p.feedrate_code, feedrate=feedrate))
 
         # Cutting...
         prev_x = first_x
         prev_y = first_y
-        for pt in path[1:]:
-            if self.app.abort_flag:
-                # graceful abort requested by the user
-                raise grace
-
-            if self.coordinates_type == "G90":
-                # For Absolute coordinates type G90
-                next_x = pt[0]
-                next_y = pt[1]
-            else:
+        if len(path) > 1:
+            if self.coordinates_type != "G90":
                 # For Incremental coordinates type G91
-                # next_x = pt[0] - prev_x
-                # next_y = pt[1] - prev_y
                 self.app.inform.emit('[ERROR_NOTCL] %s...' % _('G91 coordinates not implemented'))
-                next_x = pt[0]
-                next_y = pt[1]
 
-            gcode += self.doformat(p.linear_code, x=next_x, y=next_y, z_cut=z_cut)  # Linear motion to point
-            prev_x = pt[0]
-            prev_y = pt[1]
+            # Linear motion to each point
+            gcode.append(self.doformat_linear(p.linear_code_bulk, path[1:], z_cut=z_cut))
+            prev_x = path[-1][0]
+            prev_y = path[-1][1]
 
         # Up to travelling height.
         if up:
-            gcode += self.doformat(p.lift_code, x=prev_x, y=prev_y, z_move=z_move)  # Stop cutting
-        return gcode
+            gcode.append(self.doformat(p.lift_code, x=prev_x, y=prev_y, z_move=z_move))  # Stop cutting
+        return ''.join(gcode)
 
     def linear2gcode_extra(self, linear, dia, extracut_length, tolerance=0, down=True, up=True,
                            z_cut=None, z_move=None, zdownrate=None,
@@ -6954,7 +7124,7 @@ class CNCjob(Geometry):
         else:
             target_linear = linear
 
-        gcode = ""
+        gcode = []
 
         # path = list(target_linear.coords)
         path = self.segment(target_linear.coords)
@@ -6983,26 +7153,26 @@ class CNCjob(Geometry):
 
                 if travel[0] is not None:
                     # move to next point
-                    gcode += self.doformat(p.rapid_code, x=locx, y=locy)
+                    gcode.append(self.doformat(p.rapid_code, x=locx, y=locy))
 
                     # raise to safe Z (travel[0]) each time because safe Z may be different
                     self.z_move = travel[0]
-                    gcode += self.doformat(p.lift_code, x=locx, y=locy)
+                    gcode.append(self.doformat(p.lift_code, x=locx, y=locy))
 
                     # restore z_move
                     self.z_move = z_move
                 else:
                     if prev_z is not None:
                         # move to next point
-                        gcode += self.doformat(p.rapid_code, x=locx, y=locy)
+                        gcode.append(self.doformat(p.rapid_code, x=locx, y=locy))
 
                         # we assume that previously the z_move was altered therefore raise to
                         # the travel_z (z_move)
                         self.z_move = z_move
-                        gcode += self.doformat(p.lift_code, x=locx, y=locy)
+                        gcode.append(self.doformat(p.lift_code, x=locx, y=locy))
                     else:
                         # move to next point
-                        gcode += self.doformat(p.rapid_code, x=locx, y=locy)
+                        gcode.append(self.doformat(p.rapid_code, x=locx, y=locy))
 
                 # store prev_z
                 prev_z = travel[0]
@@ -7013,37 +7183,25 @@ class CNCjob(Geometry):
         if down:
             # Different feedrate for vertical cut?
             if self.z_feedrate is not None:
-                gcode += self.doformat(p.z_feedrate_code)
+                gcode.append(self.doformat(p.z_feedrate_code))
                 # gcode += self.doformat(p.feedrate_code)
-                gcode += self.doformat(p.down_code, x=first_x, y=first_y, z_cut=z_cut)
-                gcode += self.doformat(p.feedrate_code, feedrate=feedrate)
+                gcode.append(self.doformat(p.down_code, x=first_x, y=first_y, z_cut=z_cut))
+                gcode.append(self.doformat(p.feedrate_code, feedrate=feedrate))
             else:
-                gcode += self.doformat(p.down_code, x=first_x, y=first_y, z_cut=z_cut)  # Start cutting
+                gcode.append(self.doformat(p.down_code, x=first_x, y=first_y, z_cut=z_cut))  # Start cutting
 
         # Cutting...
         prev_x = first_x
         prev_y = first_y
-        for pt in path[1:]:
-            if self.app.abort_flag:
-                # graceful abort requested by the user
-                raise grace
-
-            if self.coordinates_type == "G90":
-                # For Absolute coordinates type G90
-                next_x = pt[0]
-                next_y = pt[1]
-            else:
-                # For Incremental coordinates type G91
+        if len(path) > 1:
+            if self.coordinates_type != "G90":
                 # For Incremental coordinates type G91
-                # next_x = pt[0] - prev_x
-                # next_y = pt[1] - prev_y
                 self.app.inform.emit('[ERROR_NOTCL] %s...' % _('G91 coordinates not implemented'))
-                next_x = pt[0]
-                next_y = pt[1]
 
-            gcode += self.doformat(p.linear_code, x=next_x, y=next_y, z_cut=z_cut)  # Linear motion to point
-            prev_x = next_x
-            prev_y = next_y
+            # Linear motion to each point
+            gcode.append(self.doformat_linear(p.linear_code_bulk, path[1:], z_cut=z_cut))
+            prev_x = path[-1][0]
+            prev_y = path[-1][1]
 
         # this line is added to create an extra cut over the first point in patch
         # to make sure that we remove the copper leftovers
@@ -7068,28 +7226,22 @@ class CNCjob(Geometry):
             new_y = extra_path[0][1]
 
             # this is an extra line therefore lift the milling bit
-            gcode += self.doformat(p.lift_code, x=prev_x, y=prev_y, z_move=z_move)  # lift
+            gcode.append(self.doformat(p.lift_code, x=prev_x, y=prev_y, z_move=z_move))  # lift
 
             # move fast to the new first point
-            gcode += self.doformat(p.rapid_code, x=new_x, y=new_y)
+            gcode.append(self.doformat(p.rapid_code, x=new_x, y=new_y))
 
             # lower the milling bit
             # Different feedrate for vertical cut?
             if self.z_feedrate is not None:
-                gcode += self.doformat(p.z_feedrate_code)
-                gcode += self.doformat(p.down_code, x=new_x, y=new_y, z_cut=z_cut)
-                gcode += self.doformat(p.feedrate_code, feedrate=feedrate)
+                gcode.append(self.doformat(p.z_feedrate_code))
+                gcode.append(self.doformat(p.down_code, x=new_x, y=new_y, z_cut=z_cut))
+                gcode.append(self.doformat(p.feedrate_code, feedrate=feedrate))
             else:
-                gcode += self.doformat(p.down_code, x=new_x, y=new_y, z_cut=z_cut)  # Start cutting
+                gcode.append(self.doformat(p.down_code, x=new_x, y=new_y, z_cut=z_cut))  # Start cutting
 
-            # start cutting the extra line
-            last_pt = extra_path[0]
-            for pt in extra_path[1:]:
-                gcode += self.doformat(p.linear_code, x=pt[0], y=pt[1])
-                last_pt = pt
-
-            # go back to the original point
-            gcode += self.doformat(p.linear_code, x=path[0][0], y=path[0][1])
+            # start cutting the extra line and then go back to the original point
+            gcode.append(self.doformat_linear(p.linear_code_bulk, extra_path[1:] + [path[0]]))
             last_pt = path[0]
         else:
             # go to the point that is 5% in length before the end (therefore 95% length from start of the line),
@@ -7107,23 +7259,22 @@ class CNCjob(Geometry):
             new_y = extra_path[0][1]
 
             # this is an extra line therefore lift the milling bit
-            gcode += self.doformat(p.lift_code, x=prev_x, y=prev_y, z_move=z_move)  # lift
+            gcode.append(self.doformat(p.lift_code, x=prev_x, y=prev_y, z_move=z_move))  # lift
 
             # move fast to the new first point
-            gcode += self.doformat(p.rapid_code, x=new_x, y=new_y)
+            gcode.append(self.doformat(p.rapid_code, x=new_x, y=new_y))
 
             # lower the milling bit
             # Different feedrate for vertical cut?
             if self.z_feedrate is not None:
-                gcode += self.doformat(p.z_feedrate_code)
-                gcode += self.doformat(p.down_code, x=new_x, y=new_y, z_cut=z_cut)
-                gcode += self.doformat(p.feedrate_code, feedrate=feedrate)
+                gcode.append(self.doformat(p.z_feedrate_code))
+                gcode.append(self.doformat(p.down_code, x=new_x, y=new_y, z_cut=z_cut))
+                gcode.append(self.doformat(p.feedrate_code, feedrate=feedrate))
             else:
-                gcode += self.doformat(p.down_code, x=new_x, y=new_y, z_cut=z_cut)  # Start cutting
+                gcode.append(self.doformat(p.down_code, x=new_x, y=new_y, z_cut=z_cut))  # Start cutting
 
             # start cutting the extra line
-            for pt in extra_path[1:]:
-                gcode += self.doformat(p.linear_code, x=pt[0], y=pt[1])
+            gcode.append(self.doformat_linear(p.linear_code_bulk, extra_path[1:]))
 
             # ---------------------------------------------
             # second half
@@ -7138,16 +7289,14 @@ class CNCjob(Geometry):
             extra_path = list(extra_line.coords)[::-1]
 
             # start cutting the extra line
-            last_pt = extra_path[0]
-            for pt in extra_path[1:]:
-                gcode += self.doformat(p.linear_code, x=pt[0], y=pt[1])
-                last_pt = pt
+            last_pt = extra_path[-1]
+            gcode.append(self.doformat_linear(p.linear_code_bulk, extra_path[1:]))
 
         # Up to travelling height.
         if up:
-            gcode += self.doformat(p.lift_code, x=last_pt[0], y=last_pt[1], z_move=z_move)  # Stop cutting
+            gcode.append(self.doformat(p.lift_code, x=last_pt[0], y=last_pt[1], z_move=z_move))  # Stop cutting
 
-        return gcode
+        return ''.join(gcode)
 
     def point2gcode(self, point, dia, z_move=None, old_point=(0, 0)):
         """
@@ -7186,10 +7335,21 @@ class CNCjob(Geometry):
             first_x = path[0][0]
             first_y = path[0][1]
 
+        # the plunge and the lift; all the moves at the point are made from one parameters snapshot
+        if self.z_feedrate is not None:
+            codes = [(p.z_feedrate_code, {}), (p.down_code, {'z_cut': self.z_cut}), (p.feedrate_code, {})]
+        else:
+            codes = [(p.down_code, {'z_cut': self.z_cut})]     # Start cutting
+        codes.append((p.lift_code, {}))                         # Stop cutting
+
         current_tooldia = dia
         travels = self.app.exc_areas.travel_coordinates(start_point=(old_point[0], old_point[1]),
                                                         end_point=(first_x, first_y),
                                                         tooldia=current_tooldia)
+        if len(travels) == 1 and travels[0][0] is None:
+            # move to the point
+            return self.doformat_points([(p.rapid_code, {})] + codes, [(first_x, first_y)])
+
         prev_z = None
         for travel in travels:
             locx = travel[1][0]
@@ -7223,14 +7383,7 @@ class CNCjob(Geometry):
 
         # gcode += self.doformat(p.linear_code, x=first_x, y=first_y)  # Move to first point
 
-        if self.z_feedrate is not None:
-            gcode += self.doformat(p.z_feedrate_code)
-            gcode += self.doformat(p.down_code, x=first_x, y=first_y, z_cut=self.z_cut)
-            gcode += self.doformat(p.feedrate_code)
-        else:
-            gcode += self.doformat(p.down_code, x=first_x, y=first_y, z_cut=self.z_cut)  # Start cutting
-
-        gcode += self.doformat(p.lift_code, x=first_x, y=first_y)  # Stop cutting
+        gcode += self.doformat_points(codes, [(first_x, first_y)])
         return gcode
 
     def export_svg(self, scale_stroke_factor=0.00,
@@ -7270,46 +7423,43 @@ class CNCjob(Geometry):
 
         # Separate the list of cuts and travels into 2 distinct lists
         # This way we can add different formatting / colors to both
-        cuts = []
-        travels = []
         cutsgeom = ''
         travelsgeom = ''
 
-        for g in self.gcode_parsed:
-            if self.app.abort_flag:
-                # graceful abort requested by the user
-                raise grace
+        geoms = parsed_geometries(self.gcode_parsed)
+        is_travel = (parsed_kinds(self.gcode_parsed) & KIND_TRAVEL) != 0
+        cuts = geoms[~is_travel]
+        travels = geoms[is_travel]
 
-            if g['kind'][0] == 'C':
-                cuts.append(g)
-            if g['kind'][0] == 'T':
-                travels.append(g)
+        if self.app.abort_flag:
+            # graceful abort requested by the user
+            raise grace
 
         # Used to determine the overall board size
-        self.solid_geometry = unary_union([geo['geom'] for geo in self.gcode_parsed])
+        self.solid_geometry = unary_union(geoms)
 
         # Convert the cuts and travels into single geometry objects we can render as svg xml
-        if travels:
-            travelsgeom = unary_union([geo['geom'] for geo in travels])
+        if travels.size:
+            travelsgeom = unary_union(travels)
 
         if self.app.abort_flag:
             # graceful abort requested by the user
             raise grace
 
-        if cuts:
-            cutsgeom = unary_union([geo['geom'] for geo in cuts])
+        if cuts.size:
+            cutsgeom = unary_union(cuts)
 
         # Render the SVG Xml
         # The scale factor affects the size of the lines, and the stroke color adds different formatting for each set
         # It's better to have the travels sitting underneath the cuts for visicut
         svg_elem = ""
-        if travels:
+        if travels.size:
             svg_elem = travelsgeom.svg(scale_factor=scale_stroke_factor, stroke_color="#F0E24D")
-        if cuts:
+        if cuts.size:
             svg_elem += cutsgeom.svg(scale_factor=scale_stroke_factor, stroke_color="#5E6CFF")
 
         # if both are true then we need a root element <g>
-        if travels and cuts:
+        if travels.size and cuts.size:
             svg_elem = "<g>" + svg_elem + "</g>"
 
         return svg_elem
@@ -7557,17 +7707,20 @@ class CNCjob(Geometry):
             self.el_count = 0
 
             # scale geometry
-            for g in self.gcode_parsed:
-                try:
-                    g['geom'] = affinity.scale(g['geom'], xfactor, yfactor, origin=(px, py))
-                except AttributeError:
-                    return g['geom']
+            if isinstance(self.gcode_parsed, GCodeParsed):
+                self.gcode_parsed.affine(affine_matrix_scale(xfactor, yfactor, (px, py)))
+            else:
+                for g in self.gcode_parsed:
+                    try:
+                        g['geom'] = affinity.scale(g['geom'], xfactor, yfactor, origin=(px, py))
+                    except AttributeError:
+                        return g['geom']
 
-                self.el_count += 1
-                disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
-                if self.old_disp_number < disp_number <= 100:
-                    self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                    self.old_disp_number = disp_number
+                    self.el_count += 1
+                    disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
+                    if self.old_disp_number < disp_number <= 100:
+                        self.app.proc_container.update_view_text(' %d%%' % disp_number)
+                        self.old_disp_number = disp_number
 
             self.create_geometry()
         else:
@@ -7586,19 +7739,22 @@ class CNCjob(Geometry):
                 self.el_count = 0
 
                 # scale gcode_parsed
-                for g in v['gcode_parsed']:
-                    try:
-                        g['geom'] = affinity.scale(g['geom'], xfactor, yfactor, origin=(px, py))
-                    except AttributeError:
-                        return g['geom']
+                if isinstance(v['gcode_parsed'], GCodeParsed):
+                    v['gcode_parsed'].affine(affine_matrix_scale(xfactor, yfactor, (px, py)))
+                else:
+                    for g in v['gcode_parsed']:
+                        try:
+                            g['geom'] = affinity.scale(g['geom'], xfactor, yfactor, origin=(px, py))
+                        except AttributeError:
+                            return g['geom']
 
-                    self.el_count += 1
-                    disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
-                    if self.old_disp_number < disp_number <= 100:
-                        self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                        self.old_disp_number = disp_number
+                        self.el_count += 1
+                        disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
+                        if self.old_disp_number < disp_number <= 100:
+                            self.app.proc_container.update_view_text(' %d%%' % disp_number)
+                            self.old_disp_number = disp_number
 
-                v['solid_geometry'] = unary_union([geo['geom'] for geo in v['gcode_parsed']])
+                v['solid_geometry'] = unary_union(parsed_geometries(v['gcode_parsed']))
         self.create_geometry()
         self.app.proc_container.new_text = ''
 
@@ -7666,17 +7822,20 @@ class CNCjob(Geometry):
             self.el_count = 0
 
             # offset geometry
-            for g in self.gcode_parsed:
-                try:
-                    g['geom'] = affinity.translate(g['geom'], xoff=dx, yoff=dy)
-                except AttributeError:
-                    return g['geom']
+            if isinstance(self.gcode_parsed, GCodeParsed):
+                self.gcode_parsed.affine(affine_matrix_translate(dx, dy))
+            else:
+                for g in self.gcode_parsed:
+                    try:
+                        g['geom'] = affinity.translate(g['geom'], xoff=dx, yoff=dy)
+                    except AttributeError:
+                        return g['geom']
 
-                self.el_count += 1
-                disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
-                if self.old_disp_number < disp_number <= 100:
-                    self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                    self.old_disp_number = disp_number
+                    self.el_count += 1
+                    disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
+                    if self.old_disp_number < disp_number <= 100:
+                        self.app.proc_container.update_view_text(' %d%%' % disp_number)
+                        self.old_disp_number = disp_number
 
             self.create_geometry()
         else:
@@ -7695,20 +7854,23 @@ class CNCjob(Geometry):
                 self.el_count = 0
 
                 # offset gcode_parsed
-                for g in v['gcode_parsed']:
-                    try:
-                        g['geom'] = affinity.translate(g['geom'], xoff=dx, yoff=dy)
-                    except AttributeError:
-                        return g['geom']
+                if isinstance(v['gcode_parsed'], GCodeParsed):
+                    v['gcode_parsed'].affine(affine_matrix_translate(dx, dy))
+                else:
+                    for g in v['gcode_parsed']:
+                        try:
+                            g['geom'] = affinity.translate(g['geom'], xoff=dx, yoff=dy)
+                        except AttributeError:
+                            return g['geom']
 
-                    self.el_count += 1
-                    disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
-                    if self.old_disp_number < disp_number <= 100:
-                        self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                        self.old_disp_number = disp_number
+                        self.el_count += 1
+                        disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
+                        if self.old_disp_number < disp_number <= 100:
+                            self.app.proc_container.update_view_text(' %d%%' % disp_number)
+                            self.old_disp_number = disp_number
 
                 # for the bounding box
-                v['solid_geometry'] = unary_union([geo['geom'] for geo in v['gcode_parsed']])
+                v['solid_geometry'] = unary_union(parsed_geometries(v['gcode_parsed']))
 
         self.app.proc_container.new_text = ''
 
@@ -7734,17 +7896,20 @@ class CNCjob(Geometry):
         self.old_disp_number = 0
         self.el_count = 0
 
-        for g in self.gcode_parsed:
-            try:
-                g['geom'] = affinity.scale(g['geom'], xscale, yscale, origin=(px, py))
-            except AttributeError:
-                return g['geom']
+        if isinstance(self.gcode_parsed, GCodeParsed):
+            self.gcode_parsed.affine(affine_matrix_scale(xscale, yscale, (px, py)))
+        else:
+            for g in self.gcode_parsed:
+                try:
+                    g['geom'] = affinity.scale(g['geom'], xscale, yscale, origin=(px, py))
+                except AttributeError:
+                    return g['geom']
 
-            self.el_count += 1
-            disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
-            if self.old_disp_number < disp_number <= 100:
-                self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                self.old_disp_number = disp_number
+                self.el_count += 1
+                disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
+                if self.old_disp_number < disp_number <= 100:
+                    self.app.proc_container.update_view_text(' %d%%' % disp_number)
+                    self.old_disp_number = disp_number
 
         self.create_geometry()
         self.app.proc_container.new_text = ''
@@ -7777,17 +7942,20 @@ class CNCjob(Geometry):
         self.old_disp_number = 0
         self.el_count = 0
 
-        for g in self.gcode_parsed:
-            try:
-                g['geom'] = affinity.skew(g['geom'], angle_x, angle_y, origin=(px, py))
-            except AttributeError:
-                return g['geom']
+        if isinstance(self.gcode_parsed, GCodeParsed):
+            self.gcode_parsed.affine(affine_matrix_skew(angle_x, angle_y, (px, py)))
+        else:
+            for g in self.gcode_parsed:
+                try:
+                    g['geom'] = affinity.skew(g['geom'], angle_x, angle_y, origin=(px, py))
+                except AttributeError:
+                    return g['geom']
 
-            self.el_count += 1
-            disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
-            if self.old_disp_number < disp_number <= 100:
-                self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                self.old_disp_number = disp_number
+                self.el_count += 1
+                disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
+                if self.old_disp_number < disp_number <= 100:
+                    self.app.proc_container.update_view_text(' %d%%' % disp_number)
+                    self.old_disp_number = disp_number
 
         self.create_geometry()
         self.app.proc_container.new_text = ''
@@ -7813,17 +7981,20 @@ class CNCjob(Geometry):
         self.old_disp_number = 0
         self.el_count = 0
 
-        for g in self.gcode_parsed:
-            try:
-                g['geom'] = affinity.rotate(g['geom'], angle, origin=(px, py))
-            except AttributeError:
-                return g['geom']
+        if isinstance(self.gcode_parsed, GCodeParsed):
+            self.gcode_parsed.affine(affine_matrix_rotate(angle, (px, py)))
+        else:
+            for g in self.gcode_parsed:
+                try:
+                    g['geom'] = affinity.rotate(g['geom'], angle, origin=(px, py))
+                except AttributeError:
+                    return g['geom']
 
-            self.el_count += 1
-            disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
-            if self.old_disp_number < disp_number <= 100:
-                self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                self.old_disp_number = disp_number
+                self.el_count += 1
+                disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
+                if self.old_disp_number < disp_number <= 100:
+                    self.app.proc_container.update_view_text(' %d%%' % disp_number)
+                    self.old_disp_number = disp_number
 
         self.create_geometry()
         self.app.proc_container.new_text = ''
@@ -7839,6 +8010,12 @@ def flatten_shapely_geometry(geometry, simplify_tolerance: float = 0.0) -> list:
     :return:
     :rtype:
     """
+    if isinstance(geometry, GeometryArray):
+        parts = geometry.parts(['MultiLineString', 'MultiPolygon', 'MultiPoint'])
+        if simplify_tolerance > 0.0:
+            parts = shapely.simplify(parts, simplify_tolerance)
+        return parts.tolist()
+
     flat_list = []
     try:
         work_geo = geometry.geoms if isinstance(geometry, (MultiLineString, MultiPolygon, MultiPoint)) else geometry
@@ -7880,6 +8057,156 @@ def get_bounds(geometry_list: list) -> list:
     return [xmin, ymin, xmax, ymax]
 
 
+def _about_origin(linear, origin):
+    """
+    Make the 3x3 affine matrix of a linear transformation that keeps the origin point in place.
+
+    :param linear:  2x2 matrix of the linear transformation
+    :param origin:  (x, y) point that is not moved by the transformation
+    :return:        3x3 affine matrix
+    :rtype:         np.ndarray
+    """
+    x0, y0 = origin
+    matrix = np.identity(3)
+    matrix[:2, :2] = linear
+    matrix[:2, 2] = (x0, y0) - np.dot(linear, (x0, y0))
+    return matrix
+
+
+def translation_matrix(dx, dy):
+    """
+    :param dx:  offset on the X axis
+    :param dy:  offset on the Y axis
+    :return:    3x3 affine matrix of the translation
+    :rtype:     np.ndarray
+    """
+    matrix = np.identity(3)
+    matrix[:2, 2] = (dx, dy)
+    return matrix
+
+
+def scale_matrix(xfactor, yfactor, origin=(0, 0)):
+    """
+    Same as shapely.affinity.scale(); a mirror is a scale with a -1 factor.
+
+    :param xfactor: scale factor on the X axis
+    :param yfactor: scale factor on the Y axis
+    :param origin:  (x, y) reference point of the scaling
+    :return:        3x3 affine matrix of the scaling
+    :rtype:         np.ndarray
+    """
+    return _about_origin(np.diag((xfactor, yfactor)), origin)
+
+
+def rotation_matrix(angle, origin=(0, 0)):
+    """
+    Same as shapely.affinity.rotate().
+
+    :param angle:   angle in degrees, positive angles are counter-clockwise
+    :param origin:  (x, y) point around which to rotate
+    :return:        3x3 affine matrix of the rotation
+    :rtype:         np.ndarray
+    """
+    theta = math.radians(angle)
+    cos_a, sin_a = math.cos(theta), math.sin(theta)
+    return _about_origin(((cos_a, -sin_a), (sin_a, cos_a)), origin)
+
+
+def skew_matrix(angle_x, angle_y, origin=(0, 0)):
+    """
+    Same as shapely.affinity.skew().
+
+    :param angle_x: shear angle, in degrees, along the X axis
+    :param angle_y: shear angle, in degrees, along the Y axis
+    :param origin:  (x, y) reference point of the skew
+    :return:        3x3 affine matrix of the skew
+    :rtype:         np.ndarray
+    """
+    return _about_origin(((1.0, math.tan(math.radians(angle_x))), (math.tan(math.radians(angle_y)), 1.0)), origin)
+
+
+def transform_bounds(bounds, matrix, rigid=False):
+    """
+    Transform the bounds of a geometry with an affine matrix. The result is exact only when the matrix keeps the
+    axes (translations, scaling, mirrors and rotations by multiples of 90 degrees).
+
+    :param bounds:  (xmin, ymin, xmax, ymax)
+    :param matrix:  3x3 affine matrix
+    :param rigid:   if True, the result is exact only if the matrix does not change the sizes either
+    :return:        the bounds of the transformed geometry or None if they can't be known without the geometry
+    :rtype:         tuple | None
+    """
+    if bounds is None or not np.all(np.isfinite(bounds)):
+        return None
+
+    linear = matrix[:2, :2]
+    tolerance = 1e-12 * max(np.abs(linear).max(), 1.0)
+    if not (abs(linear[0, 1]) < tolerance and abs(linear[1, 0]) < tolerance) and \
+            not (abs(linear[0, 0]) < tolerance and abs(linear[1, 1]) < tolerance):
+        return None
+    if rigid and not np.allclose(np.abs(linear).sum(axis=0), 1.0):
+        return None
+
+    corners = np.dot(np.array(((bounds[0], bounds[1]), (bounds[2], bounds[3]))), linear.T) + matrix[:2, 2]
+    xmin, ymin = corners.min(axis=0)
+    xmax, ymax = corners.max(axis=0)
+    return float(xmin), float(ymin), float(xmax), float(ymax)
+
+
+def affine_transform_geometry(geometry, matrix):
+    """
+    Transform all the Shapely geometry found in a nested structure of lists, tuples and dicts with an affine
+    matrix, in one vectorized pass. The lists and tuples are made again, the dicts are updated in place; anything
+    that is not geometry is left as it is.
+
+    :param geometry:    Shapely geometry or a structure that holds Shapely geometry
+    :param matrix:      3x3 affine matrix
+    :return:            the transformed structure
+    """
+    if isinstance(geometry, GeometryArray):
+        return geometry.transform(matrix)
+
+    collected = []
+    visited = set()
+
+    def collect(obj):
+        if isinstance(obj, BaseGeometry):
+            collected.append(obj)
+        elif isinstance(obj, (list, tuple)):
+            for el in obj:
+                collect(el)
+        elif isinstance(obj, dict) and id(obj) not in visited:
+            visited.add(id(obj))
+            for el in obj.values():
+                collect(el)
+
+    collect(geometry)
+    if not collected:
+        return geometry
+
+    matrix = np.asarray(matrix, dtype=float)
+    geo_arr = np.empty(len(collected), dtype=object)
+    geo_arr[:] = collected
+    transformed = iter(shapely.transform(geo_arr, lambda coords: np.dot(coords, matrix[:2, :2].T) + matrix[:2, 2]))
+    visited.clear()
+
+    def rebuild(obj):
+        if isinstance(obj, BaseGeometry):
+            return next(transformed)
+        if isinstance(obj, list):
+            rebuilt = [rebuild(el) for el in obj]
+            return GeometryArray(rebuilt) if isinstance(obj, GeometryArray) else rebuilt
+        if isinstance(obj, tuple):
+            return tuple(rebuild(el) for el in obj)
+        if isinstance(obj, dict) and id(obj) not in visited:
+            visited.add(id(obj))
+            for key in obj:
+                obj[key] = rebuild(obj[key])
+        return obj
+
+    return rebuild(geometry)
+
+
 def arc(center, radius, start, stop, direction, steps_per_circ):
     """
     Creates a list of point along the specified arc.
@@ -7971,12 +8298,15 @@ def to_dict(obj):
 
     * ApertureMacro
     * BaseGeometry
+    * GCodeParsed (as the list of dictionaries it stands for)
 
     :param obj:     Shapely geometry.
     :type obj:      BaseGeometry
     :return:        Dictionary with serializable form if ``obj`` was
                     BaseGeometry or ApertureMacro, otherwise returns ``obj``.
     """
+    if isinstance(obj, GCodeParsed):
+        return obj.to_list()
     if isinstance(obj, ApertureMacro):
         return {
             "__class__": "ApertureMacro",
@@ -8504,6 +8834,159 @@ class AppRTreeStorage(AppRTree):
         tidx = super(AppRTreeStorage, self).nearest(pt)
         return (tidx.bbox[0], tidx.bbox[1]), self.objects[tidx.object]
 
+
+class AppKDTreeStorage(object):
+    """
+    Same API as AppRTreeStorage (insert(), remove(), nearest(), get_objects()) but the points of the objects are
+    kept in NumPy arrays and searched with a KD-tree built in bulk, instead of being inserted one by one in a
+    libspatialindex tree. Removing an object only marks it as deleted; the deleted points are skipped by nearest()
+    and the tree is rebuilt (only with the points left) when too many of them are deleted.
+
+    Made for the chaining of the paths (nearest, then remove, in a loop) where only the endpoints are indexed.
+    Requires scipy. Use EndpointStorage to get this storage or AppRTreeStorage when scipy is not installed.
+    """
+
+    __slots__ = ('objects', 'indexes', 'get_points', '_alive', '_nr_points', '_pending_xy', '_pending_owner',
+                 '_xy', '_owner', '_tree', '_dead', '_nr_built')
+
+    # the points inserted after the tree was built are searched one by one, up to this number
+    max_pending = 64
+
+    def __init__(self):
+        # the stored objects; None for the removed ones
+        self.objects = []
+        # id(object) -> index in self.objects
+        self.indexes = {}
+        self.get_points = lambda go: go.coords
+
+        # for each object: 1 if it was not removed and the number of its indexed points
+        self._alive = bytearray()
+        self._nr_points = []
+
+        # points not yet in the tree
+        self._pending_xy = []
+        self._pending_owner = []
+
+        # points in the tree, the index of the object they belong to and how many of them belong to removed objects
+        self._xy = np.empty((0, 2))
+        self._owner = np.empty(0, dtype=np.intp)
+        self._tree = None
+        self._dead = 0
+        # the objects inserted before the last rebuild; the points of the others are pending
+        self._nr_built = 0
+
+    def __len__(self):
+        return len(self._alive) - self._alive.count(0)
+
+    def insert(self, obj):
+        pts = [(pt[0], pt[1]) for pt in self.get_points(obj)]
+
+        idx = len(self.objects)
+        self.objects.append(obj)
+        # See the note about the indexes in AppRTreeStorage.insert()
+        self.indexes[id(obj)] = idx
+        self._alive.append(1)
+        self._nr_points.append(len(pts))
+
+        self._pending_xy += pts
+        self._pending_owner += [idx] * len(pts)
+
+    def remove(self, obj):
+        objidx = self.indexes[id(obj)]
+        self.objects[objidx] = None
+
+        if self._alive[objidx]:
+            self._alive[objidx] = 0
+            # the points still pending are dropped when the tree is rebuilt and are not counted
+            if objidx < self._nr_built:
+                self._dead += self._nr_points[objidx]
+
+    def get_objects(self):
+        return (o for o in self.objects if o is not None)
+
+    def _rebuild(self):
+        """
+        Builds the tree from the points of the objects that were not removed, including the pending ones.
+        """
+        alive = np.frombuffer(bytes(self._alive), dtype=np.uint8).astype(bool)
+        if self._pending_xy:
+            pending_xy = np.array(self._pending_xy, dtype=float).reshape(-1, 2)
+            pending_owner = np.array(self._pending_owner, dtype=np.intp)
+            xy = np.concatenate([self._xy, pending_xy])
+            owner = np.concatenate([self._owner, pending_owner])
+        else:
+            xy, owner = self._xy, self._owner
+
+        keep = alive[owner]
+        self._xy = xy[keep]
+        self._owner = owner[keep]
+        self._pending_xy = []
+        self._pending_owner = []
+        self._dead = 0
+        self._nr_built = len(self._alive)
+        self._tree = cKDTree(self._xy, leafsize=16, balanced_tree=False, compact_nodes=False) if len(self._xy) else None
+
+    def _nearest_in_tree(self, pt):
+        """
+        :return:    (distance, (x, y), object index) of the nearest point of a not removed object, in the tree;
+                    None if there is none
+        """
+        size = len(self._xy)
+        if self._tree is None or self._dead >= size:
+            return None
+
+        alive = self._alive
+        k = min(8, size)
+        skipped = 0
+        while True:
+            dists, rows = self._tree.query(pt, k=[*range(skipped + 1, k + 1)])
+            for d, row in zip(dists.tolist(), rows.tolist()):
+                objidx = int(self._owner[row])
+                if alive[objidx]:
+                    found = d, (float(self._xy[row, 0]), float(self._xy[row, 1])), objidx
+                    # too many removed points around; it is cheaper to rebuild the tree than to skip them again
+                    if skipped > 32 and self._dead * 8 > size:
+                        self._rebuild()
+                    return found
+            skipped = k
+            if k == size:
+                return None
+            k = min(k * 4, size)
+
+    def nearest(self, pt):
+        """
+        Returns the nearest matching point and the object it belongs to.
+        Will raise StopIteration if no items are found.
+
+        :param pt:  Query point.
+        :return:    (match_x, match_y), Object owner of matching point.
+        :rtype:     tuple
+        """
+        if len(self._pending_xy) > self.max_pending or (self._pending_xy and self._tree is None) or \
+                (self._tree is not None and self._dead * 2 > len(self._xy)):
+            self._rebuild()
+
+        # the few points inserted after the tree was built; they are searched first, the search in the tree may
+        # rebuild it and move them into it
+        best_dist, best_pt, best_owner = np.inf, None, None
+        for xy, owner in zip(self._pending_xy, self._pending_owner):
+            if self._alive[owner]:
+                d = math.hypot(xy[0] - pt[0], xy[1] - pt[1])
+                if d < best_dist:
+                    best_dist, best_pt, best_owner = d, (float(xy[0]), float(xy[1])), owner
+
+        found = self._nearest_in_tree(pt)
+        if found is not None and (best_owner is None or found[0] < best_dist):
+            best_dist, best_pt, best_owner = found
+
+        if best_owner is None:
+            raise StopIteration
+        return best_pt, self.objects[best_owner]
+
+
+# the chaining of the paths uses the KD-tree index when scipy is installed
+EndpointStorage = AppKDTreeStorage if HAS_SCIPY else AppRTreeStorage
+
 # class myO:
 #     def __init__(self, coords):
 #         self.coords = coords
@@ -77,6 +77,9 @@ class AppDefaults:
         "units_precision": 4,
         "global_graphic_engine": '3D',
         "global_graphic_engine_3d_no_mp": False,
+        "global_graphic_engine_triangulation": 'glu',
+        "global_graphic_engine_lod": True,
+        "global_graphic_engine_instancing": True,
         "global_app_level": 'b',
 
         "global_log_verbose": 2,
@@ -94,6 +97,7 @@ class AppDefaults:
         "global_process_number": int((os.cpu_count()) / 4) if os.cpu_count() > 4 else 1,
         "global_tolerance": 0.005,
 
+        "global_project_format": 'archive',
         "global_save_compressed": True,
         "global_compression_level": 3,
         "global_autosave": False,
@@ -172,6 +176,7 @@ class AppDefaults:
         "gerber_use_buffer_for_union": True,
         "gerber_clean_apertures": True,
         "gerber_extra_buffering": False,
+        "gerber_tiled_union": False,
         "gerber_plot_on_select": True,
 
         "gerber_plot_fill": '#BBF268BF',
@@ -543,6 +548,7 @@ class AppDefaults:
         "tools_ncc_tipangle": 30,
         "tools_ncc_newdia": 0.1,
         "tools_ncc_plotting": 'normal',
+        "tools_ncc_parallel": True,
         "tools_ncc_check_valid": True,
 
         # Cutout Tool
@@ -575,6 +581,7 @@ class AppDefaults:
         "tools_paint_connect": True,
         "tools_paint_contour": True,
         "tools_paint_plotting": 'normal',
+        "tools_paint_parallel": True,
         "tools_paint_rest": False,
         "tools_paint_cutz": -0.05,
         "tools_paint_tipdia": 0.1,
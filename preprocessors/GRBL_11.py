@@ -236,6 +236,13 @@ G00 Z{z_toolchange}
         return ('G01 ' + self.position_code(p)).format(**p) + \
                ' F' + str(self.feedrate_format % (p.fr_decimals, p.feedrate))
 
+    def rapid_code_bulk(self, p, xs, ys):
+        return self.format_positions(p, 'G00 ', xs, ys)
+
+    def linear_code_bulk(self, p, xs, ys):
+        return self.format_positions(p, 'G01 ', xs, ys,
+                                     suffix=' F' + str(self.feedrate_format % (p.fr_decimals, p.feedrate)))
+
     def end_code(self, p):
         coords_xy = p['xy_end']
         gcode = ('G00 Z' + self.feedrate_format % (p.fr_decimals, p.z_end) + "\n")
@@ -233,6 +233,12 @@ G0 Z{z_toolchange}
     def linear_code(self, p):
         return ('G1 ' + self.position_code(p)).format(**p) + " " + self.inline_feedrate_code(p)
 
+    def rapid_code_bulk(self, p, xs, ys):
+        return self.format_positions(p, 'G0 ', xs, ys, suffix=" " + self.feedrate_rapid_code(p))
+
+    def linear_code_bulk(self, p, xs, ys):
+        return self.format_positions(p, 'G1 ', xs, ys, suffix=" " + self.inline_feedrate_code(p))
+
     def end_code(self, p):
         coords_xy = p['xy_end']
         gcode = ('G0 Z' + self.feedrate_format % (p.fr_decimals, p.z_end) + " " + self.feedrate_rapid_code(p) + "\n")
@@ -250,6 +250,12 @@ G00 Z{z_toolchange}
         # It is a horizontal move in the X-Y CNC plane.
         return ('G01 ' + self.position_code(p)).format(**p)
 
+    def rapid_code_bulk(self, p, xs, ys):
+        return self.format_positions(p, 'G00 ', xs, ys)
+
+    def linear_code_bulk(self, p, xs, ys):
+        return self.format_positions(p, 'G01 ', xs, ys)
+
     def end_code(self, p):
         # a final move at the end of the CNC job. First it moves to a safe parking Z height followed by an X-Y move
         # to the parking location.
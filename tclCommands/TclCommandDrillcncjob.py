@@ -1,4 +1,5 @@
 from tclCommands.TclCommand import TclCommandSignaled
+from appParsers.ParseGCode import GCodeParsed
 
 import collections
 import math
@@ -82,7 +83,8 @@ class TclCommandDrillcncjob(TclCommandSignaled):
             ('las_min_pwr', 'Used with "laser" preprocessors. Set the laser power when not cutting, travelling'),
             ('pp', 'This is the Excellon preprocessor name: case_sensitive, no_quotes'),
             ('opt_type', 'Name of move optimization type. B by default for Basic OR-Tools, M for Metaheuristic OR-Tools'
-                         'T from Travelling Salesman Algorithm. B and M works only for 64bit application flavor and '
+                         'T from Travelling Salesman Algorithm, R for Rtree and L for 2-Opt (needs scipy). '
+                         'B and M works only for 64bit application flavor and '
                          'T works only for 32bit application flavor'),
             ('diatol', 'Tolerance. Percentange (0.0 ... 100.0) within which dias in drilled_dias will be judged to be '
                        'the same as the ones in the tools from the Excellon object. E.g: if in drill_dias we have a '
@@ -358,7 +360,7 @@ class TclCommandDrillcncjob(TclCommandSignaled):
             cnc_job_obj.source_file = ret_val
             cnc_job_obj.gc_start = ret_val[1]
 
-            total_gcode_parsed = []
+            parsed_parts = []
             if cnc_job_obj.toolchange is True:
                 if tools == "all":
                     processed_tools = list(cnc_job_obj.tools.keys())
@@ -377,7 +379,7 @@ class TclCommandDrillcncjob(TclCommandSignaled):
                     first_drill_point = cnc_job_obj.tools[t_item]['last_point']
                     gcode_parsed = cnc_job_obj.excellon_tool_gcode_parse(used_tooldia, gcode=tool_gcode,
                                                                          start_pt=first_drill_point)
-                    total_gcode_parsed += gcode_parsed
+                    parsed_parts.append(gcode_parsed)
                     cnc_job_obj.tools[t_item]['gcode_parsed'] = gcode_parsed
             else:
                 if tools == "all":
@@ -395,10 +397,10 @@ class TclCommandDrillcncjob(TclCommandSignaled):
                 first_drill_point = cnc_job_obj.tools[first_tool]['last_point']
                 gcode_parsed = cnc_job_obj.excellon_tool_gcode_parse(used_tooldia, gcode=tool_gcode,
                                                                      start_pt=first_drill_point)
-                total_gcode_parsed += gcode_parsed
+                parsed_parts.append(gcode_parsed)
                 cnc_job_obj.tools[first_tool]['gcode_parsed'] = gcode_parsed
 
-            cnc_job_obj.gcode_parsed = total_gcode_parsed
+            cnc_job_obj.gcode_parsed = GCodeParsed.concatenate(parsed_parts)
             # cnc_job_obj.gcode_parse()
             cnc_job_obj.create_geometry()
 
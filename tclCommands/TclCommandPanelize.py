@@ -298,7 +298,7 @@ class TclCommandPanelize(TclCommand):
                     currenty = 0.0
 
                     def translate_recursion(geom):
-                        if type(geom) == list:
+                        if isinstance(geom, list):
                             geoms = []
                             for local_geom in geom:
                                 geoms.append(translate_recursion(local_geom))
@@ -359,7 +359,7 @@ class TclCommandPanelize(TclCommand):
                     currenty = 0.0
 
                     def translate_recursion(geom):
-                        if type(geom) == list:
+                        if isinstance(geom, list):
                             geoms = []
                             for local_geom in geom:
                                 res_geo = translate_recursion(local_geom)